@@ -1000,44 +1000,19 @@ class AIAnalysisService:
         column_list = sorted(columns, key=lambda x: x.lower())[:max_columns]
         return {"tables": table_list, "columns": column_list}
 
-    @staticmethod
-    def _extract_plan_table_cardinality(plan_xml: str) -> Dict[str, int]:
+    def _extract_plan_table_cardinality(self, plan_xml: str) -> Dict[str, int]:
         if not plan_xml:
             return {}
         try:
-            import xml.etree.ElementTree as ET
-            root = ET.fromstring(plan_xml)
+            # PlanInsights cache'i (plan hash + analyzer sürümü): hit'te plan XML parse edilmez
+            return dict(self.plan_analyzer.analyze(plan_xml).table_cardinality)
         except Exception:
             return {}
-        ns = {"sp": "http://schemas.microsoft.com/sqlserver/2004/07/showplan"}
-        cardinality_map: Dict[str, int] = {}
-        for node in root.findall(".//*[@TableCardinality]"):
-            raw_value = node.get("TableCardinality")
-            if not raw_value:
-                continue
-            try:
-                card_value = int(float(raw_value))
-            except Exception:
-                continue
-            if card_value <= 0:
-                continue
-            obj = node.find(".//sp:Object", ns)
-            if obj is None:
-                continue
-            schema_name = str(obj.get("Schema", "") or "dbo").strip("[]")
-            table_name = str(obj.get("Table", "") or "").strip("[]")
-            if not table_name:
-                continue
-            key = f"{schema_name}.{table_name}".lower()
-            if card_value > cardinality_map.get(key, 0):
-                cardinality_map[key] = card_value
-        return cardinality_map
 
-    @classmethod
-    def _apply_plan_table_rows(cls, existing_indexes: Any, plan_xml: str) -> Any:
+    def _apply_plan_table_rows(self, existing_indexes: Any, plan_xml: str) -> Any:
         if not isinstance(existing_indexes, list) or not plan_xml:
             return existing_indexes
-        card_map = cls._extract_plan_table_cardinality(plan_xml)
+        card_map = self._extract_plan_table_cardinality(plan_xml)
         if not card_map:
             return existing_indexes
         for table_info in existing_indexes:
@@ -1843,6 +1818,12 @@ class AIAnalysisService:
         primary = str(plan_insights.get("primary_access_operator", "") or "").strip()
         if primary:
             parts.append(f"primary={primary}")
+        hotspots = plan_insights.get("runtime_hotspots", [])
+        if isinstance(hotspots, list) and hotspots and isinstance(hotspots[0], dict):
+            parts.append(f"hotspot={hotspots[0].get('operator', '')}")
+        misestimates = plan_insights.get("cardinality_misestimates", [])
+        if isinstance(misestimates, list) and misestimates:
+            parts.append(f"misestimates={len(misestimates)}")
         flags = []
         for key, label in (
             ("has_table_scan", "table_scan"),
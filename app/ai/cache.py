@@ -84,6 +84,7 @@ class CacheConfig:
     default_ttl: int = 3600  # 1 hour
     analysis_ttl: int = 7200  # 2 hours for AI analysis
     collection_ttl: int = 600  # 10 minutes for collection data
+    plan_insights_ttl: int = 30 * 24 * 3600  # Derived from plan XML only; long-lived
     
     # Strategies
     eviction_strategy: CacheStrategy = CacheStrategy.LRU
@@ -132,6 +133,16 @@ class CacheKeyBuilder:
         ]
         return ":".join(parts)
     
+    @staticmethod
+    def for_plan_insights(plan_hash: str, analyzer_version: int) -> str:
+        """Build cache key for derived plan insights"""
+        parts = [
+            "plan_insights",
+            f"v{int(analyzer_version)}",
+            plan_hash,
+        ]
+        return ":".join(parts)
+    
     @staticmethod
     def hash_content(content: Any) -> str:
         """Generate hash from content"""
@@ -579,6 +590,48 @@ class AIAnalysisCache:
         if self._memory:
             self._memory.set(key, data, self._config.collection_ttl)
     
+    def get_plan_insights(self, plan_hash: str, analyzer_version: int) -> Optional[Any]:
+        """
+        Get cached plan insights for a plan content hash.
+        
+        Args:
+            plan_hash: Plan XML content hash
+            analyzer_version: Analyzer version the insights were produced with
+            
+        Returns:
+            Cached PlanInsights or None
+        """
+        key = CacheKeyBuilder.for_plan_insights(plan_hash, analyzer_version)
+        
+        if self._memory:
+            result = self._memory.get(key)
+            if result is not None:
+                logger.debug(f"Cache hit (memory): {key}")
+                return result
+        
+        if self._disk:
+            result = self._disk.get(key)
+            if result is not None:
+                logger.debug(f"Cache hit (disk): {key}")
+                if self._memory:
+                    self._memory.set(key, result, self._config.plan_insights_ttl, plan_hash)
+                return result
+        
+        return None
+    
+    def set_plan_insights(self, plan_hash: str, analyzer_version: int, insights: Any) -> None:
+        """Cache plan insights in memory and on disk"""
+        key = CacheKeyBuilder.for_plan_insights(plan_hash, analyzer_version)
+        ttl = self._config.plan_insights_ttl
+        
+        if self._memory:
+            self._memory.set(key, insights, ttl, plan_hash)
+        
+        if self._disk:
+            self._disk.set(key, insights, ttl)
+        
+        logger.debug(f"Cached plan insights: {key}")
+    
     def invalidate_object(self, object_name: str) -> int:
         """
         Invalidate all cache entries for an object.
@@ -9,6 +9,7 @@ Bu modül XML execution plan'ı analiz ederek:
 5. AI'a zengin context sağlar
 """
 
+import copy
 import re
 import xml.etree.ElementTree as ET
 from typing import Dict, Any, List, Optional, Tuple
@@ -16,9 +17,15 @@ from dataclasses import dataclass, field
 from enum import Enum
 
 from app.core.logger import get_logger
+from app.analysis.plan_model import PlanModel, get_plan_model, plan_content_hash
+from app.analysis.plan_runtime import build_runtime_profile
 
 logger = get_logger('ai.plan_analyzer')
 
+# PlanInsights üretimi (alanlar / kurallar) değiştiğinde artırılır;
+# disk cache'teki eski sürüm sonuçları böylece kullanılmaz.
+PLAN_ANALYZER_VERSION = 2
+
 
 class OperatorType(Enum):
     """SQL Server execution plan operatör türleri"""
@@ -66,6 +73,7 @@ class PlanOperator:
     logical_op: str
     estimated_rows: float
     actual_rows: float = 0
+    estimated_executions: float = 1
     estimated_cost: float = 0
     actual_cost: float = 0
     cpu_cost: float = 0
@@ -75,19 +83,33 @@ class PlanOperator:
     warnings: List[str] = field(default_factory=list)
     properties: Dict[str, Any] = field(default_factory=dict)
     
+    # Actual plan (RunTimeCountersPerThread toplamları)
+    actual_executions: int = 0
+    actual_elapsed_ms: float = 0
+    self_elapsed_ms: float = 0
+    actual_cpu_ms: float = 0
+    actual_logical_reads: int = 0
+    
+    @property
+    def estimated_rows_all_executions(self) -> float:
+        """EstimateRows tek execution içindir; actual_rows ile aynı ölçeğe getir"""
+        return self.estimated_rows * max(1.0, self.estimated_executions)
+    
     @property
     def row_estimate_accuracy(self) -> float:
         """Actual vs Estimated row doğruluğu (1.0 = mükemmel)"""
-        if self.estimated_rows == 0:
+        estimated = self.estimated_rows_all_executions
+        if estimated == 0:
             return 0.0 if self.actual_rows > 0 else 1.0
-        return min(self.actual_rows, self.estimated_rows) / max(self.actual_rows, self.estimated_rows)
+        return min(self.actual_rows, estimated) / max(self.actual_rows, estimated)
     
     @property
     def has_bad_estimate(self) -> bool:
         """Kötü tahmin mi? (10x veya daha fazla fark)"""
-        if self.estimated_rows == 0 or self.actual_rows == 0:
+        estimated = self.estimated_rows_all_executions
+        if estimated == 0 or self.actual_rows == 0:
             return False
-        ratio = max(self.actual_rows, self.estimated_rows) / max(min(self.actual_rows, self.estimated_rows), 1)
+        ratio = max(self.actual_rows, estimated) / max(min(self.actual_rows, estimated), 1)
         return ratio >= 10
 
 
@@ -154,6 +176,17 @@ class PlanInsights:
     estimated_rows: float = 0
     actual_rows: float = 0
     
+    # Actual plan: zamanın harcandığı yerler ve tahmin hataları
+    has_actual_stats: bool = False
+    actual_elapsed_ms: Optional[float] = None
+    actual_cpu_ms: Optional[float] = None
+    runtime_hotspots: List[Dict[str, Any]] = field(default_factory=list)
+    cardinality_misestimates: List[Dict[str, Any]] = field(default_factory=list)
+    
+    # Tablo bazında en büyük TableCardinality ("schema.table" -> satır);
+    # AI Tune mevcut index satır sayılarını cache'ten doldurur (prompt'a girmez)
+    table_cardinality: Dict[str, int] = field(default_factory=dict)
+    
     # Özet
     has_table_scan: bool = False
     has_key_lookup: bool = False
@@ -170,7 +203,7 @@ class PlanInsights:
     
     def to_dict(self) -> Dict[str, Any]:
         """AI prompt için dict'e dönüştür"""
-        return {
+        data = {
             "total_cost": self.total_cost,
             "is_parallel": self.is_parallel,
             "dop": self.degree_of_parallelism,
@@ -198,6 +231,12 @@ class PlanInsights:
             "has_sort": self.has_sort,
             "row_estimate_issues": any(op.has_bad_estimate for op in self.operators)
         }
+        if self.has_actual_stats:
+            data["actual_elapsed_ms"] = self.actual_elapsed_ms
+            data["actual_cpu_ms"] = self.actual_cpu_ms
+            data["runtime_hotspots"] = self.runtime_hotspots
+            data["cardinality_misestimates"] = self.cardinality_misestimates
+        return data
     
     def get_summary(self) -> str:
         """İnsan tarafından okunabilir özet"""
@@ -224,6 +263,16 @@ class PlanInsights:
         if self.missing_indexes:
             lines.append(f"📈 {len(self.missing_indexes)} missing index önerisi")
         
+        if self.runtime_hotspots:
+            top = self.runtime_hotspots[0]
+            lines.append(
+                f"⏱️ En yavaş operatör: {top['operator']} "
+                f"({top['self_elapsed_ms']:.0f} ms, %{top['elapsed_percent']:.0f})"
+            )
+        
+        if self.cardinality_misestimates:
+            lines.append(f"📉 {len(self.cardinality_misestimates)} operatörde 10x+ kardinalite sapması")
+        
         if not lines:
             lines.append("✅ Önemli bir sorun tespit edilmedi")
         
@@ -259,6 +308,14 @@ class ExecutionPlanAnalyzer:
         "Table Spool",
     }
     
+    def __init__(self, use_cache: bool = True):
+        """
+        Args:
+            use_cache: PlanInsights'ı plan içerik hash'i + analyzer sürümüyle
+                memory/disk cache'te tut (aynı plan tekrar parse edilmez)
+        """
+        self.use_cache = use_cache
+    
     def analyze(self, plan_xml: str) -> PlanInsights:
         """
         Execution plan XML'i analiz et
@@ -275,21 +332,30 @@ class ExecutionPlanAnalyzer:
             logger.warning("Empty plan XML provided")
             return insights
         
+        plan_hash = plan_content_hash(plan_xml)
+        cached = self._get_cached_insights(plan_hash)
+        if cached is not None:
+            return cached
+        
         try:
-            # Parse XML
-            root = ET.fromstring(plan_xml)
+            # Ortak plan modeli (PlanParser ile aynı tek parse, hash'e göre memoize)
+            model = get_plan_model(plan_xml)
             
             # Extract general info
-            self._extract_general_info(root, insights)
+            self._extract_general_info(model, insights)
+            insights.table_cardinality = dict(model.table_cardinality)
             
             # Extract operators
-            self._extract_operators(root, insights)
+            self._extract_operators(model, insights)
             
             # Extract missing indexes
-            self._extract_missing_indexes(root, insights)
+            self._extract_missing_indexes(model, insights)
             
             # Extract warnings
-            self._extract_warnings(root, insights)
+            self._extract_warnings(model, insights)
+            
+            # Actual plan runtime istatistikleri
+            self._extract_runtime_stats(model, insights)
             
             # Analyze and set flags
             self._analyze_operators(insights)
@@ -297,6 +363,9 @@ class ExecutionPlanAnalyzer:
             logger.info(f"Plan analysis complete: {len(insights.operators)} operators, "
                        f"{len(insights.warnings)} warnings, {len(insights.missing_indexes)} missing indexes")
             
+            # Yalnızca başarılı analizler cache'lenir
+            self._store_cached_insights(plan_hash, insights)
+            
         except ET.ParseError as e:
             logger.error(f"Failed to parse plan XML: {e}")
             insights.warnings.append(PlanWarning(
@@ -314,73 +383,80 @@ class ExecutionPlanAnalyzer:
         
         return insights
     
-    def _extract_general_info(self, root: ET.Element, insights: PlanInsights) -> None:
+    def _get_cached_insights(self, plan_hash: str) -> Optional[PlanInsights]:
+        """Cache'teki insights'ın kopyası (çağıranlar sonucu değiştirebilir)"""
+        if not self.use_cache:
+            return None
+        try:
+            from app.ai.cache import get_ai_cache
+            cached = get_ai_cache().get_plan_insights(plan_hash, PLAN_ANALYZER_VERSION)
+        except Exception as e:
+            logger.debug(f"Plan insights cache unavailable: {e}")
+            return None
+        if not isinstance(cached, PlanInsights):
+            return None
+        logger.debug(f"Plan insights served from cache: {plan_hash[:12]}")
+        return copy.deepcopy(cached)
+    
+    def _store_cached_insights(self, plan_hash: str, insights: PlanInsights) -> None:
+        if not self.use_cache:
+            return
+        try:
+            from app.ai.cache import get_ai_cache
+            get_ai_cache().set_plan_insights(plan_hash, PLAN_ANALYZER_VERSION, copy.deepcopy(insights))
+        except Exception as e:
+            logger.debug(f"Failed to cache plan insights: {e}")
+    
+    def _extract_general_info(self, model: PlanModel, insights: PlanInsights) -> None:
         """Genel plan bilgilerini çıkar"""
         # Statement info
-        stmt = root.find('.//sp:StmtSimple', self.NAMESPACES)
+        stmt = model.first_statement("StmtSimple")
         if stmt is not None:
-            insights.statement_type = stmt.get('StatementType', '')
-            cost = stmt.get('StatementSubTreeCost')
+            insights.statement_type = stmt.statement_type
+            cost = stmt.attributes.get('StatementSubTreeCost')
             if cost:
                 insights.total_cost = float(cost)
             
             # Optimization info
-            opt = stmt.get('StatementOptmLevel', '')
-            insights.optimization_level = opt
-            
-            early_term = stmt.get('StatementOptmEarlyAbortReason', '')
-            insights.reason_for_early_termination = early_term
+            insights.optimization_level = stmt.attributes.get('StatementOptmLevel', '')
+            insights.reason_for_early_termination = stmt.attributes.get('StatementOptmEarlyAbortReason', '')
         
         # Parallelism check
-        parallelism = root.find('.//sp:RelOp[@PhysicalOp="Parallelism"]', self.NAMESPACES)
-        if parallelism is not None:
+        if model.nodes_by_physical_op.get("Parallelism"):
             insights.is_parallel = True
-            # Try to get DOP
-            runtime = root.find('.//sp:QueryPlan', self.NAMESPACES)
-            if runtime is not None:
-                dop = runtime.get('DegreeOfParallelism')
-                if dop:
-                    insights.degree_of_parallelism = int(dop)
-    
-    def _extract_operators(self, root: ET.Element, insights: PlanInsights) -> None:
+            if model.first_query_plan_dop:
+                insights.degree_of_parallelism = int(model.first_query_plan_dop)
+    
+    def _extract_operators(self, model: PlanModel, insights: PlanInsights) -> None:
         """Tüm operatörleri çıkar"""
-        for relop in root.findall('.//sp:RelOp', self.NAMESPACES):
-            physical_op = relop.get('PhysicalOp', '')
-            logical_op = relop.get('LogicalOp', '')
+        for node in model.nodes:
+            physical_op = node.physical_op
             if physical_op and physical_op not in insights.physical_ops:
                 insights.physical_ops.append(physical_op)
             
-            # Cost info
-            estimated_cost = float(relop.get('EstimateCPU', 0)) + float(relop.get('EstimateIO', 0))
-            subtree_cost = float(relop.get('EstimatedTotalSubtreeCost', 0))
-            
-            # Row estimates
-            estimated_rows = float(relop.get('EstimateRows', 0))
-            
-            # Actual rows (if actual plan)
-            actual_rows = 0
-            runtime_info = relop.find('.//sp:RunTimeInformation/sp:RunTimeCountersPerThread', self.NAMESPACES)
-            if runtime_info is not None:
-                actual_rows = float(runtime_info.get('ActualRows', 0))
-            
             # Create operator object
             op = PlanOperator(
                 name=physical_op,
                 physical_op=physical_op,
-                logical_op=logical_op,
-                estimated_rows=estimated_rows,
-                actual_rows=actual_rows,
-                estimated_cost=estimated_cost,
-                subtree_cost=subtree_cost,
-                cpu_cost=float(relop.get('EstimateCPU', 0)),
-                io_cost=float(relop.get('EstimateIO', 0)),
-                parallel=relop.get('Parallel', '0') == '1'
+                logical_op=node.logical_op,
+                estimated_rows=node.estimate_rows,
+                estimated_executions=node.estimate_executions,
+                actual_rows=float(node.actual_rows or 0),
+                estimated_cost=node.estimate_cpu + node.estimate_io,
+                subtree_cost=node.subtree_cost,
+                cpu_cost=node.estimate_cpu,
+                io_cost=node.estimate_io,
+                parallel=node.parallel
             )
+            if node.runtime is not None:
+                op.actual_executions = node.runtime.actual_executions
+                op.actual_elapsed_ms = node.runtime.actual_elapsed_ms
+                op.self_elapsed_ms = node.runtime.self_elapsed_ms
+                op.actual_cpu_ms = node.runtime.actual_cpu_ms
+                op.actual_logical_reads = node.runtime.actual_logical_reads
             
             # Check for warnings
-            warnings = relop.findall('.//sp:Warnings/*', self.NAMESPACES)
-            for w in warnings:
-                op.warnings.append(w.tag.replace('{' + self.NAMESPACES['sp'] + '}', ''))
+            op.warnings.extend(w.tag for w in node.warnings)
             
             insights.operators.append(op)
             
@@ -389,48 +465,50 @@ class ExecutionPlanAnalyzer:
                 if physical_op not in insights.expensive_operators:
                     insights.expensive_operators.append(physical_op)
     
-    def _extract_missing_indexes(self, root: ET.Element, insights: PlanInsights) -> None:
+    def _extract_runtime_stats(self, model: PlanModel, insights: PlanInsights, top_n: int = 5) -> None:
+        """Actual plan'da zamanın harcandığı ve tahminin saptığı operatörleri çıkar"""
+        if not model.has_runtime_stats:
+            return
+        stmt = model.default_statement()
+        profile = build_runtime_profile(
+            model,
+            statement_index=stmt.index if stmt is not None else None,
+            top_n=top_n,
+        )
+        insights.has_actual_stats = True
+        insights.actual_elapsed_ms = profile.statement_elapsed_ms
+        insights.actual_cpu_ms = profile.statement_cpu_ms
+        # Statement'ın döndürdüğü satır = kök operatörün actual satırı
+        insights.actual_rows = float(profile.operators[0].actual_rows) if profile.operators else 0.0
+        insights.runtime_hotspots = [op.to_dict() for op in profile.by_elapsed]
+        insights.cardinality_misestimates = [op.to_dict() for op in profile.by_misestimate]
+    
+    def _extract_missing_indexes(self, model: PlanModel, insights: PlanInsights) -> None:
         """Missing index önerilerini çıkar"""
-        for mig in root.findall('.//sp:MissingIndexGroup', self.NAMESPACES):
-            impact = float(mig.get('Impact', 0))
-            
-            mi_elem = mig.find('.//sp:MissingIndex', self.NAMESPACES)
-            if mi_elem is not None:
-                database = mi_elem.get('Database', '').strip('[]')
-                schema = mi_elem.get('Schema', 'dbo').strip('[]')
-                table = mi_elem.get('Table', '').strip('[]')
-                
-                # Equality columns
-                eq_cols = []
-                for col in mi_elem.findall('.//sp:ColumnGroup[@Usage="EQUALITY"]/sp:Column', self.NAMESPACES):
-                    eq_cols.append(col.get('Name', '').strip('[]'))
-                
-                # Inequality columns
-                ineq_cols = []
-                for col in mi_elem.findall('.//sp:ColumnGroup[@Usage="INEQUALITY"]/sp:Column', self.NAMESPACES):
-                    ineq_cols.append(col.get('Name', '').strip('[]'))
-                
-                # Include columns
-                inc_cols = []
-                for col in mi_elem.findall('.//sp:ColumnGroup[@Usage="INCLUDE"]/sp:Column', self.NAMESPACES):
-                    inc_cols.append(col.get('Name', '').strip('[]'))
-                
-                insights.missing_indexes.append(MissingIndex(
-                    database=database,
-                    schema_name=schema,
-                    table_name=table,
-                    equality_columns=eq_cols,
-                    inequality_columns=ineq_cols,
-                    include_columns=inc_cols,
-                    impact=impact
-                ))
+        for group in model.iter_missing_index_groups():
+            if not group.indexes:
+                continue
+            mi = group.indexes[0]
+            insights.missing_indexes.append(MissingIndex(
+                database=mi.database,
+                schema_name=mi.schema_name or 'dbo',
+                table_name=mi.table_name,
+                equality_columns=list(mi.equality_columns),
+                inequality_columns=list(mi.inequality_columns),
+                include_columns=list(mi.include_columns),
+                impact=group.impact
+            ))
     
-    def _extract_warnings(self, root: ET.Element, insights: PlanInsights) -> None:
+    def _extract_warnings(self, model: PlanModel, insights: PlanInsights) -> None:
         """Plan uyarılarını çıkar"""
+        by_tag: Dict[str, List[Dict[str, str]]] = {}
+        for warning in model.warnings:
+            by_tag.setdefault(warning.tag, []).append(warning.attributes)
+        
         # Implicit conversions
-        for conv in root.findall('.//sp:Warnings/sp:PlanAffectingConvert', self.NAMESPACES):
-            conv_type = conv.get('ConvertIssue', '')
-            expression = conv.get('Expression', '')
+        for attrs in by_tag.get('PlanAffectingConvert', []):
+            conv_type = attrs.get('ConvertIssue', '')
+            expression = attrs.get('Expression', '')
             
             insights.warnings.append(PlanWarning(
                 warning_type="ImplicitConversion",
@@ -441,8 +519,8 @@ class ExecutionPlanAnalyzer:
             insights.has_implicit_conversion = True
         
         # Sort warnings
-        for sort_warn in root.findall('.//sp:Warnings/sp:SortWarning', self.NAMESPACES):
-            sort_type = sort_warn.get('SortSpillDetails', '')
+        for attrs in by_tag.get('SortWarning', []):
+            sort_type = attrs.get('SortSpillDetails', '')
             
             insights.warnings.append(PlanWarning(
                 warning_type="SortWarning",
@@ -453,8 +531,8 @@ class ExecutionPlanAnalyzer:
             insights.has_sort_warning = True
         
         # Hash spill warnings  
-        for hash_warn in root.findall('.//sp:Warnings/sp:HashWarning', self.NAMESPACES):
-            hash_type = hash_warn.get('HashSpillDetails', '')
+        for attrs in by_tag.get('HashWarning', []):
+            hash_type = attrs.get('HashSpillDetails', '')
             
             insights.warnings.append(PlanWarning(
                 warning_type="HashSpill",
@@ -465,7 +543,7 @@ class ExecutionPlanAnalyzer:
             insights.has_hash_spill = True
         
         # No stats warnings
-        for no_stats in root.findall('.//sp:Warnings/sp:NoStats', self.NAMESPACES):
+        for _ in by_tag.get('NoStats', []):
             insights.warnings.append(PlanWarning(
                 warning_type="NoStatistics",
                 message="İstatistik bilgisi eksik - tahminler yanlış olabilir",
@@ -474,7 +552,7 @@ class ExecutionPlanAnalyzer:
             ))
         
         # Columns with no statistics
-        for col_no_stats in root.findall('.//sp:Warnings/sp:ColumnsWithNoStatistics', self.NAMESPACES):
+        for _ in by_tag.get('ColumnsWithNoStatistics', []):
             insights.warnings.append(PlanWarning(
                 warning_type="ColumnsNoStats",
                 message="Bazı kolonlarda istatistik yok",
@@ -512,7 +590,7 @@ class ExecutionPlanAnalyzer:
             if op.has_bad_estimate:
                 insights.warnings.append(PlanWarning(
                     warning_type="BadEstimate",
-                    message=f"Kötü row tahmini: Est={op.estimated_rows:.0f}, Act={op.actual_rows:.0f}",
+                    message=f"Kötü row tahmini: Est={op.estimated_rows_all_executions:.0f}, Act={op.actual_rows:.0f}",
                     severity="Medium",
                     operator=op.name,
                     recommendation="İstatistikleri güncelleyin veya histogram'ı kontrol edin"
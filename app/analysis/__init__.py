@@ -2,10 +2,42 @@
 Analysis Module - SQL parsing and execution plan analysis
 """
 
-from app.analysis.plan_parser import PlanParser, PlanOperator, ExecutionPlan
+from app.analysis.plan_parser import PlanParser, PlanOperator, ExecutionPlan, PlanStatementInfo
+from app.analysis.plan_model import PlanModel, get_plan_model
+from app.analysis.plan_operator_store import PlanOperatorStore, PlanOperatorView
+from app.analysis.plan_runtime import PlanRuntimeProfile, build_runtime_profile
+from app.analysis.plan_diff import PlanDiffEngine, PlanDiffResult
+from app.analysis.plan_cache_scanner import PlanCacheScanner, PlanCacheScanResult
+from app.analysis.missing_index_consolidator import MissingIndexConsolidator, ConsolidatedMissingIndex
+from app.analysis.wait_delta_engine import WaitDeltaEngine, WaitIntervalDelta
+from app.analysis.trend_engine import TrendEngine, TrendSignal
+from app.analysis.sql_fingerprint import SqlFingerprinter, SqlFingerprint
+from app.analysis.regression_detector import WorkloadRegressionDetector
+from app.analysis.plan_change_tracker import PlanChangeTracker
 
 __all__ = [
     "PlanParser",
     "PlanOperator", 
     "ExecutionPlan",
+    "PlanStatementInfo",
+    "PlanModel",
+    "get_plan_model",
+    "PlanOperatorStore",
+    "PlanOperatorView",
+    "PlanRuntimeProfile",
+    "build_runtime_profile",
+    "PlanDiffEngine",
+    "PlanDiffResult",
+    "PlanCacheScanner",
+    "PlanCacheScanResult",
+    "MissingIndexConsolidator",
+    "ConsolidatedMissingIndex",
+    "WaitDeltaEngine",
+    "WaitIntervalDelta",
+    "TrendEngine",
+    "TrendSignal",
+    "SqlFingerprinter",
+    "SqlFingerprint",
+    "WorkloadRegressionDetector",
+    "PlanChangeTracker",
 ]
@@ -0,0 +1,479 @@
+"""
+Missing Index Consolidation
+
+Birçok plandan (MissingIndexGroup) ve sys.dm_db_missing_index_* DMV'lerinden
+gelen missing index önerilerini tablo bazında birleştirir.
+
+Sütunlar tablo başına bir sözlükte bit index'lerine çevrilir; her öneri
+equality / key / include kümeleri için birer int bitmask taşır. Kapsama
+kontrolleri (alt küme, üst küme) birkaç bit işlemidir; binlerce öneri
+milisaniyeler içinde birleşir.
+
+Birleştirme kuralları:
+1. Aynı anahtar (equality kümesi + inequality sırası) -> include birleşimi
+2. Geniş aday, dar öneriyi seek olarak karşılayabiliyorsa (equality alt
+   kümesi + ilk inequality sütunu hemen ardından yerleştirilebilir) öneri
+   adaya katılır; eksik sütunlar include'a eklenir
+3. Adaya katılan önerilerin seek önekleri bir zincir oluşturmalıdır
+   (her biri diğerinin alt/üst kümesi); böylece tek bir anahtar sırası
+   hepsini karşılar
+
+Skor: Σ impact(%) / 100 x execution sayısı (DMV'de user_seeks + user_scans)
+"""
+
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Optional, List, Dict, Any, Iterable, Tuple
+
+from app.core.logger import get_logger
+
+logger = get_logger('analysis.missing_index_consolidator')
+
+
+# Birleştirilmiş önerinin include genişliği bunu aşacaksa birleştirme yapılmaz
+DEFAULT_MAX_INCLUDE_COLUMNS = 16
+
+
+def _clean_name(value: Any) -> str:
+    return str(value or "").strip().strip('[]').strip()
+
+
+def split_column_list(value: Any) -> List[str]:
+    """DMV sütun listesi ('[a], [b]') veya liste -> köşeli parantezsiz sütun adları"""
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        items = value
+    else:
+        items = str(value).split(",")
+    columns = []
+    for item in items:
+        name = _clean_name(item)
+        if name:
+            columns.append(name)
+    return columns
+
+
+def split_object_name(statement: Any) -> Tuple[str, str, str]:
+    """DMV statement ('[db].[dbo].[T]') -> (database, schema, table)"""
+    parts = [_clean_name(part) for part in str(statement or "").split("].[")]
+    parts = [part for part in parts if part]
+    if len(parts) >= 3:
+        return parts[-3], parts[-2], parts[-1]
+    if len(parts) == 2:
+        return "", parts[0], parts[1]
+    if len(parts) == 1:
+        return "", "dbo", parts[0]
+    return "", "", ""
+
+
+@dataclass
+class MissingIndexSuggestion:
+    """Tek kaynaktan gelen normalize edilmiş missing index önerisi"""
+    database: str
+    schema_name: str
+    table_name: str
+    equality_columns: List[str] = field(default_factory=list)
+    inequality_columns: List[str] = field(default_factory=list)
+    include_columns: List[str] = field(default_factory=list)
+    impact: float = 0.0                 # 0-100
+    executions: float = 1.0             # Plan execution / DMV seeks + scans
+    source: str = "plan"                # plan, dmv
+    source_ref: str = ""                # plan handle, query id vb.
+
+    @property
+    def table_key(self) -> str:
+        return ".".join((self.database or "", self.schema_name or "dbo", self.table_name)).lower()
+
+    @property
+    def score(self) -> float:
+        return max(0.0, float(self.impact)) / 100.0 * max(0.0, float(self.executions))
+
+
+@dataclass
+class ConsolidatedMissingIndex:
+    """Birleştirilmiş index önerisi"""
+    database: str
+    schema_name: str
+    table_name: str
+    equality_columns: List[str] = field(default_factory=list)
+    inequality_columns: List[str] = field(default_factory=list)
+    include_columns: List[str] = field(default_factory=list)
+    score: float = 0.0
+    total_executions: float = 0.0
+    max_impact: float = 0.0
+    suggestion_count: int = 0
+    sources: Counter = field(default_factory=Counter)
+    source_refs: List[str] = field(default_factory=list)
+
+    @property
+    def key_columns(self) -> List[str]:
+        return self.equality_columns + self.inequality_columns
+
+    @property
+    def weighted_impact(self) -> float:
+        """Execution ağırlıklı ortalama impact (%)"""
+        if self.total_executions <= 0:
+            return self.max_impact
+        return self.score / self.total_executions * 100.0
+
+    @property
+    def create_statement(self) -> str:
+        """CREATE INDEX statement oluştur"""
+        cols = self.key_columns
+        name_cols = "_".join(col.replace(" ", "") for col in cols[:3])
+        stmt = f"CREATE NONCLUSTERED INDEX [IX_{self.table_name}_{name_cols}]\n"
+        stmt += f"ON [{self.schema_name or 'dbo'}].[{self.table_name}] ({', '.join(f'[{c}]' for c in cols)})"
+        if self.include_columns:
+            stmt += f"\nINCLUDE ({', '.join(f'[{c}]' for c in self.include_columns)})"
+        return stmt + ";"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "table": f"{self.schema_name}.{self.table_name}",
+            "equality_columns": list(self.equality_columns),
+            "inequality_columns": list(self.inequality_columns),
+            "include_columns": list(self.include_columns),
+            "score": round(self.score, 2),
+            "weighted_impact": round(self.weighted_impact, 1),
+            "executions": int(self.total_executions),
+            "merged_suggestions": self.suggestion_count,
+            "sources": dict(self.sources),
+        }
+
+
+def suggestions_from_plan_model(
+    model: Any,
+    executions: float = 1.0,
+    source_ref: str = "",
+    default_database: str = "",
+) -> List[MissingIndexSuggestion]:
+    """PlanModel MissingIndexGroup'larını normalize öneri listesine çevir"""
+    suggestions = []
+    for group in model.iter_missing_index_groups():
+        for mi in group.indexes:
+            suggestions.append(MissingIndexSuggestion(
+                database=_clean_name(mi.database) or default_database,
+                schema_name=_clean_name(mi.schema_name) or "dbo",
+                table_name=_clean_name(mi.table_name),
+                equality_columns=split_column_list(mi.equality_columns),
+                inequality_columns=split_column_list(mi.inequality_columns),
+                include_columns=split_column_list(mi.include_columns),
+                impact=float(group.impact or 0.0),
+                executions=max(1.0, float(executions or 1.0)),
+                source="plan",
+                source_ref=source_ref,
+            ))
+    return suggestions
+
+
+class _TableColumns:
+    """Tablo başına sütun adı -> bit sözlüğü (büyük/küçük harf duyarsız)"""
+
+    __slots__ = ("bits", "names")
+
+    def __init__(self):
+        self.bits: Dict[str, int] = {}
+        self.names: List[str] = []
+
+    def bit(self, name: str) -> int:
+        key = name.lower()
+        position = self.bits.get(key)
+        if position is None:
+            position = len(self.names)
+            self.bits[key] = position
+            self.names.append(name)
+        return position
+
+    def mask(self, columns: Iterable[str]) -> int:
+        value = 0
+        for name in columns:
+            value |= 1 << self.bit(name)
+        return value
+
+    def columns(self, mask: int) -> List[str]:
+        """Mask'teki sütunlar (ilk görülme sırasıyla)"""
+        result = []
+        position = 0
+        while mask:
+            if mask & 1:
+                result.append(self.names[position])
+            mask >>= 1
+            position += 1
+        return result
+
+
+class _Candidate:
+    """Tablo içinde birleştirme adayı (bitmask temsili)"""
+
+    __slots__ = (
+        "eq_mask", "ineq", "ineq_mask", "include_mask", "chain",
+        "score", "executions", "max_impact", "count", "sources", "refs",
+    )
+
+    def __init__(self, eq_mask: int, ineq: Tuple[int, ...], include_mask: int):
+        self.eq_mask = eq_mask
+        self.ineq = ineq                     # Inequality sütun bitleri (sıralı)
+        self.ineq_mask = 0
+        for position in ineq:
+            self.ineq_mask |= 1 << position
+        self.include_mask = include_mask & ~(eq_mask | self.ineq_mask)
+        self.chain: List[int] = [eq_mask]    # Katılan önerilerin seek önekleri
+        self.score = 0.0
+        self.executions = 0.0
+        self.max_impact = 0.0
+        self.count = 0
+        self.sources: Counter = Counter()
+        self.refs: List[str] = []
+
+    @property
+    def key_mask(self) -> int:
+        return self.eq_mask | self.ineq_mask
+
+    def seek_prefixes(self, eq_mask: int, ineq: Tuple[int, ...]) -> Optional[Tuple[int, ...]]:
+        """
+        Öneri (eq_mask, ineq) bu adayın anahtarıyla seek edilebiliyorsa
+        sağlanması gereken seek önek mask'leri, edilemiyorsa None
+        """
+        if eq_mask & ~self.eq_mask:
+            return None
+        if not ineq:
+            return (eq_mask,)
+        first = 1 << ineq[0]
+        extra = self.eq_mask & ~eq_mask
+        if extra & first:
+            # İlk inequality sütunu adayın equality'lerinden biri: önerinin
+            # equality'leri önce (eq_mask), o sütun hemen ardından gelmeli
+            return (eq_mask, eq_mask | first)
+        if not extra and self.ineq and self.ineq[0] == ineq[0]:
+            return (eq_mask,)
+        return None
+
+    def absorb(self, score: float, executions: float, impact: float, source: str, ref: str) -> None:
+        self.score += score
+        self.executions += executions
+        self.max_impact = max(self.max_impact, impact)
+        self.count += 1
+        self.sources[source] += 1
+        if ref and len(self.refs) < 10 and ref not in self.refs:
+            self.refs.append(ref)
+
+
+def _chain_compatible(chain: List[int], prefix: int) -> bool:
+    """Her seek öneki diğerinin alt ya da üst kümesi olmalı"""
+    for other in chain:
+        if (other & prefix) != other and (other & prefix) != prefix:
+            return False
+    return True
+
+
+def _popcount(value: int) -> int:
+    return bin(value).count("1")
+
+
+class MissingIndexConsolidator:
+    """
+    Missing index önerilerini toplayıp tablo bazında birleştirir
+
+    Usage:
+        consolidator = MissingIndexConsolidator()
+        consolidator.add_dmv_rows(rows)
+        consolidator.add_plan_missing_indexes(plan.missing_indexes, executions=120)
+        for item in consolidator.consolidate(top_n=20):
+            print(item.create_statement)
+    """
+
+    def __init__(self, max_include_columns: int = DEFAULT_MAX_INCLUDE_COLUMNS):
+        self.max_include_columns = max(0, int(max_include_columns))
+        self._suggestions: List[MissingIndexSuggestion] = []
+
+    def __len__(self) -> int:
+        return len(self._suggestions)
+
+    # ------------------------------------------------------------------
+    # Girdi
+    # ------------------------------------------------------------------
+
+    def add(self, suggestion: MissingIndexSuggestion) -> None:
+        if not suggestion.table_name:
+            return
+        if not suggestion.equality_columns and not suggestion.inequality_columns:
+            return
+        self._suggestions.append(suggestion)
+
+    def add_plan_missing_indexes(
+        self,
+        missing_indexes: Iterable[Any],
+        executions: float = 1.0,
+        source_ref: str = "",
+    ) -> None:
+        """
+        PlanParser / PlanInsights MissingIndex nesneleri veya PlanModel
+        MissingIndexInfo (impact ayrıca verilmişse) ekle
+        """
+        for mi in missing_indexes:
+            self.add(MissingIndexSuggestion(
+                database=_clean_name(getattr(mi, "database", "")),
+                schema_name=_clean_name(getattr(mi, "schema_name", "")) or "dbo",
+                table_name=_clean_name(getattr(mi, "table_name", "")),
+                equality_columns=split_column_list(getattr(mi, "equality_columns", [])),
+                inequality_columns=split_column_list(getattr(mi, "inequality_columns", [])),
+                include_columns=split_column_list(getattr(mi, "include_columns", [])),
+                impact=float(getattr(mi, "impact", 0.0) or 0.0),
+                executions=max(1.0, float(executions or 1.0)),
+                source="plan",
+                source_ref=source_ref,
+            ))
+
+    def add_plan_model(self, model: Any, executions: float = 1.0, source_ref: str = "") -> None:
+        """PlanModel'in tüm statement'larındaki MissingIndexGroup'ları ekle"""
+        for suggestion in suggestions_from_plan_model(model, executions, source_ref):
+            self.add(suggestion)
+
+    def add_dmv_rows(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """
+        sys.dm_db_missing_index_details / group_stats satırları
+
+        Beklenen kolonlar: statement (veya database_name / schema_name /
+        table_name), equality_columns, inequality_columns, included_columns,
+        avg_user_impact, user_seeks, user_scans
+        """
+        for row in rows:
+            database, schema_name, table_name = split_object_name(row.get("statement"))
+            database = _clean_name(row.get("database_name")) or database
+            schema_name = _clean_name(row.get("schema_name")) or schema_name or "dbo"
+            table_name = _clean_name(row.get("table_name")) or table_name
+            executions = float(row.get("user_seeks", 0) or 0) + float(row.get("user_scans", 0) or 0)
+            self.add(MissingIndexSuggestion(
+                database=database,
+                schema_name=schema_name,
+                table_name=table_name,
+                equality_columns=split_column_list(row.get("equality_columns")),
+                inequality_columns=split_column_list(row.get("inequality_columns")),
+                include_columns=split_column_list(row.get("included_columns")),
+                impact=float(row.get("avg_user_impact", 0) or 0),
+                executions=max(1.0, executions),
+                source="dmv",
+                source_ref=str(row.get("index_handle", "") or ""),
+            ))
+
+    # ------------------------------------------------------------------
+    # Birleştirme
+    # ------------------------------------------------------------------
+
+    def consolidate(self, top_n: Optional[int] = None) -> List[ConsolidatedMissingIndex]:
+        """Önerileri birleştir ve skora göre sırala"""
+        by_table: Dict[str, List[MissingIndexSuggestion]] = {}
+        for suggestion in self._suggestions:
+            by_table.setdefault(suggestion.table_key, []).append(suggestion)
+
+        results: List[ConsolidatedMissingIndex] = []
+        for suggestions in by_table.values():
+            results.extend(self._consolidate_table(suggestions))
+
+        results.sort(key=lambda item: (-item.score, -item.max_impact, item.table_name))
+        logger.debug(f"Consolidated {len(self._suggestions)} missing index suggestions into {len(results)}")
+        if top_n is not None:
+            return results[:max(0, int(top_n))]
+        return results
+
+    def _consolidate_table(self, suggestions: List[MissingIndexSuggestion]) -> List[ConsolidatedMissingIndex]:
+        columns = _TableColumns()
+        # 1. Aynı anahtar: (eq_mask, ineq sırası) -> include birleşimi
+        exact: Dict[Tuple[int, Tuple[int, ...]], List[Any]] = {}
+        for suggestion in suggestions:
+            eq_mask = columns.mask(suggestion.equality_columns)
+            ineq = tuple(
+                columns.bit(name) for name in suggestion.inequality_columns
+                if not eq_mask & (1 << columns.bit(name))
+            )
+            include_mask = columns.mask(suggestion.include_columns)
+            bucket = exact.get((eq_mask, ineq))
+            if bucket is None:
+                exact[(eq_mask, ineq)] = [include_mask, [suggestion]]
+            else:
+                bucket[0] |= include_mask
+                bucket[1].append(suggestion)
+
+        # 2. Geniş anahtarlar önce: dar öneriler onlara katılır
+        ordered = sorted(
+            exact.items(),
+            key=lambda item: (
+                -(_popcount(item[0][0]) + len(item[0][1])),
+                -sum(s.score for s in item[1][1]),
+            ),
+        )
+        candidates: List[_Candidate] = []
+        for (eq_mask, ineq), (include_mask, members) in ordered:
+            ineq_mask = 0
+            for position in ineq:
+                ineq_mask |= 1 << position
+            target = None
+            for candidate in candidates:
+                prefixes = candidate.seek_prefixes(eq_mask, ineq)
+                if prefixes is None or not all(_chain_compatible(candidate.chain, p) for p in prefixes):
+                    continue
+                needed = (eq_mask | ineq_mask | include_mask) & ~candidate.key_mask
+                if _popcount(candidate.include_mask | needed) > self.max_include_columns:
+                    continue
+                target = candidate
+                candidate.include_mask |= needed
+                candidate.chain.extend(prefixes)
+                break
+            if target is None:
+                target = _Candidate(eq_mask, ineq, include_mask)
+                candidates.append(target)
+            for suggestion in members:
+                target.absorb(
+                    suggestion.score,
+                    max(0.0, float(suggestion.executions)),
+                    float(suggestion.impact),
+                    suggestion.source,
+                    suggestion.source_ref,
+                )
+
+        first = suggestions[0]
+        return [self._to_result(first, columns, candidate) for candidate in candidates]
+
+    @staticmethod
+    def _to_result(
+        first: MissingIndexSuggestion,
+        columns: _TableColumns,
+        candidate: _Candidate,
+    ) -> ConsolidatedMissingIndex:
+        # Anahtar sırası: zincirdeki en dar seek önekinden genişe doğru
+        equality: List[str] = []
+        placed = 0
+        for prefix in sorted(set(candidate.chain), key=_popcount):
+            for name in columns.columns(prefix & candidate.eq_mask & ~placed):
+                equality.append(name)
+            placed |= prefix & candidate.eq_mask
+        equality.extend(columns.columns(candidate.eq_mask & ~placed))
+        return ConsolidatedMissingIndex(
+            database=first.database,
+            schema_name=first.schema_name or "dbo",
+            table_name=first.table_name,
+            equality_columns=equality,
+            inequality_columns=[columns.names[position] for position in candidate.ineq],
+            include_columns=columns.columns(candidate.include_mask),
+            score=candidate.score,
+            total_executions=candidate.executions,
+            max_impact=candidate.max_impact,
+            suggestion_count=candidate.count,
+            sources=candidate.sources,
+            source_refs=list(candidate.refs),
+        )
+
+
+def consolidate_missing_indexes(
+    dmv_rows: Optional[Iterable[Dict[str, Any]]] = None,
+    plan_missing_indexes: Optional[Iterable[Any]] = None,
+    top_n: Optional[int] = None,
+) -> List[ConsolidatedMissingIndex]:
+    """Shortcut: DMV satırları ve plan önerilerini tek seferde birleştir"""
+    consolidator = MissingIndexConsolidator()
+    if dmv_rows:
+        consolidator.add_dmv_rows(dmv_rows)
+    if plan_missing_indexes:
+        consolidator.add_plan_missing_indexes(plan_missing_indexes)
+    return consolidator.consolidate(top_n=top_n)
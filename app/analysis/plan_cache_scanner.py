@@ -0,0 +1,594 @@
+"""
+Plan Cache Anti-Pattern Scanner
+
+Plan cache'teki en pahalı N planı tek tek çekip ortak PlanModel parser'ı ile
+tarar ve bulguları tablo / index bazında toplar:
+- Implicit conversion (PlanAffectingConvert)
+- Key / RID lookup
+- TempDB spill (Sort / Hash / Exchange)
+- Missing index önerileri
+- Aşırı memory grant (DMV grant / used veya MemoryGrantWarning)
+- Paralel thread dağılım dengesizliği (actual planlarda)
+
+Bellek sınırlı: planlar sınırlı bir worker havuzunda en fazla
+``max_in_flight`` adet aynı anda işlenir; XML ve model bulgular çıkarıldıktan
+sonra atılır (memoize cache'e yazılmaz). Sonuçta yalnızca sayaçlar ve nesne
+başına sınırlı sayıda örnek tutulur.
+
+Veritabanından bağımsızdır: XML'i getiren fonksiyon dışarıdan verilir
+(QueryStatsService.scan_plan_cache).
+"""
+
+import re
+import time
+import xml.etree.ElementTree as ET
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Callable, Tuple, Iterator
+
+from app.core.logger import get_logger
+from app.analysis.plan_model import PlanModel, PlanNode, PlanStatement, build_plan_model
+from app.analysis.missing_index_consolidator import (
+    ConsolidatedMissingIndex, MissingIndexConsolidator, MissingIndexSuggestion, suggestions_from_plan_model,
+)
+
+logger = get_logger('analysis.plan_cache_scanner')
+
+
+CATEGORY_IMPLICIT_CONVERSION = "implicit_conversion"
+CATEGORY_KEY_LOOKUP = "key_lookup"
+CATEGORY_SPILL = "spill"
+CATEGORY_MISSING_INDEX = "missing_index"
+CATEGORY_MEMORY_GRANT = "excessive_memory_grant"
+CATEGORY_PARALLELISM_SKEW = "parallelism_skew"
+
+CATEGORY_LABELS = {
+    CATEGORY_IMPLICIT_CONVERSION: "Implicit conversion",
+    CATEGORY_KEY_LOOKUP: "Key lookup",
+    CATEGORY_SPILL: "TempDB spill",
+    CATEGORY_MISSING_INDEX: "Missing index",
+    CATEGORY_MEMORY_GRANT: "Excessive memory grant",
+    CATEGORY_PARALLELISM_SKEW: "Parallelism skew",
+}
+
+_LOOKUP_OPS = frozenset(("Key Lookup", "RID Lookup"))
+_SPILL_WARNINGS = frozenset((
+    "SpillToTempDb",
+    "SortSpillDetails",
+    "HashSpillDetails",
+    "ExchangeSpillDetails",
+    "SortWarning",
+    "HashWarning",
+))
+_ACCESS_OPS = frozenset((
+    "Table Scan",
+    "Clustered Index Scan",
+    "Clustered Index Seek",
+    "Index Scan",
+    "Index Seek",
+    "Columnstore Index Scan",
+))
+
+# CONVERT_IMPLICIT(nvarchar(50),[db].[dbo].[Orders].[Code],0) -> db, dbo, Orders, Code
+_CONVERTED_COLUMN_RE = re.compile(
+    r"CONVERT_IMPLICIT\([^,]*,\s*(?:\[([^\]]*)\]\.)?\[([^\]]*)\]\.\[([^\]]*)\]\.\[([^\]]*)\]"
+)
+
+# Nesne başına saklanan örnek bulgu / plan sayısı
+_MAX_SAMPLES = 5
+
+
+@dataclass
+class PlanCacheEntry:
+    """Taranacak plan cache girdisi (sys.dm_exec_query_stats, plan_handle bazında)"""
+    plan_handle: Any
+    query_plan_hash: str = ""
+    database_name: str = ""
+    object_name: str = ""
+    execution_count: int = 0
+    total_cpu_ms: float = 0.0
+    total_duration_ms: float = 0.0
+    total_logical_reads: int = 0
+    max_grant_kb: Optional[float] = None
+    max_used_grant_kb: Optional[float] = None
+    last_execution_time: Optional[datetime] = None
+
+    @property
+    def handle_hex(self) -> str:
+        handle = self.plan_handle
+        if isinstance(handle, (bytes, bytearray)):
+            return "0x" + bytes(handle).hex().upper()
+        return str(handle or "")
+
+
+@dataclass
+class PlanCacheFinding:
+    """Tek planda bulunan anti-pattern"""
+    category: str
+    severity: str                  # High, Medium, Low
+    detail: str
+    table: str = ""                # database.schema.table (bilinmiyorsa boş)
+    index: str = ""
+    statement_index: int = -1
+    node_index: int = -1
+    plan_handle: str = ""
+    weight_cpu_ms: float = 0.0     # Planın toplam CPU'su (etki sıralaması için)
+
+
+@dataclass
+class PlanCacheObjectFindings:
+    """Tablo / index bazında toplanmış bulgular"""
+    table: str
+    index: str = ""
+    category_counts: Counter = field(default_factory=Counter)
+    plan_count: int = 0
+    total_cpu_ms: float = 0.0
+    samples: List[PlanCacheFinding] = field(default_factory=list)
+    plan_handles: List[str] = field(default_factory=list)
+
+    @property
+    def finding_count(self) -> int:
+        return int(sum(self.category_counts.values()))
+
+    @property
+    def display_name(self) -> str:
+        name = self.table or "(no table)"
+        if self.index:
+            name += f" ({self.index})"
+        return name
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "object": self.display_name,
+            "findings": dict(self.category_counts),
+            "plan_count": self.plan_count,
+            "total_cpu_ms": round(self.total_cpu_ms, 1),
+            "samples": [f.detail for f in self.samples],
+        }
+
+
+@dataclass
+class PlanCacheScanResult:
+    """Plan cache taraması özeti"""
+    plans_requested: int = 0
+    plans_scanned: int = 0
+    plans_without_xml: int = 0
+    plans_failed: int = 0
+    plans_with_findings: int = 0
+    cancelled: bool = False
+    duration_ms: float = 0.0
+    category_counts: Counter = field(default_factory=Counter)
+    by_object: Dict[Tuple[str, str], PlanCacheObjectFindings] = field(default_factory=dict)
+    # Tüm planların missing index önerileri birleştirilmiş ve skorlanmış halde
+    missing_indexes: List[ConsolidatedMissingIndex] = field(default_factory=list)
+
+    @property
+    def finding_count(self) -> int:
+        return int(sum(self.category_counts.values()))
+
+    def top_objects(self, n: int = 20, category: Optional[str] = None) -> List[PlanCacheObjectFindings]:
+        """Bulgu sayısı ve etkilenen planların CPU'suna göre en sorunlu nesneler"""
+        items = list(self.by_object.values())
+        if category:
+            items = [item for item in items if item.category_counts.get(category)]
+            key = lambda item: (-item.category_counts[category], -item.total_cpu_ms, item.display_name)
+        else:
+            key = lambda item: (-item.finding_count, -item.total_cpu_ms, item.display_name)
+        return sorted(items, key=key)[:max(0, int(n))]
+
+    def get_summary(self) -> str:
+        status = " (cancelled)" if self.cancelled else ""
+        if not self.category_counts:
+            return f"Scanned {self.plans_scanned} plans{status}: no anti-patterns found"
+        parts = [
+            f"{count} {CATEGORY_LABELS.get(category, category).lower()}"
+            for category, count in self.category_counts.most_common()
+        ]
+        return (
+            f"Scanned {self.plans_scanned} plans{status}, "
+            f"{self.plans_with_findings} with findings: " + ", ".join(parts)
+        )
+
+    def to_dict(self, top_n: int = 20) -> Dict[str, Any]:
+        return {
+            "plans_scanned": self.plans_scanned,
+            "plans_with_findings": self.plans_with_findings,
+            "plans_failed": self.plans_failed,
+            "cancelled": self.cancelled,
+            "findings": dict(self.category_counts),
+            "top_objects": [item.to_dict() for item in self.top_objects(top_n)],
+            "missing_indexes": [item.to_dict() for item in self.missing_indexes[:top_n]],
+        }
+
+
+def _qualified_table(node: PlanNode, default_database: str = "") -> str:
+    if not node.object_name:
+        return ""
+    parts = [node.database_name or default_database, node.schema_name or "dbo", node.object_name]
+    return ".".join(part for part in parts if part)
+
+
+class PlanCacheScanner:
+    """
+    Plan cache girdilerini sınırlı worker havuzunda tarayan toplayıcı
+
+    Args:
+        fetch_plan_xml: PlanCacheEntry -> plan XML (yoksa None); worker
+            thread'lerinden çağrılır, thread-safe olmalıdır
+        max_workers: Eş zamanlı XML çeken / parse eden worker sayısı
+        max_in_flight: Aynı anda bellekte tutulan en fazla plan (varsayılan 2 x worker)
+    """
+
+    def __init__(
+        self,
+        fetch_plan_xml: Callable[[PlanCacheEntry], Optional[str]],
+        max_workers: int = 4,
+        max_in_flight: Optional[int] = None,
+        min_grant_kb: float = 10240.0,
+        max_grant_used_ratio: float = 0.1,
+        skew_factor: float = 3.0,
+        min_skew_rows: float = 10000.0,
+        min_missing_index_impact: float = 10.0,
+    ):
+        self.fetch_plan_xml = fetch_plan_xml
+        self.max_workers = max(1, int(max_workers))
+        self.max_in_flight = max(self.max_workers, int(max_in_flight or self.max_workers * 2))
+        self.min_grant_kb = float(min_grant_kb)
+        self.max_grant_used_ratio = float(max_grant_used_ratio)
+        self.skew_factor = float(skew_factor)
+        self.min_skew_rows = float(min_skew_rows)
+        self.min_missing_index_impact = float(min_missing_index_impact)
+
+    # ------------------------------------------------------------------
+    # Tarama
+    # ------------------------------------------------------------------
+
+    def scan(
+        self,
+        entries: List[PlanCacheEntry],
+        cancel_check: Optional[Callable[[], bool]] = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+    ) -> PlanCacheScanResult:
+        """
+        Girdileri tara ve bulguları nesne bazında topla
+
+        Args:
+            entries: Taranacak planlar (öncelik sırasıyla)
+            cancel_check: True dönerse yeni plan başlatılmaz, sonuç cancelled=True
+            progress_callback: (tamamlanan, toplam) ile çağrılır (tarama thread'inde)
+        """
+        started = time.perf_counter()
+        result = PlanCacheScanResult(plans_requested=len(entries))
+        pending = iter(entries)
+        in_flight = set()
+        completed = 0
+        consolidator = MissingIndexConsolidator()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="plan-cache-scan") as pool:
+            while True:
+                # Pencereyi doldur: bellekte en fazla max_in_flight plan
+                while len(in_flight) < self.max_in_flight and not result.cancelled:
+                    if self._is_cancelled(cancel_check):
+                        result.cancelled = True
+                        break
+                    entry = next(pending, None)
+                    if entry is None:
+                        break
+                    in_flight.add(pool.submit(self._scan_entry, entry))
+                if not in_flight:
+                    break
+
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    completed += 1
+                    self._collect(result, future, consolidator)
+                if progress_callback is not None:
+                    try:
+                        progress_callback(completed, len(entries))
+                    except Exception:
+                        pass
+
+        result.missing_indexes = consolidator.consolidate()
+        result.duration_ms = round((time.perf_counter() - started) * 1000.0, 2)
+        logger.info(result.get_summary())
+        return result
+
+    @staticmethod
+    def _is_cancelled(cancel_check: Optional[Callable[[], bool]]) -> bool:
+        if cancel_check is None:
+            return False
+        try:
+            return bool(cancel_check())
+        except Exception:
+            return False
+
+    def _scan_entry(
+        self,
+        entry: PlanCacheEntry,
+    ) -> Optional[Tuple[List[PlanCacheFinding], List[MissingIndexSuggestion]]]:
+        """Worker: XML'i getir, bulguları ve missing index önerilerini çıkar, XML / modeli bırak"""
+        plan_xml = self.fetch_plan_xml(entry)
+        if not plan_xml:
+            return None
+        model = build_plan_model(plan_xml)
+        del plan_xml
+        suggestions = suggestions_from_plan_model(
+            model,
+            executions=entry.execution_count,
+            source_ref=entry.handle_hex,
+            default_database=entry.database_name,
+        )
+        return self._findings_from_model(entry, model), suggestions
+
+    def _collect(self, result: PlanCacheScanResult, future, consolidator: MissingIndexConsolidator) -> None:
+        try:
+            scanned = future.result()
+        except ET.ParseError as e:
+            result.plans_failed += 1
+            logger.debug(f"Plan cache scan: invalid plan XML: {e}")
+            return
+        except Exception as e:
+            result.plans_failed += 1
+            logger.warning(f"Plan cache scan: plan failed: {e}")
+            return
+        if scanned is None:
+            result.plans_without_xml += 1
+            return
+        findings, suggestions = scanned
+        for suggestion in suggestions:
+            consolidator.add(suggestion)
+        result.plans_scanned += 1
+        if findings:
+            result.plans_with_findings += 1
+        self._aggregate(result, findings)
+
+    @staticmethod
+    def _aggregate(result: PlanCacheScanResult, findings: List[PlanCacheFinding]) -> None:
+        seen_objects = set()
+        for finding in findings:
+            result.category_counts[finding.category] += 1
+            key = (finding.table.lower(), finding.index.lower())
+            bucket = result.by_object.get(key)
+            if bucket is None:
+                bucket = PlanCacheObjectFindings(table=finding.table, index=finding.index)
+                result.by_object[key] = bucket
+            bucket.category_counts[finding.category] += 1
+            if len(bucket.samples) < _MAX_SAMPLES:
+                bucket.samples.append(finding)
+            if key not in seen_objects:
+                # Plan başına bir kez say
+                seen_objects.add(key)
+                bucket.plan_count += 1
+                bucket.total_cpu_ms += finding.weight_cpu_ms
+                if len(bucket.plan_handles) < _MAX_SAMPLES:
+                    bucket.plan_handles.append(finding.plan_handle)
+
+    # ------------------------------------------------------------------
+    # Bulgu çıkarımı
+    # ------------------------------------------------------------------
+
+    def extract_findings(self, entry: PlanCacheEntry, plan_xml: str) -> List[PlanCacheFinding]:
+        """
+        Tek planın anti-pattern bulguları
+
+        Model memoize edilmez; tarama binlerce planda PlanModelCache'i
+        doldurmaz ve plan bittiğinde bellekten düşer.
+
+        Raises:
+            ET.ParseError: XML geçersizse
+        """
+        return self._findings_from_model(entry, build_plan_model(plan_xml))
+
+    def _findings_from_model(self, entry: PlanCacheEntry, model: PlanModel) -> List[PlanCacheFinding]:
+        handle = entry.handle_hex
+        weight = float(entry.total_cpu_ms or 0.0)
+        findings: List[PlanCacheFinding] = []
+        spilled_nodes = set()
+
+        def add(category: str, severity: str, detail: str, table: str = "", index: str = "",
+                statement_index: int = -1, node_index: int = -1) -> None:
+            findings.append(PlanCacheFinding(
+                category=category,
+                severity=severity,
+                detail=detail,
+                table=table,
+                index=index,
+                statement_index=statement_index,
+                node_index=node_index,
+                plan_handle=handle,
+                weight_cpu_ms=weight,
+            ))
+
+        for warning in model.warnings:
+            if warning.tag == 'PlanAffectingConvert':
+                table, column = self._converted_column(warning.attributes.get('Expression', ''), entry.database_name)
+                issue = warning.attributes.get('ConvertIssue', '')
+                detail = f"{issue}: {warning.attributes.get('Expression', '')}".strip(": ")
+                add(
+                    CATEGORY_IMPLICIT_CONVERSION,
+                    "High" if issue == "Seek Plan" else "Medium",
+                    detail,
+                    table=table,
+                    index=column,
+                    statement_index=warning.statement_index,
+                    node_index=warning.node_index,
+                )
+            elif warning.tag in _SPILL_WARNINGS and warning.node_index >= 0:
+                # Aynı operatörün SpillToTempDb + *SpillDetails uyarıları tek bulgu
+                if warning.node_index in spilled_nodes:
+                    continue
+                spilled_nodes.add(warning.node_index)
+                node = model.nodes[warning.node_index]
+                table, index = self._consumer_object(model, node, entry.database_name)
+                add(
+                    CATEGORY_SPILL,
+                    "High",
+                    f"{node.physical_op} spilled to tempdb ({warning.tag})",
+                    table=table,
+                    index=index,
+                    statement_index=node.statement_index,
+                    node_index=node.index,
+                )
+            elif warning.tag == 'MemoryGrantWarning':
+                kind = warning.attributes.get('GrantWarningKind', '')
+                if kind and 'Excessive' not in kind:
+                    continue
+                table, index = self._statement_object(model, warning.statement_index, entry.database_name)
+                add(
+                    CATEGORY_MEMORY_GRANT,
+                    "Medium",
+                    f"Excessive grant: granted {warning.attributes.get('GrantedMemory', '?')} KB, "
+                    f"used {warning.attributes.get('MaxUsedMemory', '?')} KB",
+                    table=table,
+                    index=index,
+                    statement_index=warning.statement_index,
+                )
+
+        for node in model.nodes:
+            if node.physical_op in _LOOKUP_OPS:
+                rows = node.estimate_rows * max(1.0, node.estimate_executions)
+                add(
+                    CATEGORY_KEY_LOOKUP,
+                    "High" if rows >= 1000 else "Medium",
+                    f"{node.physical_op} on {node.object_name or '?'} (~{rows:,.0f} rows)",
+                    table=_qualified_table(node, entry.database_name),
+                    index=node.index_name,
+                    statement_index=node.statement_index,
+                    node_index=node.index,
+                )
+            runtime = node.runtime
+            if (
+                runtime is not None
+                and runtime.worker_thread_count >= 2
+                and runtime.actual_rows >= self.min_skew_rows
+                # DOP 2'de en fazla 2x olabilir: eşik worker sayısıyla sınırlanır
+                and runtime.thread_skew >= min(self.skew_factor, runtime.worker_thread_count * 0.9)
+            ):
+                table, index = self._consumer_object(model, node, entry.database_name)
+                add(
+                    CATEGORY_PARALLELISM_SKEW,
+                    "Medium",
+                    f"{node.physical_op}: busiest thread processed {runtime.thread_skew:.1f}x "
+                    f"the average of {runtime.worker_thread_count} threads",
+                    table=table,
+                    index=index,
+                    statement_index=node.statement_index,
+                    node_index=node.index,
+                )
+
+        for stmt in model.statements:
+            for group in stmt.missing_index_groups:
+                if group.impact < self.min_missing_index_impact:
+                    continue
+                for mi in group.indexes:
+                    table = ".".join(
+                        part.strip('[]') for part in (mi.database or entry.database_name, mi.schema_name or "dbo", mi.table_name)
+                        if part
+                    )
+                    keys = mi.equality_columns + mi.inequality_columns
+                    detail = f"Impact {group.impact:.0f}%: keys ({', '.join(keys)})"
+                    if mi.include_columns:
+                        detail += f" include ({', '.join(mi.include_columns)})"
+                    add(
+                        CATEGORY_MISSING_INDEX,
+                        "High" if group.impact >= 50 else "Medium",
+                        detail,
+                        table=table,
+                        statement_index=stmt.index,
+                    )
+
+        self._check_grant_usage(entry, model, add)
+        return findings
+
+    def _check_grant_usage(self, entry: PlanCacheEntry, model: PlanModel, add) -> None:
+        """DMV max_grant_kb / max_used_grant_kb ile kullanılmayan grant"""
+        granted = float(entry.max_grant_kb or 0.0)
+        used = float(entry.max_used_grant_kb or 0.0)
+        if granted < self.min_grant_kb or used > granted * self.max_grant_used_ratio:
+            return
+        if any(w.tag == 'MemoryGrantWarning' for w in model.warnings):
+            return  # Plan içindeki uyarı zaten raporlandı
+        stmt = self._grant_statement(model)
+        table, index = self._statement_object(model, stmt.index if stmt else -1, entry.database_name)
+        add(
+            CATEGORY_MEMORY_GRANT,
+            "Medium",
+            f"Max grant {granted:,.0f} KB, max used {used:,.0f} KB ({used / granted * 100:.0f}%)",
+            table=table,
+            index=index,
+            statement_index=stmt.index if stmt else -1,
+        )
+
+    @staticmethod
+    def _grant_statement(model: PlanModel) -> Optional[PlanStatement]:
+        """En büyük memory grant isteyen statement"""
+        candidates = [s for s in model.statements if s.memory_grant_kb]
+        if not candidates:
+            return model.default_statement()
+        return max(candidates, key=lambda s: s.memory_grant_kb or 0.0)
+
+    @staticmethod
+    def _converted_column(expression: str, default_database: str) -> Tuple[str, str]:
+        match = _CONVERTED_COLUMN_RE.search(expression or "")
+        if not match:
+            return "", ""
+        database, schema_name, table, column = match.groups()
+        parts = [database or default_database, schema_name or "dbo", table]
+        return ".".join(part for part in parts if part), column
+
+    @staticmethod
+    def _first_access(model: PlanModel, node_index: int) -> Optional[PlanNode]:
+        """Alt ağaçtaki en pahalı tablo erişim operatörü"""
+        best: Optional[PlanNode] = None
+        for node in model.iter_subtree(node_index):
+            if node.physical_op in _ACCESS_OPS and node.object_name:
+                if best is None or node.subtree_cost > best.subtree_cost:
+                    best = node
+        return best
+
+    def _consumer_object(self, model: PlanModel, node: PlanNode, default_database: str) -> Tuple[str, str]:
+        """Nesnesi olmayan operatör (Sort, Hash) için beslendiği tablo"""
+        if node.object_name:
+            return _qualified_table(node, default_database), node.index_name
+        access = self._first_access(model, node.index)
+        if access is None:
+            return "", ""
+        return _qualified_table(access, default_database), access.index_name
+
+    def _statement_object(self, model: PlanModel, statement_index: int, default_database: str) -> Tuple[str, str]:
+        if statement_index < 0 or statement_index >= len(model.statements):
+            return "", ""
+        best: Optional[PlanNode] = None
+        for root in model.statements[statement_index].root_indices:
+            access = self._first_access(model, root)
+            if access is not None and (best is None or access.subtree_cost > best.subtree_cost):
+                best = access
+        if best is None:
+            return "", ""
+        return _qualified_table(best, default_database), best.index_name
+
+
+def iter_plan_cache_entries(rows: List[Dict[str, Any]]) -> Iterator[PlanCacheEntry]:
+    """PLAN_CACHE_TOP_HANDLES satırlarını PlanCacheEntry'ye çevir"""
+    for row in rows:
+        handle = row.get('plan_handle')
+        if not handle:
+            continue
+        plan_hash = row.get('query_plan_hash') or ''
+        if isinstance(plan_hash, (bytes, bytearray)):
+            plan_hash = "0x" + bytes(plan_hash).hex().upper()
+        grant = row.get('max_grant_kb')
+        used = row.get('max_used_grant_kb')
+        yield PlanCacheEntry(
+            plan_handle=handle,
+            query_plan_hash=str(plan_hash),
+            execution_count=int(row.get('execution_count', 0) or 0),
+            total_cpu_ms=float(row.get('total_cpu_ms', 0) or 0),
+            total_duration_ms=float(row.get('total_duration_ms', 0) or 0),
+            total_logical_reads=int(row.get('total_logical_reads', 0) or 0),
+            max_grant_kb=float(grant) if grant is not None else None,
+            max_used_grant_kb=float(used) if used is not None else None,
+            last_execution_time=row.get('last_execution_time'),
+        )
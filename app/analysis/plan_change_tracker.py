@@ -0,0 +1,312 @@
+"""
+Plan Change / Forced Plan Impact Tracker
+
+Birden fazla planı olan sorguların plan bazlı performansını yerel, indeksli
+bir store'da tutar ve plan flip'lerini (yeni plan X kat kötü) ile plan
+forcing adaylarını çıkarır.
+
+Store yapısı:
+    (query_id, plan_id) -> plan meta + gün bazlı bucket'lar
+    query_id -> {plan_id, ...}   (index)
+    last_interval_id             (artımlı tarama watermark'ı)
+
+Girdi: QueryStoreQueries.PLAN_PERFORMANCE_DELTA satırları
+Çıktı: PlanChangeImpact listesi
+"""
+
+from typing import Optional, List, Dict, Any, Set, Tuple
+from datetime import date, datetime, timedelta
+
+from app.core.logger import get_logger
+from app.models.query_stats_models import PlanChangeImpact, PlanPerformance
+
+logger = get_logger('analysis.plan_change_tracker')
+
+
+# Bucket alanları: [executions, sum_duration_us, sum_cpu_us, sum_logical_reads]
+_BUCKET_FIELDS = ("executions", "sum_duration_us", "sum_cpu_us", "sum_logical_reads")
+
+
+class PlanChangeTracker:
+    """
+    Artımlı plan performans store'u ve plan değişimi değerlendiricisi
+
+    Kullanım:
+        tracker = PlanChangeTracker.from_dict(saved_state)
+        tracker.merge_rows(delta_rows)
+        tracker.prune(window_days=7)
+        impacts = tracker.evaluate(flip_ratio=2.0)
+        saved_state = tracker.to_dict()
+    """
+
+    STATE_VERSION = 1
+
+    def __init__(self, window_days: int = 7):
+        self.window_days = max(1, int(window_days))
+        self.last_interval_id = 0
+        self.last_scan_at: Optional[str] = None
+        self._plans: Dict[Tuple[int, int], Dict[str, Any]] = {}
+        self._plans_by_query: Dict[int, Set[int]] = {}
+
+    # ------------------------------------------------------------------
+    # Serialization
+    # ------------------------------------------------------------------
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": self.STATE_VERSION,
+            "window_days": int(self.window_days),
+            "last_interval_id": int(self.last_interval_id),
+            "last_scan_at": self.last_scan_at,
+            "plans": [dict(entry) for entry in self._plans.values()],
+        }
+
+    @classmethod
+    def from_dict(cls, payload: Optional[Dict[str, Any]]) -> "PlanChangeTracker":
+        data = dict(payload or {})
+        tracker = cls(window_days=int(data.get("window_days", 7) or 7))
+        if int(data.get("version", 0) or 0) != cls.STATE_VERSION:
+            return tracker
+        tracker.last_interval_id = int(data.get("last_interval_id", 0) or 0)
+        tracker.last_scan_at = data.get("last_scan_at")
+        for entry in data.get("plans", []) or []:
+            try:
+                key = (int(entry["query_id"]), int(entry["plan_id"]))
+            except (KeyError, TypeError, ValueError):
+                continue
+            entry["buckets"] = {
+                str(day): [float(v or 0.0) for v in list(values)[: len(_BUCKET_FIELDS)]]
+                for day, values in dict(entry.get("buckets", {}) or {}).items()
+            }
+            tracker._plans[key] = entry
+            tracker._plans_by_query.setdefault(key[0], set()).add(key[1])
+        return tracker
+
+    # ------------------------------------------------------------------
+    # Store maintenance
+    # ------------------------------------------------------------------
+
+    def reset(self, window_days: Optional[int] = None) -> None:
+        if window_days is not None:
+            self.window_days = max(1, int(window_days))
+        self.last_interval_id = 0
+        self.last_scan_at = None
+        self._plans.clear()
+        self._plans_by_query.clear()
+
+    def known_query_ids(self) -> List[int]:
+        return sorted(self._plans_by_query.keys())
+
+    def plan_count(self) -> int:
+        return len(self._plans)
+
+    @staticmethod
+    def _day_key(value: Any) -> Optional[str]:
+        if isinstance(value, datetime):
+            return value.date().isoformat()
+        if isinstance(value, date):
+            return value.isoformat()
+        if isinstance(value, str) and value:
+            return value[:10]
+        return None
+
+    @staticmethod
+    def _iso(value: Any) -> Optional[str]:
+        if isinstance(value, datetime):
+            return value.isoformat()
+        if value is None:
+            return None
+        return str(value)
+
+    def merge_rows(self, rows: Optional[List[Dict[str, Any]]]) -> int:
+        """
+        Delta satırlarını store'a ekle
+
+        Aynı (query_id, plan_id, gün) bucket'ı varsa toplamlar eklenir; satırlar
+        watermark sonrası interval'lerden geldiği için çift sayım olmaz.
+
+        Returns:
+            İşlenen satır sayısı
+        """
+        merged = 0
+        max_interval = int(self.last_interval_id)
+        for row in rows or []:
+            try:
+                query_id = int(row.get("query_id"))
+                plan_id = int(row.get("plan_id"))
+            except (TypeError, ValueError):
+                continue
+            day = self._day_key(row.get("bucket_date"))
+            if day is None:
+                continue
+
+            key = (query_id, plan_id)
+            entry = self._plans.get(key)
+            if entry is None:
+                entry = {
+                    "query_id": query_id,
+                    "plan_id": plan_id,
+                    "buckets": {},
+                    "first_seen": None,
+                    "last_seen": None,
+                }
+                self._plans[key] = entry
+                self._plans_by_query.setdefault(query_id, set()).add(plan_id)
+
+            plan_hash = row.get("query_plan_hash")
+            if isinstance(plan_hash, (bytes, bytearray)):
+                plan_hash = "0x" + bytes(plan_hash).hex().upper()
+            entry["plan_hash"] = str(plan_hash or entry.get("plan_hash") or "")
+            entry["is_forced"] = bool(row.get("is_forced_plan"))
+            entry["force_failure_count"] = int(row.get("force_failure_count") or 0)
+
+            first_seen = self._iso(row.get("first_seen"))
+            last_seen = self._iso(row.get("last_seen"))
+            if first_seen and (not entry["first_seen"] or first_seen < entry["first_seen"]):
+                entry["first_seen"] = first_seen
+            if last_seen and (not entry["last_seen"] or last_seen > entry["last_seen"]):
+                entry["last_seen"] = last_seen
+
+            bucket = entry["buckets"].setdefault(day, [0.0] * len(_BUCKET_FIELDS))
+            for idx, field_name in enumerate(_BUCKET_FIELDS):
+                bucket[idx] += float(row.get(field_name) or 0.0)
+
+            max_interval = max(max_interval, int(row.get("max_interval_id") or 0))
+            merged += 1
+
+        self.last_interval_id = max_interval
+        self.last_scan_at = datetime.now().isoformat(timespec="seconds")
+        return merged
+
+    def prune(self, window_days: Optional[int] = None, today: Optional[date] = None) -> int:
+        """Pencere dışına düşen bucket'ları ve boş planları sil"""
+        days = max(1, int(window_days if window_days is not None else self.window_days))
+        cutoff = ((today or date.today()) - timedelta(days=days)).isoformat()
+        removed = 0
+        for key in list(self._plans.keys()):
+            entry = self._plans[key]
+            buckets = entry.get("buckets", {})
+            for day in [d for d in buckets if d < cutoff]:
+                del buckets[day]
+            if buckets:
+                continue
+            del self._plans[key]
+            plan_ids = self._plans_by_query.get(key[0])
+            if plan_ids is not None:
+                plan_ids.discard(key[1])
+                if not plan_ids:
+                    del self._plans_by_query[key[0]]
+            removed += 1
+        return removed
+
+    # ------------------------------------------------------------------
+    # Evaluation
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _parse_dt(value: Any) -> Optional[datetime]:
+        if isinstance(value, datetime):
+            return value
+        if isinstance(value, str) and value:
+            try:
+                return datetime.fromisoformat(value)
+            except ValueError:
+                return None
+        return None
+
+    def _plan_performance(self, entry: Dict[str, Any]) -> PlanPerformance:
+        totals = [0.0] * len(_BUCKET_FIELDS)
+        for values in entry.get("buckets", {}).values():
+            for idx, value in enumerate(values):
+                totals[idx] += float(value or 0.0)
+        executions = int(totals[0])
+        divisor = float(max(1, executions))
+        return PlanPerformance(
+            plan_id=int(entry["plan_id"]),
+            plan_hash=str(entry.get("plan_hash") or ""),
+            is_forced=bool(entry.get("is_forced")),
+            force_failure_count=int(entry.get("force_failure_count") or 0),
+            first_seen=self._parse_dt(entry.get("first_seen")),
+            last_seen=self._parse_dt(entry.get("last_seen")),
+            executions=executions,
+            avg_duration_ms=totals[1] / divisor / 1000.0,
+            avg_cpu_ms=totals[2] / divisor / 1000.0,
+            avg_logical_reads=totals[3] / divisor,
+        )
+
+    def evaluate(
+        self,
+        flip_ratio: float = 2.0,
+        min_executions: int = 5,
+        query_ids: Optional[List[int]] = None,
+    ) -> List[PlanChangeImpact]:
+        """
+        Store'daki çok planlı sorguları değerlendir
+
+        Args:
+            flip_ratio: Güncel planın best plana göre kaç kat kötü olduğunda flip sayılacağı
+            min_executions: Bir planın karşılaştırmaya girmesi için gereken minimum execution
+            query_ids: Yalnızca bu sorgular (None = hepsi)
+
+        Returns:
+            Flip / forced plan regresyonu önce, impact_ms'e göre azalan sıralı liste
+        """
+        ratio_threshold = max(1.0, float(flip_ratio))
+        min_execs = max(1, int(min_executions))
+        targets = query_ids if query_ids is not None else list(self._plans_by_query.keys())
+
+        impacts: List[PlanChangeImpact] = []
+        for query_id in targets:
+            plan_ids = self._plans_by_query.get(int(query_id))
+            if not plan_ids or len(plan_ids) < 2:
+                continue
+            plans = [self._plan_performance(self._plans[(int(query_id), pid)]) for pid in plan_ids]
+            plans.sort(key=lambda p: (p.last_seen or datetime.min, p.executions), reverse=True)
+
+            eligible = [p for p in plans if p.executions >= min_execs]
+            current = plans[0]
+            forced = next((p for p in plans if p.is_forced), None)
+            impact = PlanChangeImpact(
+                query_id=int(query_id),
+                plans=plans,
+                current_plan_id=int(current.plan_id),
+                forced_plan_id=int(forced.plan_id) if forced else None,
+            )
+            if len(eligible) < 2:
+                impacts.append(impact)
+                continue
+
+            best = min(eligible, key=lambda p: (p.avg_duration_ms, -p.executions))
+            impact.best_plan_id = int(best.plan_id)
+            if current.executions >= min_execs and best.avg_duration_ms > 0:
+                impact.worse_ratio = current.avg_duration_ms / best.avg_duration_ms
+                impact.impact_ms = max(
+                    0.0, (current.avg_duration_ms - best.avg_duration_ms) * current.executions
+                )
+            impact.is_plan_flip = (
+                int(current.plan_id) != int(best.plan_id)
+                and impact.worse_ratio >= ratio_threshold
+            )
+            if forced is not None and forced.executions >= min_execs and best.avg_duration_ms > 0:
+                impact.forced_plan_regressed = (
+                    int(forced.plan_id) != int(best.plan_id)
+                    and forced.avg_duration_ms / best.avg_duration_ms >= ratio_threshold
+                )
+            # Forcing adayı: flip var, iyi plan daha önce forcing hatası almamış ve
+            # sorguda zaten başka bir plan forced değil
+            impact.is_forcing_candidate = (
+                impact.is_plan_flip
+                and not best.is_forced
+                and int(best.force_failure_count) == 0
+                and forced is None
+            )
+            impacts.append(impact)
+
+        impacts.sort(
+            key=lambda i: (
+                not (i.is_plan_flip or i.forced_plan_regressed),
+                -float(i.impact_ms),
+                int(i.query_id),
+            )
+        )
+        return impacts
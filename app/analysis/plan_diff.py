@@ -0,0 +1,611 @@
+"""
+Execution Plan Diff
+
+Aynı sorgunun iki execution plan'ını ortak PlanModel üzerinden karşılaştırır.
+
+Hizalama (tree edit distance yaklaşımı, O(n) - O(n·k)):
+1. Alt ağaç hash'leri: her düğüm için (operatör etiketi + çocuk hash'leri)
+   bottom-up hesaplanır; iki planda aynı hash'e sahip alt ağaçlar bütün
+   olarak eşlenir (1000+ operatörlü planlarda işin çoğu burada biter)
+2. Top-down: eşlenmiş düğümlerin eşlenmemiş çocukları nesne / index /
+   physical op / operatör sınıfı benzerliğine göre açgözlü eşlenir;
+   araya eklenmiş tek operatör (Parallelism, Compute Scalar) atlanabilir
+3. Bottom-up: çocukları eşlenmiş ama kendisi eşlenmemiş düğümler,
+   çocuklarının karşılıklarının ortak parent'ına eşlenir
+
+Raporlanan farklar: erişim yolu (scan/seek/lookup, index), join tipi,
+memory grant, paralellik, maliyet kayması, tahmin farkı, eklenen/silinen
+operatörler.
+"""
+
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Optional, List, Dict, Any, Tuple
+
+from app.core.logger import get_logger
+from app.analysis.plan_model import PlanModel, PlanNode, PlanStatement, get_plan_model, statement_subtree_cost
+
+logger = get_logger('analysis.plan_diff')
+
+
+_JOIN_OPS = frozenset(("Nested Loops", "Hash Match", "Merge Join", "Adaptive Join"))
+_ACCESS_OPS = frozenset((
+    "Table Scan",
+    "Clustered Index Scan",
+    "Clustered Index Seek",
+    "Index Scan",
+    "Index Seek",
+    "Key Lookup",
+    "RID Lookup",
+    "Columnstore Index Scan",
+))
+
+# Eklenip/silinmesi Medium sayılan bloklayıcı / bellek kullanan operatörler
+_HEAVY_OPS = frozenset(("Sort", "Hash Match", "Table Spool", "Index Spool", "Eager Spool"))
+
+_SEVERITY_ORDER = {"High": 0, "Medium": 1, "Low": 2}
+
+
+def _operator_class(node: PlanNode) -> str:
+    """Kaba operatör sınıfı (hizalama ve mesajlar için)"""
+    physical_op = node.physical_op
+    if physical_op in ("Nested Loops", "Merge Join") or (
+        physical_op in _JOIN_OPS and "Join" in (node.logical_op or "")
+    ):
+        return "join"
+    if physical_op in _ACCESS_OPS or node.object_name:
+        return "access"
+    if "Aggregate" in physical_op or "Aggregate" in (node.logical_op or ""):
+        return "aggregate"
+    return physical_op or "unknown"
+
+
+def _access_label(node: PlanNode) -> str:
+    label = node.physical_op or "Unknown"
+    if node.index_name and node.index_name != node.object_name:
+        label += f" ({node.index_name})"
+    return label
+
+
+def _node_label(node: PlanNode) -> str:
+    label = node.physical_op or node.logical_op or "Unknown"
+    if node.object_name:
+        label += f" [{node.object_name}]"
+    return label
+
+
+@dataclass
+class PlanDiffChange:
+    """Tek plan farkı"""
+    category: str          # access_path, join_type, memory_grant, parallelism, cost_shift,
+                           # cardinality, operator_added, operator_removed, operator_changed, total_cost
+    severity: str          # High, Medium, Low
+    message: str
+    left_node_index: Optional[int] = None
+    right_node_index: Optional[int] = None
+    left_value: Any = None
+    right_value: Any = None
+
+
+@dataclass
+class PlanDiffResult:
+    """İki planın hizalanmış karşılaştırması (düğüm index'leri PlanModel.nodes içindir)"""
+    left_statement_index: int = 0
+    right_statement_index: int = 0
+    left_operator_count: int = 0
+    right_operator_count: int = 0
+    left_cost: float = 0.0
+    right_cost: float = 0.0
+    matches: Dict[int, int] = field(default_factory=dict)      # sol düğüm -> sağ düğüm
+    removed_nodes: List[int] = field(default_factory=list)     # yalnızca solda
+    added_nodes: List[int] = field(default_factory=list)       # yalnızca sağda
+    changed_nodes: Dict[int, int] = field(default_factory=dict)  # eşlenmiş ama farklı (sol -> sağ)
+    changes: List[PlanDiffChange] = field(default_factory=list)
+
+    @property
+    def is_identical(self) -> bool:
+        return not self.changes and not self.added_nodes and not self.removed_nodes
+
+    @property
+    def similarity(self) -> float:
+        """Eşlenmiş ve değişmemiş operatörlerin oranı (0-1)"""
+        total = max(self.left_operator_count, self.right_operator_count)
+        if total == 0:
+            return 1.0
+        unchanged = len(self.matches) - len(self.changed_nodes)
+        return max(0.0, unchanged / float(total))
+
+    @property
+    def cost_change_percent(self) -> float:
+        if self.left_cost <= 0:
+            return 0.0
+        return (self.right_cost - self.left_cost) / self.left_cost * 100.0
+
+    def changes_by_category(self) -> Dict[str, List[PlanDiffChange]]:
+        grouped: Dict[str, List[PlanDiffChange]] = {}
+        for change in self.changes:
+            grouped.setdefault(change.category, []).append(change)
+        return grouped
+
+    def get_summary(self) -> str:
+        if self.is_identical:
+            return "Plans are structurally identical"
+        counts = Counter(change.category for change in self.changes)
+        parts = [f"{count} {category.replace('_', ' ')}" for category, count in counts.most_common()]
+        return (
+            f"Similarity {self.similarity * 100:.0f}%, cost {self.cost_change_percent:+.0f}%: "
+            + ", ".join(parts)
+        )
+
+
+class _PlanSide:
+    """Tek statement'ın hizalama için ön hesaplanmış görünümü"""
+
+    def __init__(self, model: PlanModel, stmt: PlanStatement):
+        self.model = model
+        self.stmt = stmt
+        self.node_indices: List[int] = list(stmt.node_indices)
+        self.hashes: Dict[int, int] = {}
+        self.sizes: Dict[int, int] = {}
+        self.cost = statement_subtree_cost(model, stmt)
+        self._compute_hashes()
+
+    def node(self, index: int) -> PlanNode:
+        return self.model.nodes[index]
+
+    def _compute_hashes(self) -> None:
+        # Preorder'ı tersten gezmek çocukları parent'tan önce işler (iteratif post-order)
+        for index in reversed(self.node_indices):
+            node = self.model.nodes[index]
+            label = (node.physical_op, node.logical_op, node.object_name, node.index_name)
+            child_hashes = tuple(self.hashes[c] for c in node.children)
+            self.hashes[index] = hash((label, child_hashes))
+            self.sizes[index] = 1 + sum(self.sizes[c] for c in node.children)
+
+    def parent(self, index: int) -> int:
+        return self.model.nodes[index].parent_index
+
+    def percent(self, index: int) -> float:
+        if self.cost <= 0:
+            return 0.0
+        return self.model.nodes[index].subtree_cost / self.cost * 100.0
+
+
+class PlanDiffEngine:
+    """
+    İki plan arasında operatör hizalaması ve fark raporu
+
+    Kullanım:
+        engine = PlanDiffEngine()
+        diff = engine.diff_xml(old_plan_xml, new_plan_xml)
+        for change in diff.changes:
+            print(change.severity, change.message)
+    """
+
+    def __init__(
+        self,
+        cost_shift_threshold: float = 10.0,
+        memory_grant_ratio: float = 2.0,
+        estimate_ratio: float = 10.0,
+        min_match_score: int = 2,
+    ):
+        """
+        Args:
+            cost_shift_threshold: Raporlanacak minimum maliyet payı değişimi (yüzde puan)
+            memory_grant_ratio: Raporlanacak minimum memory grant oranı
+            estimate_ratio: Raporlanacak minimum tahmini satır oranı
+            min_match_score: Heuristik eşleşme için gereken minimum benzerlik skoru
+        """
+        self.cost_shift_threshold = float(cost_shift_threshold)
+        self.memory_grant_ratio = max(1.0, float(memory_grant_ratio))
+        self.estimate_ratio = max(1.0, float(estimate_ratio))
+        self.min_match_score = int(min_match_score)
+
+    def diff_xml(
+        self,
+        left_xml: str,
+        right_xml: str,
+        left_statement_index: Optional[int] = None,
+        right_statement_index: Optional[int] = None,
+    ) -> Optional[PlanDiffResult]:
+        """
+        Plan XML'lerini memoize edilmiş model üzerinden karşılaştır
+
+        Returns:
+            PlanDiffResult veya None (statement bulunamazsa)
+
+        Raises:
+            ET.ParseError: XML geçersizse
+        """
+        return self.diff(
+            get_plan_model(left_xml),
+            get_plan_model(right_xml),
+            left_statement_index=left_statement_index,
+            right_statement_index=right_statement_index,
+        )
+
+    def diff(
+        self,
+        left_model: PlanModel,
+        right_model: PlanModel,
+        left_statement_index: Optional[int] = None,
+        right_statement_index: Optional[int] = None,
+    ) -> Optional[PlanDiffResult]:
+        left_stmt = self._resolve_statement(left_model, left_statement_index)
+        right_stmt = self._resolve_statement(right_model, right_statement_index)
+        if left_stmt is None or right_stmt is None:
+            return None
+
+        left = _PlanSide(left_model, left_stmt)
+        right = _PlanSide(right_model, right_stmt)
+        matches = self._align(left, right)
+
+        result = PlanDiffResult(
+            left_statement_index=left_stmt.index,
+            right_statement_index=right_stmt.index,
+            left_operator_count=len(left.node_indices),
+            right_operator_count=len(right.node_indices),
+            left_cost=left.cost,
+            right_cost=right.cost,
+            matches=matches,
+        )
+        matched_right = set(matches.values())
+        result.removed_nodes = [i for i in left.node_indices if i not in matches]
+        result.added_nodes = [i for i in right.node_indices if i not in matched_right]
+
+        self._compare_statements(left, right, result)
+        self._compare_access_paths(left, right, result)
+        self._compare_matched(left, right, result)
+        self._report_unmatched(left, right, result)
+
+        result.changes.sort(key=lambda c: (_SEVERITY_ORDER.get(c.severity, 3), c.category))
+        logger.debug(
+            f"Plan diff: {len(matches)} matched, {len(result.added_nodes)} added, "
+            f"{len(result.removed_nodes)} removed, {len(result.changes)} changes"
+        )
+        return result
+
+    @staticmethod
+    def _resolve_statement(model: PlanModel, statement_index: Optional[int]) -> Optional[PlanStatement]:
+        if statement_index is None:
+            return model.default_statement()
+        if 0 <= int(statement_index) < len(model.statements):
+            return model.statements[int(statement_index)]
+        return None
+
+    # ------------------------------------------------------------------
+    # Alignment
+    # ------------------------------------------------------------------
+
+    def _align(self, left: _PlanSide, right: _PlanSide) -> Dict[int, int]:
+        matches: Dict[int, int] = {}
+        reverse: Dict[int, int] = {}
+
+        def link(left_index: int, right_index: int) -> None:
+            matches[left_index] = right_index
+            reverse[right_index] = left_index
+
+        def link_subtree(left_index: int, right_index: int) -> None:
+            # Aynı hash -> aynı şekil: preorder'da paralel yürü
+            stack = [(left_index, right_index)]
+            while stack:
+                l_idx, r_idx = stack.pop()
+                link(l_idx, r_idx)
+                stack.extend(zip(left.node(l_idx).children, right.node(r_idx).children))
+
+        # 1) Aynı alt ağaçlar (hash); yaprakta belirsiz eşleşmeden kaçın
+        right_by_hash: Dict[int, List[int]] = {}
+        for index in right.node_indices:
+            right_by_hash.setdefault(right.hashes[index], []).append(index)
+        left_hash_counts = Counter(left.hashes[i] for i in left.node_indices)
+
+        for index in left.node_indices:
+            if index in matches:
+                continue
+            subtree_hash = left.hashes[index]
+            candidates = [c for c in right_by_hash.get(subtree_hash, ()) if c not in reverse]
+            if not candidates:
+                continue
+            if left.sizes[index] == 1 and (len(candidates) > 1 or left_hash_counts[subtree_hash] > 1):
+                continue
+            parent_partner = matches.get(left.parent(index))
+            chosen = next((c for c in candidates if right.parent(c) == parent_partner), candidates[0])
+            if right.sizes[chosen] == left.sizes[index]:
+                link_subtree(index, chosen)
+
+        # 2) + 3) yeni eşleşme kalmayana kadar; bottom-up eşleşen parent'ların
+        # çocukları bir sonraki turda top-down hizalanır
+        for l_root, r_root in zip(left.stmt.root_indices, right.stmt.root_indices):
+            if l_root not in matches and r_root not in reverse:
+                link(l_root, r_root)
+        queue = [l_idx for l_idx in left.node_indices if l_idx in matches]
+        while queue:
+            # 2) Top-down: eşlenmiş düğümlerin çocukları
+            position = 0
+            while position < len(queue):
+                l_idx = queue[position]
+                position += 1
+                r_idx = matches[l_idx]
+                for l_child, r_child in self._match_children(left, right, l_idx, r_idx, matches, reverse):
+                    link(l_child, r_child)
+                    queue.append(l_child)
+
+            # 3) Bottom-up: çocuklarının karşılıkları aynı parent'ta toplanan düğümler
+            queue = []
+            for l_idx in reversed(left.node_indices):
+                if l_idx in matches:
+                    continue
+                node = left.node(l_idx)
+                partner_parents = Counter(
+                    right.parent(matches[c]) for c in node.children if c in matches
+                )
+                for r_idx, _ in partner_parents.most_common():
+                    if r_idx < 0 or r_idx in reverse:
+                        continue
+                    if self._match_score(node, right.node(r_idx)) >= 1:
+                        link(l_idx, r_idx)
+                        queue.append(l_idx)
+                    break
+
+        return matches
+
+    def _match_score(self, left_node: PlanNode, right_node: PlanNode) -> int:
+        score = 0
+        if left_node.object_name and left_node.object_name == right_node.object_name:
+            score += 3
+            if left_node.index_name == right_node.index_name:
+                score += 1
+        if left_node.physical_op == right_node.physical_op:
+            score += 2
+        if left_node.logical_op == right_node.logical_op:
+            score += 1
+        if _operator_class(left_node) == _operator_class(right_node):
+            score += 1
+        return score
+
+    def _match_children(
+        self,
+        left: _PlanSide,
+        right: _PlanSide,
+        left_index: int,
+        right_index: int,
+        matches: Dict[int, int],
+        reverse: Dict[int, int],
+    ) -> List[Tuple[int, int]]:
+        """Eşlenmiş bir çiftin eşlenmemiş çocuklarını açgözlü eşle (tek seviye atlamalı)"""
+        left_children = [c for c in left.node(left_index).children if c not in matches]
+        if not left_children:
+            return []
+        right_candidates: List[Tuple[int, int]] = []   # (düğüm, atlama cezası)
+        for child in right.node(right_index).children:
+            if child not in reverse:
+                right_candidates.append((child, 0))
+            # Araya eklenmiş operatör: torunlar da aday (cezalı)
+            for grandchild in right.node(child).children:
+                if grandchild not in reverse:
+                    right_candidates.append((grandchild, 1))
+        if not right_candidates:
+            return []
+
+        scored: List[Tuple[int, int, int, int]] = []
+        for order, l_child in enumerate(left_children):
+            l_node = left.node(l_child)
+            for r_child, penalty in right_candidates:
+                score = self._match_score(l_node, right.node(r_child)) - penalty
+                if score >= self.min_match_score:
+                    # Eşit skorda sıra (kardeş pozisyonu) korunur
+                    scored.append((-score, order, r_child, l_child))
+        scored.sort()
+
+        paired: List[Tuple[int, int]] = []
+        used_left, used_right = set(), set()
+        for _, _, r_child, l_child in scored:
+            if l_child in used_left or r_child in used_right:
+                continue
+            used_left.add(l_child)
+            used_right.add(r_child)
+            paired.append((l_child, r_child))
+        return paired
+
+    # ------------------------------------------------------------------
+    # Change reporting
+    # ------------------------------------------------------------------
+
+    def _compare_statements(self, left: _PlanSide, right: _PlanSide, result: PlanDiffResult) -> None:
+        left_dop = int(left.stmt.degree_of_parallelism or 1)
+        right_dop = int(right.stmt.degree_of_parallelism or 1)
+        if left_dop != right_dop:
+            result.changes.append(PlanDiffChange(
+                category="parallelism",
+                severity="Medium",
+                message=f"Degree of parallelism changed: {left_dop} → {right_dop}",
+                left_value=left_dop,
+                right_value=right_dop,
+            ))
+
+        left_grant = left.stmt.memory_grant_kb
+        right_grant = right.stmt.memory_grant_kb
+        if left_grant is not None or right_grant is not None:
+            low = max(1.0, min(left_grant or 0.0, right_grant or 0.0))
+            high = max(left_grant or 0.0, right_grant or 0.0)
+            if high / low >= self.memory_grant_ratio and high >= 1024:
+                result.changes.append(PlanDiffChange(
+                    category="memory_grant",
+                    severity="Medium",
+                    message=f"Memory grant changed: {left_grant or 0:,.0f} KB → {right_grant or 0:,.0f} KB",
+                    left_value=left_grant,
+                    right_value=right_grant,
+                ))
+
+        if left.cost > 0 and abs(result.cost_change_percent) >= self.cost_shift_threshold:
+            result.changes.append(PlanDiffChange(
+                category="total_cost",
+                severity="Medium" if abs(result.cost_change_percent) >= 100 else "Low",
+                message=(
+                    f"Estimated statement cost {left.cost:.4f} → {right.cost:.4f} "
+                    f"({result.cost_change_percent:+.0f}%)"
+                ),
+                left_value=left.cost,
+                right_value=right.cost,
+            ))
+
+    def _compare_access_paths(self, left: _PlanSide, right: _PlanSide, result: PlanDiffResult) -> None:
+        """Nesne bazında erişim yöntemlerini karşılaştır (hizalamadan bağımsız)"""
+        def access_by_object(side: _PlanSide) -> Dict[str, Counter]:
+            grouped: Dict[str, Counter] = {}
+            for index in side.node_indices:
+                node = side.node(index)
+                if node.object_name and node.physical_op in _ACCESS_OPS:
+                    key = f"{node.schema_name}.{node.object_name}" if node.schema_name else node.object_name
+                    grouped.setdefault(key, Counter())[_access_label(node)] += 1
+            return grouped
+
+        left_access = access_by_object(left)
+        right_access = access_by_object(right)
+        for obj in sorted(set(left_access) | set(right_access)):
+            before = left_access.get(obj, Counter())
+            after = right_access.get(obj, Counter())
+            if before == after:
+                continue
+            gained = after - before
+            severity = "Low"
+            if any("Scan" in label or "Lookup" in label for label in gained):
+                severity = "High"
+            elif gained:
+                severity = "Medium"
+            result.changes.append(PlanDiffChange(
+                category="access_path",
+                severity=severity,
+                message=(
+                    f"Access path on [{obj}]: "
+                    f"{', '.join(sorted(before.elements())) or 'none'} → "
+                    f"{', '.join(sorted(after.elements())) or 'none'}"
+                ),
+                left_value=sorted(before.elements()),
+                right_value=sorted(after.elements()),
+            ))
+
+    def _compare_matched(self, left: _PlanSide, right: _PlanSide, result: PlanDiffResult) -> None:
+        for l_idx in left.node_indices:
+            r_idx = result.matches.get(l_idx)
+            if r_idx is None:
+                continue
+            l_node = left.node(l_idx)
+            r_node = right.node(r_idx)
+            changed = False
+
+            if l_node.physical_op != r_node.physical_op or l_node.logical_op != r_node.logical_op:
+                changed = True
+                if _operator_class(l_node) == "join" and _operator_class(r_node) == "join":
+                    result.changes.append(PlanDiffChange(
+                        category="join_type",
+                        severity="Medium",
+                        message=(
+                            f"Join changed: {l_node.physical_op} ({l_node.logical_op}) → "
+                            f"{r_node.physical_op} ({r_node.logical_op})"
+                        ),
+                        left_node_index=l_idx,
+                        right_node_index=r_idx,
+                        left_value=l_node.physical_op,
+                        right_value=r_node.physical_op,
+                    ))
+                elif not (l_node.physical_op in _ACCESS_OPS and r_node.physical_op in _ACCESS_OPS):
+                    # Erişim operatörleri nesne bazında raporlandı
+                    result.changes.append(PlanDiffChange(
+                        category="operator_changed",
+                        severity="Low",
+                        message=f"Operator changed: {_node_label(l_node)} → {_node_label(r_node)}",
+                        left_node_index=l_idx,
+                        right_node_index=r_idx,
+                    ))
+            elif l_node.index_name != r_node.index_name:
+                changed = True
+
+            if l_node.parallel != r_node.parallel:
+                changed = True
+                result.changes.append(PlanDiffChange(
+                    category="parallelism",
+                    severity="Low",
+                    message=(
+                        f"{_node_label(r_node)} now runs "
+                        f"{'in parallel' if r_node.parallel else 'serially'}"
+                    ),
+                    left_node_index=l_idx,
+                    right_node_index=r_idx,
+                    left_value=l_node.parallel,
+                    right_value=r_node.parallel,
+                ))
+
+            low_grant = max(1.0, float(min(l_node.memory_grant_kb, r_node.memory_grant_kb)))
+            high_grant = float(max(l_node.memory_grant_kb, r_node.memory_grant_kb))
+            if high_grant >= 1024 and high_grant / low_grant >= self.memory_grant_ratio:
+                changed = True
+                result.changes.append(PlanDiffChange(
+                    category="memory_grant",
+                    severity="Low",
+                    message=(
+                        f"{_node_label(r_node)} memory: {l_node.memory_grant_kb:,} KB → "
+                        f"{r_node.memory_grant_kb:,} KB"
+                    ),
+                    left_node_index=l_idx,
+                    right_node_index=r_idx,
+                    left_value=l_node.memory_grant_kb,
+                    right_value=r_node.memory_grant_kb,
+                ))
+
+            left_pct = left.percent(l_idx)
+            right_pct = right.percent(r_idx)
+            if abs(right_pct - left_pct) >= self.cost_shift_threshold:
+                changed = True
+                result.changes.append(PlanDiffChange(
+                    category="cost_shift",
+                    severity="Medium" if abs(right_pct - left_pct) >= 40 else "Low",
+                    message=f"{_node_label(r_node)} cost share {left_pct:.1f}% → {right_pct:.1f}%",
+                    left_node_index=l_idx,
+                    right_node_index=r_idx,
+                    left_value=left_pct,
+                    right_value=right_pct,
+                ))
+
+            low_rows = max(1.0, min(l_node.estimate_rows, r_node.estimate_rows))
+            high_rows = max(l_node.estimate_rows, r_node.estimate_rows)
+            if high_rows / low_rows >= self.estimate_ratio:
+                changed = True
+                result.changes.append(PlanDiffChange(
+                    category="cardinality",
+                    severity="Low",
+                    message=(
+                        f"{_node_label(r_node)} estimated rows "
+                        f"{l_node.estimate_rows:,.0f} → {r_node.estimate_rows:,.0f}"
+                    ),
+                    left_node_index=l_idx,
+                    right_node_index=r_idx,
+                    left_value=l_node.estimate_rows,
+                    right_value=r_node.estimate_rows,
+                ))
+
+            if changed:
+                result.changed_nodes[l_idx] = r_idx
+
+    def _report_unmatched(self, left: _PlanSide, right: _PlanSide, result: PlanDiffResult) -> None:
+        for category, side, indices, verb in (
+            ("operator_removed", left, result.removed_nodes, "removed"),
+            ("operator_added", right, result.added_nodes, "added"),
+        ):
+            for index in indices:
+                node = side.node(index)
+                if node.physical_op in _ACCESS_OPS:
+                    continue  # access_path altında raporlandı
+                is_heavy = _operator_class(node) == "join" or node.physical_op in _HEAVY_OPS
+                result.changes.append(PlanDiffChange(
+                    category=category,
+                    severity="Medium" if is_heavy else "Low",
+                    message=f"{_node_label(node)} {verb}",
+                    left_node_index=index if side is left else None,
+                    right_node_index=index if side is right else None,
+                ))
+
+
+def diff_plans(left_xml: str, right_xml: str) -> Optional[PlanDiffResult]:
+    """Shortcut: varsayılan statement'lar için plan farkı"""
+    return PlanDiffEngine().diff_xml(left_xml, right_xml)
@@ -0,0 +1,650 @@
+"""
+Canonical Execution Plan Model
+
+Showplan XML tek geçişte (XMLPullParser start/end event'leri) okunur ve
+viewer (PlanParser), AI insights (ExecutionPlanAnalyzer) ile tablo
+cardinality çıkarımı (AIAnalysisService) için ortak, indeksli bir modele
+dönüştürülür. Model plan XML hash'ine göre memoize edilir; aynı plan için
+XML yalnızca bir kez parse edilir.
+
+Model salt okunur kabul edilir: türetilen yapılar (ExecutionPlan,
+PlanInsights) kendi nesnelerini üretir, modeli değiştirmez.
+"""
+
+import hashlib
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Optional, List, Dict, Any, Tuple, Iterator
+
+from app.core.logger import get_logger
+
+logger = get_logger('analysis.plan_model')
+
+
+# XMLPullParser'a tek seferde beslenen karakter sayısı
+_FEED_CHUNK_CHARS = 1 << 16
+
+# Predicate metni için alınan maksimum karakter
+_PREDICATE_TEXT_MAX = 200
+
+
+def _local_name(tag: str) -> str:
+    """'{namespace}Tag' -> 'Tag'"""
+    return tag.rsplit('}', 1)[-1] if '}' in tag else tag
+
+
+def plan_content_hash(xml_string: str) -> str:
+    """Plan XML'inin içerik hash'i (memoization anahtarı)"""
+    return hashlib.sha1(str(xml_string or "").encode("utf-8", errors="ignore")).hexdigest()
+
+
+@dataclass
+class PlanNodeWarning:
+    """RelOp veya statement seviyesindeki tek uyarı elementi"""
+    tag: str
+    attributes: Dict[str, str] = field(default_factory=dict)
+    node_index: int = -1          # -1: statement / QueryPlan seviyesi
+    statement_index: int = -1
+
+
+@dataclass
+class PlanNodeRuntime:
+    """
+    Actual plan: RelOp/RunTimeInformation/RunTimeCountersPerThread toplamları
+
+    Satır, execution, read ve CPU thread'ler üzerinden toplanır; elapsed
+    paralel thread'ler aynı anda çalıştığı için en büyük thread değeridir.
+    Row mode'da ActualElapsedms alt ağacı da kapsar; self_elapsed_ms bu
+    durumda en yavaş çocuğun süresi düşülerek yaklaşık hesaplanır.
+    """
+    thread_count: int = 0
+    actual_rows: float = 0.0
+    actual_rows_read: float = 0.0
+    actual_executions: int = 0
+    actual_elapsed_ms: float = 0.0
+    actual_cpu_ms: float = 0.0
+    actual_logical_reads: int = 0
+    actual_physical_reads: int = 0
+    actual_scans: int = 0
+    execution_mode: str = "Row"
+    has_timing: bool = False        # ActualElapsedms (SQL 2016 SP1+) mevcut mu
+    self_elapsed_ms: float = 0.0
+    worker_thread_count: int = 0    # Thread > 0 (paralel worker) sayısı
+    max_thread_rows: float = 0.0    # Worker thread'ler içindeki en büyük ActualRows
+
+    @property
+    def thread_skew(self) -> float:
+        """En yüklü worker thread'in satırı / worker başına ortalama satır (>= 1.0)"""
+        if self.worker_thread_count < 2 or self.actual_rows <= 0:
+            return 1.0
+        average = self.actual_rows / self.worker_thread_count
+        return max(1.0, self.max_thread_rows / average)
+
+    def add_thread(self, attrs: Dict[str, str]) -> None:
+        """Tek RunTimeCountersPerThread elementini topla"""
+        self.thread_count += 1
+        rows = _attr_float(attrs, 'ActualRows')
+        self.actual_rows += rows
+        if _attr_float(attrs, 'Thread') > 0:
+            self.worker_thread_count += 1
+            self.max_thread_rows = max(self.max_thread_rows, rows)
+        self.actual_rows_read += _attr_float(attrs, 'ActualRowsRead')
+        self.actual_executions += int(_attr_float(attrs, 'ActualExecutions'))
+        self.actual_cpu_ms += _attr_float(attrs, 'ActualCPUms')
+        self.actual_logical_reads += int(_attr_float(attrs, 'ActualLogicalReads'))
+        self.actual_physical_reads += int(_attr_float(attrs, 'ActualPhysicalReads'))
+        self.actual_scans += int(_attr_float(attrs, 'ActualScans'))
+        if 'ActualElapsedms' in attrs:
+            self.has_timing = True
+            self.actual_elapsed_ms = max(self.actual_elapsed_ms, _attr_float(attrs, 'ActualElapsedms'))
+        mode = attrs.get('ActualExecutionMode')
+        if mode:
+            self.execution_mode = mode
+
+
+def _attr_float(attrs: Dict[str, str], name: str) -> float:
+    try:
+        return float(attrs.get(name) or 0)
+    except ValueError:
+        return 0.0
+
+
+@dataclass
+class PlanNode:
+    """Tek RelOp; nodes listesindeki indeksi ile adreslenir"""
+    index: int
+    statement_index: int
+    parent_index: int = -1
+    depth: int = 0
+    children: List[int] = field(default_factory=list)
+    node_id: Optional[int] = None            # RelOp/@NodeId
+    physical_op: str = ""
+    logical_op: str = ""
+    estimate_rows: float = 0.0              # Tek execution için
+    estimate_executions: float = 1.0         # 1 + EstimateRebinds + EstimateRewinds
+    estimate_io: float = 0.0
+    estimate_cpu: float = 0.0
+    subtree_cost: float = 0.0
+    avg_row_size: int = 0
+    parallel: bool = False
+    actual_rows: Optional[float] = None      # Tüm thread'lerin ActualRows toplamı
+    runtime: Optional[PlanNodeRuntime] = None
+    table_cardinality: Optional[float] = None
+    database_name: str = ""
+    schema_name: str = ""
+    object_name: str = ""
+    index_name: str = ""
+    seek_predicates: str = ""
+    predicates: str = ""
+    memory_grant_kb: int = 0
+    warnings: List[PlanNodeWarning] = field(default_factory=list)
+
+
+@dataclass
+class MissingIndexInfo:
+    database: str = ""
+    schema_name: str = ""
+    table_name: str = ""
+    equality_columns: List[str] = field(default_factory=list)
+    inequality_columns: List[str] = field(default_factory=list)
+    include_columns: List[str] = field(default_factory=list)
+
+
+@dataclass
+class MissingIndexGroupInfo:
+    impact: float = 0.0
+    indexes: List[MissingIndexInfo] = field(default_factory=list)
+
+
+@dataclass
+class PlanStatement:
+    """StmtSimple / StmtCond / StmtCursor ... elementi"""
+    index: int
+    kind: str
+    parent_statement_index: int = -1
+    batch_index: int = 0
+    attributes: Dict[str, str] = field(default_factory=dict)
+    degree_of_parallelism: Optional[int] = None    # İlk QueryPlan/@DegreeOfParallelism
+    has_query_plan: bool = False
+    root_indices: List[int] = field(default_factory=list)
+    node_indices: List[int] = field(default_factory=list)
+    missing_index_groups: List[MissingIndexGroupInfo] = field(default_factory=list)
+    warnings: List[PlanNodeWarning] = field(default_factory=list)
+    query_time_stats: Dict[str, str] = field(default_factory=dict)  # QueryPlan/QueryTimeStats (actual)
+    memory_grant_info: Dict[str, str] = field(default_factory=dict)  # QueryPlan/MemoryGrantInfo
+
+    @property
+    def actual_elapsed_ms(self) -> Optional[float]:
+        raw = self.query_time_stats.get('ElapsedTime')
+        return _attr_float(self.query_time_stats, 'ElapsedTime') if raw else None
+
+    @property
+    def actual_cpu_ms(self) -> Optional[float]:
+        raw = self.query_time_stats.get('CpuTime')
+        return _attr_float(self.query_time_stats, 'CpuTime') if raw else None
+
+    @property
+    def memory_grant_kb(self) -> Optional[float]:
+        """Verilen (actual) yoksa istenen/tahmini memory grant (KB)"""
+        for key in ('GrantedMemory', 'RequestedMemory', 'SerialDesiredMemory'):
+            if self.memory_grant_info.get(key):
+                return _attr_float(self.memory_grant_info, key)
+        return None
+
+    @property
+    def statement_type(self) -> str:
+        return self.attributes.get('StatementType', '')
+
+    @property
+    def statement_text(self) -> str:
+        return self.attributes.get('StatementText', '')
+
+    @property
+    def query_plan_hash(self) -> str:
+        return self.attributes.get('QueryPlanHash', '')
+
+
+def statement_subtree_cost(model: "PlanModel", stmt: PlanStatement) -> float:
+    """StatementSubTreeCost; yoksa kök operatörlerin toplam maliyeti"""
+    raw = stmt.attributes.get('StatementSubTreeCost')
+    if raw:
+        try:
+            return float(raw)
+        except ValueError:
+            pass
+    return float(sum(model.nodes[i].subtree_cost for i in stmt.root_indices))
+
+
+@dataclass
+class PlanModel:
+    """Tek parse ile elde edilen indeksli plan modeli"""
+    content_hash: str = ""
+    nodes: List[PlanNode] = field(default_factory=list)
+    statements: List[PlanStatement] = field(default_factory=list)
+    warnings: List[PlanNodeWarning] = field(default_factory=list)   # Doküman sırasıyla tümü
+    table_cardinality: Dict[str, int] = field(default_factory=dict)  # "schema.table" -> satır
+    first_query_plan_dop: Optional[int] = None
+    nodes_by_physical_op: Dict[str, List[int]] = field(default_factory=dict)
+    has_runtime_stats: bool = False   # Actual plan (RunTimeInformation) mı
+
+    def first_statement(self, kind: str = "StmtSimple") -> Optional[PlanStatement]:
+        for stmt in self.statements:
+            if stmt.kind == kind:
+                return stmt
+        return None
+
+    def iter_subtree(self, node_index: int) -> Iterator[PlanNode]:
+        """Preorder (iteratif) alt ağaç gezintisi"""
+        stack = [int(node_index)]
+        while stack:
+            node = self.nodes[stack.pop()]
+            yield node
+            stack.extend(reversed(node.children))
+
+    def nodes_with_physical_op(self, physical_op: str) -> List[PlanNode]:
+        return [self.nodes[i] for i in self.nodes_by_physical_op.get(physical_op, [])]
+
+    def iter_missing_index_groups(self) -> Iterator[MissingIndexGroupInfo]:
+        for stmt in self.statements:
+            yield from stmt.missing_index_groups
+
+    def statement_cost(self, statement_index: int) -> float:
+        return statement_subtree_cost(self, self.statements[int(statement_index)])
+
+    @property
+    def total_statement_cost(self) -> float:
+        """Tüm statement'ların (prosedür/batch geneli) toplam maliyeti"""
+        return float(sum(statement_subtree_cost(self, stmt) for stmt in self.statements))
+
+    def default_statement(self) -> Optional[PlanStatement]:
+        """Varsayılan gösterim: QueryPlan'ı olan ilk StmtSimple, yoksa ilk StmtSimple"""
+        first_simple = None
+        for stmt in self.statements:
+            if stmt.kind != "StmtSimple":
+                continue
+            if stmt.root_indices:
+                return stmt
+            if first_simple is None:
+                first_simple = stmt
+        return first_simple
+
+
+class _PlanModelBuilder:
+    """
+    Showplan event akışından PlanModel kuran builder
+
+    - Statement elementleri (Stmt*) iç içe olabilir; her statement kendi açık
+      RelOp yığınını tutar
+    - Object / SeekPredicates / Predicate / MemoryGrant / RunTimeCountersPerThread
+      yalnızca sahibi olan (en yakın) RelOp'a atanır
+    - Warnings çocukları en yakın RelOp'a, yoksa statement'a atanır
+    - İşlenen elementler 'end' event'inde temizlenir
+    """
+
+    def __init__(self, content_hash: str):
+        self.model = PlanModel(content_hash=content_hash)
+        self._depth = 0
+        self._tag_stack: List[str] = []
+        # Statement bağlamları: [statement, element derinliği, açık RelOp yığını]
+        # RelOp yığını girdileri: (node, element derinliği, işlenmiş parça adları)
+        self._contexts: List[List[Any]] = []
+        self._batch_index = -1
+        self._captures: List[List[Any]] = []
+        self._warnings_owner: Optional[Tuple[Optional[PlanNode], PlanStatement, int]] = None
+        self._pending_cardinality: List[Tuple[float, int]] = []
+        self._missing_group: Optional[MissingIndexGroupInfo] = None
+        self._missing_index: Optional[MissingIndexInfo] = None
+        self._column_usage = ""
+
+    def consume(self, events) -> None:
+        for event, elem in events:
+            if event == "start":
+                self._start(elem)
+            else:
+                self._end(elem)
+
+    # ------------------------------------------------------------------
+    # start
+    # ------------------------------------------------------------------
+
+    def _start(self, elem: ET.Element) -> None:
+        self._depth += 1
+        depth = self._depth
+        name = _local_name(elem.tag)
+        self._tag_stack.append(name)
+        attrs = elem.attrib
+
+        if self._captures:
+            self._capture_text(name, attrs)
+        if 'TableCardinality' in attrs:
+            self._push_cardinality(attrs.get('TableCardinality'), depth)
+        if name == 'Object' and self._pending_cardinality:
+            self._resolve_cardinality(attrs)
+
+        if name == 'Batch':
+            self._batch_index += 1
+            return
+        if name.startswith('Stmt') and name != 'StmtBlock':
+            self._start_statement(name, attrs, depth)
+            return
+        if not self._contexts:
+            return
+
+        context = self._contexts[-1]
+        stmt: PlanStatement = context[0]
+        ops = context[2]
+
+        if self._warnings_owner is not None and depth == self._warnings_owner[2] + 1:
+            self._add_warning(name, attrs)
+            return
+        if name == 'RelOp':
+            self._start_rel_op(context, attrs, depth)
+            return
+        if name == 'QueryPlan':
+            if not stmt.has_query_plan:
+                stmt.has_query_plan = True
+                dop = attrs.get('DegreeOfParallelism')
+                stmt.degree_of_parallelism = int(dop) if dop else None
+            if self.model.first_query_plan_dop is None and attrs.get('DegreeOfParallelism'):
+                self.model.first_query_plan_dop = int(attrs.get('DegreeOfParallelism'))
+            return
+        if name == 'Warnings':
+            self._warnings_owner = (ops[-1][0] if ops else None, stmt, depth)
+            return
+        if name in ('MissingIndexGroup', 'MissingIndex', 'ColumnGroup') or (
+            name == 'Column' and self._missing_index is not None
+        ):
+            self._start_missing_index_part(stmt, name, attrs)
+            return
+        if name == 'QueryTimeStats':
+            if not stmt.query_time_stats:
+                stmt.query_time_stats = dict(attrs)
+            return
+        if name == 'MemoryGrantInfo' and not ops:
+            if not stmt.memory_grant_info:
+                stmt.memory_grant_info = dict(attrs)
+            return
+        if not ops:
+            return
+
+        node, op_depth, seen = ops[-1]
+        if name == 'Object':
+            # IndexScan, TableScan vb. içindeki (RelOp'un torunu) ilk Object
+            if depth == op_depth + 2 and 'Object' not in seen:
+                seen.add('Object')
+                node.database_name = attrs.get('Database', '').strip('[]')
+                node.schema_name = attrs.get('Schema', '').strip('[]')
+                node.object_name = attrs.get('Table', '').strip('[]')
+                node.index_name = attrs.get('Index', '').strip('[]')
+        elif name == 'SeekPredicates' or name == 'Predicate':
+            if name not in seen:
+                seen.add(name)
+                field_name = 'seek_predicates' if name == 'SeekPredicates' else 'predicates'
+                self._captures.append([field_name, depth, node, [], 0])
+        elif name == 'MemoryGrant':
+            if 'MemoryGrant' not in seen:
+                seen.add('MemoryGrant')
+                node.memory_grant_kb = int(attrs.get('SerialDesiredMemory', 0))
+        elif name == 'RunTimeCountersPerThread':
+            # RelOp > RunTimeInformation > RunTimeCountersPerThread (thread başına bir tane)
+            if depth == op_depth + 2:
+                if node.runtime is None:
+                    node.runtime = PlanNodeRuntime()
+                    self.model.has_runtime_stats = True
+                node.runtime.add_thread(attrs)
+                node.actual_rows = node.runtime.actual_rows
+
+    def _start_statement(self, kind: str, attrs: Dict[str, str], depth: int) -> None:
+        parent_index = self._contexts[-1][0].index if self._contexts else -1
+        stmt = PlanStatement(
+            index=len(self.model.statements),
+            kind=kind,
+            parent_statement_index=parent_index,
+            batch_index=max(0, self._batch_index),
+            attributes=dict(attrs),
+        )
+        self.model.statements.append(stmt)
+        self._contexts.append([stmt, depth, []])
+
+    def _start_rel_op(self, context: List[Any], attrs: Dict[str, str], depth: int) -> None:
+        stmt: PlanStatement = context[0]
+        ops = context[2]
+        node_id = attrs.get('NodeId')
+        node = PlanNode(
+            index=len(self.model.nodes),
+            statement_index=stmt.index,
+            depth=len(ops),
+            node_id=int(node_id) if node_id not in (None, '') else None,
+            physical_op=attrs.get('PhysicalOp', ''),
+            logical_op=attrs.get('LogicalOp', ''),
+            estimate_rows=float(attrs.get('EstimateRows', 0)),
+            estimate_executions=1.0 + float(attrs.get('EstimateRebinds', 0)) + float(attrs.get('EstimateRewinds', 0)),
+            estimate_io=float(attrs.get('EstimateIO', 0)),
+            estimate_cpu=float(attrs.get('EstimateCPU', 0)),
+            subtree_cost=float(attrs.get('EstimatedTotalSubtreeCost', 0)),
+            avg_row_size=int(attrs.get('AvgRowSize', 0)),
+            parallel=attrs.get('Parallel', '0') == '1',
+        )
+        raw_cardinality = attrs.get('TableCardinality')
+        if raw_cardinality:
+            node.table_cardinality = float(raw_cardinality)
+        if ops:
+            parent = ops[-1][0]
+            node.parent_index = parent.index
+            parent.children.append(node.index)
+        else:
+            stmt.root_indices.append(node.index)
+        stmt.node_indices.append(node.index)
+        self.model.nodes.append(node)
+        if node.physical_op:
+            self.model.nodes_by_physical_op.setdefault(node.physical_op, []).append(node.index)
+        ops.append((node, depth, set()))
+
+    def _start_missing_index_part(self, stmt: PlanStatement, name: str, attrs: Dict[str, str]) -> None:
+        if name == 'MissingIndexGroup':
+            self._missing_group = MissingIndexGroupInfo(impact=float(attrs.get('Impact', 0)))
+            stmt.missing_index_groups.append(self._missing_group)
+        elif name == 'MissingIndex':
+            if self._missing_group is None:
+                self._missing_group = MissingIndexGroupInfo()
+                stmt.missing_index_groups.append(self._missing_group)
+            self._missing_index = MissingIndexInfo(
+                database=attrs.get('Database', '').strip('[]'),
+                schema_name=attrs.get('Schema', '').strip('[]'),
+                table_name=attrs.get('Table', '').strip('[]'),
+            )
+            self._missing_group.indexes.append(self._missing_index)
+        elif name == 'ColumnGroup':
+            self._column_usage = attrs.get('Usage', '')
+        elif name == 'Column' and len(self._tag_stack) > 1 and self._tag_stack[-2] == 'ColumnGroup':
+            index = self._missing_index
+            col_name = attrs.get('Name', '').strip('[]')
+            if self._column_usage == 'EQUALITY':
+                index.equality_columns.append(col_name)
+            elif self._column_usage == 'INEQUALITY':
+                index.inequality_columns.append(col_name)
+            elif self._column_usage == 'INCLUDE':
+                index.include_columns.append(col_name)
+
+    def _capture_text(self, name: str, attrs: Dict[str, str]) -> None:
+        """Aktif predicate'lere Column / Const değerlerini ekle"""
+        value = ""
+        if 'Column' in name:
+            value = attrs.get('Column', '')
+        elif 'Const' in name:
+            value = attrs.get('ConstValue', '')
+        if not value:
+            return
+        for capture in self._captures:
+            if capture[4] <= _PREDICATE_TEXT_MAX:
+                capture[3].append(value)
+                capture[4] += len(value) + 1
+
+    def _add_warning(self, tag: str, attrs: Dict[str, str]) -> None:
+        node, stmt, _ = self._warnings_owner
+        warning = PlanNodeWarning(
+            tag=tag,
+            attributes=dict(attrs),
+            node_index=node.index if node is not None else -1,
+            statement_index=stmt.index,
+        )
+        if node is not None:
+            node.warnings.append(warning)
+        else:
+            stmt.warnings.append(warning)
+        self.model.warnings.append(warning)
+
+    def _push_cardinality(self, raw_value: Optional[str], depth: int) -> None:
+        try:
+            value = int(float(raw_value))
+        except (TypeError, ValueError):
+            return
+        if value > 0:
+            self._pending_cardinality.append((value, depth))
+
+    def _resolve_cardinality(self, attrs: Dict[str, str]) -> None:
+        """TableCardinality taşıyan elementlerin alt ağacındaki ilk Object"""
+        schema_name = str(attrs.get('Schema', '') or 'dbo').strip('[]')
+        table_name = str(attrs.get('Table', '') or '').strip('[]')
+        pending = self._pending_cardinality
+        self._pending_cardinality = []
+        if not table_name:
+            return
+        key = f"{schema_name}.{table_name}".lower()
+        for value, _ in pending:
+            if value > self.model.table_cardinality.get(key, 0):
+                self.model.table_cardinality[key] = value
+
+    # ------------------------------------------------------------------
+    # end
+    # ------------------------------------------------------------------
+
+    def _end(self, elem: ET.Element) -> None:
+        depth = self._depth
+        self._depth -= 1
+        name = self._tag_stack.pop() if self._tag_stack else ""
+
+        if self._pending_cardinality and self._pending_cardinality[-1][1] == depth:
+            self._pending_cardinality.pop()
+        if self._captures and self._captures[-1][1] == depth:
+            field_name, _, node, parts, _ = self._captures.pop()
+            setattr(node, field_name, ' '.join(parts)[:_PREDICATE_TEXT_MAX])
+        if self._warnings_owner is not None and self._warnings_owner[2] == depth:
+            self._warnings_owner = None
+
+        if self._contexts:
+            context = self._contexts[-1]
+            ops = context[2]
+            if name == 'RelOp' and ops and ops[-1][1] == depth:
+                node = ops.pop()[0]
+                if node.runtime is not None:
+                    self._finish_runtime(node)
+            elif name == 'MissingIndex':
+                self._missing_index = None
+            elif name == 'MissingIndexGroup':
+                self._missing_group = None
+            elif context[1] == depth:
+                self._contexts.pop()
+        elem.clear()
+
+
+    def _finish_runtime(self, node: PlanNode) -> None:
+        """Çocuklar kapandıktan sonra operatörün kendi elapsed süresini hesapla"""
+        runtime = node.runtime
+        if runtime.execution_mode == "Batch":
+            # Batch mode süreleri zaten operatörün kendisine ait
+            runtime.self_elapsed_ms = runtime.actual_elapsed_ms
+            return
+        slowest_child = 0.0
+        for child_index in node.children:
+            child_runtime = self.model.nodes[child_index].runtime
+            if child_runtime is not None:
+                slowest_child = max(slowest_child, child_runtime.actual_elapsed_ms)
+        runtime.self_elapsed_ms = max(0.0, runtime.actual_elapsed_ms - slowest_child)
+
+
+class PlanModelCache:
+    """Plan içerik hash'ine göre süreç genelinde LRU memoization"""
+
+    _CACHE_MAX = 32
+    _CACHE: "OrderedDict[str, PlanModel]" = OrderedDict()
+    _CACHE_LOCK = Lock()
+    _HITS = 0
+    _MISSES = 0
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._CACHE_LOCK:
+            cls._CACHE.clear()
+            cls._HITS = 0
+            cls._MISSES = 0
+
+    @classmethod
+    def info(cls) -> Dict[str, int]:
+        with cls._CACHE_LOCK:
+            return {
+                "size": len(cls._CACHE),
+                "max_size": int(cls._CACHE_MAX),
+                "hits": int(cls._HITS),
+                "misses": int(cls._MISSES),
+            }
+
+    @classmethod
+    def get(cls, content_hash: str) -> Optional[PlanModel]:
+        with cls._CACHE_LOCK:
+            model = cls._CACHE.get(content_hash)
+            if model is None:
+                cls._MISSES += 1
+                return None
+            cls._CACHE.move_to_end(content_hash)
+            cls._HITS += 1
+            return model
+
+    @classmethod
+    def put(cls, model: PlanModel) -> None:
+        with cls._CACHE_LOCK:
+            cls._CACHE[model.content_hash] = model
+            cls._CACHE.move_to_end(model.content_hash)
+            while len(cls._CACHE) > int(cls._CACHE_MAX):
+                cls._CACHE.popitem(last=False)
+
+
+def build_plan_model(xml_string: str, content_hash: Optional[str] = None) -> PlanModel:
+    """
+    Plan XML'ini tek geçişte parse edip PlanModel üret (cache'e bakmaz)
+
+    Raises:
+        ET.ParseError: XML geçersizse
+    """
+    builder = _PlanModelBuilder(content_hash or plan_content_hash(xml_string))
+    pull_parser = ET.XMLPullParser(events=("start", "end"))
+    for offset in range(0, len(xml_string), _FEED_CHUNK_CHARS):
+        pull_parser.feed(xml_string[offset:offset + _FEED_CHUNK_CHARS])
+        builder.consume(pull_parser.read_events())
+    pull_parser.close()
+    builder.consume(pull_parser.read_events())
+    return builder.model
+
+
+def get_plan_model(xml_string: str) -> PlanModel:
+    """
+    Memoize edilmiş PlanModel döndür
+
+    Aynı plan XML'i için viewer, AI analizi ve cardinality çıkarımı aynı
+    modeli paylaşır; XML yalnızca ilk çağrıda parse edilir.
+
+    Raises:
+        ET.ParseError: XML geçersizse
+    """
+    content_hash = plan_content_hash(xml_string)
+    model = PlanModelCache.get(content_hash)
+    if model is not None:
+        return model
+    model = build_plan_model(xml_string, content_hash=content_hash)
+    PlanModelCache.put(model)
+    logger.debug(
+        f"Plan model built: {len(model.statements)} statements, {len(model.nodes)} operators"
+    )
+    return model
@@ -0,0 +1,445 @@
+"""
+Compact Plan Operator Store
+
+Büyük planlar için operatör ağacını struct-of-arrays olarak tutar:
+- Sayısal alanlar array('d' / 'q' / 'i') kolonlarında
+- Operatör/nesne adları ve predicate'ler store içi string havuzunda (index ile)
+- Ağaç preorder sırada saklanır; parent index'i ve subtree_end ile
+  çocuklar ayrı bir liste tutmadan bulunur:
+      ilk çocuk = i + 1, sonraki kardeş = subtree_end[çocuk]
+
+Store oluşturulduktan sonra değişmez; bu yüzden cache'lenen planlar
+kopyalanmadan paylaşılabilir. Viewer ve analiz kodu PlanOperator API'sini
+kullanmaya devam eder: PlanOperatorView, store'daki bir satırı ihtiyaç
+anında PlanOperator gibi gösteren salt okunur bir görünümdür.
+"""
+
+import sys
+from array import array
+from typing import Optional, List, Dict, Any, Tuple, Iterator
+
+from app.analysis.plan_parser import OperatorType, PlanOperator, PlanWarning
+
+_OPERATOR_TYPES: Tuple[OperatorType, ...] = tuple(OperatorType)
+_OPERATOR_TYPE_INDEX: Dict[OperatorType, int] = {}
+for _i, _op_type in enumerate(_OPERATOR_TYPES):
+    # Aynı değere sahip enum alias'ları (HASH_AGGREGATE) ilk üyeye düşer
+    _OPERATOR_TYPE_INDEX.setdefault(_op_type, _i)
+
+_FLOAT_FIELDS = (
+    "estimated_cost",
+    "subtree_cost",
+    "estimated_cpu_cost",
+    "estimated_io_cost",
+    "cost_percent",
+    "estimated_rows",
+    "estimated_executions",
+    "actual_elapsed_ms",
+    "actual_self_elapsed_ms",
+    "actual_cpu_ms",
+)
+_INT_FIELDS = (
+    "node_id",
+    "estimated_row_size",
+    "estimated_degree",
+    "memory_grant_kb",
+    "depth",
+    "actual_logical_reads",
+)
+# None olabilen tamsayılar (estimated plan'da actual değer yok): _NO_VALUE ile saklanır
+_NULLABLE_INT_FIELDS = (
+    "actual_rows",
+    "actual_executions",
+)
+_STRING_FIELDS = (
+    "physical_op",
+    "logical_op",
+    "object_name",
+    "database_name",
+    "schema_name",
+    "index_name",
+    "seek_predicates",
+    "predicates",
+)
+# Sık tekrar eden kısa adlar process genelinde intern edilir
+_INTERNED_FIELDS = frozenset(("physical_op", "logical_op", "database_name", "schema_name"))
+
+_FLAG_PARALLEL = 1
+_FLAG_SPILL = 2
+_NO_VALUE = -1
+
+
+class PlanOperatorStoreBuilder:
+    """
+    Preorder sırada operatör satırı ekleyerek PlanOperatorStore kurar
+
+    Kullanım:
+        builder = PlanOperatorStoreBuilder()
+        root = builder.append(None, physical_op="Select", ...)
+        builder.append(root, physical_op="Index Seek", ...)
+        store = builder.build()
+    """
+
+    def __init__(self):
+        self._floats: Dict[str, array] = {name: array('d') for name in _FLOAT_FIELDS}
+        self._ints: Dict[str, array] = {name: array('q') for name in _INT_FIELDS}
+        self._string_refs: Dict[str, array] = {name: array('I') for name in _STRING_FIELDS}
+        self._nullable_ints: Dict[str, array] = {name: array('q') for name in _NULLABLE_INT_FIELDS}
+        self._operator_types = array('B')
+        self._flags = array('B')
+        self._parents = array('i')
+        self._strings: List[str] = [""]
+        self._string_ids: Dict[str, int] = {"": 0}
+        self._warnings: Dict[int, Tuple[PlanWarning, ...]] = {}
+
+    def __len__(self) -> int:
+        return len(self._parents)
+
+    def _string_id(self, field_name: str, value: Any) -> int:
+        text = str(value or "")
+        string_id = self._string_ids.get(text)
+        if string_id is None:
+            if field_name in _INTERNED_FIELDS:
+                text = sys.intern(text)
+            string_id = len(self._strings)
+            self._strings.append(text)
+            self._string_ids[text] = string_id
+        return string_id
+
+    def append(
+        self,
+        parent_index: Optional[int],
+        *,
+        operator_type: OperatorType = OperatorType.UNKNOWN,
+        parallel: bool = False,
+        spill_to_tempdb: bool = False,
+        warnings: Optional[List[PlanWarning]] = None,
+        **values: Any,
+    ) -> int:
+        """
+        Operatör satırı ekle
+
+        Satırlar preorder sırada eklenmelidir (parent her zaman çocuklarından önce).
+
+        Args:
+            parent_index: Parent satırın index'i (kök için None)
+            **values: PlanOperator alan adları (sayısal ve string alanlar)
+
+        Returns:
+            Eklenen satırın index'i
+        """
+        index = len(self._parents)
+        if parent_index is not None and not 0 <= int(parent_index) < index:
+            raise ValueError(f"Parent index must precede child in preorder: {parent_index}")
+
+        for name in _FLOAT_FIELDS:
+            default = 1.0 if name == "estimated_executions" else 0.0
+            value = values.get(name)
+            self._floats[name].append(float(value if value is not None else default))
+        for name in _INT_FIELDS:
+            default = 1 if name == "estimated_degree" else 0
+            value = values.get(name)
+            self._ints[name].append(int(value if value is not None else default))
+        for name in _STRING_FIELDS:
+            self._string_refs[name].append(self._string_id(name, values.get(name)))
+
+        for name in _NULLABLE_INT_FIELDS:
+            value = values.get(name)
+            self._nullable_ints[name].append(_NO_VALUE if value is None else int(value))
+        self._operator_types.append(_OPERATOR_TYPE_INDEX.get(operator_type, _OPERATOR_TYPE_INDEX[OperatorType.UNKNOWN]))
+        self._flags.append((_FLAG_PARALLEL if parallel else 0) | (_FLAG_SPILL if spill_to_tempdb else 0))
+        self._parents.append(-1 if parent_index is None else int(parent_index))
+        if warnings:
+            self._warnings[index] = tuple(warnings)
+        return index
+
+    def build(self) -> "PlanOperatorStore":
+        """Kolonları dondur ve subtree sınırlarını hesapla"""
+        count = len(self._parents)
+        # Preorder'da çocuklar parent'tan sonra gelir: tersten tek geçiş yeterli
+        subtree_end = array('i', range(1, count + 1))
+        for index in range(count - 1, 0, -1):
+            parent = self._parents[index]
+            if parent >= 0 and subtree_end[index] > subtree_end[parent]:
+                subtree_end[parent] = subtree_end[index]
+
+        return PlanOperatorStore(
+            floats=self._floats,
+            ints=self._ints,
+            string_refs=self._string_refs,
+            strings=tuple(self._strings),
+            nullable_ints=self._nullable_ints,
+            operator_types=self._operator_types,
+            flags=self._flags,
+            parents=self._parents,
+            subtree_end=subtree_end,
+            warnings=dict(self._warnings),
+        )
+
+
+class PlanOperatorStore:
+    """
+    Değişmez, kolon bazlı operatör ağacı
+
+    Satır 0 köktür; satırlar preorder sıradadır.
+    """
+
+    __slots__ = (
+        "_floats", "_ints", "_string_refs", "_strings", "_nullable_ints",
+        "_operator_types", "_flags", "_parents", "_subtree_end", "_warnings",
+    )
+
+    def __init__(
+        self,
+        floats: Dict[str, array],
+        ints: Dict[str, array],
+        string_refs: Dict[str, array],
+        strings: Tuple[str, ...],
+        nullable_ints: Dict[str, array],
+        operator_types: array,
+        flags: array,
+        parents: array,
+        subtree_end: array,
+        warnings: Dict[int, Tuple[PlanWarning, ...]],
+    ):
+        self._floats = floats
+        self._ints = ints
+        self._string_refs = string_refs
+        self._strings = strings
+        self._nullable_ints = nullable_ints
+        self._operator_types = operator_types
+        self._flags = flags
+        self._parents = parents
+        self._subtree_end = subtree_end
+        self._warnings = warnings
+
+    @classmethod
+    def from_operator(cls, root: PlanOperator) -> "PlanOperatorStore":
+        """Mevcut PlanOperator ağacını kompakt store'a dönüştür (iteratif)"""
+        builder = PlanOperatorStoreBuilder()
+        stack: List[Tuple[PlanOperator, Optional[int]]] = [(root, None)]
+        while stack:
+            op, parent_index = stack.pop()
+            index = builder.append(
+                parent_index,
+                operator_type=op.operator_type,
+                parallel=op.parallel,
+                spill_to_tempdb=op.spill_to_tempdb,
+                warnings=op.warnings,
+                **{
+                    name: getattr(op, name)
+                    for name in _FLOAT_FIELDS + _INT_FIELDS + _NULLABLE_INT_FIELDS + _STRING_FIELDS
+                },
+            )
+            for child in reversed(op.children):
+                stack.append((child, index))
+        return builder.build()
+
+    def __len__(self) -> int:
+        return len(self._parents)
+
+    # ------------------------------------------------------------------
+    # Column access
+    # ------------------------------------------------------------------
+
+    def float_value(self, name: str, index: int) -> float:
+        return self._floats[name][index]
+
+    def int_value(self, name: str, index: int) -> int:
+        return self._ints[name][index]
+
+    def string_value(self, name: str, index: int) -> str:
+        return self._strings[self._string_refs[name][index]]
+
+    def nullable_int_value(self, name: str, index: int) -> Optional[int]:
+        value = self._nullable_ints[name][index]
+        return None if value == _NO_VALUE else int(value)
+
+    def operator_type(self, index: int) -> OperatorType:
+        return _OPERATOR_TYPES[self._operator_types[index]]
+
+    def flag(self, index: int, mask: int) -> bool:
+        return bool(self._flags[index] & mask)
+
+    def warnings(self, index: int) -> Tuple[PlanWarning, ...]:
+        return self._warnings.get(index, ())
+
+    def parent_index(self, index: int) -> Optional[int]:
+        parent = self._parents[index]
+        return None if parent < 0 else int(parent)
+
+    def subtree_end(self, index: int) -> int:
+        return int(self._subtree_end[index])
+
+    def child_indices(self, index: int) -> Iterator[int]:
+        end = self._subtree_end[index]
+        child = index + 1
+        while child < end:
+            yield child
+            child = self._subtree_end[child]
+
+    # ------------------------------------------------------------------
+    # Views
+    # ------------------------------------------------------------------
+
+    def view(self, index: int = 0) -> "PlanOperatorView":
+        if not 0 <= int(index) < len(self._parents):
+            raise IndexError(f"Operator index out of range: {index}")
+        return PlanOperatorView(self, int(index))
+
+    def materialize(self, index: int = 0) -> PlanOperator:
+        """
+        Alt ağacın değiştirilebilir PlanOperator kopyası
+
+        View'ler salt okunurdur; operatörleri düzenleyecek kod bu kopyayı kullanmalıdır.
+        """
+        end = self.subtree_end(index)
+        built: Dict[int, PlanOperator] = {}
+        for row in range(index, end):
+            op = PlanOperator(
+                operator_type=self.operator_type(row),
+                parallel=self.flag(row, _FLAG_PARALLEL),
+                spill_to_tempdb=self.flag(row, _FLAG_SPILL),
+                warnings=list(self.warnings(row)),
+                **{name: self._floats[name][row] for name in _FLOAT_FIELDS},
+                **{name: int(self._ints[name][row]) for name in _INT_FIELDS},
+                **{name: self.nullable_int_value(name, row) for name in _NULLABLE_INT_FIELDS},
+                **{name: self.string_value(name, row) for name in _STRING_FIELDS},
+            )
+            parent = self._parents[row]
+            if row != index and parent in built:
+                op.parent = built[parent]
+                built[parent].children.append(op)
+            built[row] = op
+        return built[index]
+
+    def nbytes(self) -> int:
+        """Kolonların ve string havuzunun yaklaşık bellek kullanımı (byte)"""
+        columns = list(self._floats.values()) + list(self._ints.values()) + list(self._string_refs.values())
+        columns += list(self._nullable_ints.values())
+        columns += [self._operator_types, self._flags, self._parents, self._subtree_end]
+        total = sum(col.buffer_info()[1] * col.itemsize for col in columns)
+        total += sum(sys.getsizeof(text) for text in self._strings)
+        total += sum(sys.getsizeof(items) for items in self._warnings.values())
+        return int(total)
+
+
+def _float_field(name: str) -> property:
+    return property(lambda self: self._store._floats[name][self._index])
+
+
+def _int_field(name: str) -> property:
+    return property(lambda self: int(self._store._ints[name][self._index]))
+
+
+def _nullable_int_field(name: str) -> property:
+    return property(lambda self: self._store.nullable_int_value(name, self._index))
+
+
+def _string_field(name: str) -> property:
+    return property(lambda self: self._store.string_value(name, self._index))
+
+
+class PlanOperatorView(PlanOperator):
+    """
+    PlanOperatorStore satırı üzerinde salt okunur PlanOperator görünümü
+
+    Her erişimde store'dan okunur; children/parent yeni view'ler döndürür.
+    Aynı store ve index'e sahip view'ler eşittir.
+    """
+
+    __slots__ = ("_store", "_index")
+
+    def __init__(self, store: PlanOperatorStore, index: int):
+        object.__setattr__(self, "_store", store)
+        object.__setattr__(self, "_index", index)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(
+            f"PlanOperatorView is read-only; use PlanOperatorStore.materialize() to edit '{name}'"
+        )
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, PlanOperatorView):
+            return NotImplemented
+        return self._store is other._store and self._index == other._index
+
+    def __hash__(self) -> int:
+        return hash((id(self._store), self._index))
+
+    def __repr__(self) -> str:
+        return f"PlanOperatorView(node_id={self.node_id}, physical_op={self.physical_op!r})"
+
+    @property
+    def store(self) -> PlanOperatorStore:
+        return self._store
+
+    @property
+    def store_index(self) -> int:
+        return self._index
+
+    node_id = _int_field("node_id")
+    estimated_row_size = _int_field("estimated_row_size")
+    estimated_degree = _int_field("estimated_degree")
+    memory_grant_kb = _int_field("memory_grant_kb")
+    depth = _int_field("depth")
+    actual_logical_reads = _int_field("actual_logical_reads")
+    actual_rows = _nullable_int_field("actual_rows")
+    actual_executions = _nullable_int_field("actual_executions")
+
+    estimated_cost = _float_field("estimated_cost")
+    subtree_cost = _float_field("subtree_cost")
+    estimated_cpu_cost = _float_field("estimated_cpu_cost")
+    estimated_io_cost = _float_field("estimated_io_cost")
+    cost_percent = _float_field("cost_percent")
+    estimated_rows = _float_field("estimated_rows")
+    estimated_executions = _float_field("estimated_executions")
+    actual_elapsed_ms = _float_field("actual_elapsed_ms")
+    actual_self_elapsed_ms = _float_field("actual_self_elapsed_ms")
+    actual_cpu_ms = _float_field("actual_cpu_ms")
+
+    physical_op = _string_field("physical_op")
+    logical_op = _string_field("logical_op")
+    object_name = _string_field("object_name")
+    database_name = _string_field("database_name")
+    schema_name = _string_field("schema_name")
+    index_name = _string_field("index_name")
+    seek_predicates = _string_field("seek_predicates")
+    predicates = _string_field("predicates")
+
+    @property
+    def operator_type(self) -> OperatorType:
+        return self._store.operator_type(self._index)
+
+    @property
+    def parallel(self) -> bool:
+        return self._store.flag(self._index, _FLAG_PARALLEL)
+
+    @property
+    def spill_to_tempdb(self) -> bool:
+        return self._store.flag(self._index, _FLAG_SPILL)
+
+    @property
+    def warnings(self) -> List[PlanWarning]:
+        return list(self._store.warnings(self._index))
+
+    @property
+    def has_warnings(self) -> bool:
+        return bool(self._store.warnings(self._index))
+
+    @property
+    def children(self) -> List[PlanOperator]:
+        return [PlanOperatorView(self._store, child) for child in self._store.child_indices(self._index)]
+
+    @property
+    def parent(self) -> Optional[PlanOperator]:
+        parent = self._store.parent_index(self._index)
+        return None if parent is None else PlanOperatorView(self._store, parent)
+
+    def get_all_operators(self) -> List[PlanOperator]:
+        """Alt ağaç preorder sırada store'da ardışık durur"""
+        end = self._store.subtree_end(self._index)
+        return [PlanOperatorView(self._store, row) for row in range(self._index, end)]
+
+    def subtree_size(self) -> int:
+        return self._store.subtree_end(self._index) - self._index
@@ -15,7 +15,6 @@ Referans: https://docs.microsoft.com/en-us/sql/relational-databases/showplan-log
 import xml.etree.ElementTree as ET
 from typing import Optional, List, Dict, Any, Tuple
 import copy
-import hashlib
 from collections import OrderedDict
 from dataclasses import dataclass, field
 from enum import Enum
@@ -23,6 +22,14 @@ from datetime import datetime
 from threading import Lock
 
 from app.core.logger import get_logger
+from app.analysis.plan_model import (
+    PlanModel,
+    PlanModelCache,
+    PlanNode,
+    PlanStatement,
+    get_plan_model,
+    plan_content_hash,
+)
 
 logger = get_logger('analysis.plan_parser')
 
@@ -162,9 +169,17 @@ class PlanOperator:
     
     # Satır tahminleri
     estimated_rows: float = 0.0
-    actual_rows: Optional[int] = None  # Actual plan için
+    estimated_executions: float = 1.0  # 1 + rebinds + rewinds
+    actual_rows: Optional[int] = None  # Actual plan için (tüm execution/thread toplamı)
     estimated_row_size: int = 0
     
+    # Actual plan runtime istatistikleri (RunTimeCountersPerThread)
+    actual_executions: Optional[int] = None
+    actual_elapsed_ms: float = 0.0       # Row mode: alt ağaç dahil
+    actual_self_elapsed_ms: float = 0.0
+    actual_cpu_ms: float = 0.0
+    actual_logical_reads: int = 0
+    
     # Parallelism
     parallel: bool = False
     estimated_degree: int = 1
@@ -211,6 +226,19 @@ class PlanOperator:
         """Uyarı var mı?"""
         return len(self.warnings) > 0
     
+    @property
+    def has_actual_stats(self) -> bool:
+        """Actual plan istatistiği var mı?"""
+        return self.actual_rows is not None
+    
+    @property
+    def misestimate_factor(self) -> float:
+        """Tüm execution'lar için tahmini/gerçek satır kat farkı (estimated plan için 1.0)"""
+        if self.actual_rows is None:
+            return 1.0
+        from app.analysis.plan_runtime import cardinality_misestimate
+        return cardinality_misestimate(self.estimated_rows, self.actual_rows, self.estimated_executions)
+    
     @property
     def is_expensive(self) -> bool:
         """Pahalı operatör mü? (>25% maliyet)"""
@@ -273,13 +301,45 @@ class PlanOperator:
         return "#22c55e"  # Yeşil
     
     def get_all_operators(self) -> List['PlanOperator']:
-        """Tüm operatörleri düz liste olarak döndür"""
-        result = [self]
-        for child in self.children:
-            result.extend(child.get_all_operators())
+        """Tüm operatörleri düz liste olarak döndür (preorder, iteratif)"""
+        result: List['PlanOperator'] = []
+        stack: List['PlanOperator'] = [self]
+        while stack:
+            op = stack.pop()
+            result.append(op)
+            stack.extend(reversed(op.children))
         return result
 
 
+@dataclass
+class PlanStatementInfo:
+    """
+    Plan içindeki tek statement özeti (prosedür / çok statement'lı batch)
+    
+    Operatör ağacı içermez; ağaç PlanParser.parse(xml, statement_index=...)
+    ile ihtiyaç anında kurulur.
+    """
+    statement_index: int
+    batch_index: int = 0
+    kind: str = "StmtSimple"          # StmtSimple, StmtCond, StmtCursor ...
+    statement_type: str = ""
+    statement_text: str = ""
+    subtree_cost: float = 0.0
+    cost_percent: float = 0.0         # Tüm statement'ların toplamı içindeki pay
+    operator_count: int = 0
+    parent_statement_index: int = -1  # StmtCond/UDF içindeki iç içe statement'lar için
+    has_query_plan: bool = False
+    
+    @property
+    def display_name(self) -> str:
+        text = " ".join(str(self.statement_text or "").split())
+        if not text:
+            text = self.statement_type or self.kind
+        if len(text) > 80:
+            text = text[:77] + "..."
+        return f"#{self.statement_index + 1} [{self.cost_percent:.1f}%] {text}"
+
+
 @dataclass
 class ExecutionPlan:
     """
@@ -316,6 +376,10 @@ class ExecutionPlan:
     # Parallelism
     degree_of_parallelism: int = 1
     
+    # Actual plan: QueryTimeStats (estimated plan için None)
+    actual_elapsed_ms: Optional[float] = None
+    actual_cpu_ms: Optional[float] = None
+    
     # Uyarılar ve öneriler
     warnings: List[PlanWarning] = field(default_factory=list)
     missing_indexes: List[MissingIndex] = field(default_factory=list)
@@ -323,6 +387,20 @@ class ExecutionPlan:
     # Plan XML (orijinal)
     plan_xml: str = ""
     
+    # Çok statement'lı planlar: gösterilen statement ve tüm statement özetleri
+    statement_index: int = 0
+    statements: List[PlanStatementInfo] = field(default_factory=list)
+    
+    @property
+    def is_multi_statement(self) -> bool:
+        """Plan birden fazla statement içeriyor mu?"""
+        return len(self.statements) > 1
+    
+    def top_statements(self, top_n: int = 10) -> List[PlanStatementInfo]:
+        """Maliyete göre azalan ilk N statement"""
+        ranked = sorted(self.statements, key=lambda st: (-st.subtree_cost, st.statement_index))
+        return ranked[: max(0, int(top_n))]
+    
     @property
     def operator_count(self) -> int:
         """Toplam operatör sayısı"""
@@ -361,6 +439,32 @@ class ExecutionPlan:
         if not self.root_operator:
             return []
         return [op for op in self.root_operator.get_all_operators() if op.cost_percent > 10]
+    
+    @property
+    def has_actual_stats(self) -> bool:
+        """Actual execution plan mı?"""
+        if not self.root_operator:
+            return False
+        return any(op.has_actual_stats for op in self.root_operator.get_all_operators())
+    
+    def runtime_hotspots(self, top_n: int = 10) -> List[PlanOperator]:
+        """Gerçekte en çok zaman harcayan operatörler (self elapsed, yoksa CPU)"""
+        if not self.root_operator:
+            return []
+        operators = [op for op in self.root_operator.get_all_operators() if op.has_actual_stats]
+        operators.sort(key=lambda op: (-op.actual_self_elapsed_ms, -op.actual_cpu_ms, op.node_id))
+        return operators[: max(0, int(top_n))]
+    
+    def misestimated_operators(self, top_n: int = 10, min_factor: float = 10.0) -> List[PlanOperator]:
+        """Kardinalite tahmini en çok sapan operatörler (kat farkına göre)"""
+        if not self.root_operator:
+            return []
+        operators = [
+            op for op in self.root_operator.get_all_operators()
+            if op.has_actual_stats and op.misestimate_factor >= min_factor
+        ]
+        operators.sort(key=lambda op: (-op.misestimate_factor, -op.actual_self_elapsed_ms, op.node_id))
+        return operators[: max(0, int(top_n))]
 
 
 class PlanParser:
@@ -387,6 +491,7 @@ class PlanParser:
     def clear_cache(cls) -> None:
         with cls._CACHE_LOCK:
             cls._PARSED_PLAN_CACHE.clear()
+        PlanModelCache.clear()
 
     @classmethod
     def cache_info(cls) -> Dict[str, int]:
@@ -395,7 +500,42 @@ class PlanParser:
 
     @staticmethod
     def _make_cache_key(xml_string: str) -> str:
-        return hashlib.sha1(str(xml_string or "").encode("utf-8", errors="ignore")).hexdigest()
+        return plan_content_hash(xml_string)
+
+    @staticmethod
+    def _clone_plan(plan: ExecutionPlan) -> ExecutionPlan:
+        """
+        Plan kopyası (deepcopy yerine)
+
+        Parser'ın ürettiği operatörler değişmez bir PlanOperatorStore üzerindeki
+        view'lerdir; store kopyalanmadan paylaşılır. Elle kurulmuş PlanOperator
+        ağaçları açık yığın ile kopyalanır (derin zincirlerde recursion yok).
+        """
+        from app.analysis.plan_operator_store import PlanOperatorView
+        
+        cloned = copy.copy(plan)
+        cloned.statements = list(plan.statements)
+        cloned.warnings = [copy.deepcopy(w) for w in plan.warnings]
+        cloned.missing_indexes = [copy.deepcopy(mi) for mi in plan.missing_indexes]
+        if plan.root_operator is None or isinstance(plan.root_operator, PlanOperatorView):
+            return cloned
+
+        def _clone_op(source: PlanOperator, parent: Optional[PlanOperator]) -> PlanOperator:
+            target = copy.copy(source)
+            target.parent = parent
+            target.children = []
+            target.warnings = [copy.deepcopy(w) for w in source.warnings]
+            return target
+
+        cloned.root_operator = _clone_op(plan.root_operator, None)
+        stack = [(plan.root_operator, cloned.root_operator)]
+        while stack:
+            source, target = stack.pop()
+            for child in source.children:
+                child_copy = _clone_op(child, target)
+                target.children.append(child_copy)
+                stack.append((child, child_copy))
+        return cloned
 
     @classmethod
     def _get_cached_plan(cls, cache_key: str) -> Optional[ExecutionPlan]:
@@ -404,22 +544,29 @@ class PlanParser:
             if cached is None:
                 return None
             cls._PARSED_PLAN_CACHE.move_to_end(cache_key)
-            return copy.deepcopy(cached)
+            return cls._clone_plan(cached)
 
     @classmethod
     def _set_cached_plan(cls, cache_key: str, plan: ExecutionPlan) -> None:
         with cls._CACHE_LOCK:
-            cls._PARSED_PLAN_CACHE[cache_key] = copy.deepcopy(plan)
+            cls._PARSED_PLAN_CACHE[cache_key] = cls._clone_plan(plan)
             cls._PARSED_PLAN_CACHE.move_to_end(cache_key)
             while len(cls._PARSED_PLAN_CACHE) > int(cls._PARSED_PLAN_CACHE_MAX):
                 cls._PARSED_PLAN_CACHE.popitem(last=False)
     
-    def parse(self, xml_string: str) -> Optional[ExecutionPlan]:
+    def parse(self, xml_string: str, statement_index: Optional[int] = None) -> Optional[ExecutionPlan]:
         """
         Plan XML'ini parse et
         
+        XML, ortak PlanModel üzerinden tek geçişte okunur (plan_model.get_plan_model);
+        aynı plan için AI analizi ve cardinality çıkarımı da bu modeli kullanır.
+        Operatör ağacı yalnızca istenen statement için, model düğümlerinden
+        iteratif olarak kurulur; diğer statement'lar plan.statements içinde
+        özet olarak yer alır.
+        
         Args:
             xml_string: Showplan XML string
+            statement_index: Gösterilecek statement (None: QueryPlan'ı olan ilk StmtSimple)
         
         Returns:
             ExecutionPlan veya None (hata durumunda)
@@ -429,80 +576,39 @@ class PlanParser:
             return None
 
         cache_key = self._make_cache_key(xml_string)
+        if statement_index is not None:
+            cache_key = f"{cache_key}:{int(statement_index)}"
         cached_plan = self._get_cached_plan(cache_key)
         if cached_plan is not None:
             logger.debug("Plan parser cache hit")
             return cached_plan
         
         try:
-            # XML'i parse et
-            root = ET.fromstring(xml_string)
-            
-            # Namespace kontrolü
-            if root.tag.startswith('{'):
-                # Namespace'li XML
-                ns = {'sp': root.tag.split('}')[0].strip('{')}
-            else:
-                ns = SHOWPLAN_NS
-            
+            model = get_plan_model(xml_string)
             plan = ExecutionPlan(plan_xml=xml_string)
+            plan.statements = self.summarize_statements(model)
             
-            # Batch'i bul
-            batch = root.find('.//sp:Batch', ns)
-            if batch is None:
-                batch = root.find('.//Batch')
-            
-            if batch is None:
-                # Direkt ShowPlanXML altında ara
-                stmt = root.find('.//sp:StmtSimple', ns)
-                if stmt is None:
-                    stmt = root.find('.//StmtSimple')
+            if statement_index is None:
+                stmt = model.default_statement()
+            elif 0 <= int(statement_index) < len(model.statements):
+                stmt = model.statements[int(statement_index)]
             else:
-                stmt = batch.find('.//sp:StmtSimple', ns)
-                if stmt is None:
-                    stmt = batch.find('.//StmtSimple')
-            
+                logger.warning(f"Statement index out of range: {statement_index}")
+                return None
             if stmt is None:
                 logger.warning("No statement found in plan XML")
                 return plan
             
-            # Statement bilgisi
-            plan.statement_text = stmt.get('StatementText', '')
-            plan.statement_type = stmt.get('StatementType', '')
-            
-            # Compile bilgisi
-            plan.compile_cpu = float(stmt.get('StatementCompCpu', 0))
-            plan.compile_memory = int(stmt.get('StatementCompMem', 0))
-            
-            # Missing indexes
-            plan.missing_indexes = self._parse_missing_indexes(stmt, ns)
-            
-            # RelOp (root operatör) bul
-            query_plan = stmt.find('.//sp:QueryPlan', ns)
-            if query_plan is None:
-                query_plan = stmt.find('.//QueryPlan')
-            
-            if query_plan is not None:
-                # DOP
-                plan.degree_of_parallelism = int(query_plan.get('DegreeOfParallelism', 1))
-                
-                # Root RelOp
-                rel_op = query_plan.find('sp:RelOp', ns)
-                if rel_op is None:
-                    rel_op = query_plan.find('RelOp')
-                
-                if rel_op is not None:
-                    # İlk geçişte toplam maliyeti hesapla
-                    self._total_cost = float(rel_op.get('EstimatedTotalSubtreeCost', 0))
-                    plan.total_cost = self._total_cost
-                    
-                    # Operatör ağacını oluştur
-                    plan.root_operator = self._parse_rel_op(rel_op, ns, depth=0)
+            plan.statement_index = stmt.index
+            self._populate_from_statement(plan, model, stmt)
             
             # Plan-level uyarıları topla
             plan.warnings = self._collect_plan_warnings(plan)
             
-            logger.info(f"Parsed plan: {plan.operator_count} operators, cost={plan.total_cost:.4f}")
+            logger.info(
+                f"Parsed plan: statement {stmt.index + 1}/{len(model.statements)}, "
+                f"{plan.operator_count} operators, cost={plan.total_cost:.4f}"
+            )
             self._set_cached_plan(cache_key, plan)
             return plan
             
@@ -513,88 +619,187 @@ class PlanParser:
             logger.error(f"Plan parse error: {e}")
             return None
     
-    def _parse_rel_op(
-        self, 
-        rel_op_elem: ET.Element, 
-        ns: dict, 
-        depth: int = 0,
-        node_id: int = 0
-    ) -> PlanOperator:
-        """RelOp elementini parse et"""
-        op = PlanOperator(
-            node_id=node_id,
-            depth=depth
-        )
-        
-        # Temel özellikler
-        op.physical_op = rel_op_elem.get('PhysicalOp', '')
-        op.logical_op = rel_op_elem.get('LogicalOp', '')
-        op.estimated_cost = float(rel_op_elem.get('EstimatedTotalSubtreeCost', 0))
-        op.subtree_cost = op.estimated_cost
-        op.estimated_rows = float(rel_op_elem.get('EstimateRows', 0))
-        op.estimated_row_size = int(rel_op_elem.get('AvgRowSize', 0))
-        op.parallel = rel_op_elem.get('Parallel', '0') == '1'
-        
-        # Maliyet yüzdesi
-        if self._total_cost > 0:
-            op.cost_percent = (op.estimated_cost / self._total_cost) * 100
-        
-        # I/O ve CPU maliyetleri
-        op.estimated_io_cost = float(rel_op_elem.get('EstimateIO', 0))
-        op.estimated_cpu_cost = float(rel_op_elem.get('EstimateCPU', 0))
-        
-        # Operatör tipini belirle
-        op.operator_type = self._get_operator_type(op.physical_op)
-        
-        # Nesne bilgisi (tablo, index)
-        self._parse_object_info(rel_op_elem, op, ns)
-        
-        # Predicates
-        self._parse_predicates(rel_op_elem, op, ns)
-        
-        # Warnings
-        self._parse_warnings(rel_op_elem, op, ns)
-        
-        # Memory grant
-        memory_elem = rel_op_elem.find('.//sp:MemoryGrant', ns)
-        if memory_elem is None:
-            memory_elem = rel_op_elem.find('.//MemoryGrant')
-        if memory_elem is not None:
-            op.memory_grant_kb = int(memory_elem.get('SerialDesiredMemory', 0))
+    def parse_statement(self, xml_string: str, statement_index: int) -> Optional[ExecutionPlan]:
+        """Tek bir statement'ın operatör ağacını kur (lazy açılış için)"""
+        return self.parse(xml_string, statement_index=statement_index)
+    
+    @staticmethod
+    def summarize_statements(model: PlanModel) -> List[PlanStatementInfo]:
+        """Modeldeki tüm statement'lar için maliyet payı dahil özet listesi"""
+        costs = [model.statement_cost(stmt.index) for stmt in model.statements]
+        total = float(sum(costs))
+        return [
+            PlanStatementInfo(
+                statement_index=stmt.index,
+                batch_index=stmt.batch_index,
+                kind=stmt.kind,
+                statement_type=stmt.statement_type,
+                statement_text=stmt.statement_text,
+                subtree_cost=cost,
+                cost_percent=(cost / total * 100.0) if total > 0 else 0.0,
+                operator_count=len(stmt.node_indices),
+                parent_statement_index=stmt.parent_statement_index,
+                has_query_plan=stmt.has_query_plan,
+            )
+            for stmt, cost in zip(model.statements, costs)
+        ]
+    
+    def rank_statements(self, xml_string: str, top_n: int = 10) -> List[PlanStatementInfo]:
+        """
+        Prosedür / batch planındaki en maliyetli statement'ları döndür
         
-        # Child RelOp'ları bul
-        child_id = node_id + 1
-        for child_rel_op in rel_op_elem.findall('sp:RelOp', ns):
-            child = self._parse_rel_op(child_rel_op, ns, depth + 1, child_id)
-            child.parent = op
-            op.children.append(child)
-            child_id += len(child.get_all_operators())
+        Operatör ağacı kurulmaz; yalnızca memoize edilmiş model kullanılır.
+        """
+        if not xml_string or not xml_string.strip():
+            return []
+        try:
+            statements = self.summarize_statements(get_plan_model(xml_string))
+        except ET.ParseError as e:
+            logger.error(f"XML parse error: {e}")
+            return []
+        ranked = sorted(statements, key=lambda st: (-st.subtree_cost, st.statement_index))
+        return ranked[: max(0, int(top_n))]
+    
+    @staticmethod
+    def operator_ids(model: PlanModel, stmt: PlanStatement) -> Dict[int, int]:
+        """
+        Model düğüm index'i -> ExecutionPlan operatör node_id eşlemesi
         
-        # Namespace'siz de dene
-        if not op.children:
-            for child_rel_op in rel_op_elem.findall('RelOp'):
-                child = self._parse_rel_op(child_rel_op, ns, depth + 1, child_id)
-                child.parent = op
-                op.children.append(child)
-                child_id += len(child.get_all_operators())
+        Operatörler statement düğümleriyle aynı preorder sırada numaralanır;
+        birden fazla QueryPlan kökü varsa 0 sanal köke aittir.
+        """
+        offset = 1 if len(stmt.root_indices) > 1 else 0
+        return {node_index: offset + position for position, node_index in enumerate(stmt.node_indices)}
+    
+    def _populate_from_statement(
+        self,
+        plan: ExecutionPlan,
+        model: PlanModel,
+        stmt: PlanStatement,
+    ) -> None:
+        """Statement bilgisini ve operatör ağacını modelden ExecutionPlan'a aktar"""
+        attrs = stmt.attributes
+        plan.statement_text = stmt.statement_text
+        plan.statement_type = stmt.statement_type
+        plan.plan_hash = stmt.query_plan_hash
+        
+        # Compile bilgisi
+        plan.compile_cpu = float(attrs.get('StatementCompCpu', 0))
+        plan.compile_memory = int(attrs.get('StatementCompMem', 0))
+        
+        # Actual plan süreleri
+        plan.actual_elapsed_ms = stmt.actual_elapsed_ms
+        plan.actual_cpu_ms = stmt.actual_cpu_ms
+        
+        # Missing indexes
+        plan.missing_indexes = [
+            MissingIndex(
+                database=mi.database,
+                schema_name=mi.schema_name,
+                table_name=mi.table_name,
+                impact=group.impact,
+                equality_columns=list(mi.equality_columns),
+                inequality_columns=list(mi.inequality_columns),
+                include_columns=list(mi.include_columns),
+            )
+            for group in stmt.missing_index_groups
+            for mi in group.indexes
+        ]
         
-        # İç içe operatörler (örn: IndexScan içindeki RelOp)
-        for inner_elem in rel_op_elem:
-            for inner_rel_op in inner_elem.findall('sp:RelOp', ns):
-                child = self._parse_rel_op(inner_rel_op, ns, depth + 1, child_id)
-                child.parent = op
-                op.children.append(child)
-                child_id += len(child.get_all_operators())
-            
-            # Namespace'siz
-            for inner_rel_op in inner_elem.findall('RelOp'):
-                if inner_rel_op not in rel_op_elem.findall('RelOp'):
-                    child = self._parse_rel_op(inner_rel_op, ns, depth + 1, child_id)
-                    child.parent = op
-                    op.children.append(child)
-                    child_id += len(child.get_all_operators())
+        if stmt.has_query_plan:
+            plan.degree_of_parallelism = int(stmt.degree_of_parallelism or 1)
+        if not stmt.root_indices:
+            return
         
-        return op
+        from app.analysis.plan_operator_store import PlanOperatorStoreBuilder
+        
+        root_nodes = [model.nodes[i] for i in stmt.root_indices]
+        self._total_cost = float(sum(node.subtree_cost for node in root_nodes))
+        plan.total_cost = self._total_cost
+        
+        # Operatörler preorder sırada kompakt store'a yazılır (açık yığın ile);
+        # node_id store index'i ile aynıdır
+        builder = PlanOperatorStoreBuilder()
+        stack: List[Tuple[PlanNode, Optional[int], int]] = []
+        if len(root_nodes) > 1:
+            # StmtCursor / StmtCond: birden fazla QueryPlan kökü sanal bir kök altında
+            root_index = builder.append(
+                None,
+                node_id=0,
+                physical_op=stmt.kind,
+                logical_op=stmt.statement_type or stmt.kind,
+                estimated_cost=self._total_cost,
+                subtree_cost=self._total_cost,
+                cost_percent=100.0 if self._total_cost > 0 else 0.0,
+            )
+            for node in reversed(root_nodes):
+                stack.append((node, root_index, 1))
+        else:
+            stack.append((root_nodes[0], None, root_nodes[0].depth))
+        while stack:
+            node, parent_index, depth = stack.pop()
+            index = self._append_operator(builder, node, parent_index, depth, self._total_cost)
+            for child_index in reversed(node.children):
+                stack.append((model.nodes[child_index], index, depth + 1))
+        plan.root_operator = builder.build().view(0)
+    
+    def _append_operator(
+        self,
+        builder: Any,
+        node: PlanNode,
+        parent_index: Optional[int],
+        depth: int,
+        total_cost: float,
+    ) -> int:
+        """Model düğümünü store'a operatör satırı olarak ekle"""
+        warnings = [
+            PlanWarning(
+                warning_type=warning.tag,
+                message=self._get_warning_message(warning.tag, warning.attributes),
+                severity="warning"
+            )
+            for warning in node.warnings
+        ]
+        runtime = node.runtime
+        if runtime is not None:
+            actual = dict(
+                actual_rows=int(round(runtime.actual_rows)),
+                actual_executions=runtime.actual_executions,
+                actual_elapsed_ms=runtime.actual_elapsed_ms,
+                actual_self_elapsed_ms=runtime.self_elapsed_ms,
+                actual_cpu_ms=runtime.actual_cpu_ms,
+                actual_logical_reads=runtime.actual_logical_reads,
+            )
+        else:
+            actual = {}
+        return builder.append(
+            parent_index,
+            node_id=len(builder),
+            depth=depth,
+            physical_op=node.physical_op,
+            logical_op=node.logical_op,
+            operator_type=self._get_operator_type(node.physical_op),
+            estimated_cost=node.subtree_cost,
+            subtree_cost=node.subtree_cost,
+            cost_percent=(node.subtree_cost / total_cost) * 100 if total_cost > 0 else 0.0,
+            estimated_rows=node.estimate_rows,
+            estimated_executions=node.estimate_executions,
+            estimated_row_size=node.avg_row_size,
+            estimated_io_cost=node.estimate_io,
+            estimated_cpu_cost=node.estimate_cpu,
+            parallel=node.parallel,
+            database_name=node.database_name,
+            schema_name=node.schema_name,
+            object_name=node.object_name,
+            index_name=node.index_name,
+            seek_predicates=node.seek_predicates,
+            predicates=node.predicates,
+            memory_grant_kb=node.memory_grant_kb,
+            warnings=warnings,
+            # Spill kontrolü
+            spill_to_tempdb=any('Spill' in warning.tag for warning in node.warnings),
+            **actual,
+        )
     
     def _get_operator_type(self, physical_op: str) -> OperatorType:
         """Physical op'tan operatör tipini belirle"""
@@ -624,79 +829,7 @@ class PlanParser:
         
         return OperatorType.UNKNOWN
     
-    def _parse_object_info(self, rel_op: ET.Element, op: PlanOperator, ns: dict) -> None:
-        """Nesne bilgisini parse et"""
-        # IndexScan, TableScan vb. içindeki Object elementini bul
-        for child in rel_op:
-            obj = child.find('sp:Object', ns)
-            if obj is None:
-                obj = child.find('Object')
-            
-            if obj is not None:
-                op.database_name = obj.get('Database', '').strip('[]')
-                op.schema_name = obj.get('Schema', '').strip('[]')
-                op.object_name = obj.get('Table', '').strip('[]')
-                op.index_name = obj.get('Index', '').strip('[]')
-                break
-    
-    def _parse_predicates(self, rel_op: ET.Element, op: PlanOperator, ns: dict) -> None:
-        """Predicate bilgilerini parse et"""
-        # SeekPredicates
-        seek_elem = rel_op.find('.//sp:SeekPredicates', ns)
-        if seek_elem is None:
-            seek_elem = rel_op.find('.//SeekPredicates')
-        
-        if seek_elem is not None:
-            op.seek_predicates = self._extract_scalar_string(seek_elem)
-        
-        # Predicate
-        pred_elem = rel_op.find('.//sp:Predicate', ns)
-        if pred_elem is None:
-            pred_elem = rel_op.find('.//Predicate')
-        
-        if pred_elem is not None:
-            op.predicates = self._extract_scalar_string(pred_elem)
-    
-    def _extract_scalar_string(self, elem: ET.Element) -> str:
-        """ScalarOperator'dan string çıkar"""
-        # Basitleştirilmiş - gerçek implementasyon daha karmaşık olabilir
-        text_parts = []
-        for col in elem.iter():
-            if 'Column' in col.tag:
-                col_name = col.get('Column', '')
-                if col_name:
-                    text_parts.append(col_name)
-            if 'Const' in col.tag:
-                val = col.get('ConstValue', '')
-                if val:
-                    text_parts.append(val)
-        
-        return ' '.join(text_parts)[:200]  # İlk 200 karakter
-    
-    def _parse_warnings(self, rel_op: ET.Element, op: PlanOperator, ns: dict) -> None:
-        """Uyarıları parse et"""
-        warnings_elem = rel_op.find('.//sp:Warnings', ns)
-        if warnings_elem is None:
-            warnings_elem = rel_op.find('.//Warnings')
-        
-        if warnings_elem is None:
-            return
-        
-        for child in warnings_elem:
-            tag = child.tag.split('}')[-1] if '}' in child.tag else child.tag
-            
-            warning = PlanWarning(
-                warning_type=tag,
-                message=self._get_warning_message(tag, child),
-                severity="warning"
-            )
-            op.warnings.append(warning)
-            
-            # Spill kontrolü
-            if 'Spill' in tag:
-                op.spill_to_tempdb = True
-    
-    def _get_warning_message(self, warning_type: str, elem: ET.Element) -> str:
+    def _get_warning_message(self, warning_type: str, attributes: Dict[str, str]) -> str:
         """Uyarı mesajı oluştur"""
         messages = {
             "NoJoinPredicate": "Join predicate is missing - may result in a Cartesian product",
@@ -708,63 +841,6 @@ class PlanParser:
         
         return messages.get(warning_type, f"Warning: {warning_type}")
     
-    def _parse_missing_indexes(self, stmt: ET.Element, ns: dict) -> List[MissingIndex]:
-        """Missing index önerilerini parse et"""
-        missing = []
-        
-        for mi_group in stmt.findall('.//sp:MissingIndexGroup', ns):
-            impact = float(mi_group.get('Impact', 0))
-            
-            for mi in mi_group.findall('.//sp:MissingIndex', ns):
-                index = MissingIndex(
-                    database=mi.get('Database', '').strip('[]'),
-                    schema_name=mi.get('Schema', '').strip('[]'),
-                    table_name=mi.get('Table', '').strip('[]'),
-                    impact=impact
-                )
-                
-                # Equality columns
-                for col_group in mi.findall('sp:ColumnGroup', ns):
-                    usage = col_group.get('Usage', '')
-                    for col in col_group.findall('sp:Column', ns):
-                        col_name = col.get('Name', '').strip('[]')
-                        if usage == 'EQUALITY':
-                            index.equality_columns.append(col_name)
-                        elif usage == 'INEQUALITY':
-                            index.inequality_columns.append(col_name)
-                        elif usage == 'INCLUDE':
-                            index.include_columns.append(col_name)
-                
-                missing.append(index)
-        
-        # Namespace'siz de dene
-        if not missing:
-            for mi_group in stmt.findall('.//MissingIndexGroup'):
-                impact = float(mi_group.get('Impact', 0))
-                
-                for mi in mi_group.findall('.//MissingIndex'):
-                    index = MissingIndex(
-                        database=mi.get('Database', '').strip('[]'),
-                        schema_name=mi.get('Schema', '').strip('[]'),
-                        table_name=mi.get('Table', '').strip('[]'),
-                        impact=impact
-                    )
-                    
-                    for col_group in mi.findall('ColumnGroup'):
-                        usage = col_group.get('Usage', '')
-                        for col in col_group.findall('Column'):
-                            col_name = col.get('Name', '').strip('[]')
-                            if usage == 'EQUALITY':
-                                index.equality_columns.append(col_name)
-                            elif usage == 'INEQUALITY':
-                                index.inequality_columns.append(col_name)
-                            elif usage == 'INCLUDE':
-                                index.include_columns.append(col_name)
-                    
-                    missing.append(index)
-        
-        return missing
-    
     def _collect_plan_warnings(self, plan: ExecutionPlan) -> List[PlanWarning]:
         """Plan seviyesi uyarıları topla"""
         warnings = []
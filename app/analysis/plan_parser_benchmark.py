@@ -0,0 +1,182 @@
+"""
+PlanParser Benchmark
+
+Sentetik showplan XML'leri üretip PlanParser.parse süresini operatör
+sayısına göre ölçer. Tek geçişli parser'da operatör başına süre
+(us/op) plan büyüdükçe yaklaşık sabit kalmalıdır.
+
+Kullanım:
+    python -m app.analysis.plan_parser_benchmark
+    python -m app.analysis.plan_parser_benchmark --sizes 500 1000 5000 --shape chain
+    python -m app.analysis.plan_parser_benchmark --memory
+"""
+
+import argparse
+import time
+import tracemalloc
+from typing import List, Dict, Any, Sequence
+from xml.sax.saxutils import quoteattr
+
+from app.analysis.plan_parser import PlanParser
+
+SHOWPLAN_XMLNS = "http://schemas.microsoft.com/sqlserver/2004/07/showplan"
+DEFAULT_SIZES = (250, 500, 1000, 2000, 4000, 8000)
+
+
+def _rel_op_open(node_id: int, physical_op: str, logical_op: str, cost: float) -> str:
+    return (
+        f'<RelOp NodeId="{node_id}" PhysicalOp={quoteattr(physical_op)} LogicalOp={quoteattr(logical_op)} '
+        f'EstimateRows="100" EstimateIO="0.003125" EstimateCPU="0.0001581" AvgRowSize="27" '
+        f'EstimatedTotalSubtreeCost="{cost:.6f}" Parallel="0">'
+        '<OutputList><ColumnReference Database="[db]" Schema="[dbo]" Table="[t]" Column="c1"/></OutputList>'
+    )
+
+
+def _scan_leaf(node_id: int, cost: float) -> str:
+    return (
+        _rel_op_open(node_id, "Index Seek", "Index Seek", cost)
+        + '<IndexScan Ordered="1">'
+        f'<Object Database="[db]" Schema="[dbo]" Table="[t{node_id}]" Index="[ix_{node_id}]"/>'
+        '<SeekPredicates><SeekPredicateNew><SeekKeys><Prefix ScanType="EQ"><RangeColumns>'
+        f'<ColumnReference Column="id{node_id}"/></RangeColumns><RangeExpressions><ScalarOperator>'
+        f'<Const ConstValue="({node_id})"/></ScalarOperator></RangeExpressions></Prefix></SeekKeys>'
+        '</SeekPredicateNew></SeekPredicates></IndexScan></RelOp>'
+    )
+
+
+def build_synthetic_plan(n_operators: int, shape: str = "bushy") -> str:
+    """
+    n_operators adet RelOp içeren showplan XML üret
+
+    Args:
+        n_operators: Toplam operatör sayısı (>= 1)
+        shape: "bushy" (dengeli Nested Loops ağacı) veya "chain" (derin Compute Scalar zinciri)
+    """
+    n = max(1, int(n_operators))
+    parts: List[str] = []
+
+    if shape == "chain":
+        # n-1 Compute Scalar + 1 yaprak: derinlik = n (recursion limitini zorlar)
+        for node_id in range(n - 1):
+            parts.append(_rel_op_open(node_id, "Compute Scalar", "Compute Scalar", float(n - node_id)))
+            parts.append("<ComputeScalar>")
+        parts.append(_scan_leaf(n - 1, 1.0))
+        parts.append("</ComputeScalar></RelOp>" * (n - 1))
+    else:
+        # Preorder numaralı dengeli ikili ağaç; açık/kapalı etiketler yığınla üretilir
+        counter = [0]
+
+        def emit(size: int) -> None:
+            stack: List[Any] = [("open", size)]
+            while stack:
+                kind, value = stack.pop()
+                if kind == "close":
+                    parts.append(value)
+                    continue
+                node_id = counter[0]
+                counter[0] += 1
+                if value == 1:
+                    parts.append(_scan_leaf(node_id, 1.0))
+                    continue
+                remaining = value - 1
+                left = (remaining + 1) // 2
+                right = remaining - left
+                parts.append(_rel_op_open(node_id, "Nested Loops", "Inner Join", float(value)))
+                parts.append('<NestedLoops Optimized="0">')
+                stack.append(("close", "</NestedLoops></RelOp>"))
+                if right:
+                    stack.append(("open", right))
+                stack.append(("open", left))
+
+        emit(n)
+
+    body = "".join(parts)
+    return (
+        f'<ShowPlanXML xmlns="{SHOWPLAN_XMLNS}" Version="1.564" Build="16.0.1000.6">'
+        '<BatchSequence><Batch><Statements>'
+        '<StmtSimple StatementText="SELECT ..." StatementId="1" StatementCompId="1" '
+        f'StatementType="SELECT" StatementSubTreeCost="{float(n):.6f}" StatementCompCpu="12" StatementCompMem="512">'
+        '<QueryPlan DegreeOfParallelism="1">'
+        f"{body}"
+        "</QueryPlan></StmtSimple></Statements></Batch></BatchSequence></ShowPlanXML>"
+    )
+
+
+def _traced_kb(factory) -> float:
+    """factory() sonucunun tuttuğu bellek (tracemalloc, KB)"""
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        result = factory()
+        used = tracemalloc.get_traced_memory()[0] - baseline
+    finally:
+        tracemalloc.stop()
+    del result
+    return round(used / 1024.0, 1)
+
+
+def run_benchmark(
+    sizes: Sequence[int] = DEFAULT_SIZES,
+    shape: str = "bushy",
+    repeat: int = 3,
+    measure_memory: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Her boyut için en iyi parse süresini ölç (cache her turda temizlenir)
+
+    measure_memory=True ise kompakt operatör store'u ile aynı ağacın
+    PlanOperator nesneleri olarak tuttuğu bellek de karşılaştırılır.
+
+    Returns:
+        [{"operators", "xml_kb", "best_ms", "us_per_op"[, "store_kb", "objects_kb"]}, ...]
+    """
+    parser = PlanParser()
+    results: List[Dict[str, Any]] = []
+    for size in sizes:
+        xml_text = build_synthetic_plan(size, shape=shape)
+        best = float("inf")
+        operator_count = 0
+        for _ in range(max(1, int(repeat))):
+            PlanParser.clear_cache()
+            started = time.perf_counter()
+            plan = parser.parse(xml_text)
+            best = min(best, time.perf_counter() - started)
+            operator_count = plan.operator_count if plan else 0
+        row = {
+            "operators": int(operator_count),
+            "xml_kb": round(len(xml_text) / 1024.0, 1),
+            "best_ms": round(best * 1000.0, 2),
+            "us_per_op": round(best * 1_000_000.0 / max(1, operator_count), 2),
+        }
+        store = getattr(plan.root_operator, "store", None) if measure_memory and plan else None
+        if store is not None:
+            row["store_kb"] = round(store.nbytes() / 1024.0, 1)
+            row["objects_kb"] = _traced_kb(store.materialize)
+        results.append(row)
+    PlanParser.clear_cache()
+    return results
+
+
+def main(argv: Sequence[str] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="PlanParser parse time vs. operator count")
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    arg_parser.add_argument("--shape", choices=("bushy", "chain"), default="bushy")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--memory", action="store_true", help="compare store vs. PlanOperator object memory")
+    args = arg_parser.parse_args(argv)
+
+    rows = run_benchmark(args.sizes, shape=args.shape, repeat=args.repeat, measure_memory=args.memory)
+    header = f"{'operators':>10} {'xml_kb':>10} {'best_ms':>10} {'us/op':>8}"
+    if args.memory:
+        header += f" {'store_kb':>10} {'objects_kb':>11}"
+    print(header)
+    for row in rows:
+        line = f"{row['operators']:>10} {row['xml_kb']:>10} {row['best_ms']:>10} {row['us_per_op']:>8}"
+        if args.memory:
+            line += f" {row.get('store_kb', 0):>10} {row.get('objects_kb', 0):>11}"
+        print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
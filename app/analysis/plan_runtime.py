@@ -0,0 +1,187 @@
+"""
+Actual Plan Runtime Analysis
+
+Actual execution plan'lardaki (RunTimeCountersPerThread) operatör
+istatistiklerinden iki sıralama üretir:
+- Zamanın gerçekten harcandığı operatörler (self elapsed, yoksa CPU)
+- Kardinalite tahmin hataları (tüm execution'lar için tahmini vs gerçek satır)
+
+Girdi: PlanModel (plan_model.get_plan_model)
+Çıktı: PlanRuntimeProfile
+"""
+
+from dataclasses import dataclass, field
+from typing import Optional, List, Dict, Any
+
+from app.analysis.plan_model import PlanModel, PlanNode
+
+# Bu kat ve üzeri fark kötü tahmin sayılır
+DEFAULT_MISESTIMATE_FACTOR = 10.0
+
+
+def cardinality_misestimate(
+    estimated_rows: float,
+    actual_rows: float,
+    estimated_executions: float = 1.0,
+) -> float:
+    """
+    Tüm execution'lar için tahmini ve gerçek satır arasındaki kat farkı (>= 1.0)
+
+    EstimateRows tek execution içindir; actual satırlar tüm execution'ların ve
+    thread'lerin toplamıdır. SSMS'teki gibi tahmin, tahmini execution sayısı
+    (1 + rebinds + rewinds) ile çarpılarak karşılaştırılır. 1'in altındaki
+    değerler 1 kabul edilir.
+    """
+    estimated = max(1.0, float(estimated_rows or 0.0) * max(1.0, float(estimated_executions or 1.0)))
+    actual = max(1.0, float(actual_rows or 0.0))
+    return max(estimated, actual) / min(estimated, actual)
+
+
+@dataclass
+class OperatorRuntimeStat:
+    """Tek operatörün actual plan özeti"""
+    node_index: int
+    node_id: Optional[int]
+    statement_index: int
+    physical_op: str
+    logical_op: str = ""
+    object_name: str = ""
+    index_name: str = ""
+    thread_count: int = 0
+    execution_mode: str = "Row"
+    estimated_rows: float = 0.0            # Tüm execution'lar için (EstimateRows x tahmini execution)
+    actual_rows: float = 0.0               # Tüm execution ve thread'lerin toplamı
+    actual_executions: int = 0
+    actual_elapsed_ms: float = 0.0         # Row mode: alt ağaç dahil
+    self_elapsed_ms: float = 0.0
+    actual_cpu_ms: float = 0.0
+    actual_logical_reads: int = 0
+    actual_physical_reads: int = 0
+    misestimate_factor: float = 1.0
+    elapsed_percent: float = 0.0           # Statement self elapsed toplamı içindeki pay
+
+    @property
+    def is_underestimate(self) -> bool:
+        return self.actual_rows > self.estimated_rows
+
+    @property
+    def display_name(self) -> str:
+        name = self.physical_op or self.logical_op or "Unknown"
+        if self.object_name:
+            name += f" [{self.object_name}]"
+        if self.node_id is not None:
+            name += f" (#{self.node_id})"
+        return name
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "operator": self.display_name,
+            "self_elapsed_ms": round(self.self_elapsed_ms, 1),
+            "elapsed_percent": round(self.elapsed_percent, 1),
+            "cpu_ms": round(self.actual_cpu_ms, 1),
+            "logical_reads": int(self.actual_logical_reads),
+            "executions": int(self.actual_executions),
+            "estimated_rows": round(self.estimated_rows, 1),
+            "actual_rows": round(self.actual_rows, 1),
+            "misestimate_factor": round(self.misestimate_factor, 1),
+            "direction": "under" if self.is_underestimate else "over",
+        }
+
+
+@dataclass
+class PlanRuntimeProfile:
+    """Actual plan operatör sıralamaları"""
+    has_runtime_stats: bool = False
+    has_timing: bool = False
+    statement_elapsed_ms: Optional[float] = None   # QueryTimeStats/ElapsedTime
+    statement_cpu_ms: Optional[float] = None
+    operators: List[OperatorRuntimeStat] = field(default_factory=list)
+    by_elapsed: List[OperatorRuntimeStat] = field(default_factory=list)
+    by_misestimate: List[OperatorRuntimeStat] = field(default_factory=list)
+
+
+def _operator_stat(node: PlanNode) -> OperatorRuntimeStat:
+    runtime = node.runtime
+    return OperatorRuntimeStat(
+        node_index=node.index,
+        node_id=node.node_id,
+        statement_index=node.statement_index,
+        physical_op=node.physical_op,
+        logical_op=node.logical_op,
+        object_name=node.object_name,
+        index_name=node.index_name,
+        thread_count=runtime.thread_count,
+        execution_mode=runtime.execution_mode,
+        estimated_rows=node.estimate_rows * max(1.0, node.estimate_executions),
+        actual_rows=runtime.actual_rows,
+        actual_executions=runtime.actual_executions,
+        actual_elapsed_ms=runtime.actual_elapsed_ms,
+        self_elapsed_ms=runtime.self_elapsed_ms,
+        actual_cpu_ms=runtime.actual_cpu_ms,
+        actual_logical_reads=runtime.actual_logical_reads,
+        actual_physical_reads=runtime.actual_physical_reads,
+        misestimate_factor=cardinality_misestimate(
+            node.estimate_rows, runtime.actual_rows, node.estimate_executions
+        ),
+    )
+
+
+def build_runtime_profile(
+    model: PlanModel,
+    statement_index: Optional[int] = None,
+    top_n: int = 10,
+    min_misestimate_factor: float = DEFAULT_MISESTIMATE_FACTOR,
+) -> PlanRuntimeProfile:
+    """
+    Actual plan operatörlerini elapsed ve tahmin hatasına göre sırala
+
+    Args:
+        model: Plan modeli
+        statement_index: Yalnızca bu statement (None: tüm plan)
+        top_n: Her sıralamada tutulacak operatör sayısı
+        min_misestimate_factor: by_misestimate listesine girmek için gereken kat farkı
+
+    Returns:
+        PlanRuntimeProfile (estimated plan için has_runtime_stats=False, listeler boş)
+    """
+    profile = PlanRuntimeProfile(has_runtime_stats=bool(model.has_runtime_stats))
+    if not model.has_runtime_stats:
+        return profile
+
+    if statement_index is not None:
+        stmt = model.statements[int(statement_index)]
+        nodes = [model.nodes[i] for i in stmt.node_indices]
+        statements = [stmt]
+    else:
+        nodes = model.nodes
+        statements = model.statements
+
+    elapsed = [s.actual_elapsed_ms for s in statements if s.actual_elapsed_ms is not None]
+    cpu = [s.actual_cpu_ms for s in statements if s.actual_cpu_ms is not None]
+    profile.statement_elapsed_ms = float(sum(elapsed)) if elapsed else None
+    profile.statement_cpu_ms = float(sum(cpu)) if cpu else None
+
+    profile.operators = [_operator_stat(node) for node in nodes if node.runtime is not None]
+    profile.has_timing = any(node.runtime.has_timing for node in nodes if node.runtime is not None)
+
+    total_self = sum(op.self_elapsed_ms for op in profile.operators)
+    if total_self > 0:
+        for op in profile.operators:
+            op.elapsed_percent = op.self_elapsed_ms / total_self * 100.0
+
+    limit = max(0, int(top_n))
+    if profile.has_timing:
+        elapsed_key = lambda op: (-op.self_elapsed_ms, -op.actual_cpu_ms, op.node_index)
+    else:
+        # ActualElapsedms yoksa (eski sürümler) CPU ve logical reads ile sırala
+        elapsed_key = lambda op: (-op.actual_cpu_ms, -op.actual_logical_reads, op.node_index)
+    profile.by_elapsed = sorted(profile.operators, key=elapsed_key)[:limit]
+
+    threshold = max(1.0, float(min_misestimate_factor))
+    misestimates = [op for op in profile.operators if op.misestimate_factor >= threshold]
+    # Aynı kat farkında daha çok zaman harcayan operatör önce
+    profile.by_misestimate = sorted(
+        misestimates,
+        key=lambda op: (-op.misestimate_factor, -op.self_elapsed_ms, op.node_index),
+    )[:limit]
+    return profile
@@ -0,0 +1,197 @@
+"""
+Workload Regression Detector
+
+Query Store'dan iki zaman penceresi (baseline / recent) için çekilen
+sorgu bazlı agregasyonları karşılaştırır; execution başına duration, CPU
+ve logical reads için anlamlı artışları ve baskın plan değişimlerini bulur.
+
+Girdi: QueryStoreQueries.QUERY_WINDOW_AGGREGATES satırları (her pencere için ayrı)
+Çıktı: QueryRegression listesi (impact'e göre sıralı)
+
+Anlamlılık: Welch z-istatistiği
+    z = (mean_recent - mean_base) / sqrt(sd_base² / n_base + sd_recent² / n_recent)
+ve minimum yüzde değişim eşiği birlikte aranır; böylece çok sık çalışan
+sorgulardaki küçük ama "istatistiksel olarak anlamlı" oynamalar elenir.
+"""
+
+import math
+from typing import Optional, List, Dict, Any
+
+from app.core.logger import get_logger
+from app.models.query_stats_models import QueryRegression, WindowMetricDelta
+
+logger = get_logger('analysis.regression_detector')
+
+
+class WorkloadRegressionDetector:
+    """
+    İki pencere arasında workload geneli regresyon tespiti
+
+    Kullanım:
+        detector = WorkloadRegressionDetector(min_executions=10)
+        regressions = detector.compare(baseline_rows, recent_rows)
+    """
+
+    # metric adı -> (ortalama kolonu, stdev kolonu)
+    METRIC_COLUMNS = {
+        "duration": ("avg_duration_ms", "stdev_duration_ms"),
+        "cpu": ("avg_cpu_ms", "stdev_cpu_ms"),
+        "logical_reads": ("avg_logical_reads", "stdev_logical_reads"),
+    }
+
+    def __init__(
+        self,
+        min_executions: int = 10,
+        min_change_percent: float = 25.0,
+        z_threshold: float = 3.0,
+        min_baseline_duration_ms: float = 1.0,
+    ):
+        """
+        Args:
+            min_executions: Her iki pencerede gereken minimum execution sayısı
+            min_change_percent: Regresyon sayılacak minimum artış (%)
+            z_threshold: Welch z-istatistiği eşiği
+            min_baseline_duration_ms: Bundan hızlı sorgularda duration yüzdesi gürültü kabul edilir
+        """
+        self.min_executions = max(1, int(min_executions))
+        self.min_change_percent = float(min_change_percent)
+        self.z_threshold = float(z_threshold)
+        self.min_baseline_duration_ms = max(0.0, float(min_baseline_duration_ms))
+
+    @staticmethod
+    def _to_float(value: Any) -> float:
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return 0.0
+        if math.isnan(number) or math.isinf(number):
+            return 0.0
+        return number
+
+    @staticmethod
+    def _to_int(value: Any) -> int:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return 0
+
+    @staticmethod
+    def _index_rows(rows: Optional[List[Dict[str, Any]]]) -> Dict[int, Dict[str, Any]]:
+        indexed: Dict[int, Dict[str, Any]] = {}
+        for row in rows or []:
+            try:
+                indexed[int(row.get("query_id"))] = row
+            except (TypeError, ValueError):
+                continue
+        return indexed
+
+    def _metric_delta(
+        self,
+        metric: str,
+        baseline: Dict[str, Any],
+        recent: Dict[str, Any],
+        n_base: int,
+        n_recent: int,
+    ) -> WindowMetricDelta:
+        avg_col, sd_col = self.METRIC_COLUMNS[metric]
+        base_avg = self._to_float(baseline.get(avg_col))
+        recent_avg = self._to_float(recent.get(avg_col))
+        base_sd = self._to_float(baseline.get(sd_col))
+        recent_sd = self._to_float(recent.get(sd_col))
+
+        change_pct = ((recent_avg - base_avg) / base_avg * 100.0) if base_avg > 0 else 0.0
+        std_err = math.sqrt(
+            (base_sd * base_sd) / max(1, n_base) + (recent_sd * recent_sd) / max(1, n_recent)
+        )
+        if std_err > 0:
+            z_score = (recent_avg - base_avg) / std_err
+        else:
+            # Varyans bilgisi yok (tek interval / sabit değer): fark varsa anlamlı kabul et
+            z_score = math.copysign(float("inf"), recent_avg - base_avg) if recent_avg != base_avg else 0.0
+
+        is_significant = (
+            base_avg > 0
+            and abs(change_pct) >= self.min_change_percent
+            and abs(z_score) >= self.z_threshold
+        )
+        if metric == "duration" and base_avg < self.min_baseline_duration_ms:
+            is_significant = False
+
+        return WindowMetricDelta(
+            metric=metric,
+            baseline_avg=base_avg,
+            recent_avg=recent_avg,
+            baseline_stdev=base_sd,
+            recent_stdev=recent_sd,
+            change_percent=change_pct,
+            z_score=z_score if math.isfinite(z_score) else math.copysign(1e9, z_score),
+            is_significant=is_significant,
+        )
+
+    def compare(
+        self,
+        baseline_rows: Optional[List[Dict[str, Any]]],
+        recent_rows: Optional[List[Dict[str, Any]]],
+        include_plan_changes: bool = True,
+    ) -> List[QueryRegression]:
+        """
+        Baseline ve recent pencere satırlarını karşılaştır
+
+        Returns:
+            Regresyon veya (include_plan_changes ise) plan değişimi olan sorgular;
+            önce regresyonlar, kendi içinde impact_ms'e göre azalan sırada.
+        """
+        baseline_by_id = self._index_rows(baseline_rows)
+        recent_by_id = self._index_rows(recent_rows)
+
+        results: List[QueryRegression] = []
+        for query_id, recent in recent_by_id.items():
+            baseline = baseline_by_id.get(query_id)
+            if baseline is None:
+                continue
+            n_base = self._to_int(baseline.get("total_executions"))
+            n_recent = self._to_int(recent.get("total_executions"))
+            if n_base < self.min_executions or n_recent < self.min_executions:
+                continue
+
+            deltas = {
+                metric: self._metric_delta(metric, baseline, recent, n_base, n_recent)
+                for metric in self.METRIC_COLUMNS
+            }
+            is_regression = any(d.is_significant and d.change_percent > 0 for d in deltas.values())
+
+            item = QueryRegression(
+                query_id=int(query_id),
+                query_hash=str(recent.get("query_hash") or baseline.get("query_hash") or ""),
+                query_text=str(recent.get("query_text") or baseline.get("query_text") or ""),
+                object_name=recent.get("object_name") or baseline.get("object_name"),
+                schema_name=recent.get("schema_name") or baseline.get("schema_name"),
+                baseline_executions=n_base,
+                recent_executions=n_recent,
+                duration=deltas["duration"],
+                cpu=deltas["cpu"],
+                logical_reads=deltas["logical_reads"],
+                baseline_plan_id=baseline.get("dominant_plan_id"),
+                recent_plan_id=recent.get("dominant_plan_id"),
+                baseline_plan_count=self._to_int(baseline.get("plan_count")),
+                recent_plan_count=self._to_int(recent.get("plan_count")),
+                impact_ms=deltas["duration"].delta * n_recent,
+                is_regression=is_regression,
+            )
+            if is_regression or (include_plan_changes and item.plan_changed):
+                results.append(item)
+
+        return self.rank(results)
+
+    @staticmethod
+    def rank(regressions: List[QueryRegression]) -> List[QueryRegression]:
+        """Regresyonlar önce; ardından toplam ek süre (impact_ms) ve plan değişimine göre"""
+        return sorted(
+            regressions or [],
+            key=lambda r: (
+                not r.is_regression,
+                -max(0.0, float(r.impact_ms)),
+                not r.plan_changed,
+                int(r.query_id),
+            ),
+        )
@@ -0,0 +1,280 @@
+"""
+SQL Fingerprint / Normalization Engine
+
+Literal farkları dışında aynı olan ad-hoc sorguları tek bir gruba toplamak için
+T-SQL metnini token bazlı normalize eder ve kararlı bir hash üretir.
+
+Normalizasyon kuralları:
+- Yorumlar (-- ve /* */) atılır, whitespace tek boşluğa indirgenir
+- String, sayı, hex/binary ve money literal'leri -> ?
+- IN (?, ?, ...) listeleri -> IN (?+)
+- VALUES (...), (...) çok satırlı listeleri -> VALUES (...) tek grup
+- Keyword ve identifier'lar küçük harfe, [bracket] / "quoted" identifier'lar sade hale getirilir
+"""
+
+import hashlib
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Lock
+from typing import Optional, List, Dict, Any, Tuple, Hashable
+
+from app.core.logger import get_logger
+
+logger = get_logger('analysis.sql_fingerprint')
+
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<ws>\s+)
+    | (?P<line_comment>--[^\r\n]*)
+    | (?P<block_comment>/\*.*?(?:\*/|\Z))
+    | (?P<string>N?'(?:[^']|'')*(?:'|\Z))
+    | (?P<bracket>\[(?:[^\]]|\]\])*(?:\]|\Z))
+    | (?P<quoted>"(?:[^"]|"")*(?:"|\Z))
+    | (?P<hex>0[xX][0-9a-fA-F]*)
+    | (?P<money>\$-?(?:\d+(?:\.\d*)?|\.\d+))
+    | (?P<number>(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?)
+    | (?P<variable>@@?[\w$#@]+)
+    | (?P<word>[^\W\d][\w$#@]*|\#+[\w$#@]*)
+    | (?P<op><>|!=|>=|<=|!<|!>|\+=|-=|\*=|/=|%=|&=|\|=|\^=|::|.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+_LITERAL_KINDS = frozenset({"string", "hex", "money", "number"})
+# Önünde bu token'lar varsa '-' / '+' unary kabul edilir ve literal'e katılır
+_UNARY_CONTEXT = frozenset({
+    "(", ",", "=", "<", ">", "<>", "!=", ">=", "<=", "+", "-", "*", "/", "%",
+    "and", "or", "not", "select", "where", "when", "then", "else", "in", "between",
+    "return", "values", "top", "set", "by", "like", "is",
+})
+PLACEHOLDER = "?"
+LIST_PLACEHOLDER = "?+"
+
+
+@dataclass
+class SqlFingerprint:
+    """Normalize edilmiş SQL ve hash'i"""
+    fingerprint: str
+    normalized_sql: str
+    token_count: int = 0
+    literal_count: int = 0
+
+
+class SqlFingerprinter:
+    """
+    Token bazlı SQL fingerprint motoru
+
+    Kullanım:
+        fp = SqlFingerprinter()
+        result = fp.fingerprint("SELECT * FROM t WHERE id = 42")
+        result.normalized_sql   # "select * from t where id = ?"
+        result.fingerprint      # 16 karakterlik kararlı hash
+
+    sql_handle verildiğinde sonuç süreç genelindeki LRU cache'te tutulur;
+    aynı handle için metin yeniden tokenize edilmez.
+    """
+
+    _CACHE_MAX = 20000
+    _CACHE: "OrderedDict[Hashable, SqlFingerprint]" = OrderedDict()
+    _CACHE_LOCK = Lock()
+    _CACHE_HITS = 0
+    _CACHE_MISSES = 0
+
+    FINGERPRINT_LENGTH = 16
+
+    # ------------------------------------------------------------------
+    # Cache
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def clear_cache(cls) -> None:
+        with cls._CACHE_LOCK:
+            cls._CACHE.clear()
+            cls._CACHE_HITS = 0
+            cls._CACHE_MISSES = 0
+
+    @classmethod
+    def cache_info(cls) -> Dict[str, int]:
+        with cls._CACHE_LOCK:
+            return {
+                "size": len(cls._CACHE),
+                "max_size": int(cls._CACHE_MAX),
+                "hits": int(cls._CACHE_HITS),
+                "misses": int(cls._CACHE_MISSES),
+            }
+
+    @staticmethod
+    def make_handle_key(
+        sql_handle: Any,
+        statement_start_offset: Optional[int] = None,
+        statement_end_offset: Optional[int] = None,
+    ) -> Optional[Tuple[str, int, int]]:
+        """sql_handle (+ statement offset) için hashable cache key üret"""
+        if sql_handle is None:
+            return None
+        if isinstance(sql_handle, (bytes, bytearray, memoryview)):
+            handle_text = bytes(sql_handle).hex()
+        else:
+            handle_text = str(sql_handle).strip().lower()
+            if handle_text.startswith("0x"):
+                handle_text = handle_text[2:]
+        if not handle_text:
+            return None
+        return (
+            handle_text,
+            int(statement_start_offset or 0),
+            int(statement_end_offset if statement_end_offset is not None else -1),
+        )
+
+    @classmethod
+    def _cache_get(cls, key: Hashable) -> Optional[SqlFingerprint]:
+        with cls._CACHE_LOCK:
+            item = cls._CACHE.get(key)
+            if item is None:
+                cls._CACHE_MISSES += 1
+                return None
+            cls._CACHE.move_to_end(key)
+            cls._CACHE_HITS += 1
+            return item
+
+    @classmethod
+    def _cache_set(cls, key: Hashable, value: SqlFingerprint) -> None:
+        with cls._CACHE_LOCK:
+            cls._CACHE[key] = value
+            cls._CACHE.move_to_end(key)
+            while len(cls._CACHE) > int(cls._CACHE_MAX):
+                cls._CACHE.popitem(last=False)
+
+    # ------------------------------------------------------------------
+    # Normalization
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def tokenize(sql_text: str) -> Tuple[List[str], int]:
+        """
+        SQL metnini normalize edilmiş token listesine çevir
+
+        Returns:
+            (tokens, literal_count)
+        """
+        tokens: List[str] = []
+        literal_count = 0
+        for match in _TOKEN_RE.finditer(str(sql_text or "")):
+            kind = match.lastgroup
+            if kind in ("ws", "line_comment", "block_comment"):
+                continue
+            value = match.group()
+            if kind in _LITERAL_KINDS:
+                literal_count += 1
+                # Unary +/- işaretini literal'e kat: "= -5" ile "= 5" aynı parmak izi
+                if (
+                    tokens
+                    and tokens[-1] in ("-", "+")
+                    and (len(tokens) == 1 or tokens[-2] in _UNARY_CONTEXT)
+                ):
+                    tokens.pop()
+                tokens.append(PLACEHOLDER)
+                continue
+            if kind == "bracket":
+                tokens.append(value[1:-1].replace("]]", "]").lower() if value.endswith("]") else value[1:].lower())
+                continue
+            if kind == "quoted":
+                tokens.append(value[1:-1].replace('""', '"').lower() if value.endswith('"') else value[1:].lower())
+                continue
+            tokens.append(value.lower())
+        return tokens, literal_count
+
+    @staticmethod
+    def _collapse_lists(tokens: List[str]) -> List[str]:
+        """IN (?, ?, ...) ve VALUES (...), (...) listelerini tek temsilciye indir"""
+        out: List[str] = []
+        i = 0
+        n = len(tokens)
+        while i < n:
+            tok = tokens[i]
+            if tok == "in" and i + 1 < n and tokens[i + 1] == "(":
+                j = i + 2
+                only_literals = True
+                while j < n and tokens[j] != ")":
+                    if tokens[j] not in (PLACEHOLDER, ","):
+                        only_literals = False
+                        break
+                    j += 1
+                if only_literals and j < n and j > i + 2:
+                    out.extend(["in", "(", LIST_PLACEHOLDER, ")"])
+                    i = j + 1
+                    continue
+            if tok == "values" and i + 1 < n and tokens[i + 1] == "(":
+                out.append("values")
+                i += 1
+                first_group: Optional[List[str]] = None
+                while i < n and tokens[i] == "(":
+                    depth = 0
+                    j = i
+                    while j < n:
+                        if tokens[j] == "(":
+                            depth += 1
+                        elif tokens[j] == ")":
+                            depth -= 1
+                            if depth == 0:
+                                break
+                        j += 1
+                    group = tokens[i:j + 1]
+                    if first_group is None:
+                        first_group = group
+                        out.extend(group)
+                    i = j + 1
+                    if i < n and tokens[i] == "," and i + 1 < n and tokens[i + 1] == "(":
+                        i += 1
+                        continue
+                    break
+                continue
+            out.append(tok)
+            i += 1
+        return out
+
+    @classmethod
+    def normalize(cls, sql_text: str) -> str:
+        """SQL metnini fingerprint için normalize et"""
+        tokens, _ = cls.tokenize(sql_text)
+        return " ".join(cls._collapse_lists(tokens))
+
+    @classmethod
+    def _compute(cls, sql_text: str) -> SqlFingerprint:
+        tokens, literal_count = cls.tokenize(sql_text)
+        collapsed = cls._collapse_lists(tokens)
+        normalized = " ".join(collapsed)
+        digest = hashlib.sha1(normalized.encode("utf-8", errors="ignore")).hexdigest()
+        return SqlFingerprint(
+            fingerprint=digest[: cls.FINGERPRINT_LENGTH],
+            normalized_sql=normalized,
+            token_count=len(collapsed),
+            literal_count=literal_count,
+        )
+
+    def fingerprint(
+        self,
+        sql_text: Optional[str],
+        sql_handle: Any = None,
+        statement_start_offset: Optional[int] = None,
+        statement_end_offset: Optional[int] = None,
+    ) -> SqlFingerprint:
+        """
+        SQL metninin fingerprint'ini döndür
+
+        Args:
+            sql_text: Statement metni
+            sql_handle: Varsa sys.dm_exec_query_stats.sql_handle (cache key)
+            statement_start_offset / statement_end_offset: Batch içindeki statement konumu
+        """
+        key = self.make_handle_key(sql_handle, statement_start_offset, statement_end_offset)
+        if key is not None:
+            cached = self._cache_get(key)
+            if cached is not None:
+                return cached
+        result = self._compute(str(sql_text or ""))
+        if key is not None:
+            self._cache_set(key, result)
+        return result
@@ -0,0 +1,280 @@
+"""
+Vectorized Query Trend Engine
+
+Top-N sonuç kümesindeki tüm sorgular için günlük trend matrisinden
+eğim, yüzde değişim, volatilite ve change-point tespitini tek seferde
+(NumPy ile) hesaplar.
+
+Girdi: query_id -> TrendData listesi (QueryStoreQueries.QUERY_DAILY_TREND_BATCH)
+Çıktı: query_id -> TrendSignal
+"""
+
+from typing import Optional, List, Dict, Any, Tuple
+from dataclasses import dataclass
+from datetime import date, datetime
+
+import numpy as np
+
+from app.core.logger import get_logger
+from app.models.query_stats_models import TrendData
+
+logger = get_logger('analysis.trend_engine')
+
+
+@dataclass
+class TrendSignal:
+    """Tek sorgu için trend özeti"""
+    query_id: int
+    metric: str = "avg_duration_ms"
+    points: int = 0
+    slope_per_day: float = 0.0          # Metrik birimi / gün
+    percent_change: float = 0.0         # Fit edilen doğrunun başı -> sonu
+    volatility: float = 0.0             # Coefficient of variation (std / mean)
+    change_point_date: Optional[date] = None
+    change_point_shift_percent: float = 0.0
+    regression_score: float = 0.0
+    is_regressing: bool = False
+
+    @property
+    def trend_coefficient(self) -> float:
+        """QueryMetrics.trend_coefficient ile uyumlu oran (>1 kötüleşme)"""
+        return max(0.0, 1.0 + (self.percent_change / 100.0))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "query_id": int(self.query_id),
+            "metric": self.metric,
+            "points": int(self.points),
+            "slope_per_day": round(float(self.slope_per_day), 4),
+            "percent_change": round(float(self.percent_change), 2),
+            "volatility": round(float(self.volatility), 4),
+            "change_point_date": self.change_point_date.isoformat() if self.change_point_date else None,
+            "change_point_shift_percent": round(float(self.change_point_shift_percent), 2),
+            "regression_score": round(float(self.regression_score), 4),
+            "is_regressing": bool(self.is_regressing),
+        }
+
+
+class TrendEngine:
+    """
+    NumPy tabanlı trend motoru
+
+    Kullanım:
+        engine = TrendEngine()
+        signals = engine.analyze(trends_by_query)
+        regressing = [s for s in signals.values() if s.is_regressing]
+    """
+
+    SUPPORTED_METRICS = ("avg_duration_ms", "avg_cpu_ms", "avg_logical_reads", "executions")
+
+    def __init__(
+        self,
+        min_points: int = 3,
+        min_segment_points: int = 2,
+        regression_threshold_percent: float = 30.0,
+        change_point_min_ratio: float = 0.5,
+    ):
+        """
+        Args:
+            min_points: Trend hesaplamak için gereken minimum gün sayısı
+            min_segment_points: Change-point her iki tarafında olması gereken minimum nokta
+            regression_threshold_percent: Regresyon sayılacak minimum artış (%)
+            change_point_min_ratio: Change-point için açıklanan varyans oranı eşiği (0-1)
+        """
+        self.min_points = max(2, int(min_points))
+        self.min_segment_points = max(1, int(min_segment_points))
+        self.regression_threshold_percent = float(regression_threshold_percent)
+        self.change_point_min_ratio = float(change_point_min_ratio)
+
+    @staticmethod
+    def _to_date(value: Any) -> Optional[date]:
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        if isinstance(value, str) and value:
+            try:
+                return datetime.fromisoformat(value[:10]).date()
+            except ValueError:
+                return None
+        return None
+
+    @classmethod
+    def build_matrix(
+        cls,
+        trends_by_query: Dict[int, List[TrendData]],
+        metric: str = "avg_duration_ms",
+    ) -> Tuple[List[int], List[date], np.ndarray]:
+        """
+        query_id x gün matrisini oluştur (eksik günler NaN)
+
+        Returns:
+            (query_ids, dates, matrix[len(query_ids), len(dates)])
+        """
+        if metric not in cls.SUPPORTED_METRICS:
+            raise ValueError(f"Unsupported trend metric: {metric}")
+
+        query_ids: List[int] = []
+        all_dates = set()
+        parsed: List[List[Tuple[date, float]]] = []
+        for qid, points in (trends_by_query or {}).items():
+            row: List[Tuple[date, float]] = []
+            for point in points or []:
+                day = cls._to_date(getattr(point, "date", None))
+                if day is None:
+                    continue
+                row.append((day, float(getattr(point, metric, 0.0) or 0.0)))
+                all_dates.add(day)
+            query_ids.append(int(qid))
+            parsed.append(row)
+
+        dates = sorted(all_dates)
+        matrix = np.full((len(query_ids), len(dates)), np.nan, dtype=np.float64)
+        if not dates:
+            return query_ids, dates, matrix
+
+        date_index = {day: idx for idx, day in enumerate(dates)}
+        for row_idx, row in enumerate(parsed):
+            for day, value in row:
+                matrix[row_idx, date_index[day]] = value
+        return query_ids, dates, matrix
+
+    def analyze(
+        self,
+        trends_by_query: Dict[int, List[TrendData]],
+        metric: str = "avg_duration_ms",
+    ) -> Dict[int, TrendSignal]:
+        """Tüm sorgular için trend sinyallerini hesapla"""
+        query_ids, dates, matrix = self.build_matrix(trends_by_query, metric=metric)
+        if not query_ids:
+            return {}
+        return self.analyze_matrix(query_ids, dates, matrix, metric=metric)
+
+    def analyze_matrix(
+        self,
+        query_ids: List[int],
+        dates: List[date],
+        matrix: np.ndarray,
+        metric: str = "avg_duration_ms",
+    ) -> Dict[int, TrendSignal]:
+        """
+        Hazır matris üzerinden vektörel hesaplama
+
+        Her satır bir sorgu, her sütun bir gün; NaN = veri yok.
+        """
+        n_rows = len(query_ids)
+        if n_rows == 0:
+            return {}
+        if matrix.size == 0 or not dates:
+            return {int(qid): TrendSignal(query_id=int(qid), metric=metric) for qid in query_ids}
+
+        y = np.asarray(matrix, dtype=np.float64)
+        mask = ~np.isnan(y)
+        y0 = np.where(mask, y, 0.0)
+        counts = mask.sum(axis=1).astype(np.float64)
+        safe_counts = np.maximum(counts, 1.0)
+
+        # Gün ekseni: ilk tarihten itibaren gün farkı (boşluklu günler doğru ağırlıklanır)
+        x_axis = np.array([(d - dates[0]).days for d in dates], dtype=np.float64)
+        x = np.where(mask, x_axis[np.newaxis, :], 0.0)
+
+        # --- Least-squares eğim (satır bazlı, NaN-aware) ---
+        x_mean = x.sum(axis=1) / safe_counts
+        y_mean = y0.sum(axis=1) / safe_counts
+        dx = np.where(mask, x - x_mean[:, np.newaxis], 0.0)
+        dy = np.where(mask, y0 - y_mean[:, np.newaxis], 0.0)
+        sxx = (dx * dx).sum(axis=1)
+        sxy = (dx * dy).sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            slope = np.where(sxx > 0, sxy / sxx, 0.0)
+
+        # --- Fit edilen doğrunun ilk/son gözlem noktasındaki değerleri ---
+        big = np.float64(np.inf)
+        x_first = np.where(mask, x_axis[np.newaxis, :], big).min(axis=1)
+        x_last = np.where(mask, x_axis[np.newaxis, :], -big).max(axis=1)
+        x_first = np.where(np.isfinite(x_first), x_first, 0.0)
+        x_last = np.where(np.isfinite(x_last), x_last, 0.0)
+        fit_start = y_mean + slope * (x_first - x_mean)
+        fit_end = y_mean + slope * (x_last - x_mean)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pct_change = np.where(fit_start > 0, (fit_end - fit_start) / fit_start * 100.0, 0.0)
+
+        # --- Volatilite (coefficient of variation) ---
+        variance = (dy * dy).sum(axis=1) / safe_counts
+        with np.errstate(divide="ignore", invalid="ignore"):
+            volatility = np.where(y_mean > 0, np.sqrt(variance) / y_mean, 0.0)
+
+        # --- Tek change-point (mean shift, between-segment SS maksimizasyonu) ---
+        cum_count = np.cumsum(mask, axis=1).astype(np.float64)
+        cum_sum = np.cumsum(y0, axis=1)
+        left_n = cum_count[:, :-1]
+        right_n = counts[:, np.newaxis] - left_n
+        with np.errstate(divide="ignore", invalid="ignore"):
+            left_mean = cum_sum[:, :-1] / left_n
+            right_mean = (y0.sum(axis=1)[:, np.newaxis] - cum_sum[:, :-1]) / right_n
+            between_ss = (left_n * right_n / safe_counts[:, np.newaxis]) * (right_mean - left_mean) ** 2
+        # Split noktası yalnızca gözlemin olduğu günün sonunda ve her iki tarafta yeterli nokta varken geçerli
+        valid_split = (
+            mask[:, :-1]
+            & (left_n >= self.min_segment_points)
+            & (right_n >= self.min_segment_points)
+        )
+        between_ss = np.where(valid_split & np.isfinite(between_ss), between_ss, -1.0)
+        if between_ss.shape[1] > 0:
+            split_idx = between_ss.argmax(axis=1)
+            best_ss = between_ss[np.arange(n_rows), split_idx]
+            best_left = left_mean[np.arange(n_rows), split_idx]
+            best_right = right_mean[np.arange(n_rows), split_idx]
+        else:
+            split_idx = np.zeros(n_rows, dtype=np.int64)
+            best_ss = np.full(n_rows, -1.0)
+            best_left = np.zeros(n_rows)
+            best_right = np.zeros(n_rows)
+        total_ss = (dy * dy).sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            explained = np.where(total_ss > 0, best_ss / total_ss, 0.0)
+            shift_pct = np.where(best_left > 0, (best_right - best_left) / best_left * 100.0, 0.0)
+        has_change_point = (best_ss > 0) & (explained >= self.change_point_min_ratio)
+
+        # --- Regresyon skoru ve bayrağı ---
+        enough_points = counts >= self.min_points
+        effective_change = np.maximum(pct_change, np.where(has_change_point, shift_pct, 0.0))
+        is_regressing = enough_points & (effective_change >= self.regression_threshold_percent)
+        # Gürültülü serilerde skoru volatiliteye göre sönümle
+        regression_score = np.where(
+            enough_points,
+            np.maximum(effective_change, 0.0) / (1.0 + np.nan_to_num(volatility)),
+            0.0,
+        )
+
+        signals: Dict[int, TrendSignal] = {}
+        for row_idx, qid in enumerate(query_ids):
+            points = int(counts[row_idx])
+            if points < self.min_points:
+                signals[int(qid)] = TrendSignal(query_id=int(qid), metric=metric, points=points)
+                continue
+            cp_date = None
+            if bool(has_change_point[row_idx]):
+                # Change-point: split sonrası ilk gözlem günü
+                after = np.nonzero(mask[row_idx, int(split_idx[row_idx]) + 1:])[0]
+                if after.size:
+                    cp_date = dates[int(split_idx[row_idx]) + 1 + int(after[0])]
+            signals[int(qid)] = TrendSignal(
+                query_id=int(qid),
+                metric=metric,
+                points=points,
+                slope_per_day=float(slope[row_idx]),
+                percent_change=float(pct_change[row_idx]),
+                volatility=float(volatility[row_idx]),
+                change_point_date=cp_date,
+                change_point_shift_percent=float(shift_pct[row_idx]) if cp_date else 0.0,
+                regression_score=float(regression_score[row_idx]),
+                is_regressing=bool(is_regressing[row_idx]),
+            )
+        return signals
+
+    @staticmethod
+    def rank_regressions(signals: Dict[int, TrendSignal]) -> List[TrendSignal]:
+        """Regresyon skoruna göre azalan sıralama (yalnızca regresyonlar)"""
+        regressing = [s for s in (signals or {}).values() if s.is_regressing]
+        return sorted(regressing, key=lambda s: (-s.regression_score, s.query_id))
@@ -0,0 +1,302 @@
+"""
+Wait Categories - wait type -> kategori eşlemesi
+
+Bağımlılıksız modül (yalnızca stdlib): analiz motorları (WaitDeltaEngine vb.)
+app.database paketini (bağlantı katmanı, pyodbc / Qt) yüklemeden kullanabilir.
+app.database.queries.wait_stats_queries aynı isimleri geriye dönük uyumluluk
+için yeniden dışa aktarır.
+"""
+
+import re
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, Generic, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class WaitCategory(Enum):
+    """Wait type categories"""
+    CPU = "CPU"
+    IO = "I/O"
+    LOCK = "Lock"
+    LATCH = "Latch"
+    MEMORY = "Memory"
+    NETWORK = "Network"
+    BUFFER = "Buffer"
+    CLR = "CLR"
+    OTHER = "Other"
+
+
+# Wait type to category mapping
+WAIT_CATEGORIES: Dict[str, WaitCategory] = {
+    # CPU waits
+    'SOS_SCHEDULER_YIELD': WaitCategory.CPU,
+    'THREADPOOL': WaitCategory.CPU,
+    'CXPACKET': WaitCategory.CPU,
+    'CXCONSUMER': WaitCategory.CPU,
+    'CXSYNC_PORT': WaitCategory.CPU,
+    'CXSYNC_CONSUMER': WaitCategory.CPU,
+    'EXCHANGE': WaitCategory.CPU,
+    
+    # I/O waits
+    'PAGEIOLATCH_SH': WaitCategory.IO,
+    'PAGEIOLATCH_EX': WaitCategory.IO,
+    'PAGEIOLATCH_UP': WaitCategory.IO,
+    'PAGEIOLATCH_DT': WaitCategory.IO,
+    'PAGEIOLATCH_NL': WaitCategory.IO,
+    'PAGEIOLATCH_KP': WaitCategory.IO,
+    'WRITELOG': WaitCategory.IO,
+    'IO_COMPLETION': WaitCategory.IO,
+    'ASYNC_IO_COMPLETION': WaitCategory.IO,
+    'ASYNC_NETWORK_IO': WaitCategory.NETWORK,
+    'BACKUPIO': WaitCategory.IO,
+    'BACKUPBUFFER': WaitCategory.IO,
+    
+    # Lock waits
+    'LCK_M_S': WaitCategory.LOCK,
+    'LCK_M_X': WaitCategory.LOCK,
+    'LCK_M_U': WaitCategory.LOCK,
+    'LCK_M_IS': WaitCategory.LOCK,
+    'LCK_M_IX': WaitCategory.LOCK,
+    'LCK_M_SIU': WaitCategory.LOCK,
+    'LCK_M_SIX': WaitCategory.LOCK,
+    'LCK_M_UIX': WaitCategory.LOCK,
+    'LCK_M_BU': WaitCategory.LOCK,
+    'LCK_M_RS_S': WaitCategory.LOCK,
+    'LCK_M_RS_U': WaitCategory.LOCK,
+    'LCK_M_RIn_NL': WaitCategory.LOCK,
+    'LCK_M_SCH_S': WaitCategory.LOCK,
+    'LCK_M_SCH_M': WaitCategory.LOCK,
+    
+    # Latch waits
+    'PAGELATCH_SH': WaitCategory.LATCH,
+    'PAGELATCH_EX': WaitCategory.LATCH,
+    'PAGELATCH_UP': WaitCategory.LATCH,
+    'PAGELATCH_DT': WaitCategory.LATCH,
+    'PAGELATCH_NL': WaitCategory.LATCH,
+    'PAGELATCH_KP': WaitCategory.LATCH,
+    'LATCH_SH': WaitCategory.LATCH,
+    'LATCH_EX': WaitCategory.LATCH,
+    'LATCH_UP': WaitCategory.LATCH,
+    'LATCH_DT': WaitCategory.LATCH,
+    'LATCH_NL': WaitCategory.LATCH,
+    
+    # Memory waits
+    'RESOURCE_SEMAPHORE': WaitCategory.MEMORY,
+    'RESOURCE_SEMAPHORE_QUERY_COMPILE': WaitCategory.MEMORY,
+    'RESOURCE_SEMAPHORE_MUTEX': WaitCategory.MEMORY,
+    'CMEMTHREAD': WaitCategory.MEMORY,
+    'SOS_RESERVEDMEMBLOCKLIST': WaitCategory.MEMORY,
+    
+    # Buffer waits
+    'BUFFER': WaitCategory.BUFFER,
+    'DBMIRROR_DBM_MUTEX': WaitCategory.BUFFER,
+    
+    # Network waits
+    'ASYNC_NETWORK_IO': WaitCategory.NETWORK,
+    'NET_WAITFOR_PACKET': WaitCategory.NETWORK,
+    
+    # CLR waits
+    'CLR_AUTO_EVENT': WaitCategory.CLR,
+    'CLR_CRST': WaitCategory.CLR,
+    'CLR_JOIN': WaitCategory.CLR,
+    'CLR_MANUAL_EVENT': WaitCategory.CLR,
+    'CLR_MEMORY_SPY': WaitCategory.CLR,
+    'CLR_MONITOR': WaitCategory.CLR,
+    'CLR_RWLOCK_READER': WaitCategory.CLR,
+    'CLR_RWLOCK_WRITER': WaitCategory.CLR,
+    'CLR_SEMAPHORE': WaitCategory.CLR,
+    'CLR_TASK_START': WaitCategory.CLR,
+}
+
+
+# Category colors for UI
+CATEGORY_COLORS: Dict[WaitCategory, str] = {
+    WaitCategory.CPU: "#EF4444",      # Red
+    WaitCategory.IO: "#F59E0B",       # Amber
+    WaitCategory.LOCK: "#8B5CF6",     # Purple
+    WaitCategory.LATCH: "#EC4899",    # Pink
+    WaitCategory.MEMORY: "#3B82F6",   # Blue
+    WaitCategory.NETWORK: "#10B981",  # Green
+    WaitCategory.BUFFER: "#6366F1",   # Indigo
+    WaitCategory.CLR: "#14B8A6",      # Teal
+    WaitCategory.OTHER: "#64748B",    # Slate
+}
+
+
+class CompiledPatternMatcher(Generic[T]):
+    """
+    Ordered regex rules compiled into a single matcher with memoized results.
+
+    Rules keep first-match-wins priority: each rule becomes an anchored lookahead
+    branch, and alternation tries branches in order at position 0. If the
+    combined pattern cannot be built (e.g. user patterns with numbered
+    backreferences), matching falls back to the per-rule loop.
+    """
+
+    MAX_MEMO_ENTRIES = 8192
+
+    def __init__(self, rules: Sequence[Tuple[T, str]], flags: int = re.IGNORECASE):
+        self._keys: List[T] = []
+        self._compiled: List[Tuple[T, "re.Pattern[str]"]] = []
+        for key, pattern in rules:
+            try:
+                self._compiled.append((key, re.compile(pattern, flags)))
+                self._keys.append(key)
+            except re.error:
+                continue
+        self._combined: Optional["re.Pattern[str]"] = None
+        # Numbered backreferences would point at the wrong group once combined
+        has_backrefs = any(re.search(r"\\[1-9]", compiled.pattern) for _key, compiled in self._compiled)
+        if self._compiled and not has_backrefs:
+            branches = "|".join(
+                f"(?=[\\s\\S]*?(?:{compiled.pattern}))(?P<r{index}>)"
+                for index, (_key, compiled) in enumerate(self._compiled)
+            )
+            try:
+                self._combined = re.compile(f"(?:{branches})", flags)
+            except re.error:
+                self._combined = None
+        self._memo: Dict[str, Optional[T]] = {}
+
+    @property
+    def rule_count(self) -> int:
+        return len(self._compiled)
+
+    def match(self, text: str) -> Optional[T]:
+        """Key of the first rule that matches anywhere in text (None: no rule)."""
+        try:
+            return self._memo[text]
+        except KeyError:
+            pass
+        result: Optional[T] = None
+        if self._combined is not None:
+            found = self._combined.match(text)
+            if found is not None and found.lastgroup:
+                result = self._keys[int(found.lastgroup[1:])]
+        else:
+            for key, compiled in self._compiled:
+                if compiled.search(text):
+                    result = key
+                    break
+        if len(self._memo) >= self.MAX_MEMO_ENTRIES:
+            self._memo.clear()
+        self._memo[text] = result
+        return result
+
+
+@dataclass(frozen=True)
+class WaitCategoryPattern:
+    category: WaitCategory
+    pattern: str
+
+
+class WaitCategoryResolver:
+    """
+    Category resolver with exact-match priority and regex pattern fallback.
+    """
+
+    _PATTERNS: Tuple[WaitCategoryPattern, ...] = (
+        WaitCategoryPattern(WaitCategory.CPU, r"(SOS_SCHEDULER|THREADPOOL|CXPACKET|CXCONSUMER|CXSYNC|SCHEDULER|CPU)"),
+        WaitCategoryPattern(WaitCategory.IO, r"(PAGEIO|WRITELOG|IO_COMPLETION|ASYNC_IO|DISK|OTHER DISK|LOG IO|\bI/?O\b)"),
+        WaitCategoryPattern(WaitCategory.LOCK, r"(^LCK_|LOCK|DEADLOCK)"),
+        WaitCategoryPattern(WaitCategory.LATCH, r"(PAGELATCH|LATCH_|LATCH)"),
+        WaitCategoryPattern(WaitCategory.MEMORY, r"(RESOURCE_SEMAPHORE|CMEMTHREAD|MEMORY|GRANT)"),
+        WaitCategoryPattern(WaitCategory.NETWORK, r"(ASYNC_NETWORK_IO|NETWORK|PACKET|NET_)"),
+        WaitCategoryPattern(WaitCategory.BUFFER, r"(BUFFER|BPOOL|BUFFER LATCH)"),
+        WaitCategoryPattern(WaitCategory.CLR, r"(^CLR_|SQL CLR|CLR)"),
+    )
+
+    # Query Store wait category descriptions and common textual aliases.
+    _CATEGORY_TEXT_ALIASES: Dict[str, WaitCategory] = {
+        "CPU": WaitCategory.CPU,
+        "PARALLELISM": WaitCategory.CPU,
+        "WORKER THREAD": WaitCategory.CPU,
+        "LOCK": WaitCategory.LOCK,
+        "LATCH": WaitCategory.LATCH,
+        "BUFFER LATCH": WaitCategory.BUFFER,
+        "BUFFER IO": WaitCategory.IO,
+        "TRAN LOG IO": WaitCategory.IO,
+        "OTHER DISK IO": WaitCategory.IO,
+        "NETWORK IO": WaitCategory.NETWORK,
+        "MEMORY": WaitCategory.MEMORY,
+        "SQL CLR": WaitCategory.CLR,
+        "CLR": WaitCategory.CLR,
+        "PREEMPTIVE": WaitCategory.OTHER,
+        "IDLE": WaitCategory.OTHER,
+        "USER WAIT": WaitCategory.OTHER,
+        "UNKNOWN": WaitCategory.OTHER,
+        "TRACING": WaitCategory.OTHER,
+        "SERVICE BROKER": WaitCategory.OTHER,
+        "TRANSACTION": WaitCategory.OTHER,
+        "REPLICATION": WaitCategory.OTHER,
+        "MIRRORING": WaitCategory.OTHER,
+        "COMPILATION": WaitCategory.CPU,
+        "LOG RATE GOVERNOR": WaitCategory.IO,
+    }
+
+    def __init__(self):
+        self._exact_map = dict(WAIT_CATEGORIES)
+        for key, value in list(WAIT_CATEGORIES.items()):
+            self._exact_map[str(key).upper()] = value
+        self._text_alias_map = {
+            str(key).strip().upper(): value
+            for key, value in self._CATEGORY_TEXT_ALIASES.items()
+        }
+        self._pattern_matcher: CompiledPatternMatcher[WaitCategory] = CompiledPatternMatcher(
+            [(rule.category, rule.pattern) for rule in self._PATTERNS]
+        )
+        # wait_type -> category; wait type isimleri sınırlı (~1000) olduğundan refresh'ler arası kalıcı
+        self._resolved: Dict[str, WaitCategory] = {}
+
+    def resolve(self, wait_type_or_text: str) -> WaitCategory:
+        key = wait_type_or_text if isinstance(wait_type_or_text, str) else str(wait_type_or_text or "")
+        cached = self._resolved.get(key)
+        if cached is not None:
+            return cached
+        category = self._resolve_uncached(key)
+        if len(self._resolved) >= CompiledPatternMatcher.MAX_MEMO_ENTRIES:
+            self._resolved.clear()
+        self._resolved[key] = category
+        return category
+
+    def _resolve_uncached(self, wait_type_or_text: str) -> WaitCategory:
+        raw = str(wait_type_or_text or "").strip()
+        if not raw:
+            return WaitCategory.OTHER
+
+        direct = self._exact_map.get(raw)
+        if direct:
+            return direct
+        direct = self._exact_map.get(raw.upper())
+        if direct:
+            return direct
+
+        alias = self._text_alias_map.get(raw.upper())
+        if alias:
+            return alias
+
+        return self._pattern_matcher.match(raw) or WaitCategory.OTHER
+
+
+_WAIT_CATEGORY_RESOLVER = WaitCategoryResolver()
+
+
+def get_wait_category(wait_type: str) -> WaitCategory:
+    """Get category for a wait type"""
+    return _WAIT_CATEGORY_RESOLVER.resolve(wait_type)
+
+
+def resolve_wait_category_text(category_text: str) -> WaitCategory:
+    """
+    Resolve category text (from Query Store / UI labels) into WaitCategory.
+
+    This resolver is intentionally heuristic and case-insensitive.
+    """
+    return _WAIT_CATEGORY_RESOLVER.resolve(category_text)
+
+
+def get_category_color(category: WaitCategory) -> str:
+    """Get color for a wait category"""
+    return CATEGORY_COLORS.get(category, CATEGORY_COLORS[WaitCategory.OTHER])
@@ -0,0 +1,382 @@
+"""
+Wait Stats Interval Delta Engine
+
+sys.dm_os_wait_stats sayaçları instance restart'ından (veya DBCC SQLPERF CLEAR'dan)
+beri kümülatiftir; uzun süredir açık bir sunucuda toplamlar neredeyse hiç
+kıpırdamaz. Bu motor her sunucu için bir önceki ham snapshot'ı tutar ve iki
+refresh arasındaki farktan interval dağılımını ve saniye başına wait oranlarını
+hesaplar.
+
+Sayaç sıfırlanmaları:
+    - sqlserver_start_time değiştiyse (restart) önceki snapshot geçersizdir;
+      mevcut sayaçlar başlangıçtan bu yana biriken interval olarak alınır.
+    - Tek bir wait type sayacı geriye gittiyse (CLEAR) o sayacın mevcut değeri
+      interval farkı kabul edilir.
+
+Girdi: WaitStatsQueries.WAIT_COUNTERS satırları
+Çıktı: WaitIntervalDelta (son interval + rolling window)
+"""
+
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from time import monotonic
+from typing import Any, Deque, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from app.core.logger import get_logger
+from app.analysis.wait_categories import WaitCategory, get_wait_category
+
+logger = get_logger('analysis.wait_delta_engine')
+
+# wait_type -> (waiting_tasks_count, wait_time_ms, signal_wait_time_ms)
+CounterMap = Dict[str, Tuple[int, int, int]]
+
+
+def _to_int(value: Any) -> int:
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+@dataclass
+class WaitCounterSnapshot:
+    """Tek refresh'te okunan ham kümülatif sayaçlar"""
+    server_key: str
+    captured_at: datetime
+    monotonic_ts: float
+    server_start_time: Optional[datetime] = None
+    counters: CounterMap = field(default_factory=dict)
+
+
+@dataclass
+class WaitTypeDelta:
+    """Bir wait type'ın interval içindeki artışı"""
+    wait_type: str
+    category: WaitCategory
+    waiting_tasks: int = 0
+    wait_time_ms: int = 0
+    signal_wait_ms: int = 0
+    wait_ms_per_sec: float = 0.0
+    wait_percent: float = 0.0
+
+    @property
+    def resource_wait_ms(self) -> int:
+        return max(0, self.wait_time_ms - self.signal_wait_ms)
+
+    @property
+    def avg_wait_ms(self) -> float:
+        return self.wait_time_ms / self.waiting_tasks if self.waiting_tasks else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "wait_type": self.wait_type,
+            "category": self.category.value,
+            "waiting_tasks": int(self.waiting_tasks),
+            "wait_time_ms": int(self.wait_time_ms),
+            "signal_wait_ms": int(self.signal_wait_ms),
+            "resource_wait_ms": int(self.resource_wait_ms),
+            "wait_ms_per_sec": round(float(self.wait_ms_per_sec), 2),
+            "wait_percent": round(float(self.wait_percent), 2),
+        }
+
+
+@dataclass
+class WaitIntervalDelta:
+    """İki snapshot (veya rolling window) arasındaki wait dağılımı"""
+    server_key: str
+    started_at: datetime
+    ended_at: datetime
+    interval_seconds: float
+    waits: List[WaitTypeDelta] = field(default_factory=list)
+    category_wait_ms: Dict[WaitCategory, int] = field(default_factory=dict)
+    total_wait_time_ms: int = 0
+    total_signal_wait_ms: int = 0
+    total_waiting_tasks: int = 0
+    counter_reset: bool = False
+    interval_count: int = 1
+
+    @property
+    def wait_ms_per_sec(self) -> float:
+        """Saniye başına biriken wait süresi (ms/s ~ ortalama bekleyen task sayısı x 1000)"""
+        return self.total_wait_time_ms / self.interval_seconds if self.interval_seconds > 0 else 0.0
+
+    @property
+    def waiting_tasks_per_sec(self) -> float:
+        return self.total_waiting_tasks / self.interval_seconds if self.interval_seconds > 0 else 0.0
+
+    @property
+    def signal_wait_percent(self) -> float:
+        if self.total_wait_time_ms <= 0:
+            return 0.0
+        return self.total_signal_wait_ms * 100.0 / self.total_wait_time_ms
+
+    @property
+    def resource_wait_percent(self) -> float:
+        return 100.0 - self.signal_wait_percent if self.total_wait_time_ms > 0 else 0.0
+
+    def top_waits(self, limit: int = 10) -> List[WaitTypeDelta]:
+        return self.waits[:max(0, int(limit))]
+
+    def to_dict(self, top_n: int = 10) -> Dict[str, Any]:
+        return {
+            "server_key": self.server_key,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "ended_at": self.ended_at.isoformat(timespec="seconds"),
+            "interval_seconds": round(float(self.interval_seconds), 3),
+            "interval_count": int(self.interval_count),
+            "total_wait_time_ms": int(self.total_wait_time_ms),
+            "total_signal_wait_ms": int(self.total_signal_wait_ms),
+            "total_waiting_tasks": int(self.total_waiting_tasks),
+            "wait_ms_per_sec": round(float(self.wait_ms_per_sec), 2),
+            "signal_wait_percent": round(float(self.signal_wait_percent), 2),
+            "counter_reset": bool(self.counter_reset),
+            "category_wait_ms": {cat.value: int(ms) for cat, ms in self.category_wait_ms.items() if ms},
+            "top_waits": [w.to_dict() for w in self.top_waits(top_n)],
+        }
+
+
+def build_interval_delta(
+    server_key: str,
+    started_at: datetime,
+    ended_at: datetime,
+    interval_seconds: float,
+    deltas: CounterMap,
+    counter_reset: bool = False,
+    interval_count: int = 1,
+) -> WaitIntervalDelta:
+    """Wait type farklarından sıralı interval özeti üret"""
+    seconds = max(0.0, float(interval_seconds))
+    total_wait = sum(wait_ms for _tasks, wait_ms, _signal in deltas.values())
+    waits: List[WaitTypeDelta] = []
+    categories = {cat: 0 for cat in WaitCategory}
+    total_signal = 0
+    total_tasks = 0
+
+    for wait_type, (tasks, wait_ms, signal_ms) in deltas.items():
+        if wait_ms <= 0 and tasks <= 0:
+            continue
+        category = get_wait_category(wait_type)
+        categories[category] += wait_ms
+        total_signal += signal_ms
+        total_tasks += tasks
+        waits.append(WaitTypeDelta(
+            wait_type=wait_type,
+            category=category,
+            waiting_tasks=tasks,
+            wait_time_ms=wait_ms,
+            signal_wait_ms=signal_ms,
+            wait_ms_per_sec=wait_ms / seconds if seconds > 0 else 0.0,
+            wait_percent=wait_ms * 100.0 / total_wait if total_wait > 0 else 0.0,
+        ))
+
+    waits.sort(key=lambda w: (w.wait_time_ms, w.waiting_tasks), reverse=True)
+    return WaitIntervalDelta(
+        server_key=server_key,
+        started_at=started_at,
+        ended_at=ended_at,
+        interval_seconds=seconds,
+        waits=waits,
+        category_wait_ms=categories,
+        total_wait_time_ms=total_wait,
+        total_signal_wait_ms=total_signal,
+        total_waiting_tasks=total_tasks,
+        counter_reset=counter_reset,
+        interval_count=interval_count,
+    )
+
+
+class WaitDeltaEngine:
+    """
+    Sunucu bazlı interval delta motoru
+
+    Kullanım:
+        engine = WaitDeltaEngine(window_seconds=300)
+        interval = engine.ingest("SRV01", rows)   # ilk çağrıda None (baseline)
+        window = engine.window("SRV01")           # son 5 dakikanın toplamı
+
+    Refresh worker thread'lerinden çağrılabilir; durum tek bir lock ile korunur.
+    """
+
+    def __init__(
+        self,
+        window_seconds: float = 300.0,
+        max_intervals: int = 240,
+        min_interval_seconds: float = 0.5,
+    ):
+        self.window_seconds = max(1.0, float(window_seconds))
+        self.min_interval_seconds = max(0.0, float(min_interval_seconds))
+        self._max_intervals = max(1, int(max_intervals))
+        self._previous: Dict[str, WaitCounterSnapshot] = {}
+        self._intervals: Dict[str, Deque[Tuple[WaitIntervalDelta, CounterMap]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def counters_from_rows(rows: Iterable[Mapping[str, Any]]) -> CounterMap:
+        """WAIT_COUNTERS satırlarını wait_type -> sayaç tuple'ına çevir"""
+        counters: CounterMap = {}
+        for row in rows or []:
+            wait_type = str(row.get("wait_type", "") or "")
+            if not wait_type:
+                continue
+            counters[wait_type] = (
+                _to_int(row.get("waiting_tasks_count")),
+                _to_int(row.get("wait_time_ms")),
+                _to_int(row.get("signal_wait_time_ms")),
+            )
+        return counters
+
+    @staticmethod
+    def start_time_from_rows(rows: Iterable[Mapping[str, Any]]) -> Optional[datetime]:
+        for row in rows or []:
+            value = row.get("sqlserver_start_time")
+            if isinstance(value, datetime):
+                return value
+            if value:
+                try:
+                    return datetime.fromisoformat(str(value))
+                except ValueError:
+                    return None
+        return None
+
+    def ingest(
+        self,
+        server_key: str,
+        rows: Iterable[Mapping[str, Any]],
+        server_start_time: Optional[datetime] = None,
+        captured_at: Optional[datetime] = None,
+        monotonic_ts: Optional[float] = None,
+    ) -> Optional[WaitIntervalDelta]:
+        """
+        Yeni ham snapshot'ı işle
+
+        Returns:
+            Önceki snapshot'a göre interval; ilk snapshot'ta veya interval
+            min_interval_seconds'tan kısaysa None.
+        """
+        rows = list(rows or [])
+        snapshot = WaitCounterSnapshot(
+            server_key=server_key,
+            captured_at=captured_at or datetime.now(),
+            monotonic_ts=monotonic() if monotonic_ts is None else float(monotonic_ts),
+            server_start_time=server_start_time or self.start_time_from_rows(rows),
+            counters=self.counters_from_rows(rows),
+        )
+
+        with self._lock:
+            previous = self._previous.get(server_key)
+            if previous is None:
+                self._previous[server_key] = snapshot
+                return None
+
+            elapsed = snapshot.monotonic_ts - previous.monotonic_ts
+            if elapsed < self.min_interval_seconds:
+                # Çok kısa aralık: baseline'ı koru, bir sonraki refresh daha uzun interval görür
+                return None
+
+            restarted = (
+                snapshot.server_start_time is not None
+                and previous.server_start_time is not None
+                and snapshot.server_start_time != previous.server_start_time
+            )
+            if restarted:
+                deltas = dict(snapshot.counters)
+                started_at = max(previous.captured_at, snapshot.server_start_time)
+                interval_seconds = max(
+                    self.min_interval_seconds,
+                    min(elapsed, (snapshot.captured_at - started_at).total_seconds()),
+                )
+                counter_reset = True
+            else:
+                deltas, counter_reset = self._diff_counters(previous.counters, snapshot.counters)
+                started_at = previous.captured_at
+                interval_seconds = elapsed
+
+            interval = build_interval_delta(
+                server_key=server_key,
+                started_at=started_at,
+                ended_at=snapshot.captured_at,
+                interval_seconds=interval_seconds,
+                deltas=deltas,
+                counter_reset=counter_reset,
+            )
+            self._previous[server_key] = snapshot
+            history = self._intervals.setdefault(server_key, deque(maxlen=self._max_intervals))
+            history.append((interval, deltas))
+            self._prune(history, snapshot.captured_at)
+
+        if counter_reset:
+            logger.info(
+                f"Wait stats counter reset detected for {server_key} "
+                f"({'restart' if restarted else 'cleared counters'})"
+            )
+        return interval
+
+    @staticmethod
+    def _diff_counters(previous: CounterMap, current: CounterMap) -> Tuple[CounterMap, bool]:
+        deltas: CounterMap = {}
+        counter_reset = False
+        for wait_type, (tasks, wait_ms, signal_ms) in current.items():
+            prev_tasks, prev_wait, prev_signal = previous.get(wait_type, (0, 0, 0))
+            if wait_ms < prev_wait or tasks < prev_tasks or signal_ms < prev_signal:
+                # Sayaç sıfırlanıp yeniden birikmiş; farkı mevcut değer kabul et
+                counter_reset = True
+                deltas[wait_type] = (tasks, wait_ms, signal_ms)
+                continue
+            if wait_ms == prev_wait and tasks == prev_tasks:
+                continue
+            deltas[wait_type] = (tasks - prev_tasks, wait_ms - prev_wait, signal_ms - prev_signal)
+        if not counter_reset and any(wait_type not in current for wait_type in previous):
+            # wait_time_ms > 0 filtresinden düşen tipler sayacın temizlendiğini gösterir
+            counter_reset = True
+        return deltas, counter_reset
+
+    def _prune(self, history: Deque[Tuple[WaitIntervalDelta, CounterMap]], now: datetime) -> None:
+        while history and (now - history[0][0].ended_at).total_seconds() > self.window_seconds:
+            history.popleft()
+
+    def last_interval(self, server_key: str) -> Optional[WaitIntervalDelta]:
+        with self._lock:
+            history = self._intervals.get(server_key)
+            return history[-1][0] if history else None
+
+    def intervals(self, server_key: str) -> List[WaitIntervalDelta]:
+        """Rolling window içindeki intervaller (eskiden yeniye)"""
+        with self._lock:
+            return [interval for interval, _deltas in self._intervals.get(server_key, ())]
+
+    def window(self, server_key: str) -> Optional[WaitIntervalDelta]:
+        """Rolling window içindeki tüm intervallerin toplamı"""
+        with self._lock:
+            history = list(self._intervals.get(server_key, ()))
+        if not history:
+            return None
+
+        combined: Dict[str, List[int]] = {}
+        for _interval, deltas in history:
+            for wait_type, (tasks, wait_ms, signal_ms) in deltas.items():
+                slot = combined.setdefault(wait_type, [0, 0, 0])
+                slot[0] += tasks
+                slot[1] += wait_ms
+                slot[2] += signal_ms
+
+        return build_interval_delta(
+            server_key=server_key,
+            started_at=history[0][0].started_at,
+            ended_at=history[-1][0].ended_at,
+            interval_seconds=sum(interval.interval_seconds for interval, _deltas in history),
+            deltas={wait_type: (v[0], v[1], v[2]) for wait_type, v in combined.items()},
+            counter_reset=any(interval.counter_reset for interval, _deltas in history),
+            interval_count=len(history),
+        )
+
+    def reset(self, server_key: Optional[str] = None) -> None:
+        """Baseline ve geçmişi temizle (server_key None ise tüm sunucular)"""
+        with self._lock:
+            if server_key is None:
+                self._previous.clear()
+                self._intervals.clear()
+            else:
+                self._previous.pop(server_key, None)
+                self._intervals.pop(server_key, None)
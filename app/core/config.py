@@ -5,7 +5,7 @@ Application configuration management using Pydantic Settings
 import sys
 import os
 from pathlib import Path
-from typing import Optional, Any
+from typing import Optional, Any, List
 from functools import lru_cache
 
 from pydantic import Field, field_validator
@@ -170,6 +170,25 @@ class LicenseSettings(BaseSettings):
     last_validated_at: Optional[str] = Field(default=None)
 
 
+class MetricsEndpointSettings(BaseSettings):
+    """Embedded Prometheus scrape endpoint settings"""
+
+    enabled: bool = Field(default=False)
+    host: str = Field(default="127.0.0.1")
+    port: int = Field(default=9187, ge=1024, le=65535)
+
+
+class HeadlessCollectorSettings(BaseSettings):
+    """Headless (GUI-less) collector settings - python -m app.headless"""
+
+    profiles: List[str] = Field(default_factory=list)  # profile names/ids, empty = all saved profiles
+    wait_interval_seconds: int = Field(default=300, ge=15, le=86400)
+    dashboard_interval_seconds: int = Field(default=60, ge=5, le=86400)
+    max_workers: int = Field(default=4, ge=1, le=32)
+    collect_dashboard: bool = Field(default=True)
+    write_reports: bool = Field(default=True)
+
+
 class Settings(BaseSettings):
     """Main application settings"""
     
@@ -186,6 +205,8 @@ class Settings(BaseSettings):
     cache: CacheSettings = Field(default_factory=CacheSettings)
     logging: LoggingSettings = Field(default_factory=LoggingSettings)
     license: LicenseSettings = Field(default_factory=LicenseSettings)
+    metrics: MetricsEndpointSettings = Field(default_factory=MetricsEndpointSettings)
+    headless: HeadlessCollectorSettings = Field(default_factory=HeadlessCollectorSettings)
     
     # App paths
     app_dir: Path = Field(default_factory=get_app_dir)
@@ -4,10 +4,10 @@ Database connection management for SQL Server
 
 import asyncio
 from typing import Optional, List, Dict, Any
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, contextmanager
 from dataclasses import dataclass
 from datetime import datetime
-from threading import Lock
+from threading import Lock, local
 
 import pyodbc
 from PyQt6.QtCore import QObject, pyqtSignal
@@ -31,6 +31,9 @@ from app.core.exceptions import (
 
 logger = get_logger('database.connection')
 
+# Per-thread connection override; headless workers bind their own profile's connection.
+_thread_binding = local()
+
 
 def get_available_odbc_drivers() -> List[str]:
     """Get list of available SQL Server ODBC drivers"""
@@ -478,8 +481,89 @@ class DatabaseConnection:
         except Exception as e:
             raise QueryExecutionError(f"Query execution error: {e}", query=query)
     
+    def execute_query_multi(
+        self,
+        query: str,
+        timeout: Optional[int] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Execute a multi-statement batch and return every row-returning result set
+
+        Args:
+            query: SQL batch (no parameters; raw pyodbc cursor)
+            timeout: Query timeout in seconds
+
+        Returns:
+            One list of row dictionaries per result set, in batch order
+
+        Raises:
+            QueryExecutionError: If query fails
+            QueryTimeoutError: If query times out
+        """
+        if not self.is_connected:
+            raise QueryExecutionError("Not connected to database")
+
+        timeout = timeout or self._settings.database.query_timeout
+
+        try:
+            with self._engine.connect() as conn:
+                raw_conn = conn.connection
+                self._set_active_dbapi_connection(raw_conn)
+                try:
+                    self._apply_query_timeout(raw_conn, timeout)
+                    conn.execute(text(f"SET LOCK_TIMEOUT {timeout * 1000}"))
+
+                    cursor = raw_conn.cursor()
+                    try:
+                        cursor.timeout = int(timeout)
+                    except Exception:
+                        pass
+                    cursor.execute("SET NOCOUNT ON")
+                    cursor.execute(query)
+
+                    result_sets: List[List[Dict[str, Any]]] = []
+                    while True:
+                        if cursor.description:
+                            columns = [col[0] for col in cursor.description]
+                            result_sets.append([dict(zip(columns, row)) for row in cursor.fetchall()])
+                        if not cursor.nextset():
+                            break
+                    return result_sets
+                finally:
+                    self._clear_active_dbapi_connection()
+
+        except (pyodbc.OperationalError, SAOperationalError) as e:
+            msg = str(e).lower()
+            if ("timeout" in msg) or ("hyt00" in msg) or ("hyt01" in msg):
+                raise QueryTimeoutError(f"Query timed out after {timeout}s", query=query)
+            raise QueryExecutionError(f"Query failed: {e}", query=query)
+        except Exception as e:
+            raise QueryExecutionError(f"Query execution error: {e}", query=query)
+
+    def open_dedicated_dbapi_connection(self) -> Any:
+        """
+        Open a separate autocommit DBAPI connection (outside the shared pool)
+
+        Intended for long-running, high-frequency pollers that should not pay a
+        pool checkout per query. Session settings the caller applies (isolation
+        level, deadlock priority) never leak into pooled connections and no
+        transaction stays open. The caller must close() it.
+        """
+        if not self.is_connected:
+            raise QueryExecutionError("Not connected to database")
+        try:
+            raw_connection = pyodbc.connect(
+                self._build_connection_string(),
+                autocommit=True,
+                timeout=int(self.profile.connection_timeout or 15),
+            )
+        except Exception as e:
+            raise QueryExecutionError(f"Could not open dedicated connection: {e}")
+        self._apply_query_timeout(raw_connection, self.profile.query_timeout)
+        return raw_connection
+
     def execute_scalar(
-        self, 
+        self,
         query: str, 
         params: Optional[Dict[str, Any]] = None
     ) -> Any:
@@ -516,6 +600,20 @@ class DatabaseConnection:
         except Exception as e:
             raise QueryExecutionError(f"Non-query execution error: {e}", query=query)
     
+    def execute_autocommit(self, query: str) -> None:
+        """
+        Execute server-level DDL outside a transaction (e.g. CREATE/ALTER EVENT SESSION)
+        """
+        if not self.is_connected:
+            raise QueryExecutionError("Not connected to database")
+
+        try:
+            with self._engine.connect() as conn:
+                conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+                conn.execute(text(query))
+        except Exception as e:
+            raise QueryExecutionError(f"Autocommit execution error: {e}", query=query)
+
     def test_connection(self) -> bool:
         """Test if connection is still alive"""
         if not self._engine:
@@ -556,7 +654,10 @@ class ConnectionManager(QObject):
     
     @property
     def active_connection(self) -> Optional[DatabaseConnection]:
-        """Get the currently active connection"""
+        """Get the currently active connection (thread-bound connection wins)"""
+        bound = getattr(_thread_binding, 'connection', None)
+        if bound is not None:
+            return bound
         if self._active_connection_id:
             return self._connections.get(self._active_connection_id)
         return None
@@ -581,11 +682,25 @@ class ConnectionManager(QObject):
         
         return conn
     
+    @property
+    def connections(self) -> Dict[str, DatabaseConnection]:
+        """Snapshot of all open connections keyed by profile id"""
+        return dict(self._connections)
+    
     def disconnect(self, profile_id: str) -> None:
         """Disconnect a specific connection"""
         if profile_id in self._connections:
+            server = str(getattr(self._connections[profile_id].profile, "server", "") or "")
             self._connections[profile_id].disconnect()
             del self._connections[profile_id]
+            if server and not any(
+                str(getattr(conn.profile, "server", "") or "") == server for conn in self._connections.values()
+            ):
+                try:
+                    from app.services.metrics_exporter import get_metrics_registry
+                    get_metrics_registry().drop_server(server)
+                except Exception:
+                    pass
             
             if self._active_connection_id == profile_id:
                 self._active_connection_id = None
@@ -599,11 +714,18 @@ class ConnectionManager(QObject):
     
     def disconnect_all(self) -> None:
         """Disconnect all connections"""
+        servers = {str(getattr(conn.profile, "server", "") or "") for conn in self._connections.values()}
         for conn in self._connections.values():
             conn.disconnect()
         self._connections.clear()
         self._active_connection_id = None
         self.connection_changed.emit(False, "", "")
+        try:
+            from app.services.metrics_exporter import get_metrics_registry
+            for server in servers:
+                get_metrics_registry().drop_server(server)
+        except Exception:
+            pass
         try:
             from app.services.query_stats_service import QueryStatsService
             QueryStatsService.stop_background_refresh()
@@ -622,6 +744,23 @@ class ConnectionManager(QObject):
         return self._connections.get(profile_id)
 
 
+@contextmanager
+def bind_thread_connection(connection: DatabaseConnection):
+    """
+    Make ``connection`` the active connection for the current thread only.
+
+    Services resolve their connection through ``active_connection``, so a worker
+    thread can collect for one profile while other threads (or the GUI) keep
+    using theirs.
+    """
+    previous = getattr(_thread_binding, 'connection', None)
+    _thread_binding.connection = connection
+    try:
+        yield connection
+    finally:
+        _thread_binding.connection = previous
+
+
 # Global connection manager instance
 _connection_manager: Optional[ConnectionManager] = None
 
@@ -256,17 +256,150 @@ class QueryStoreQueries:
     WHERE q.query_id = :query_id
     """
     
+    # ==========================================================================
+    # BATCH DETAY SORGULARI - Çoklu query_id (OPENJSON listesi)
+    # ==========================================================================
+    # :query_ids_json parametresi JSON dizi olarak gönderilir: "[12, 45, 78]"
+    # Tek round trip ile tüm seçili sorguların detayını getirir (compat level 130+).
+
+    QUERY_METRICS_BATCH = """
+    SELECT
+        q.query_id,
+        COUNT(DISTINCT p.plan_id) AS plan_count,
+        SUM(rs.count_executions) AS total_executions,
+        AVG(rs.avg_duration) / 1000.0 AS avg_duration_ms,
+        AVG(rs.avg_cpu_time) / 1000.0 AS avg_cpu_ms,
+        AVG(rs.avg_logical_io_reads) AS avg_logical_reads,
+        AVG(rs.avg_logical_io_writes) AS avg_logical_writes,
+        AVG(rs.avg_physical_io_reads) AS avg_physical_reads,
+        MAX(rs.max_duration) / 1000.0 AS max_duration_ms
+    FROM OPENJSON(:query_ids_json) WITH (query_id BIGINT '$') ids
+    JOIN sys.query_store_query q ON q.query_id = ids.query_id
+    JOIN sys.query_store_plan p ON q.query_id = p.query_id
+    JOIN sys.query_store_runtime_stats rs ON p.plan_id = rs.plan_id
+    JOIN sys.query_store_runtime_stats_interval rsi
+        ON rs.runtime_stats_interval_id = rsi.runtime_stats_interval_id
+    WHERE rsi.start_time > DATEADD(day, -:days, GETDATE())
+    GROUP BY q.query_id
+    """
+
+    QUERY_WAIT_STATS_BATCH = """
+    SELECT
+        p.query_id,
+        ws.wait_category_desc AS wait_category,
+        SUM(ws.total_query_wait_time_ms) AS total_wait_ms,
+        CAST(SUM(ws.total_query_wait_time_ms) * 100.0 /
+            NULLIF(SUM(SUM(ws.total_query_wait_time_ms)) OVER(PARTITION BY p.query_id), 0) AS DECIMAL(5,2)) AS wait_percent
+    FROM OPENJSON(:query_ids_json) WITH (query_id BIGINT '$') ids
+    JOIN sys.query_store_plan p ON p.query_id = ids.query_id
+    JOIN sys.query_store_wait_stats ws ON ws.plan_id = p.plan_id
+    JOIN sys.query_store_runtime_stats_interval rsi
+        ON ws.runtime_stats_interval_id = rsi.runtime_stats_interval_id
+    WHERE rsi.start_time > DATEADD(day, -:days, GETDATE())
+    GROUP BY p.query_id, ws.wait_category_desc
+    ORDER BY p.query_id, total_wait_ms DESC
+    """
+
+    QUERY_PLAN_STABILITY_BATCH = """
+    SELECT
+        p.query_id,
+        p.plan_id,
+        p.query_plan_hash,
+        p.is_forced_plan,
+        p.force_failure_count,
+        MIN(rs.first_execution_time) AS first_seen,
+        MAX(rs.last_execution_time) AS last_seen,
+        SUM(rs.count_executions) AS execution_count,
+        AVG(rs.avg_duration) / 1000.0 AS avg_duration_ms,
+        STDEV(rs.avg_duration) / 1000.0 AS stdev_duration_ms
+    FROM OPENJSON(:query_ids_json) WITH (query_id BIGINT '$') ids
+    JOIN sys.query_store_plan p ON p.query_id = ids.query_id
+    JOIN sys.query_store_runtime_stats rs ON p.plan_id = rs.plan_id
+    JOIN sys.query_store_runtime_stats_interval rsi
+        ON rs.runtime_stats_interval_id = rsi.runtime_stats_interval_id
+    WHERE rsi.start_time > DATEADD(day, -:days, GETDATE())
+    GROUP BY p.query_id, p.plan_id, p.query_plan_hash, p.is_forced_plan, p.force_failure_count
+    ORDER BY p.query_id, execution_count DESC
+    """
+
+    QUERY_DAILY_TREND_BATCH = """
+    SELECT
+        p.query_id,
+        CAST(rsi.start_time AS DATE) AS trend_date,
+        SUM(rs.count_executions) AS daily_executions,
+        AVG(rs.avg_duration) / 1000.0 AS avg_duration_ms,
+        AVG(rs.avg_cpu_time) / 1000.0 AS avg_cpu_ms,
+        AVG(rs.avg_logical_io_reads) AS avg_logical_reads
+    FROM OPENJSON(:query_ids_json) WITH (query_id BIGINT '$') ids
+    JOIN sys.query_store_plan p ON p.query_id = ids.query_id
+    JOIN sys.query_store_runtime_stats rs ON p.plan_id = rs.plan_id
+    JOIN sys.query_store_runtime_stats_interval rsi
+        ON rs.runtime_stats_interval_id = rsi.runtime_stats_interval_id
+    WHERE rsi.start_time > DATEADD(day, -:days, GETDATE())
+    GROUP BY p.query_id, CAST(rsi.start_time AS DATE)
+    ORDER BY p.query_id, trend_date
+    """
+
+    # Sorgu başlığı (QUERY_DETAIL) + son 7 gün vs önceki 7 gün trend katsayısı
+    # (QUERY_TREND_COMPARISON) tek round trip'te. trend_coefficient son 7 günde
+    # çalışmamış sorgular için NULL döner (tekil yoldaki "sonuç yok" durumu).
+    QUERY_DETAIL_BATCH = """
+    WITH Ids AS (
+        SELECT DISTINCT query_id
+        FROM OPENJSON(:query_ids_json) WITH (query_id BIGINT '$')
+    ),
+    PeriodStats AS (
+        SELECT
+            p.query_id,
+            AVG(CASE WHEN rsi.start_time > DATEADD(day, -7, GETDATE())
+                     THEN rs.avg_duration END) AS recent_avg_duration,
+            AVG(CASE WHEN rsi.start_time BETWEEN DATEADD(day, -14, GETDATE()) AND DATEADD(day, -7, GETDATE())
+                     THEN rs.avg_duration END) AS previous_avg_duration
+        FROM Ids ids
+        JOIN sys.query_store_plan p ON p.query_id = ids.query_id
+        JOIN sys.query_store_runtime_stats rs ON p.plan_id = rs.plan_id
+        JOIN sys.query_store_runtime_stats_interval rsi
+            ON rs.runtime_stats_interval_id = rsi.runtime_stats_interval_id
+        WHERE rsi.start_time >= DATEADD(day, -14, GETDATE())
+        GROUP BY p.query_id
+    )
+    SELECT
+        q.query_id,
+        q.query_hash,
+        CAST(qt.query_sql_text AS NVARCHAR(MAX)) AS query_text,
+        OBJECT_NAME(q.object_id) AS object_name,
+        OBJECT_SCHEMA_NAME(q.object_id) AS schema_name,
+        q.initial_compile_start_time,
+        q.last_compile_start_time,
+        q.last_execution_time,
+        CASE
+            WHEN ps.recent_avg_duration IS NULL THEN NULL
+            WHEN ps.previous_avg_duration IS NULL OR ps.previous_avg_duration = 0 THEN 1.0
+            ELSE ps.recent_avg_duration / ps.previous_avg_duration
+        END AS trend_coefficient,
+        CASE
+            WHEN ps.recent_avg_duration IS NULL THEN NULL
+            WHEN ps.previous_avg_duration IS NULL OR ps.previous_avg_duration = 0 THEN 0
+            ELSE CAST((ps.recent_avg_duration - ps.previous_avg_duration) * 100.0 / ps.previous_avg_duration AS DECIMAL(10,2))
+        END AS change_percent
+    FROM Ids ids
+    JOIN sys.query_store_query q ON q.query_id = ids.query_id
+    JOIN sys.query_store_query_text qt ON q.query_text_id = qt.query_text_id
+    LEFT JOIN PeriodStats ps ON ps.query_id = q.query_id
+    """
+
     # ==========================================================================
     # FALLBACK SORGULAR - DMV (Eski SQL Server sürümleri için)
     # ==========================================================================
     
     # DMV tabanlı top queries (Query Store yoksa)
-    # NOT: Object_name'e göre gruplandı - aynı SP'nin tüm statement'ları tek satırda
+    # NOT: Object_name'e göre gruplandı - aynı SP'nin tüm statement'ları tek satırda.
+    # Yalnızca nesneye bağlı satırlar; ad-hoc statement'lar DMV_ADHOC_STATEMENTS
+    # üzerinden tam metinle fingerprint'lenip client-side birleştirilir.
     DMV_TOP_QUERIES = """
     WITH QueryStats AS (
         SELECT 
-            COALESCE(OBJECT_NAME(st.objectid, st.dbid), 
-                     LEFT(SUBSTRING(st.text, (qs.statement_start_offset/2) + 1, 100), 80)) AS object_name,
+            OBJECT_NAME(st.objectid, st.dbid) AS object_name,
             OBJECT_SCHEMA_NAME(st.objectid, st.dbid) AS schema_name,
             st.objectid,
             st.dbid,
@@ -282,6 +415,7 @@ class QueryStoreQueries:
         FROM sys.dm_exec_query_stats qs
         CROSS APPLY sys.dm_exec_sql_text(qs.sql_handle) st
         WHERE qs.last_execution_time > DATEADD(day, -:days, GETDATE())
+          AND st.objectid IS NOT NULL
           AND st.text NOT LIKE '%sys.%'
           AND st.dbid = DB_ID()
     ),
@@ -365,6 +499,40 @@ class QueryStoreQueries:
     ORDER BY rn
     """
     
+    # DMV tabanlı ad-hoc statement listesi (fingerprint gruplaması için)
+    # Statement seviyesinde satır döner; literal farkları client-side fingerprint ile toplanır.
+    DMV_ADHOC_STATEMENTS = """
+    SELECT TOP (:top_n)
+        qs.sql_handle,
+        qs.statement_start_offset,
+        qs.statement_end_offset,
+        qs.query_hash,
+        SUBSTRING(
+            st.text,
+            (qs.statement_start_offset / 2) + 1,
+            ((CASE qs.statement_end_offset
+                WHEN -1 THEN DATALENGTH(st.text)
+                ELSE qs.statement_end_offset
+              END - qs.statement_start_offset) / 2) + 1
+        ) AS query_text,
+        qs.execution_count AS total_executions,
+        qs.total_elapsed_time / 1000.0 / NULLIF(qs.execution_count, 0) AS avg_duration_ms,
+        qs.total_worker_time / 1000.0 / NULLIF(qs.execution_count, 0) AS avg_cpu_ms,
+        qs.total_logical_reads * 1.0 / NULLIF(qs.execution_count, 0) AS avg_logical_reads,
+        qs.total_logical_writes * 1.0 / NULLIF(qs.execution_count, 0) AS avg_logical_writes,
+        qs.total_physical_reads * 1.0 / NULLIF(qs.execution_count, 0) AS avg_physical_reads,
+        qs.max_elapsed_time / 1000.0 AS max_duration_ms,
+        (qs.max_elapsed_time / 1000.0) * qs.execution_count / 1000.0 AS impact_score,
+        qs.last_execution_time AS last_execution
+    FROM sys.dm_exec_query_stats qs
+    CROSS APPLY sys.dm_exec_sql_text(qs.sql_handle) st
+    WHERE qs.last_execution_time > DATEADD(day, -:days, GETDATE())
+      AND st.objectid IS NULL
+      AND (st.dbid = DB_ID() OR st.dbid IS NULL)
+      AND st.text NOT LIKE '%sys.%'
+    ORDER BY qs.total_elapsed_time DESC
+    """
+    
     # DMV tabanlı wait stats (sunucu geneli)
     DMV_WAIT_STATS = """
     SELECT TOP 10
@@ -451,6 +619,130 @@ class QueryStoreQueries:
     WHERE r.query_id = :query_id
     """
     
+    # Workload geneli pencere agregasyonu (regresyon dedektörü için)
+    # Aynı şablon baseline ve recent pencere için ayrı ayrı çalıştırılır.
+    # Pencere sınırları "kaç dakika önce" olarak verilir (sunucu saatine göre).
+    # Ortalama/stdev değerleri execution ağırlıklıdır; stdev, interval bazlı
+    # stdev ve ortalamaların birleşik varyansından hesaplanır.
+    QUERY_WINDOW_AGGREGATES = """
+    WITH PlanAgg AS (
+        SELECT
+            p.query_id,
+            p.plan_id,
+            SUM(rs.count_executions) AS executions,
+            SUM(rs.avg_duration * rs.count_executions) AS sum_duration,
+            SUM((SQUARE(rs.stdev_duration) + SQUARE(rs.avg_duration)) * rs.count_executions) AS sum_sq_duration,
+            SUM(rs.avg_cpu_time * rs.count_executions) AS sum_cpu,
+            SUM((SQUARE(rs.stdev_cpu_time) + SQUARE(rs.avg_cpu_time)) * rs.count_executions) AS sum_sq_cpu,
+            SUM(rs.avg_logical_io_reads * rs.count_executions) AS sum_reads,
+            SUM((SQUARE(rs.stdev_logical_io_reads) + SQUARE(rs.avg_logical_io_reads)) * rs.count_executions) AS sum_sq_reads
+        FROM sys.query_store_plan p
+        JOIN sys.query_store_runtime_stats rs ON p.plan_id = rs.plan_id
+        JOIN sys.query_store_runtime_stats_interval rsi
+            ON rs.runtime_stats_interval_id = rsi.runtime_stats_interval_id
+        WHERE rsi.start_time >= DATEADD(minute, -:start_minutes_ago, SYSDATETIMEOFFSET())
+          AND rsi.start_time < DATEADD(minute, -:end_minutes_ago, SYSDATETIMEOFFSET())
+        GROUP BY p.query_id, p.plan_id
+    ),
+    Ranked AS (
+        SELECT
+            PlanAgg.*,
+            ROW_NUMBER() OVER (PARTITION BY query_id ORDER BY executions DESC, plan_id) AS plan_rank
+        FROM PlanAgg
+    ),
+    QueryAgg AS (
+        SELECT
+            query_id,
+            SUM(executions) AS total_executions,
+            SUM(sum_duration) / NULLIF(SUM(executions), 0) AS mean_duration,
+            SUM(sum_sq_duration) / NULLIF(SUM(executions), 0) AS mean_sq_duration,
+            SUM(sum_cpu) / NULLIF(SUM(executions), 0) AS mean_cpu,
+            SUM(sum_sq_cpu) / NULLIF(SUM(executions), 0) AS mean_sq_cpu,
+            SUM(sum_reads) / NULLIF(SUM(executions), 0) AS mean_reads,
+            SUM(sum_sq_reads) / NULLIF(SUM(executions), 0) AS mean_sq_reads,
+            COUNT(1) AS plan_count,
+            MAX(CASE WHEN plan_rank = 1 THEN plan_id END) AS dominant_plan_id
+        FROM Ranked
+        GROUP BY query_id
+        HAVING SUM(executions) >= :min_executions
+    )
+    SELECT
+        a.query_id,
+        q.query_hash,
+        OBJECT_NAME(q.object_id) AS object_name,
+        OBJECT_SCHEMA_NAME(q.object_id) AS schema_name,
+        LEFT(CAST(qt.query_sql_text AS NVARCHAR(MAX)), 4000) AS query_text,
+        a.total_executions,
+        a.mean_duration / 1000.0 AS avg_duration_ms,
+        SQRT(ABS(a.mean_sq_duration - SQUARE(a.mean_duration))) / 1000.0 AS stdev_duration_ms,
+        a.mean_cpu / 1000.0 AS avg_cpu_ms,
+        SQRT(ABS(a.mean_sq_cpu - SQUARE(a.mean_cpu))) / 1000.0 AS stdev_cpu_ms,
+        a.mean_reads AS avg_logical_reads,
+        SQRT(ABS(a.mean_sq_reads - SQUARE(a.mean_reads))) AS stdev_logical_reads,
+        a.plan_count,
+        a.dominant_plan_id
+    FROM QueryAgg a
+    JOIN sys.query_store_query q ON q.query_id = a.query_id
+    JOIN sys.query_store_query_text qt ON q.query_text_id = qt.query_text_id
+    """
+    
+    # Plan değişimi takibi (artımlı tarama)
+    # Yalnızca pencerede birden fazla planı olan sorgular; (query_id, plan_id, gün)
+    # bazında execution ağırlıklı toplamlar döner. Yalnızca kapanmış interval'ler
+    # okunur. :known_query_ids_json içindeki sorgular için :last_interval_id
+    # sonrası (delta), yeni sorgular için tüm pencere (backfill) getirilir.
+    PLAN_PERFORMANCE_DELTA = """
+    WITH MultiPlanQueries AS (
+        SELECT p.query_id
+        FROM sys.query_store_plan p
+        WHERE p.last_execution_time > DATEADD(day, -:days, SYSDATETIMEOFFSET())
+        GROUP BY p.query_id
+        HAVING COUNT(1) > 1
+    ),
+    KnownQueries AS (
+        SELECT DISTINCT query_id
+        FROM OPENJSON(:known_query_ids_json) WITH (query_id BIGINT '$')
+    )
+    SELECT
+        p.query_id,
+        p.plan_id,
+        p.query_plan_hash,
+        p.is_forced_plan,
+        p.force_failure_count,
+        CAST(rsi.start_time AS DATE) AS bucket_date,
+        MAX(rs.runtime_stats_interval_id) AS max_interval_id,
+        MIN(rs.first_execution_time) AS first_seen,
+        MAX(rs.last_execution_time) AS last_seen,
+        SUM(rs.count_executions) AS executions,
+        SUM(rs.avg_duration * rs.count_executions) AS sum_duration_us,
+        SUM(rs.avg_cpu_time * rs.count_executions) AS sum_cpu_us,
+        SUM(rs.avg_logical_io_reads * rs.count_executions) AS sum_logical_reads
+    FROM MultiPlanQueries m
+    JOIN sys.query_store_plan p ON p.query_id = m.query_id
+    JOIN sys.query_store_runtime_stats rs ON p.plan_id = rs.plan_id
+    JOIN sys.query_store_runtime_stats_interval rsi
+        ON rs.runtime_stats_interval_id = rsi.runtime_stats_interval_id
+    LEFT JOIN KnownQueries k ON k.query_id = p.query_id
+    WHERE rsi.start_time > DATEADD(day, -:days, SYSDATETIMEOFFSET())
+      AND rsi.end_time <= SYSDATETIMEOFFSET()
+      AND rs.runtime_stats_interval_id > CASE WHEN k.query_id IS NULL THEN 0 ELSE :last_interval_id END
+    GROUP BY p.query_id, p.plan_id, p.query_plan_hash, p.is_forced_plan,
+             p.force_failure_count, CAST(rsi.start_time AS DATE)
+    """
+
+    # Çoklu query_id için sorgu metni / nesne adı
+    QUERY_TEXT_BATCH = """
+    SELECT
+        q.query_id,
+        q.query_hash,
+        OBJECT_NAME(q.object_id) AS object_name,
+        OBJECT_SCHEMA_NAME(q.object_id) AS schema_name,
+        LEFT(CAST(qt.query_sql_text AS NVARCHAR(MAX)), 4000) AS query_text
+    FROM OPENJSON(:query_ids_json) WITH (query_id BIGINT '$') ids
+    JOIN sys.query_store_query q ON q.query_id = ids.query_id
+    JOIN sys.query_store_query_text qt ON q.query_text_id = qt.query_text_id
+    """
+    
     # ==========================================================================
     # EXECUTION PLAN SORGULARI
     # ==========================================================================
@@ -533,6 +825,81 @@ class QueryStoreQueries:
     ORDER BY p.usecounts DESC
     """
     
+    # Plan cache taraması: CPU'ya göre en pahalı N plan handle (XML'siz, hafif)
+    # Grant kolonları SQL Server 2016+ (13) sys.dm_exec_query_stats'ta mevcut
+    PLAN_CACHE_TOP_HANDLES = """
+    SELECT TOP (:top_n)
+        qs.plan_handle,
+        MAX(qs.query_plan_hash) AS query_plan_hash,
+        SUM(qs.execution_count) AS execution_count,
+        SUM(qs.total_worker_time) / 1000.0 AS total_cpu_ms,
+        SUM(qs.total_elapsed_time) / 1000.0 AS total_duration_ms,
+        SUM(qs.total_logical_reads) AS total_logical_reads,
+        MAX(qs.max_grant_kb) AS max_grant_kb,
+        MAX(qs.max_used_grant_kb) AS max_used_grant_kb,
+        MAX(qs.last_execution_time) AS last_execution_time
+    FROM sys.dm_exec_query_stats qs
+    GROUP BY qs.plan_handle
+    ORDER BY SUM(qs.total_worker_time) DESC
+    """
+    
+    PLAN_CACHE_TOP_HANDLES_LEGACY = """
+    SELECT TOP (:top_n)
+        qs.plan_handle,
+        MAX(qs.query_plan_hash) AS query_plan_hash,
+        SUM(qs.execution_count) AS execution_count,
+        SUM(qs.total_worker_time) / 1000.0 AS total_cpu_ms,
+        SUM(qs.total_elapsed_time) / 1000.0 AS total_duration_ms,
+        SUM(qs.total_logical_reads) AS total_logical_reads,
+        CAST(NULL AS BIGINT) AS max_grant_kb,
+        CAST(NULL AS BIGINT) AS max_used_grant_kb,
+        MAX(qs.last_execution_time) AS last_execution_time
+    FROM sys.dm_exec_query_stats qs
+    GROUP BY qs.plan_handle
+    ORDER BY SUM(qs.total_worker_time) DESC
+    """
+    
+    # Tek plan handle için plan XML'i (tarayıcı worker'ları tek tek çeker)
+    PLAN_CACHE_PLAN_XML = """
+    SELECT
+        CAST(qp.query_plan AS NVARCHAR(MAX)) AS query_plan_xml,
+        DB_NAME(qp.dbid) AS database_name,
+        OBJECT_NAME(qp.objectid, qp.dbid) AS object_name
+    FROM sys.dm_exec_query_plan(:plan_handle) qp
+    """
+    
+    # SQL Server 2019+: LAST_QUERY_PLAN_STATS açıksa son actual plan (spill / skew için)
+    PLAN_CACHE_PLAN_XML_WITH_STATS = """
+    SELECT
+        CAST(COALESCE(qps.query_plan, qp.query_plan) AS NVARCHAR(MAX)) AS query_plan_xml,
+        DB_NAME(qp.dbid) AS database_name,
+        OBJECT_NAME(qp.objectid, qp.dbid) AS object_name
+    FROM sys.dm_exec_query_plan(:plan_handle) qp
+    OUTER APPLY sys.dm_exec_query_plan_stats(:plan_handle) qps
+    """
+    
+    # Missing index DMV önerileri (konsolidasyon girdisi, aktif veritabanı)
+    MISSING_INDEX_DETAILS = """
+    SELECT TOP (:top_n)
+        mid.index_handle,
+        mid.statement,
+        DB_NAME(mid.database_id) AS database_name,
+        OBJECT_SCHEMA_NAME(mid.object_id, mid.database_id) AS schema_name,
+        OBJECT_NAME(mid.object_id, mid.database_id) AS table_name,
+        mid.equality_columns,
+        mid.inequality_columns,
+        mid.included_columns,
+        migs.user_seeks,
+        migs.user_scans,
+        migs.avg_user_impact,
+        migs.avg_total_user_cost
+    FROM sys.dm_db_missing_index_details mid
+    JOIN sys.dm_db_missing_index_groups mig ON mid.index_handle = mig.index_handle
+    JOIN sys.dm_db_missing_index_group_stats migs ON mig.index_group_handle = migs.group_handle
+    WHERE mid.database_id = DB_ID()
+    ORDER BY migs.avg_user_impact * (migs.user_seeks + migs.user_scans) DESC
+    """
+    
     # Plan operatör istatistikleri (Query Store 2017+)
     PLAN_OPERATOR_STATS = """
     SELECT 
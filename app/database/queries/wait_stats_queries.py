@@ -2,121 +2,20 @@
 Wait Statistics Queries - SQL Server wait analysis
 """
 
-import re
-from dataclasses import dataclass
-from enum import Enum
-from typing import Dict, List, Tuple
+# Kategori eşlemesi app.analysis.wait_categories'te (bağımlılıksız); mevcut import'lar için yeniden dışa aktarılır
+from app.analysis.wait_categories import (
+    CATEGORY_COLORS,
+    WAIT_CATEGORIES,
+    CompiledPatternMatcher,
+    WaitCategory,
+    WaitCategoryPattern,
+    WaitCategoryResolver,
+    get_category_color,
+    get_wait_category,
+    resolve_wait_category_text,
+)
 
 
-class WaitCategory(Enum):
-    """Wait type categories"""
-    CPU = "CPU"
-    IO = "I/O"
-    LOCK = "Lock"
-    LATCH = "Latch"
-    MEMORY = "Memory"
-    NETWORK = "Network"
-    BUFFER = "Buffer"
-    CLR = "CLR"
-    OTHER = "Other"
-
-
-# Wait type to category mapping
-WAIT_CATEGORIES: Dict[str, WaitCategory] = {
-    # CPU waits
-    'SOS_SCHEDULER_YIELD': WaitCategory.CPU,
-    'THREADPOOL': WaitCategory.CPU,
-    'CXPACKET': WaitCategory.CPU,
-    'CXCONSUMER': WaitCategory.CPU,
-    'CXSYNC_PORT': WaitCategory.CPU,
-    'CXSYNC_CONSUMER': WaitCategory.CPU,
-    'EXCHANGE': WaitCategory.CPU,
-    
-    # I/O waits
-    'PAGEIOLATCH_SH': WaitCategory.IO,
-    'PAGEIOLATCH_EX': WaitCategory.IO,
-    'PAGEIOLATCH_UP': WaitCategory.IO,
-    'PAGEIOLATCH_DT': WaitCategory.IO,
-    'PAGEIOLATCH_NL': WaitCategory.IO,
-    'PAGEIOLATCH_KP': WaitCategory.IO,
-    'WRITELOG': WaitCategory.IO,
-    'IO_COMPLETION': WaitCategory.IO,
-    'ASYNC_IO_COMPLETION': WaitCategory.IO,
-    'ASYNC_NETWORK_IO': WaitCategory.NETWORK,
-    'BACKUPIO': WaitCategory.IO,
-    'BACKUPBUFFER': WaitCategory.IO,
-    
-    # Lock waits
-    'LCK_M_S': WaitCategory.LOCK,
-    'LCK_M_X': WaitCategory.LOCK,
-    'LCK_M_U': WaitCategory.LOCK,
-    'LCK_M_IS': WaitCategory.LOCK,
-    'LCK_M_IX': WaitCategory.LOCK,
-    'LCK_M_SIU': WaitCategory.LOCK,
-    'LCK_M_SIX': WaitCategory.LOCK,
-    'LCK_M_UIX': WaitCategory.LOCK,
-    'LCK_M_BU': WaitCategory.LOCK,
-    'LCK_M_RS_S': WaitCategory.LOCK,
-    'LCK_M_RS_U': WaitCategory.LOCK,
-    'LCK_M_RIn_NL': WaitCategory.LOCK,
-    'LCK_M_SCH_S': WaitCategory.LOCK,
-    'LCK_M_SCH_M': WaitCategory.LOCK,
-    
-    # Latch waits
-    'PAGELATCH_SH': WaitCategory.LATCH,
-    'PAGELATCH_EX': WaitCategory.LATCH,
-    'PAGELATCH_UP': WaitCategory.LATCH,
-    'PAGELATCH_DT': WaitCategory.LATCH,
-    'PAGELATCH_NL': WaitCategory.LATCH,
-    'PAGELATCH_KP': WaitCategory.LATCH,
-    'LATCH_SH': WaitCategory.LATCH,
-    'LATCH_EX': WaitCategory.LATCH,
-    'LATCH_UP': WaitCategory.LATCH,
-    'LATCH_DT': WaitCategory.LATCH,
-    'LATCH_NL': WaitCategory.LATCH,
-    
-    # Memory waits
-    'RESOURCE_SEMAPHORE': WaitCategory.MEMORY,
-    'RESOURCE_SEMAPHORE_QUERY_COMPILE': WaitCategory.MEMORY,
-    'RESOURCE_SEMAPHORE_MUTEX': WaitCategory.MEMORY,
-    'CMEMTHREAD': WaitCategory.MEMORY,
-    'SOS_RESERVEDMEMBLOCKLIST': WaitCategory.MEMORY,
-    
-    # Buffer waits
-    'BUFFER': WaitCategory.BUFFER,
-    'DBMIRROR_DBM_MUTEX': WaitCategory.BUFFER,
-    
-    # Network waits
-    'ASYNC_NETWORK_IO': WaitCategory.NETWORK,
-    'NET_WAITFOR_PACKET': WaitCategory.NETWORK,
-    
-    # CLR waits
-    'CLR_AUTO_EVENT': WaitCategory.CLR,
-    'CLR_CRST': WaitCategory.CLR,
-    'CLR_JOIN': WaitCategory.CLR,
-    'CLR_MANUAL_EVENT': WaitCategory.CLR,
-    'CLR_MEMORY_SPY': WaitCategory.CLR,
-    'CLR_MONITOR': WaitCategory.CLR,
-    'CLR_RWLOCK_READER': WaitCategory.CLR,
-    'CLR_RWLOCK_WRITER': WaitCategory.CLR,
-    'CLR_SEMAPHORE': WaitCategory.CLR,
-    'CLR_TASK_START': WaitCategory.CLR,
-}
-
-
-# Category colors for UI
-CATEGORY_COLORS: Dict[WaitCategory, str] = {
-    WaitCategory.CPU: "#EF4444",      # Red
-    WaitCategory.IO: "#F59E0B",       # Amber
-    WaitCategory.LOCK: "#8B5CF6",     # Purple
-    WaitCategory.LATCH: "#EC4899",    # Pink
-    WaitCategory.MEMORY: "#3B82F6",   # Blue
-    WaitCategory.NETWORK: "#10B981",  # Green
-    WaitCategory.BUFFER: "#6366F1",   # Indigo
-    WaitCategory.CLR: "#14B8A6",      # Teal
-    WaitCategory.OTHER: "#64748B",    # Slate
-}
-
 
 class WaitStatsQueries:
     """SQL queries for Wait Statistics"""
@@ -207,6 +106,23 @@ class WaitStatsQueries:
     ORDER BY wait_time_ms DESC
     """
     
+    # Raw cumulative counters for interval deltas (superset of WAITS_BY_CATEGORY).
+    # sqlserver_start_time lets the delta engine detect instance restarts.
+    WAIT_COUNTERS = f"""
+    SELECT
+        ws.wait_type,
+        ws.waiting_tasks_count,
+        ws.wait_time_ms,
+        ws.signal_wait_time_ms,
+        ws.max_wait_time_ms,
+        si.sqlserver_start_time
+    FROM sys.dm_os_wait_stats ws
+    CROSS JOIN sys.dm_os_sys_info si
+    WHERE ws.wait_type NOT IN ({BENIGN_WAITS})
+      AND ws.wait_time_ms > 0
+    ORDER BY ws.wait_time_ms DESC
+    """
+
     # Current waiting tasks
     CURRENT_WAITS = """
     SELECT 
@@ -232,6 +148,26 @@ class WaitStatsQueries:
     ORDER BY r.wait_time DESC
     """
 
+    # Minimal waiting-tasks projection for the sub-second sampler (kept narrow on purpose)
+    WAITING_TASKS_SAMPLE = f"""
+    SELECT TOP (256)
+        wt.session_id,
+        wt.wait_type,
+        wt.wait_duration_ms,
+        wt.blocking_session_id,
+        LEFT(wt.resource_description, 128) AS resource_description
+    FROM sys.dm_os_waiting_tasks wt
+    WHERE wt.session_id IS NOT NULL
+      AND wt.session_id <> @@SPID
+      AND wt.wait_type NOT IN ({BENIGN_WAITS})
+    OPTION (MAXDOP 1)
+    """
+
+    # Single round-trip snapshot for live monitoring:
+    #   1) raw wait counters (summary / ratio / top-N / categories are derived client-side)
+    #   2) currently waiting requests
+    WAIT_SNAPSHOT_BATCH = WAIT_COUNTERS + ";\n" + CURRENT_WAITS
+
     # Signal vs Resource wait ratio
     SIGNAL_VS_RESOURCE = f"""
     SELECT 
@@ -306,109 +242,71 @@ class WaitStatsQueries:
     ORDER BY d.trend_date ASC, d.total_wait_ms DESC
     """
 
-
-@dataclass(frozen=True)
-class WaitCategoryPattern:
-    category: WaitCategory
-    pattern: str
-
-
-class WaitCategoryResolver:
-    """
-    Category resolver with exact-match priority and regex pattern fallback.
+    # Extended Events telemetry session (SQL Server 2012+; wait_completed needs 2014+).
+    # Templates are formatted with session_name / min_wait_ms / target_clause.
+    XE_SESSION_STATE = """
+    SELECT
+        CAST(CASE WHEN EXISTS (SELECT 1 FROM sys.server_event_sessions WHERE name = :session_name) THEN 1 ELSE 0 END AS BIT) AS session_exists,
+        CAST(CASE WHEN EXISTS (SELECT 1 FROM sys.dm_xe_sessions WHERE name = :session_name) THEN 1 ELSE 0 END AS BIT) AS session_running,
+        (
+            SELECT TOP (1) t.name
+            FROM sys.server_event_session_targets t
+            JOIN sys.server_event_sessions s ON s.event_session_id = t.event_session_id
+            WHERE s.name = :session_name
+            ORDER BY t.target_id
+        ) AS session_target
     """
 
-    _PATTERNS: Tuple[WaitCategoryPattern, ...] = (
-        WaitCategoryPattern(WaitCategory.CPU, r"(SOS_SCHEDULER|THREADPOOL|CXPACKET|CXCONSUMER|CXSYNC|SCHEDULER|CPU)"),
-        WaitCategoryPattern(WaitCategory.IO, r"(PAGEIO|WRITELOG|IO_COMPLETION|ASYNC_IO|DISK|OTHER DISK|LOG IO|\bI/?O\b)"),
-        WaitCategoryPattern(WaitCategory.LOCK, r"(^LCK_|LOCK|DEADLOCK)"),
-        WaitCategoryPattern(WaitCategory.LATCH, r"(PAGELATCH|LATCH_|LATCH)"),
-        WaitCategoryPattern(WaitCategory.MEMORY, r"(RESOURCE_SEMAPHORE|CMEMTHREAD|MEMORY|GRANT)"),
-        WaitCategoryPattern(WaitCategory.NETWORK, r"(ASYNC_NETWORK_IO|NETWORK|PACKET|NET_)"),
-        WaitCategoryPattern(WaitCategory.BUFFER, r"(BUFFER|BPOOL|BUFFER LATCH)"),
-        WaitCategoryPattern(WaitCategory.CLR, r"(^CLR_|SQL CLR|CLR)"),
+    XE_CREATE_SESSION_TEMPLATE = """
+    CREATE EVENT SESSION [{session_name}] ON SERVER
+    ADD EVENT sqlos.wait_completed (
+        ACTION (sqlserver.session_id, sqlserver.database_id)
+        WHERE duration >= {min_wait_ms} AND sqlserver.is_system = 0
+    ),
+    ADD EVENT sqlserver.blocked_process_report (
+        ACTION (sqlserver.database_id)
+    ),
+    ADD EVENT sqlserver.xml_deadlock_report
+    ADD TARGET {target_clause}
+    WITH (
+        MAX_MEMORY = 4096 KB,
+        EVENT_RETENTION_MODE = ALLOW_SINGLE_EVENT_LOSS,
+        MAX_DISPATCH_LATENCY = 5 SECONDS,
+        STARTUP_STATE = OFF
     )
+    """
 
-    # Query Store wait category descriptions and common textual aliases.
-    _CATEGORY_TEXT_ALIASES: Dict[str, WaitCategory] = {
-        "CPU": WaitCategory.CPU,
-        "PARALLELISM": WaitCategory.CPU,
-        "WORKER THREAD": WaitCategory.CPU,
-        "LOCK": WaitCategory.LOCK,
-        "LATCH": WaitCategory.LATCH,
-        "BUFFER LATCH": WaitCategory.BUFFER,
-        "BUFFER IO": WaitCategory.IO,
-        "TRAN LOG IO": WaitCategory.IO,
-        "OTHER DISK IO": WaitCategory.IO,
-        "NETWORK IO": WaitCategory.NETWORK,
-        "MEMORY": WaitCategory.MEMORY,
-        "SQL CLR": WaitCategory.CLR,
-        "CLR": WaitCategory.CLR,
-        "PREEMPTIVE": WaitCategory.OTHER,
-        "IDLE": WaitCategory.OTHER,
-        "USER WAIT": WaitCategory.OTHER,
-        "UNKNOWN": WaitCategory.OTHER,
-        "TRACING": WaitCategory.OTHER,
-        "SERVICE BROKER": WaitCategory.OTHER,
-        "TRANSACTION": WaitCategory.OTHER,
-        "REPLICATION": WaitCategory.OTHER,
-        "MIRRORING": WaitCategory.OTHER,
-        "COMPILATION": WaitCategory.CPU,
-        "LOG RATE GOVERNOR": WaitCategory.IO,
-    }
-
-    def __init__(self):
-        self._exact_map = dict(WAIT_CATEGORIES)
-        for key, value in list(WAIT_CATEGORIES.items()):
-            self._exact_map[str(key).upper()] = value
-        self._text_alias_map = {
-            str(key).strip().upper(): value
-            for key, value in self._CATEGORY_TEXT_ALIASES.items()
-        }
-        self._compiled_rules: List[Tuple[WaitCategory, re.Pattern[str]]] = [
-            (rule.category, re.compile(rule.pattern, re.IGNORECASE))
-            for rule in self._PATTERNS
-        ]
-
-    def resolve(self, wait_type_or_text: str) -> WaitCategory:
-        raw = str(wait_type_or_text or "").strip()
-        if not raw:
-            return WaitCategory.OTHER
-
-        direct = self._exact_map.get(raw)
-        if direct:
-            return direct
-        direct = self._exact_map.get(raw.upper())
-        if direct:
-            return direct
-
-        alias = self._text_alias_map.get(raw.upper())
-        if alias:
-            return alias
-
-        for category, pattern in self._compiled_rules:
-            if pattern.search(raw):
-                return category
-        return WaitCategory.OTHER
-
-
-_WAIT_CATEGORY_RESOLVER = WaitCategoryResolver()
-
-
-def get_wait_category(wait_type: str) -> WaitCategory:
-    """Get category for a wait type"""
-    return _WAIT_CATEGORY_RESOLVER.resolve(wait_type)
+    XE_RING_BUFFER_TARGET = "package0.ring_buffer (SET max_events_limit = {max_events}, max_memory = 4096)"
+    XE_EVENT_FILE_TARGET = (
+        "package0.event_file (SET filename = N'{file_name}.xel', max_file_size = 16, max_rollover_files = 4)"
+    )
 
+    XE_START_SESSION_TEMPLATE = "ALTER EVENT SESSION [{session_name}] ON SERVER STATE = START"
+    XE_STOP_SESSION_TEMPLATE = "ALTER EVENT SESSION [{session_name}] ON SERVER STATE = STOP"
+    XE_DROP_SESSION_TEMPLATE = "DROP EVENT SESSION [{session_name}] ON SERVER"
 
-def resolve_wait_category_text(category_text: str) -> WaitCategory:
+    # Whole ring buffer as text; events are streamed and filtered client-side
+    XE_READ_RING_BUFFER = """
+    SELECT CAST(t.target_data AS NVARCHAR(MAX)) AS target_data
+    FROM sys.dm_xe_sessions s
+    JOIN sys.dm_xe_session_targets t ON s.address = t.event_session_address
+    WHERE s.name = :session_name
+      AND t.target_name = 'ring_buffer'
     """
-    Resolve category text (from Query Store / UI labels) into WaitCategory.
 
-    This resolver is intentionally heuristic and case-insensitive.
+    # Incremental event_file read; the function skips everything up to (and including) the offset
+    XE_READ_EVENT_FILE = """
+    SELECT
+        CAST(event_data AS NVARCHAR(MAX)) AS event_data,
+        file_name,
+        file_offset
+    FROM sys.fn_xe_file_target_read_file(:file_pattern, NULL, :initial_file_name, :initial_offset)
     """
-    return _WAIT_CATEGORY_RESOLVER.resolve(category_text)
-
 
-def get_category_color(category: WaitCategory) -> str:
-    """Get color for a wait category"""
-    return CATEGORY_COLORS.get(category, CATEGORY_COLORS[WaitCategory.OTHER])
+    XE_READ_EVENT_FILE_FROM_START = """
+    SELECT
+        CAST(event_data AS NVARCHAR(MAX)) AS event_data,
+        file_name,
+        file_offset
+    FROM sys.fn_xe_file_target_read_file(:file_pattern, NULL, NULL, NULL)
+    """
@@ -0,0 +1,318 @@
+"""
+SQL Performance AI Platform - Headless Collector
+
+Runs scheduled wait-stats / dashboard collection for saved connection profiles
+without the GUI, writing to the same data directory (history, telemetry,
+scheduled reports, /metrics registry) the desktop app reads. Intended for
+24/7 collection on a jump host; open the GUI only to analyze.
+
+Usage:
+    python -m app.headless                      # profiles from settings (all if empty)
+    python -m app.headless -p PROD01 -p PROD02  # explicit profiles (name or id)
+    python -m app.headless --once               # single collection pass, then exit
+"""
+
+import argparse
+import signal
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from time import monotonic
+from typing import Dict, List, Optional, Sequence
+
+# Add app to path for imports
+APP_DIR = Path(__file__).parent
+if str(APP_DIR.parent) not in sys.path:
+    sys.path.insert(0, str(APP_DIR.parent))
+
+from app.core.config import ensure_app_dirs, get_settings
+from app.core.logger import get_logger, setup_logging
+from app.database.connection import DatabaseConnection, bind_thread_connection, get_connection_manager
+from app.models.connection_profile import ConnectionProfile
+from app.services.connection_store import get_connection_store
+from app.services.dashboard_service import get_dashboard_service
+from app.services.wait_stats_service import get_wait_stats_service
+
+logger = get_logger('headless')
+
+MAX_RECONNECT_BACKOFF_SECONDS = 300.0
+REPORT_TREND_DAYS = 7
+
+
+@dataclass
+class _ProfileState:
+    """Scheduling state of one profile inside the collector loop."""
+
+    profile: ConnectionProfile
+    connection: Optional[DatabaseConnection] = None
+    # Set by a job that saw the connection drop; handled on the scheduler thread
+    connection_lost: bool = False
+    next_connect_at: float = 0.0
+    reconnect_backoff: float = 5.0
+    next_wait_at: float = 0.0
+    next_dashboard_at: float = 0.0
+    last_report_at: Optional[datetime] = None
+    jobs: Dict[str, Future] = field(default_factory=dict)
+
+    def busy(self, job: str) -> bool:
+        future = self.jobs.get(job)
+        return future is not None and not future.done()
+
+
+class HeadlessCollector:
+    """
+    Profile scheduler backed by one shared worker pool.
+
+    Connections are opened/closed on the scheduler thread; each collection job
+    runs on a pool thread with its profile's connection bound to that thread,
+    so the singleton services collect for several servers concurrently. A job
+    is never queued twice for the same profile while the previous one runs.
+    """
+
+    def __init__(
+        self,
+        profiles: Sequence[ConnectionProfile],
+        wait_interval_seconds: float = 300.0,
+        dashboard_interval_seconds: float = 60.0,
+        max_workers: int = 4,
+        collect_dashboard: bool = True,
+        write_reports: bool = True,
+    ) -> None:
+        self._states = [_ProfileState(profile=profile) for profile in profiles]
+        self.wait_interval_seconds = max(1.0, float(wait_interval_seconds))
+        self.dashboard_interval_seconds = max(1.0, float(dashboard_interval_seconds))
+        self.collect_dashboard = bool(collect_dashboard)
+        self.write_reports = bool(write_reports)
+        self._pool = ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix='headless-collect')
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def run(self, once: bool = False) -> int:
+        """Run until ``stop()`` (or a single pass when ``once``); returns an exit code."""
+        if not self._states:
+            logger.error("No connection profiles to collect")
+            return 2
+        logger.info(
+            f"Headless collector started for {len(self._states)} profile(s) "
+            f"(wait every {self.wait_interval_seconds:.0f}s, dashboard every {self.dashboard_interval_seconds:.0f}s)"
+        )
+        try:
+            if once:
+                return self._run_once()
+            while not self._stop.is_set():
+                self._tick(monotonic())
+                self._stop.wait(1.0)
+            return 0
+        finally:
+            self._shutdown()
+
+    def _run_once(self) -> int:
+        now = monotonic()
+        for state in self._states:
+            self._ensure_connected(state, now)
+        self._tick(now)
+        futures = [future for state in self._states for future in state.jobs.values()]
+        for future in futures:
+            future.result()
+        connected = sum(1 for state in self._states if state.connection is not None and not state.connection_lost)
+        return 0 if connected == len(self._states) else 1
+
+    def _tick(self, now: float) -> None:
+        for state in self._states:
+            if not self._ensure_connected(state, now):
+                continue
+            if now >= state.next_wait_at and not state.busy('wait'):
+                state.next_wait_at = now + self.wait_interval_seconds
+                state.jobs['wait'] = self._pool.submit(self._collect_wait, state)
+            if self.collect_dashboard and now >= state.next_dashboard_at and not state.busy('dashboard'):
+                state.next_dashboard_at = now + self.dashboard_interval_seconds
+                state.jobs['dashboard'] = self._pool.submit(self._collect_dashboard, state)
+
+    def _ensure_connected(self, state: _ProfileState, now: float) -> bool:
+        conn = state.connection
+        if conn is not None and conn.is_connected and not state.connection_lost:
+            return True
+        if any(state.busy(job) for job in state.jobs):
+            return False
+        profile = state.profile
+        conn_mgr = get_connection_manager()
+        if state.connection_lost:
+            # A job saw the server drop: release the pool now, reconnect after backoff
+            state.connection_lost = False
+            self._schedule_reconnect(state, now)
+            logger.warning(f"Connection lost for {profile.name}, reconnect in {state.next_connect_at - now:.0f}s")
+            if conn is not None:
+                conn_mgr.disconnect(profile.id)
+                state.connection = None
+            return False
+        if now < state.next_connect_at:
+            return False
+        if conn is not None:
+            # Dropped connection: release its pool before reconnecting
+            conn_mgr.disconnect(profile.id)
+            state.connection = None
+        try:
+            state.connection = conn_mgr.connect(profile)
+            state.reconnect_backoff = 5.0
+            logger.info(f"Connected: {profile.name} ({profile.server}/{profile.database})")
+            return True
+        except Exception as e:
+            state.connection = None
+            logger.warning(f"Connect failed for {profile.name}, retry in {state.reconnect_backoff:.0f}s: {e}")
+            self._schedule_reconnect(state, now)
+            return False
+
+    @staticmethod
+    def _schedule_reconnect(state: _ProfileState, now: float) -> None:
+        state.next_connect_at = now + state.reconnect_backoff
+        state.reconnect_backoff = min(MAX_RECONNECT_BACKOFF_SECONDS, state.reconnect_backoff * 2)
+
+    def _collect_wait(self, state: _ProfileState) -> None:
+        """Wait snapshot (+ history/telemetry/alerts/metrics) and due scheduled reports."""
+        service = get_wait_stats_service()
+        try:
+            with bind_thread_connection(state.connection):
+                summary, metrics = service.get_wait_summary_with_metrics()
+                service.record_refresh_telemetry(metrics)
+                if metrics.connection_lost:
+                    logger.warning(f"Wait collection lost connection: {state.profile.name}")
+                    state.connection_lost = True
+                    return
+                alerts = service.evaluate_threshold_alerts(summary, None)
+                if self.write_reports:
+                    self._write_reports_if_due(service, state, summary, alerts)
+        except Exception as e:
+            logger.error(f"Wait collection failed for {state.profile.name}: {e}", exc_info=True)
+
+    def _write_reports_if_due(self, service, state: _ProfileState, summary, alerts) -> None:
+        config = service.load_schedule_config()
+        if not config.enabled:
+            return
+        now = datetime.now()
+        interval_seconds = max(1, int(config.interval_minutes or 15)) * 60
+        if state.last_report_at is not None and (now - state.last_report_at).total_seconds() < interval_seconds:
+            return
+        state.last_report_at = now
+        trend_points, _source = service.get_historical_trend(REPORT_TREND_DAYS)
+        export_payload = service.build_export_payload(
+            summary=summary,
+            waits_to_render=list(summary.top_waits or []),
+            signatures=service.analyze_wait_signatures(summary),
+            baseline=service.compare_to_baseline(summary),
+            trend_points=trend_points,
+            trend_days=REPORT_TREND_DAYS,
+            alerts=alerts,
+            comparative=service.compare_before_after(),
+            custom_category_rules=service.load_custom_category_rules(),
+            custom_category_breakdown=service.build_custom_category_breakdown(list(summary.top_waits or [])),
+            multi_server=service.get_multi_server_wait_comparison(days=REPORT_TREND_DAYS),
+        )
+        service.append_scheduled_snapshot(summary)
+        reports = service.write_automated_reports(export_payload, config=config)
+        logger.info(f"Scheduled wait reports written for {state.profile.name}: {len(reports)} file(s)")
+
+    def _collect_dashboard(self, state: _ProfileState) -> None:
+        try:
+            with bind_thread_connection(state.connection):
+                get_dashboard_service().get_all_metrics()
+        except Exception as e:
+            logger.error(f"Dashboard collection failed for {state.profile.name}: {e}", exc_info=True)
+
+    def _shutdown(self) -> None:
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        get_connection_manager().disconnect_all()
+        logger.info("Headless collector stopped")
+
+
+def resolve_profiles(selectors: Sequence[str]) -> List[ConnectionProfile]:
+    """Profiles by id or name; all saved profiles when ``selectors`` is empty."""
+    store = get_connection_store()
+    if not selectors:
+        return store.get_all()
+    profiles: List[ConnectionProfile] = []
+    for selector in selectors:
+        profile = store.get(selector) or store.get_by_name(selector)
+        if profile is None:
+            logger.warning(f"Connection profile not found: {selector}")
+        elif profile not in profiles:
+            profiles.append(profile)
+    return profiles
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='python -m app.headless',
+        description='Collect wait stats and dashboard metrics on schedule without the GUI.',
+    )
+    parser.add_argument('-p', '--profile', action='append', default=[], help='Profile name or id (repeatable)')
+    parser.add_argument('--wait-interval', type=int, help='Wait stats collection interval (seconds)')
+    parser.add_argument('--dashboard-interval', type=int, help='Dashboard collection interval (seconds)')
+    parser.add_argument('--workers', type=int, help='Shared worker pool size')
+    parser.add_argument('--no-dashboard', action='store_true', help='Skip dashboard collection')
+    parser.add_argument('--no-reports', action='store_true', help='Skip scheduled wait reports')
+    parser.add_argument('--once', action='store_true', help='Run a single collection pass and exit')
+    parser.add_argument('--list-profiles', action='store_true', help='List saved profiles and exit')
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Headless collector entry point"""
+    args = build_arg_parser().parse_args(argv)
+
+    ensure_app_dirs()
+    settings = get_settings()
+    setup_logging(
+        level=settings.logging.level,
+        log_dir=settings.logs_dir,
+        file_enabled=settings.logging.file_enabled,
+        max_file_size_mb=settings.logging.max_file_size_mb,
+        backup_count=settings.logging.backup_count,
+        retention_days=settings.logging.retention_days,
+    )
+
+    if args.list_profiles:
+        for profile in get_connection_store().get_all():
+            print(f"{profile.id}  {profile.name}  {profile.server}/{profile.database}")
+        return 0
+
+    cfg = settings.headless
+    profiles = resolve_profiles(args.profile or cfg.profiles)
+    collector = HeadlessCollector(
+        profiles,
+        wait_interval_seconds=args.wait_interval or cfg.wait_interval_seconds,
+        dashboard_interval_seconds=args.dashboard_interval or cfg.dashboard_interval_seconds,
+        max_workers=args.workers or cfg.max_workers,
+        collect_dashboard=cfg.collect_dashboard and not args.no_dashboard,
+        write_reports=cfg.write_reports and not args.no_reports,
+    )
+
+    def _request_stop(signum, _frame) -> None:
+        logger.info(f"Signal {signum} received, stopping headless collector")
+        collector.stop()
+
+    signal.signal(signal.SIGINT, _request_stop)
+    signal.signal(signal.SIGTERM, _request_stop)
+
+    # Optional Prometheus scrape endpoint (serves cached metrics only)
+    if settings.metrics.enabled:
+        try:
+            from app.services.metrics_exporter import start_metrics_endpoint
+            start_metrics_endpoint(settings.metrics.host, settings.metrics.port)
+        except Exception as e:
+            logger.warning(f"Metrics endpoint failed to start: {e}")
+
+    try:
+        return collector.run(once=args.once)
+    finally:
+        if settings.metrics.enabled:
+            from app.services.metrics_exporter import stop_metrics_endpoint
+            stop_metrics_endpoint()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -63,6 +63,14 @@ def main() -> int:
     logger.info(f"Starting {__app_name__} v{__version__}")
     logger.info(f"App directory: {app_dir}")
     logger.info(f"Python version: {sys.version}")
+
+    # Optional Prometheus scrape endpoint (serves cached metrics only)
+    if settings.metrics.enabled:
+        try:
+            from app.services.metrics_exporter import start_metrics_endpoint
+            start_metrics_endpoint(settings.metrics.host, settings.metrics.port)
+        except Exception as e:
+            logger.warning(f"Metrics endpoint failed to start: {e}")
     
     # Create Qt application
     app = QApplication(sys.argv)
@@ -173,6 +181,10 @@ def main() -> int:
     # Run event loop
     exit_code = app.exec()
 
+    if settings.metrics.enabled:
+        from app.services.metrics_exporter import stop_metrics_endpoint
+        stop_metrics_endpoint()
+
     logger.info(f"Application exiting with code: {exit_code}")
     return exit_code
 
@@ -7,7 +7,7 @@ Section 24.4 ve 24.8'deki tanımlara uygun olarak tasarlanmıştır.
 
 from typing import Optional, List, Dict, Any
 from dataclasses import dataclass, field
-from datetime import datetime
+from datetime import date, datetime
 from enum import Enum
 
 
@@ -111,6 +111,11 @@ class QueryMetrics:
     # Trend bilgisi
     trend_coefficient: float = 1.0  # >1 kötüleşme, <1 iyileşme
     change_percent: float = 0.0     # Yüzdelik değişim
+    trend_slope: float = 0.0        # Günlük eğim (ms/gün)
+    trend_volatility: float = 0.0   # Coefficient of variation
+    change_point_date: Optional[date] = None
+    regression_score: float = 0.0
+    is_regressing: bool = False
     
     @property
     def p95_duration_ms(self) -> float:
@@ -175,6 +180,10 @@ class QueryStats:
     first_compile_time: Optional[datetime] = None
     last_compile_time: Optional[datetime] = None
     
+    # Ad-hoc gruplama (SQL fingerprint)
+    fingerprint: str = ""
+    fingerprint_group_size: int = 1
+    
     @property
     def priority(self) -> QueryPriority:
         """
@@ -270,7 +279,11 @@ class QueryStats:
             return "Adhoc Query"
 
         text = raw[:50]
-        return text + "..." if len(raw) > 50 else text
+        text = text + "..." if len(raw) > 50 else text
+        # Fingerprint grubu: literal farkıyla birleşen varyant sayısı
+        if int(self.fingerprint_group_size or 1) > 1:
+            return f"{text} (×{int(self.fingerprint_group_size)} variants)"
+        return text
     
     @property
     def trend_direction(self) -> str:
@@ -306,7 +319,7 @@ class QueryStats:
                 "trend": {
                     "duration_change_percent": round(self.metrics.change_percent, 2),
                     "direction": "increasing" if self.metrics.change_percent > 0 else "decreasing",
-                    "regression_detected": self.metrics.change_percent > 30,
+                    "regression_detected": self.metrics.is_regressing or self.metrics.change_percent > 30,
                 },
                 
                 "wait_profile": {
@@ -323,6 +336,128 @@ class QueryStats:
         }
 
 
+@dataclass
+class WindowMetricDelta:
+    """Tek metrik için baseline/recent pencere karşılaştırması"""
+    metric: str
+    baseline_avg: float = 0.0
+    recent_avg: float = 0.0
+    baseline_stdev: float = 0.0
+    recent_stdev: float = 0.0
+    change_percent: float = 0.0
+    z_score: float = 0.0
+    is_significant: bool = False
+
+    @property
+    def delta(self) -> float:
+        return self.recent_avg - self.baseline_avg
+
+
+@dataclass
+class QueryRegression:
+    """
+    Workload geneli regresyon sonucu (iki zaman penceresi karşılaştırması)
+    """
+    query_id: int
+    query_hash: str = ""
+    query_text: str = ""
+    object_name: Optional[str] = None
+    schema_name: Optional[str] = None
+    baseline_executions: int = 0
+    recent_executions: int = 0
+    duration: Optional[WindowMetricDelta] = None
+    cpu: Optional[WindowMetricDelta] = None
+    logical_reads: Optional[WindowMetricDelta] = None
+    baseline_plan_id: Optional[int] = None
+    recent_plan_id: Optional[int] = None
+    baseline_plan_count: int = 0
+    recent_plan_count: int = 0
+    impact_ms: float = 0.0          # (recent - baseline) avg duration × recent executions
+    is_regression: bool = False
+
+    @property
+    def plan_changed(self) -> bool:
+        """Baskın plan pencereler arasında değişti mi?"""
+        return (
+            self.baseline_plan_id is not None
+            and self.recent_plan_id is not None
+            and int(self.baseline_plan_id) != int(self.recent_plan_id)
+        )
+
+    @property
+    def display_name(self) -> str:
+        if self.object_name:
+            if self.schema_name:
+                return f"{self.schema_name}.{self.object_name}"
+            return str(self.object_name)
+        text = str(self.query_text or "").strip()
+        if not text:
+            return f"Query #{self.query_id}"
+        return text[:50] + ("..." if len(text) > 50 else "")
+
+    @property
+    def significant_metrics(self) -> List[str]:
+        return [
+            m.metric for m in (self.duration, self.cpu, self.logical_reads)
+            if m is not None and m.is_significant and m.change_percent > 0
+        ]
+
+
+@dataclass
+class PlanPerformance:
+    """Tek planın pencere içindeki execution ağırlıklı performansı"""
+    plan_id: int
+    plan_hash: str = ""
+    is_forced: bool = False
+    force_failure_count: int = 0
+    first_seen: Optional[datetime] = None
+    last_seen: Optional[datetime] = None
+    executions: int = 0
+    avg_duration_ms: float = 0.0
+    avg_cpu_ms: float = 0.0
+    avg_logical_reads: float = 0.0
+
+
+@dataclass
+class PlanChangeImpact:
+    """
+    Birden fazla planı olan sorgu için plan değişimi / forced plan etkisi
+    """
+    query_id: int
+    plans: List[PlanPerformance] = field(default_factory=list)
+    current_plan_id: Optional[int] = None     # En son kullanılan plan
+    best_plan_id: Optional[int] = None        # En düşük avg duration (yeterli execution ile)
+    forced_plan_id: Optional[int] = None
+    worse_ratio: float = 1.0                  # current / best avg duration
+    is_plan_flip: bool = False                # Güncel plan best plana göre X kat kötü
+    is_forcing_candidate: bool = False
+    forced_plan_regressed: bool = False       # Forced plan, alternatifinden X kat kötü
+    impact_ms: float = 0.0                    # (current - best) avg duration × current executions
+    query_hash: str = ""
+    query_text: str = ""
+    object_name: Optional[str] = None
+    schema_name: Optional[str] = None
+
+    def get_plan(self, plan_id: Optional[int]) -> Optional[PlanPerformance]:
+        if plan_id is None:
+            return None
+        for plan in self.plans:
+            if int(plan.plan_id) == int(plan_id):
+                return plan
+        return None
+
+    @property
+    def display_name(self) -> str:
+        if self.object_name:
+            if self.schema_name:
+                return f"{self.schema_name}.{self.object_name}"
+            return str(self.object_name)
+        text = str(self.query_text or "").strip()
+        if not text:
+            return f"Query #{self.query_id}"
+        return text[:50] + ("..." if len(text) > 50 else "")
+
+
 @dataclass
 class QueryStoreStatus:
     """
@@ -2,13 +2,15 @@
 Dashboard Service - Server monitoring metrics
 """
 
-from typing import Optional, Dict, Any
-from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, Tuple
+from dataclasses import dataclass, field, fields
 from datetime import datetime
+from threading import Lock
 
 from app.database.connection import get_connection_manager
 from app.database.queries.dashboard_queries import DashboardQueries
 from app.core.logger import get_logger
+from app.services.metrics_exporter import metric, pool_samples, publish_metrics
 
 logger = get_logger('services.dashboard')
 
@@ -120,14 +122,9 @@ class DashboardService:
     """
     
     _instance: Optional['DashboardService'] = None
-    _last_batch_requests: int = 0
-    _last_batch_time: Optional[datetime] = None
-    _last_transactions: int = 0
-    _last_transactions_time: Optional[datetime] = None
-    _last_compilations: int = 0
-    _last_compilations_time: Optional[datetime] = None
-    _last_recompilations: int = 0
-    _last_recompilations_time: Optional[datetime] = None
+    # Cumulative counter baselines keyed by (server, counter) for per-second rates
+    _rate_baselines: Dict[Tuple[str, str], Tuple[int, datetime]] = {}
+    _rate_lock = Lock()
     
     def __new__(cls):
         if cls._instance is None:
@@ -253,8 +250,43 @@ class DashboardService:
         except Exception as e:
             logger.error(f"Error collecting dashboard metrics: {e}")
         
+        self._publish_scrape_metrics(conn, metrics)
         return metrics
-    
+
+    def _publish_scrape_metrics(self, conn, metrics: DashboardMetrics) -> None:
+        """Cache the refreshed values for the /metrics endpoint (no extra queries)."""
+        server = str(getattr(getattr(conn, 'profile', None), 'server', '') or 'unknown')
+        samples = [
+            metric('sqlperf_dashboard_metric', value, metric=item.name)
+            for item in fields(metrics)
+            for value in (getattr(metrics, item.name),)
+            if isinstance(value, (int, float)) and not isinstance(value, bool)
+        ]
+        publish_metrics('dashboard', server, samples)
+        # Pool sağlığı bellekten okunur; bağlı tüm sunucular için yayınlanır
+        for other in get_connection_manager().connections.values():
+            other_server = str(getattr(getattr(other, 'profile', None), 'server', '') or 'unknown')
+            try:
+                publish_metrics('pool', other_server, pool_samples(other.get_pool_health() or {}))
+            except Exception as e:
+                logger.debug(f"Pool metrics publish failed for {other_server}: {e}")
+    
+    def _counter_rate(self, conn, counter: str, current_value: int) -> int:
+        """Per-second rate of a cumulative perf counter since the previous read on the same server."""
+        server = str(getattr(getattr(conn, 'profile', None), 'server', '') or 'unknown')
+        current_time = datetime.now()
+        with self._rate_lock:
+            previous = self._rate_baselines.get((server, counter))
+            self._rate_baselines[(server, counter)] = (current_value, current_time)
+        if previous is None:
+            return 0
+        last_value, last_time = previous
+        elapsed = (current_time - last_time).total_seconds()
+        # Counter reset or wrap restarts the baseline
+        if last_value <= 0 or elapsed <= 0 or current_value < last_value:
+            return 0
+        return int((current_value - last_value) / elapsed)
+
     def _get_active_sessions(self, conn) -> int:
         """Get active session count"""
         try:
@@ -307,19 +339,7 @@ class DashboardService:
             result = conn.execute_query(DashboardQueries.BATCH_REQUESTS)
             if result:
                 current_value = result[0].get('batch_requests_total', 0) or 0
-                current_time = datetime.now()
-                
-                if self._last_batch_requests > 0 and self._last_batch_time:
-                    elapsed = (current_time - self._last_batch_time).total_seconds()
-                    if elapsed > 0:
-                        batch_per_sec = int((current_value - self._last_batch_requests) / elapsed)
-                        self._last_batch_requests = current_value
-                        self._last_batch_time = current_time
-                        return max(0, batch_per_sec)
-                
-                self._last_batch_requests = current_value
-                self._last_batch_time = current_time
-                return 0
+                return self._counter_rate(conn, 'batch_requests', current_value)
         except Exception as e:
             logger.warning(f"Error getting batch requests: {e}")
         return 0
@@ -592,25 +612,7 @@ class DashboardService:
             result = conn.execute_query(query)
             if result:
                 current_value = result[0].get('transactions_per_sec', 0) or 0
-                current_time = datetime.now()
-
-                if self._last_transactions > 0 and self._last_transactions_time:
-                    elapsed = (current_time - self._last_transactions_time).total_seconds()
-                    if elapsed > 0:
-                        delta = current_value - self._last_transactions
-                        if delta < 0:
-                            # Counter reset or wrap; restart baseline
-                            self._last_transactions = current_value
-                            self._last_transactions_time = current_time
-                            return 0
-                        tx_per_sec = int(delta / elapsed)
-                        self._last_transactions = current_value
-                        self._last_transactions_time = current_time
-                        return max(0, tx_per_sec)
-
-                self._last_transactions = current_value
-                self._last_transactions_time = current_time
-                return 0
+                return self._counter_rate(conn, 'transactions', current_value)
         except Exception as e:
             logger.warning(f"Error getting transactions/sec: {e}")
         return 0
@@ -627,24 +629,7 @@ class DashboardService:
             result = conn.execute_query(query)
             if result:
                 current_value = result[0].get('compilations_total', 0) or 0
-                current_time = datetime.now()
-
-                if self._last_compilations > 0 and self._last_compilations_time:
-                    elapsed = (current_time - self._last_compilations_time).total_seconds()
-                    if elapsed > 0:
-                        delta = current_value - self._last_compilations
-                        if delta < 0:
-                            self._last_compilations = current_value
-                            self._last_compilations_time = current_time
-                            return 0
-                        per_sec = int(delta / elapsed)
-                        self._last_compilations = current_value
-                        self._last_compilations_time = current_time
-                        return max(0, per_sec)
-
-                self._last_compilations = current_value
-                self._last_compilations_time = current_time
-                return 0
+                return self._counter_rate(conn, 'compilations', current_value)
         except Exception as e:
             logger.warning(f"Error getting compilations/sec: {e}")
         return 0
@@ -661,24 +646,7 @@ class DashboardService:
             result = conn.execute_query(query)
             if result:
                 current_value = result[0].get('recompilations_total', 0) or 0
-                current_time = datetime.now()
-
-                if self._last_recompilations > 0 and self._last_recompilations_time:
-                    elapsed = (current_time - self._last_recompilations_time).total_seconds()
-                    if elapsed > 0:
-                        delta = current_value - self._last_recompilations
-                        if delta < 0:
-                            self._last_recompilations = current_value
-                            self._last_recompilations_time = current_time
-                            return 0
-                        per_sec = int(delta / elapsed)
-                        self._last_recompilations = current_value
-                        self._last_recompilations_time = current_time
-                        return max(0, per_sec)
-
-                self._last_recompilations = current_value
-                self._last_recompilations_time = current_time
-                return 0
+                return self._counter_rate(conn, 'recompilations', current_value)
         except Exception as e:
             logger.warning(f"Error getting re-compilations/sec: {e}")
         return 0
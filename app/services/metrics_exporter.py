@@ -0,0 +1,328 @@
+"""
+Metrics Exporter - embedded Prometheus scrape endpoint
+
+Services publish values they have already collected (wait refresh, dashboard
+refresh, pool health, Query Statistics load telemetry) into a process-wide
+registry. The registry renders and UTF-8 encodes the exposition body once per
+publish; a scrape only hands out those cached bytes, so ``GET /metrics`` never
+runs a DMV query and costs nothing on the database side.
+
+The HTTP server runs on a daemon thread with no Qt dependency, so the same
+registry can be served by the desktop app or a headless process.
+"""
+
+from __future__ import annotations
+
+import gzip
+import math
+import threading
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core.logger import get_logger
+
+logger = get_logger("services.metrics_exporter")
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_METRICS_HOST = "127.0.0.1"
+DEFAULT_METRICS_PORT = 9187
+
+# name -> (type, help); names that are not listed are exported as untyped.
+METRIC_FAMILIES: Dict[str, Tuple[str, str]] = {
+    "sqlperf_wait_total_wait_time_ms": ("gauge", "Cumulative wait time since counters were reset (ms)."),
+    "sqlperf_wait_signal_percent": ("gauge", "Signal wait share of total wait time (%)."),
+    "sqlperf_wait_resource_percent": ("gauge", "Resource wait share of total wait time (%)."),
+    "sqlperf_wait_category_wait_time_ms": ("gauge", "Cumulative wait time per wait category (ms)."),
+    "sqlperf_wait_interval_wait_ms_per_second": ("gauge", "Wait time accrued per second over the last refresh interval."),
+    "sqlperf_wait_current_waiting_tasks": ("gauge", "Tasks waiting at the last refresh."),
+    "sqlperf_wait_blocked_sessions": ("gauge", "Blocked sessions in the last wait chain analysis."),
+    "sqlperf_wait_chain_depth": ("gauge", "Deepest blocking chain in the last wait chain analysis."),
+    "sqlperf_wait_alert_count": ("gauge", "Wait alerts currently firing."),
+    "sqlperf_wait_alert_state": ("gauge", "Wait alert rule state (1 for the reported state)."),
+    "sqlperf_wait_refresh_duration_ms": ("gauge", "Duration of the last wait stats refresh (ms)."),
+    "sqlperf_dashboard_metric": ("gauge", "Dashboard server health metric from the last dashboard refresh."),
+    "sqlperf_pool_size": ("gauge", "Connection pool size."),
+    "sqlperf_pool_checked_out": ("gauge", "Connections currently checked out of the pool."),
+    "sqlperf_pool_overflow": ("gauge", "Pool overflow connections in use."),
+    "sqlperf_pool_capacity": ("gauge", "Pool size plus max overflow."),
+    "sqlperf_pool_utilization_percent": ("gauge", "Checked-out connections relative to capacity (%)."),
+    "sqlperf_pool_exhausted": ("gauge", "1 when every pooled connection is checked out."),
+    "sqlperf_query_stats_loads_total": ("counter", "Query Statistics loads by outcome."),
+    "sqlperf_query_stats_load_time_ms": ("gauge", "Query Statistics load time over the recent window (ms)."),
+    "sqlperf_query_stats_error_rate": ("gauge", "Query Statistics load error rate over the process lifetime."),
+    "sqlperf_exporter_last_publish_timestamp_seconds": ("gauge", "Unix time each source last published for a server."),
+}
+
+
+@dataclass(frozen=True)
+class MetricSample:
+    """One exposition line: metric name, label pairs and value."""
+
+    name: str
+    value: float
+    labels: Tuple[Tuple[str, str], ...] = ()
+
+
+def metric(name: str, value: float, **labels: object) -> MetricSample:
+    return MetricSample(
+        name=name,
+        value=float(value or 0.0),
+        labels=tuple((str(k), str(v)) for k, v in labels.items()),
+    )
+
+
+def _escape_label_value(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def render_prometheus_text(samples: Iterable[MetricSample], include_metadata: bool = True) -> str:
+    """Render samples in text exposition format, grouped by metric family."""
+    families: Dict[str, List[MetricSample]] = {}
+    for item in samples:
+        families.setdefault(item.name, []).append(item)
+
+    lines: List[str] = []
+    for name, items in families.items():
+        if include_metadata and name in METRIC_FAMILIES:
+            metric_type, help_text = METRIC_FAMILIES[name]
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+        for item in items:
+            if item.labels:
+                label_text = ",".join(f'{key}="{_escape_label_value(val)}"' for key, val in item.labels)
+                lines.append(f"{name}{{{label_text}}} {_format_value(item.value)}")
+            else:
+                lines.append(f"{name} {_format_value(item.value)}")
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+class MetricsRegistry:
+    """
+    Latest published samples per (source, server), pre-rendered for scraping.
+
+    ``publish`` replaces the whole sample set of one source/server pair and
+    re-encodes the exposition body; the gzip variant is compressed on first
+    demand and cached until the next publish.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._sets: Dict[Tuple[str, str], Tuple[float, List[MetricSample]]] = {}
+        self._body: bytes = b""
+        self._gzip_body: Optional[bytes] = None
+        self._version = 0
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def publish(self, source: str, server: Optional[str], samples: Iterable[MetricSample]) -> None:
+        """Replace the sample set of ``source`` for ``server`` (None: process-wide, no server label)."""
+        source_key = str(source or "app")
+        server_key = str(server or "")
+        prefix: Tuple[Tuple[str, str], ...] = (("server", server_key),) if server_key else ()
+        labelled = [MetricSample(item.name, item.value, prefix + tuple(item.labels)) for item in samples]
+        with self._lock:
+            self._sets[(source_key, server_key)] = (time(), labelled)
+            self._render_locked()
+
+    def drop_server(self, server: str) -> None:
+        server_key = str(server or "")
+        if not server_key:
+            return
+        with self._lock:
+            stale = [key for key in self._sets if key[1] == server_key]
+            if not stale:
+                return
+            for key in stale:
+                self._sets.pop(key, None)
+            self._render_locked()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sets.clear()
+            self._render_locked()
+
+    def _render_locked(self) -> None:
+        ordered: List[MetricSample] = []
+        freshness: List[MetricSample] = []
+        for (source, server), (published_at, samples) in sorted(self._sets.items()):
+            ordered.extend(samples)
+            labels = ((("server", server),) if server else ()) + (("source", source),)
+            freshness.append(
+                MetricSample("sqlperf_exporter_last_publish_timestamp_seconds", round(published_at, 3), labels)
+            )
+        self._body = render_prometheus_text(ordered + freshness).encode("utf-8")
+        self._gzip_body = None
+        self._version += 1
+
+    def exposition(self, compressed: bool = False) -> bytes:
+        with self._lock:
+            if not compressed:
+                return self._body
+            if self._gzip_body is None:
+                self._gzip_body = gzip.compress(self._body, compresslevel=5)
+            return self._gzip_body
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry
+    server_version = "SpStudioProMetrics/1.0"
+
+    def _respond(self, send_body: bool) -> None:
+        path = self.path.split("?", 1)[0]
+        if path == "/metrics":
+            accepts_gzip = "gzip" in str(self.headers.get("Accept-Encoding", "") or "").lower()
+            body = self.registry.exposition(compressed=accepts_gzip)
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE_LATEST)
+            if accepts_gzip:
+                self.send_header("Content-Encoding", "gzip")
+        elif path in ("/", "/health"):
+            body = b"ok\n" if path == "/health" else b"<html><body><a href=\"/metrics\">/metrics</a></body></html>\n"
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; charset=utf-8" if path == "/health" else "text/html")
+        else:
+            body = b"not found\n"
+            self.send_response(404)
+            self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server API
+        self._respond(send_body=True)
+
+    def do_HEAD(self) -> None:  # noqa: N802 - http.server API
+        self._respond(send_body=False)
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        logger.debug(f"metrics endpoint: {format % args}")
+
+
+class MetricsEndpoint:
+    """Background-thread HTTP server exposing a registry at /metrics."""
+
+    def __init__(
+        self,
+        registry: MetricsRegistry,
+        host: str = DEFAULT_METRICS_HOST,
+        port: int = DEFAULT_METRICS_PORT,
+    ) -> None:
+        self._registry = registry
+        self._host = str(host or DEFAULT_METRICS_HOST)
+        self._port = int(port)
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        if self._server is not None:
+            host, port = self._server.server_address[:2]
+            return str(host), int(port)
+        return self._host, self._port
+
+    def start(self) -> bool:
+        if self.is_running:
+            return True
+        handler = type("MetricsRequestHandler", (_MetricsRequestHandler,), {"registry": self._registry})
+        try:
+            server = ThreadingHTTPServer((self._host, self._port), handler)
+        except OSError as ex:
+            logger.warning(f"Metrics endpoint could not bind {self._host}:{self._port}: {ex}")
+            return False
+        server.daemon_threads = True
+        self._server = server
+        self._thread = threading.Thread(target=server.serve_forever, name="MetricsEndpoint", daemon=True)
+        self._thread.start()
+        host, port = self.address
+        logger.info(f"Metrics endpoint listening on http://{host}:{port}/metrics")
+        return True
+
+    def stop(self, timeout: float = 2.0) -> None:
+        server = self._server
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+        self._server = None
+        self._thread = None
+
+
+def pool_samples(health: Dict[str, object]) -> List[MetricSample]:
+    """Map DatabaseConnection.get_pool_health() output to pool gauges."""
+    if not health or not bool(health.get("pool_available", False)):
+        return []
+    return [
+        metric("sqlperf_pool_size", float(health.get("pool_size", 0) or 0)),
+        metric("sqlperf_pool_checked_out", float(health.get("checked_out", 0) or 0)),
+        metric("sqlperf_pool_overflow", float(health.get("overflow", 0) or 0)),
+        metric("sqlperf_pool_capacity", float(health.get("capacity", 0) or 0)),
+        metric("sqlperf_pool_utilization_percent", float(health.get("utilization_pct", 0.0) or 0.0)),
+        metric("sqlperf_pool_exhausted", 1.0 if health.get("is_exhausted") else 0.0),
+    ]
+
+
+_registry: Optional[MetricsRegistry] = None
+_endpoint: Optional[MetricsEndpoint] = None
+_singleton_lock = threading.Lock()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """Get the process-wide MetricsRegistry instance"""
+    global _registry
+    if _registry is None:
+        with _singleton_lock:
+            if _registry is None:
+                _registry = MetricsRegistry()
+    return _registry
+
+
+def publish_metrics(source: str, server: Optional[str], samples: Iterable[MetricSample]) -> None:
+    """Best-effort publish; exporter failures must never break a refresh."""
+    try:
+        get_metrics_registry().publish(source, server, samples)
+    except Exception as ex:
+        logger.debug(f"Metrics publish failed [{source}/{server}]: {ex}")
+
+
+def start_metrics_endpoint(host: str = DEFAULT_METRICS_HOST, port: int = DEFAULT_METRICS_PORT) -> Optional[MetricsEndpoint]:
+    global _endpoint
+    with _singleton_lock:
+        if _endpoint is not None and _endpoint.is_running:
+            return _endpoint
+        endpoint = MetricsEndpoint(get_metrics_registry(), host=host, port=port)
+        if not endpoint.start():
+            return None
+        _endpoint = endpoint
+        return endpoint
+
+
+def stop_metrics_endpoint() -> None:
+    global _endpoint
+    with _singleton_lock:
+        if _endpoint is not None:
+            _endpoint.stop()
+        _endpoint = None
+
+
+def get_metrics_endpoint() -> Optional[MetricsEndpoint]:
+    return _endpoint
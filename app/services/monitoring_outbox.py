@@ -0,0 +1,611 @@
+"""
+Monitoring Outbox - durable, batched, asynchronous metric push delivery
+
+Push payloads are first appended to an on-disk outbox and delivered later by a
+background asyncio loop, so a slow or unreachable target never blocks the
+refresh cycle and nothing is lost across restarts.
+
+Delivery:
+    - one pooled httpx.AsyncClient; targets are flushed concurrently
+    - json targets: up to ``batch_size`` queued snapshots per request
+      (a single snapshot is posted as-is, several as {"snapshots": [...]})
+    - prometheus targets: gauges only need the newest sample, so older queued
+      snapshots for the same target are coalesced into the latest one
+    - transient failures (network, 408/429/5xx) retry with exponential backoff;
+      permanent 4xx, unknown targets and exhausted retries go to a dead-letter JSONL
+
+Store:
+    the outbox file is an append-only journal: "put" lines carry new entries,
+    "retry" lines update attempt state and "ack" lines tombstone delivered or
+    dead-lettered entries. Replaying the journal on load rebuilds the queue; it
+    is compacted (rewritten with only the live entries) once dead lines dominate.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import random
+import threading
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from time import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from app.core.logger import get_logger
+
+logger = get_logger("services.monitoring_outbox")
+
+MAX_OUTBOX_ENTRIES = 5000
+MAX_DEAD_LETTER_ENTRIES = 2000
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_MAX_ATTEMPTS = 8
+DEFAULT_BASE_BACKOFF_SECONDS = 2.0
+DEFAULT_MAX_BACKOFF_SECONDS = 300.0
+DEFAULT_MAX_CONNECTIONS = 8
+RETRYABLE_STATUS_CODES = frozenset({408, 425, 429})
+# Journal bu satır sayısını ve canlı kaydın iki katını aşınca sıkıştırılır
+COMPACT_MIN_JOURNAL_LINES = 1000
+# Bekleyen kayıt yokken arka plan döngüsünün uyanma aralığı
+_IDLE_WAKE_SECONDS = 30.0
+
+
+@dataclass
+class OutboxEntry:
+    """One queued snapshot for one target."""
+
+    entry_id: str
+    target: str
+    payload_format: str
+    payload: Any
+    created_at: str = field(default_factory=lambda: datetime.now().isoformat(timespec="seconds"))
+    attempts: int = 0
+    next_attempt_at: float = 0.0
+    last_error: str = ""
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "entry_id": self.entry_id,
+            "target": self.target,
+            "payload_format": self.payload_format,
+            "payload": self.payload,
+            "created_at": self.created_at,
+            "attempts": int(self.attempts),
+            "next_attempt_at": float(self.next_attempt_at),
+            "last_error": self.last_error,
+        }
+
+    @classmethod
+    def from_dict(cls, item: Dict[str, Any]) -> Optional["OutboxEntry"]:
+        entry_id = str(item.get("entry_id", "") or "")
+        target = str(item.get("target", "") or "")
+        if not entry_id or not target:
+            return None
+        return cls(
+            entry_id=entry_id,
+            target=target,
+            payload_format=str(item.get("payload_format", "json") or "json").lower(),
+            payload=item.get("payload"),
+            created_at=str(item.get("created_at", "") or ""),
+            attempts=int(item.get("attempts", 0) or 0),
+            next_attempt_at=float(item.get("next_attempt_at", 0.0) or 0.0),
+            last_error=str(item.get("last_error", "") or ""),
+        )
+
+
+@dataclass
+class OutboxDeliveryResult:
+    """Outcome of one delivery pass."""
+
+    delivered: int = 0
+    coalesced: int = 0
+    retried: int = 0
+    dead_lettered: int = 0
+    requests: int = 0
+    pending: int = 0
+    results: List[Dict[str, Any]] = field(default_factory=list)
+
+    def merge(self, other: "OutboxDeliveryResult") -> None:
+        self.delivered += other.delivered
+        self.coalesced += other.coalesced
+        self.retried += other.retried
+        self.dead_lettered += other.dead_lettered
+        self.requests += other.requests
+        self.results.extend(other.results)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "delivered": self.delivered,
+            "coalesced": self.coalesced,
+            "retried": self.retried,
+            "dead_lettered": self.dead_lettered,
+            "requests": self.requests,
+            "pending": self.pending,
+            "results": list(self.results),
+        }
+
+
+class MonitoringOutbox:
+    """
+    Persistent outbox with an asynchronous delivery loop.
+
+    ``resolve_targets`` returns the currently configured targets (objects with
+    name/url/payload_format/enabled/headers); it is consulted at delivery time
+    so header secrets are never written to the outbox file and removed targets
+    are dead-lettered instead of retried forever.
+    """
+
+    def __init__(
+        self,
+        store_path: Path,
+        dead_letter_path: Path,
+        resolve_targets: Callable[[], Iterable[Any]],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        base_backoff_seconds: float = DEFAULT_BASE_BACKOFF_SECONDS,
+        max_backoff_seconds: float = DEFAULT_MAX_BACKOFF_SECONDS,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        request_timeout_seconds: float = 5.0,
+        client_factory: Optional[Callable[[], Any]] = None,
+    ) -> None:
+        self._store_path = Path(store_path)
+        self._dead_letter_path = Path(dead_letter_path)
+        self._resolve_targets = resolve_targets
+        self.batch_size = max(1, int(batch_size))
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_backoff_seconds = max(0.0, float(base_backoff_seconds))
+        self.max_backoff_seconds = max(self.base_backoff_seconds, float(max_backoff_seconds))
+        self.max_connections = max(1, int(max_connections))
+        self.request_timeout_seconds = max(0.5, float(request_timeout_seconds))
+        self._client_factory = client_factory
+        self._lock = threading.Lock()
+        self._inflight: set = set()
+        self._target_overrides: Dict[str, Any] = {}
+        self._journal_lines = 0
+        self._entries: List[OutboxEntry] = self._load()
+        with self._lock:
+            self._maybe_compact_locked()
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._client: Optional[Any] = None
+        self._stopping = False
+        self._last_result = OutboxDeliveryResult()
+
+    # ------------------------------------------------------------------ store
+
+    def _load(self) -> List[OutboxEntry]:
+        """Replay the journal; lines without an "op" are puts (pre-journal files)."""
+        if not self._store_path.exists():
+            return []
+        entries: Dict[str, OutboxEntry] = {}
+        lines = 0
+        try:
+            with open(self._store_path, "r", encoding="utf-8") as handle:
+                for line in handle:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    lines += 1
+                    try:
+                        record = json.loads(line)
+                    except Exception:
+                        continue
+                    if not isinstance(record, dict):
+                        continue
+                    op = str(record.get("op", "put") or "put")
+                    if op == "ack":
+                        for entry_id in record.get("ids") or []:
+                            entries.pop(str(entry_id), None)
+                    elif op == "retry":
+                        entry = entries.get(str(record.get("entry_id", "") or ""))
+                        if entry is not None:
+                            entry.attempts = int(record.get("attempts", entry.attempts) or 0)
+                            entry.next_attempt_at = float(record.get("next_attempt_at", 0.0) or 0.0)
+                            entry.last_error = str(record.get("last_error", "") or "")
+                    else:
+                        entry = OutboxEntry.from_dict(record)
+                        if entry is not None:
+                            entries[entry.entry_id] = entry
+        except Exception as ex:
+            logger.warning(f"Monitoring outbox could not be loaded: {ex}")
+        self._journal_lines = lines
+        return list(entries.values())
+
+    def _append_locked(self, records: List[Dict[str, Any]]) -> None:
+        if not records:
+            return
+        try:
+            with open(self._store_path, "a", encoding="utf-8") as handle:
+                handle.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records))
+            self._journal_lines += len(records)
+        except Exception as ex:
+            logger.warning(f"Monitoring outbox journal write failed: {ex}")
+            return
+        self._maybe_compact_locked()
+
+    def _ack_locked(self, ids: Iterable[str]) -> None:
+        ids = list(ids)
+        if ids:
+            self._append_locked([{"op": "ack", "ids": ids}])
+
+    def _maybe_compact_locked(self) -> None:
+        if self._journal_lines > max(COMPACT_MIN_JOURNAL_LINES, 2 * len(self._entries)):
+            self._compact_locked()
+
+    def _compact_locked(self) -> None:
+        """Rewrite the journal with only the live entries (one put line each)."""
+        tmp_path = self._store_path.with_suffix(self._store_path.suffix + ".tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as handle:
+                for entry in self._entries:
+                    handle.write(json.dumps({"op": "put", **entry.to_dict()}, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self._store_path)
+            self._journal_lines = len(self._entries)
+        except Exception as ex:
+            logger.warning(f"Monitoring outbox could not be compacted: {ex}")
+
+    def _dead_letter_locked(self, entries: Iterable[OutboxEntry], reason: str) -> int:
+        count = 0
+        try:
+            with open(self._dead_letter_path, "a", encoding="utf-8") as handle:
+                for entry in entries:
+                    record = entry.to_dict()
+                    record["dead_lettered_at"] = datetime.now().isoformat(timespec="seconds")
+                    record["reason"] = reason
+                    handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    count += 1
+        except Exception as ex:
+            logger.warning(f"Monitoring dead-letter write failed: {ex}")
+        if count:
+            self._trim_dead_letters_locked()
+        return count
+
+    def _trim_dead_letters_locked(self) -> None:
+        try:
+            with open(self._dead_letter_path, "r", encoding="utf-8") as handle:
+                lines = handle.readlines()
+            if len(lines) <= MAX_DEAD_LETTER_ENTRIES:
+                return
+            with open(self._dead_letter_path, "w", encoding="utf-8") as handle:
+                handle.writelines(lines[-MAX_DEAD_LETTER_ENTRIES:])
+        except Exception as ex:
+            logger.debug(f"Failed to trim monitoring dead-letter file: {ex}")
+
+    # ---------------------------------------------------------------- queue
+
+    def enqueue(self, target: str, payload_format: str, payload: Any) -> OutboxEntry:
+        entry = OutboxEntry(
+            entry_id=uuid.uuid4().hex,
+            target=str(target or ""),
+            payload_format=str(payload_format or "json").strip().lower(),
+            payload=payload,
+        )
+        with self._lock:
+            self._entries.append(entry)
+            self._append_locked([{"op": "put", **entry.to_dict()}])
+            overflow = len(self._entries) - MAX_OUTBOX_ENTRIES
+            if overflow > 0:
+                dropped = [item for item in self._entries if item.entry_id not in self._inflight][:overflow]
+                dropped_ids = {item.entry_id for item in dropped}
+                self._entries = [item for item in self._entries if item.entry_id not in dropped_ids]
+                self._dead_letter_locked(dropped, "outbox overflow")
+                self._ack_locked(item.entry_id for item in dropped)
+        return entry
+
+    def remember_targets(self, targets: Iterable[Any]) -> None:
+        """Register ad-hoc targets (not in the persisted config) for delivery."""
+        with self._lock:
+            for target in targets or []:
+                name = str(getattr(target, "name", "") or "")
+                if name:
+                    self._target_overrides[name] = target
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def dead_letter_count(self) -> int:
+        if not self._dead_letter_path.exists():
+            return 0
+        try:
+            with open(self._dead_letter_path, "r", encoding="utf-8") as handle:
+                return sum(1 for line in handle if line.strip())
+        except Exception:
+            return 0
+
+    @property
+    def last_result(self) -> OutboxDeliveryResult:
+        return self._last_result
+
+    def _backoff_seconds(self, attempts: int) -> float:
+        delay = min(self.max_backoff_seconds, self.base_backoff_seconds * (2 ** max(0, attempts - 1)))
+        return delay * random.uniform(0.8, 1.2)
+
+    def _next_due_delay(self) -> float:
+        with self._lock:
+            if not self._entries:
+                return _IDLE_WAKE_SECONDS
+            due = min(entry.next_attempt_at for entry in self._entries)
+        return min(_IDLE_WAKE_SECONDS, max(0.05, due - time()))
+
+    def _claim_due_batches(self) -> Dict[str, List[OutboxEntry]]:
+        now = time()
+        batches: Dict[str, List[OutboxEntry]] = {}
+        with self._lock:
+            for entry in self._entries:
+                if entry.entry_id in self._inflight or entry.next_attempt_at > now:
+                    continue
+                bucket = batches.setdefault(entry.target, [])
+                if len(bucket) < self.batch_size:
+                    bucket.append(entry)
+            for bucket in batches.values():
+                self._inflight.update(entry.entry_id for entry in bucket)
+        return batches
+
+    def _resolved_targets(self) -> Dict[str, Any]:
+        try:
+            targets = {str(getattr(t, "name", "") or ""): t for t in (self._resolve_targets() or [])}
+        except Exception as ex:
+            logger.warning(f"Monitoring targets could not be resolved: {ex}")
+            targets = {}
+        with self._lock:
+            for name, target in self._target_overrides.items():
+                targets.setdefault(name, target)
+        return targets
+
+    # -------------------------------------------------------------- delivery
+
+    def _new_client(self) -> Any:
+        if self._client_factory is not None:
+            return self._client_factory()
+        import httpx
+
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(self.request_timeout_seconds),
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            ),
+        )
+
+    @staticmethod
+    def _batch_body(fmt: str, entries: List[OutboxEntry]) -> Any:
+        if fmt == "prometheus":
+            return str(entries[-1].payload or "")
+        if len(entries) == 1:
+            return entries[0].payload
+        return {
+            "batch_id": uuid.uuid4().hex,
+            "count": len(entries),
+            "snapshots": [entry.payload for entry in entries],
+        }
+
+    async def _deliver_target(
+        self,
+        client: Any,
+        target_name: str,
+        entries: List[OutboxEntry],
+        target: Any,
+    ) -> OutboxDeliveryResult:
+        result = OutboxDeliveryResult()
+        if target is None:
+            self._finish(entries, delivered=False, error="target removed", permanent=True, result=result)
+            result.results.append({"target": target_name, "status": "dead-letter", "error": "target removed"})
+            return result
+        if not bool(getattr(target, "enabled", True)):
+            self._release(entries)
+            result.results.append({"target": target_name, "status": "skipped", "error": "target disabled"})
+            return result
+
+        fmt = str(getattr(target, "payload_format", "json") or "json").strip().lower()
+        headers = dict(getattr(target, "headers", None) or {})
+        body = self._batch_body(fmt, entries)
+        result.requests = 1
+        try:
+            if fmt == "prometheus":
+                headers.setdefault("Content-Type", "text/plain; version=0.0.4")
+                resp = await client.post(
+                    str(target.url),
+                    content=str(body).encode("utf-8"),
+                    headers=headers,
+                    timeout=self.request_timeout_seconds,
+                )
+            else:
+                headers.setdefault("Content-Type", "application/json")
+                resp = await client.post(
+                    str(target.url),
+                    json=body,
+                    headers=headers,
+                    timeout=self.request_timeout_seconds,
+                )
+            code = int(resp.status_code)
+        except Exception as ex:
+            self._finish(entries, delivered=False, error=str(ex) or type(ex).__name__, permanent=False, result=result)
+            result.results.append({"target": target_name, "status": "retry", "batch": len(entries), "error": str(ex)})
+            return result
+
+        if code < 400:
+            self._finish(entries, delivered=True, error="", permanent=False, result=result)
+            if fmt == "prometheus":
+                result.coalesced += len(entries) - 1
+            result.results.append({"target": target_name, "status": "success", "code": code, "batch": len(entries)})
+            return result
+
+        permanent = code < 500 and code not in RETRYABLE_STATUS_CODES
+        error = f"HTTP {code}: {str(getattr(resp, 'text', '') or '')[:400]}"
+        self._finish(entries, delivered=False, error=error, permanent=permanent, result=result)
+        result.results.append(
+            {
+                "target": target_name,
+                "status": "dead-letter" if permanent else "retry",
+                "code": code,
+                "batch": len(entries),
+                "error": error,
+            }
+        )
+        return result
+
+    def _release(self, entries: List[OutboxEntry]) -> None:
+        with self._lock:
+            for entry in entries:
+                self._inflight.discard(entry.entry_id)
+
+    def _finish(
+        self,
+        entries: List[OutboxEntry],
+        delivered: bool,
+        error: str,
+        permanent: bool,
+        result: OutboxDeliveryResult,
+    ) -> None:
+        ids = {entry.entry_id for entry in entries}
+        with self._lock:
+            if delivered:
+                result.delivered += len(entries)
+                self._entries = [item for item in self._entries if item.entry_id not in ids]
+                self._ack_locked(entry.entry_id for entry in entries)
+            else:
+                dead: List[OutboxEntry] = []
+                retries: List[Dict[str, Any]] = []
+                # Batch üyeleri birlikte yeniden denensin diye gecikme bir kez hesaplanır
+                retry_at = time() + self._backoff_seconds(max(entry.attempts for entry in entries) + 1)
+                for entry in entries:
+                    entry.attempts += 1
+                    entry.last_error = error[:400]
+                    if permanent or entry.attempts >= self.max_attempts:
+                        dead.append(entry)
+                    else:
+                        entry.next_attempt_at = retry_at
+                        result.retried += 1
+                        retries.append(
+                            {
+                                "op": "retry",
+                                "entry_id": entry.entry_id,
+                                "attempts": entry.attempts,
+                                "next_attempt_at": entry.next_attempt_at,
+                                "last_error": entry.last_error,
+                            }
+                        )
+                if dead:
+                    dead_ids = {entry.entry_id for entry in dead}
+                    self._entries = [item for item in self._entries if item.entry_id not in dead_ids]
+                    result.dead_lettered += self._dead_letter_locked(dead, error or "delivery failed")
+                    retries.append({"op": "ack", "ids": [entry.entry_id for entry in dead]})
+                self._append_locked(retries)
+            self._inflight.difference_update(ids)
+
+    async def deliver_due(self, client: Optional[Any] = None) -> OutboxDeliveryResult:
+        """Deliver every due batch concurrently; safe to call from any event loop."""
+        batches = self._claim_due_batches()
+        total = OutboxDeliveryResult()
+        if batches:
+            targets = self._resolved_targets()
+            own_client = client is None
+            active = self._new_client() if own_client else client
+            try:
+                outcomes = await asyncio.gather(
+                    *(
+                        self._deliver_target(active, name, entries, targets.get(name))
+                        for name, entries in batches.items()
+                    ),
+                    return_exceptions=True,
+                )
+            finally:
+                if own_client:
+                    await active.aclose()
+            for (name, entries), outcome in zip(batches.items(), outcomes):
+                if isinstance(outcome, BaseException):
+                    self._release(entries)
+                    total.results.append({"target": name, "status": "failed", "error": str(outcome)})
+                    continue
+                total.merge(outcome)
+        total.pending = self.pending_count()
+        self._last_result = total
+        return total
+
+    # ------------------------------------------------------ background loop
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> bool:
+        if self.is_running:
+            return True
+        self._stopping = False
+        ready = threading.Event()
+        self._thread = threading.Thread(
+            target=self._thread_main,
+            args=(ready,),
+            name="MonitoringOutbox",
+            daemon=True,
+        )
+        self._thread.start()
+        ready.wait(timeout=2.0)
+        return self.is_running
+
+    def _thread_main(self, ready: threading.Event) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        try:
+            loop.run_until_complete(self._run(ready))
+        except Exception as ex:
+            logger.warning(f"Monitoring outbox loop stopped: {ex}")
+        finally:
+            self._loop = None
+            self._wake = None
+            loop.close()
+
+    async def _run(self, ready: threading.Event) -> None:
+        self._wake = asyncio.Event()
+        ready.set()
+        try:
+            client = self._new_client()
+        except Exception as ex:
+            logger.warning(f"Monitoring outbox disabled (HTTP client unavailable): {ex}")
+            return
+        self._client = client
+        try:
+            while not self._stopping:
+                try:
+                    await self.deliver_due(client)
+                except Exception as ex:
+                    logger.warning(f"Monitoring outbox delivery pass failed: {ex}")
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self._next_due_delay())
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+        finally:
+            self._client = None
+            await client.aclose()
+
+    def kick(self) -> None:
+        """Wake the delivery loop (starting it if needed) without waiting."""
+        if not self.is_running:
+            self.start()
+        loop, wake = self._loop, self._wake
+        if loop is not None and wake is not None:
+            loop.call_soon_threadsafe(wake.set)
+
+    def flush(self, timeout_seconds: float = 30.0) -> OutboxDeliveryResult:
+        """Synchronously deliver everything due now (used by callers that need the outcome)."""
+        loop = self._loop
+        if loop is not None and self.is_running:
+            future = asyncio.run_coroutine_threadsafe(self.deliver_due(self._client), loop)
+            return future.result(timeout=timeout_seconds)
+        return asyncio.run(asyncio.wait_for(self.deliver_due(), timeout=timeout_seconds))
+
+    def stop(self, timeout: float = 2.0) -> None:
+        self._stopping = True
+        loop, wake = self._loop, self._wake
+        if loop is not None and wake is not None:
+            loop.call_soon_threadsafe(wake.set)
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+        self._thread = None
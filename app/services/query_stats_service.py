@@ -12,9 +12,10 @@ Temel Sorumluluklar:
 """
 
 from typing import Optional, List, Dict, Any, Tuple, TYPE_CHECKING, Callable
-from datetime import datetime
+from datetime import datetime, timedelta
 from copy import deepcopy
 import json
+from pathlib import Path
 import logging
 import time
 import traceback
@@ -25,9 +26,13 @@ from collections import deque, OrderedDict
 from threading import Lock, Thread, Event
 
 from app.core.logger import get_logger
+from app.services.metrics_exporter import metric, publish_metrics
 # Circular import prevention: from app.database.connection import get_connection_manager, DatabaseConnection
 if TYPE_CHECKING:
     from app.database.connection import DatabaseConnection
+    from app.analysis.plan_diff import PlanDiffResult
+    from app.analysis.plan_cache_scanner import PlanCacheScanResult
+    from app.analysis.missing_index_consolidator import ConsolidatedMissingIndex
 from app.database.version_detector import SQLFeature, VersionDetector
 from app.database.queries.query_store_queries import (
     QueryStoreQueries, 
@@ -43,6 +48,8 @@ from app.models.query_stats_models import (
     QueryStoreStatus,
     QueryStatsFilter,
     QueryPriority,
+    QueryRegression,
+    PlanChangeImpact,
 )
 from app.core.exceptions import (
     ConnectionError as DBConnectionError,
@@ -78,6 +85,7 @@ class QueryStatsService(IQueryStatsService):
     _QUERY_STORE_TTL_SECONDS = 300
     _PERMISSION_TTL_SECONDS = 300
     _TOP_QUERIES_TTL_SECONDS = 30
+    _ADHOC_STATEMENT_LIMIT = 5000
     _QUERY_STORE_CACHE: Dict[str, Tuple[float, QueryStoreStatus]] = {}
     _PERMISSION_CACHE: Dict[str, Tuple[float, Dict[str, Any]]] = {}
     _SQL_VERSION_CACHE: Dict[str, int] = {}
@@ -107,6 +115,7 @@ class QueryStatsService(IQueryStatsService):
         self._runtime_warnings: List[str] = []
         self._last_error: Optional[Dict[str, str]] = None
         self._last_total_count: int = 0
+        self._detail_prefetch: Dict[Tuple[str, int, int], Any] = {}
 
     # ==========================================================================
     # ERROR/RETRY HELPERS
@@ -213,6 +222,7 @@ class QueryStatsService(IQueryStatsService):
         """Clear all connection-sensitive runtime cache fields."""
         self._query_store_status = None
         self._sql_version = None
+        self._detail_prefetch = {}
 
     def _get_connection_cache_key(self) -> str:
         """Build a stable cache key for the active connection context."""
@@ -704,6 +714,24 @@ class QueryStatsService(IQueryStatsService):
                 cls._LOAD_CANCELLED_COUNT += 1
             else:
                 cls._LOAD_ERROR_COUNT += 1
+        cls._publish_scrape_metrics()
+
+    @classmethod
+    def _publish_scrape_metrics(cls) -> None:
+        """Cache load telemetry for the /metrics endpoint; process-wide, so no server label."""
+        obs = cls.get_observability_metrics()
+        publish_metrics(
+            "query_stats",
+            None,
+            [
+                metric("sqlperf_query_stats_loads_total", obs["success_count"], outcome="success"),
+                metric("sqlperf_query_stats_loads_total", obs["error_count"], outcome="error"),
+                metric("sqlperf_query_stats_loads_total", obs["cancelled_count"], outcome="cancelled"),
+                metric("sqlperf_query_stats_load_time_ms", obs["avg_load_time_ms"], stat="avg"),
+                metric("sqlperf_query_stats_load_time_ms", obs["p95_load_time_ms"], stat="p95"),
+                metric("sqlperf_query_stats_error_rate", obs["error_rate"]),
+            ],
+        )
 
     @classmethod
     def _record_usage(cls, source: str, sort_by: str) -> None:
@@ -1367,6 +1395,9 @@ class QueryStatsService(IQueryStatsService):
             
             # Parametreleri hazırla
             params = filter.to_params()
+            # DMV yolu: nesne satırları tam top_n sıralamasıyla çekilir; ad-hoc gruplarla
+            # birleştirildikten sonra sayfalama client-side yapılır.
+            dmv_params = dict(params, offset=0, page_size=params["top_n"])
             safe_filter = self._sanitize_filter(filter)
             source_name = "query_store" if use_qs else "dmv"
             self._record_usage(source_name, str(getattr(filter, "sort_by", "") or "unknown"))
@@ -1414,7 +1445,7 @@ class QueryStatsService(IQueryStatsService):
             try:
                 results = self._execute_query_with_retry(
                     sql,
-                    params=params,
+                    params=params if use_qs else dmv_params,
                     operation_name="get_top_queries.query_store" if use_qs else "get_top_queries.dmv",
                     cancel_check=cancel_check,
                     correlation_id=corr,
@@ -1449,7 +1480,7 @@ class QueryStatsService(IQueryStatsService):
                         fallback_sql = QueryStoreQueries.get_top_queries_sql(use_query_store=False)
                         results = self._execute_query_with_retry(
                             fallback_sql,
-                            params=params,
+                            params=dmv_params,
                             operation_name="get_top_queries.dmv_fallback",
                             cancel_check=cancel_check,
                             correlation_id=corr,
@@ -1481,7 +1512,7 @@ class QueryStatsService(IQueryStatsService):
                     logger.error(f"Failed to get top queries: {primary_error}")
                     return []
             
-            if not results:
+            if not results and use_qs:
                 outcome = "success"
                 row_count = 0
                 logger.info("No queries found")
@@ -1524,23 +1555,8 @@ class QueryStatsService(IQueryStatsService):
                 )
                 
                 # Filtreleme uygula
-                if filter.search_text:
-                    search_lower = filter.search_text.lower()
-                    if search_lower not in query_stats.display_name.lower():
-                        if search_lower not in query_stats.query_text.lower():
-                            continue
-                
-                if filter.min_executions > 0:
-                    if query_stats.metrics.total_executions < filter.min_executions:
-                        continue
-                
-                if filter.min_duration_ms > 0:
-                    if query_stats.metrics.avg_duration_ms < filter.min_duration_ms:
-                        continue
-                
-                if filter.priority_filter:
-                    if query_stats.priority != filter.priority_filter:
-                        continue
+                if not self._passes_filter(query_stats, filter):
+                    continue
                 
                 queries.append(query_stats)
 
@@ -1548,6 +1564,14 @@ class QueryStatsService(IQueryStatsService):
                 self._add_warning(
                     "All query rows were filtered out due to data quality validation checks."
                 )
+
+            if not use_qs:
+                queries, total_count_from_sql = self._page_dmv_with_adhoc_groups(
+                    queries,
+                    filter,
+                    cancel_check=cancel_check,
+                    include_sensitive_data=include_sensitive_data,
+                )
             
             outcome = "success"
             row_count = len(queries)
@@ -1639,6 +1663,455 @@ class QueryStatsService(IQueryStatsService):
             last_execution=row.get('last_execution'),
         )
     
+    # ==========================================================================
+    # AD-HOC FINGERPRINT GRUPLAMA
+    # ==========================================================================
+
+    @staticmethod
+    def _merge_fingerprint_group(fingerprint: str, members: List[QueryStats]) -> QueryStats:
+        """Aynı fingerprint'e sahip sorguları execution ağırlıklı tek QueryStats'a birleştir."""
+        if len(members) == 1:
+            only = members[0]
+            only.fingerprint = fingerprint
+            only.fingerprint_group_size = 1
+            return only
+
+        representative = max(members, key=lambda q: int(q.metrics.total_executions or 0))
+        total_executions = sum(int(m.metrics.total_executions or 0) for m in members)
+        weight_total = float(max(1, total_executions))
+
+        def _weighted(attr: str) -> float:
+            return sum(
+                float(getattr(m.metrics, attr, 0.0) or 0.0) * int(m.metrics.total_executions or 0)
+                for m in members
+            ) / weight_total
+
+        max_duration = max(float(m.metrics.max_duration_ms or 0.0) for m in members)
+        metrics = QueryMetrics(
+            avg_duration_ms=_weighted("avg_duration_ms"),
+            max_duration_ms=max_duration,
+            avg_cpu_ms=_weighted("avg_cpu_ms"),
+            avg_logical_reads=_weighted("avg_logical_reads"),
+            avg_logical_writes=_weighted("avg_logical_writes"),
+            avg_physical_reads=_weighted("avg_physical_reads"),
+            total_executions=int(total_executions),
+            plan_count=max(1, len({str(m.query_hash or "") for m in members})),
+            impact_score=max_duration * total_executions / 1000.0,
+        )
+        last_seen = [m.last_execution for m in members if m.last_execution is not None]
+        return QueryStats(
+            query_id=int(representative.query_id),
+            query_hash=str(representative.query_hash or ""),
+            query_text=representative.query_text,
+            object_name=representative.object_name,
+            schema_name=representative.schema_name,
+            metrics=metrics,
+            last_execution=max(last_seen) if last_seen else None,
+            fingerprint=fingerprint,
+            fingerprint_group_size=len(members),
+        )
+
+    @staticmethod
+    def _passes_filter(query: QueryStats, filter: QueryStatsFilter) -> bool:
+        """Client-side filtreler (arama, min execution/süre, öncelik)"""
+        if filter.search_text:
+            search_lower = filter.search_text.lower()
+            if search_lower not in query.display_name.lower():
+                if search_lower not in query.query_text.lower():
+                    return False
+        if filter.min_executions > 0 and query.metrics.total_executions < filter.min_executions:
+            return False
+        if filter.min_duration_ms > 0 and query.metrics.avg_duration_ms < filter.min_duration_ms:
+            return False
+        if filter.priority_filter and query.priority != filter.priority_filter:
+            return False
+        return True
+
+    @staticmethod
+    def _dmv_sort_value(query: QueryStats, sort_by: str) -> float:
+        """DMV_TOP_QUERIES ORDER BY ifadesinin client-side karşılığı"""
+        m = query.metrics
+        if sort_by == "avg_duration":
+            return float(m.avg_duration_ms or 0.0)
+        if sort_by == "total_cpu":
+            return float(m.avg_cpu_ms or 0.0) * int(m.total_executions or 0)
+        if sort_by == "execution_count":
+            return float(m.total_executions or 0)
+        if sort_by == "logical_reads":
+            return float(m.avg_logical_reads or 0.0)
+        return float(m.impact_score or 0.0)
+
+    def _page_dmv_with_adhoc_groups(
+        self,
+        object_queries: List[QueryStats],
+        filter: QueryStatsFilter,
+        cancel_check: Optional[Callable[[], bool]] = None,
+        include_sensitive_data: bool = False,
+    ) -> Tuple[List[QueryStats], int]:
+        """
+        DMV yolunda nesne satırlarını fingerprint'li ad-hoc gruplarla birleştir
+
+        Gruplama tam statement metni üzerinde sayfalamadan önce yapılır; böylece
+        bir grup sayfalara bölünmez ve total_count grup sayısını yansıtır.
+
+        Returns:
+            (sayfa, toplam grup sayısı)
+        """
+        top_n = max(1, int(filter.top_n or 1))
+        adhoc_groups = self.get_adhoc_query_groups(
+            days=int(filter.time_range_days or 7),
+            top_n=min(self._ADHOC_STATEMENT_LIMIT, top_n * 4),
+            cancel_check=cancel_check,
+            include_sensitive_data=include_sensitive_data,
+        )
+        combined = list(object_queries or []) + [q for q in adhoc_groups if self._passes_filter(q, filter)]
+        sort_by = str(filter.sort_by or "impact_score")
+        combined.sort(key=lambda q: (-self._dmv_sort_value(q, sort_by), q.display_name))
+        combined = combined[:top_n]
+        offset = max(0, int(filter.offset or 0))
+        page_size = max(1, int(filter.page_size or 1))
+        return combined[offset:offset + page_size], len(combined)
+
+    def get_adhoc_query_groups(
+        self,
+        days: int = 7,
+        top_n: int = 500,
+        cancel_check: Optional[Callable[[], bool]] = None,
+        include_sensitive_data: bool = False,
+    ) -> List[QueryStats]:
+        """
+        Plan cache'teki ad-hoc statement'ları fingerprint'e göre grupla
+
+        Statement seviyesinde DMV satırlarını çeker, sql_handle bazlı LRU
+        cache ile fingerprint hesaplar ve impact score'a göre sıralı grup
+        listesi döndürür.
+        """
+        if not self.is_connected:
+            return []
+
+        try:
+            results = self._execute_query_with_retry(
+                QueryStoreQueries.DMV_ADHOC_STATEMENTS,
+                {"days": int(days), "top_n": max(1, int(top_n))},
+                operation_name="get_adhoc_query_groups",
+                cancel_check=cancel_check,
+            )
+        except TaskCancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to get ad-hoc statements: {e}")
+            return []
+
+        from app.analysis.sql_fingerprint import SqlFingerprinter
+
+        fingerprinter = SqlFingerprinter()
+        groups: Dict[str, List[QueryStats]] = {}
+        for row in results or []:
+            self._raise_if_cancelled(cancel_check)
+            safe_row = self._sanitize_top_query_row(
+                row,
+                is_query_store=False,
+                include_sensitive_data=include_sensitive_data,
+            )
+            if safe_row is None:
+                continue
+            fp = fingerprinter.fingerprint(
+                row.get("query_text"),
+                sql_handle=row.get("sql_handle"),
+                statement_start_offset=row.get("statement_start_offset"),
+                statement_end_offset=row.get("statement_end_offset"),
+            ).fingerprint
+            query_stats = self._row_to_query_stats(
+                safe_row,
+                is_query_store=False,
+                include_sensitive_data=include_sensitive_data,
+            )
+            groups.setdefault(fp, []).append(query_stats)
+
+        merged = [self._merge_fingerprint_group(fp, members) for fp, members in groups.items()]
+        merged.sort(key=lambda q: float(q.metrics.impact_score or 0.0), reverse=True)
+        return merged
+    
+    # ==========================================================================
+    # WORKLOAD REGRESYON TESPİTİ (İKİ PENCERE)
+    # ==========================================================================
+
+    @staticmethod
+    def _minutes_ago(moment: datetime, now: datetime) -> int:
+        """datetime'ı sunucu saatine göre 'kaç dakika önce' parametresine çevir"""
+        if moment.tzinfo is not None and now.tzinfo is None:
+            now = now.astimezone(moment.tzinfo)
+        elif moment.tzinfo is None and now.tzinfo is not None:
+            moment = moment.replace(tzinfo=now.tzinfo)
+        return max(0, int((now - moment).total_seconds() // 60))
+
+    def detect_workload_regressions(
+        self,
+        recent_start: Optional[datetime] = None,
+        recent_end: Optional[datetime] = None,
+        baseline_start: Optional[datetime] = None,
+        baseline_end: Optional[datetime] = None,
+        min_executions: int = 10,
+        min_change_percent: float = 25.0,
+        z_threshold: float = 3.0,
+        include_plan_changes: bool = True,
+        top_n: int = 100,
+        cancel_check: Optional[Callable[[], bool]] = None,
+        include_sensitive_data: bool = False,
+    ) -> List[QueryRegression]:
+        """
+        Workload geneli regresyon modu ("Salı'dan beri ne yavaşladı?")
+
+        Baseline ve recent pencere için sorgu bazlı agregasyonlar iki adet
+        set-based Query Store sorgusuyla çekilir; execution başına duration,
+        CPU ve reads farkları Welch z-istatistiği ve yüzde eşiğiyle
+        değerlendirilir.
+
+        Args:
+            recent_start: Recent pencere başlangıcı (varsayılan: son 24 saat)
+            recent_end: Recent pencere bitişi (varsayılan: şimdi)
+            baseline_start / baseline_end: Varsayılan olarak recent penceresiyle
+                aynı uzunlukta, hemen öncesindeki pencere
+            min_executions: Her iki pencerede gereken minimum execution
+            min_change_percent: Minimum artış yüzdesi
+            z_threshold: Anlamlılık eşiği
+            include_plan_changes: Regresyon olmasa da baskın planı değişenleri dahil et
+            top_n: Döndürülecek maksimum kayıt
+
+        Returns:
+            Sıralı QueryRegression listesi
+        """
+        if not self.is_connected:
+            return []
+        if not self.use_query_store():
+            self._add_warning("Workload regression mode requires an operational Query Store.")
+            return []
+
+        now = datetime.now()
+        recent_end = recent_end or now
+        recent_start = recent_start or (recent_end - timedelta(days=1))
+        if recent_start >= recent_end:
+            raise ValueError("recent_start must be earlier than recent_end")
+        baseline_end = baseline_end or recent_start
+        baseline_start = baseline_start or (baseline_end - (recent_end - recent_start))
+        if baseline_start >= baseline_end:
+            raise ValueError("baseline_start must be earlier than baseline_end")
+
+        min_executions = max(1, int(min_executions))
+        windows = {
+            "baseline": (baseline_start, baseline_end),
+            "recent": (recent_start, recent_end),
+        }
+        rows_by_window: Dict[str, List[Dict[str, Any]]] = {}
+        started = time.perf_counter()
+        for window_name, (start, end) in windows.items():
+            self._raise_if_cancelled(cancel_check)
+            try:
+                rows_by_window[window_name] = self._execute_query_with_retry(
+                    QueryStoreQueries.QUERY_WINDOW_AGGREGATES,
+                    {
+                        "start_minutes_ago": self._minutes_ago(start, now),
+                        "end_minutes_ago": self._minutes_ago(end, now),
+                        "min_executions": min_executions,
+                    },
+                    operation_name=f"detect_workload_regressions.{window_name}",
+                    cancel_check=cancel_check,
+                ) or []
+            except TaskCancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Failed to get {window_name} window aggregates: {e}")
+                return []
+
+        from app.analysis.regression_detector import WorkloadRegressionDetector
+
+        detector = WorkloadRegressionDetector(
+            min_executions=min_executions,
+            min_change_percent=min_change_percent,
+            z_threshold=z_threshold,
+        )
+        regressions = detector.compare(
+            rows_by_window["baseline"],
+            rows_by_window["recent"],
+            include_plan_changes=include_plan_changes,
+        )[: max(1, int(top_n))]
+
+        for item in regressions:
+            item.query_text = self._sanitize_query_text(
+                item.query_text,
+                f"query_id={item.query_id}",
+                include_sensitive_data=include_sensitive_data,
+            )
+
+        self._log_structured(
+            logging.INFO,
+            "detect_workload_regressions",
+            baseline_rows=len(rows_by_window["baseline"]),
+            recent_rows=len(rows_by_window["recent"]),
+            regressions=sum(1 for r in regressions if r.is_regression),
+            plan_changes=sum(1 for r in regressions if r.plan_changed),
+            elapsed_ms=round((time.perf_counter() - started) * 1000.0, 1),
+        )
+        return regressions
+
+    # ==========================================================================
+    # PLAN DEĞİŞİMİ / FORCED PLAN ETKİSİ (ARTIMLI)
+    # ==========================================================================
+
+    _PLAN_CHANGE_LOCK = Lock()
+
+    @staticmethod
+    def _plan_change_store_path() -> Path:
+        from app.core.config import get_settings
+
+        path = get_settings().data_dir / "query_stats_plan_changes.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
+
+    @classmethod
+    def _load_plan_change_store(cls) -> Dict[str, Any]:
+        path = cls._plan_change_store_path()
+        if not path.exists():
+            return {}
+        try:
+            with open(path, "r", encoding="utf-8") as handle:
+                payload = json.load(handle)
+            return payload if isinstance(payload, dict) else {}
+        except Exception as e:
+            logger.warning(f"Plan change store could not be read, starting fresh: {e}")
+            return {}
+
+    @classmethod
+    def _save_plan_change_store(cls, payload: Dict[str, Any]) -> bool:
+        path = cls._plan_change_store_path()
+        tmp_path = path.with_suffix(".tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as handle:
+                json.dump(payload, handle, ensure_ascii=False)
+            tmp_path.replace(path)
+            return True
+        except Exception as e:
+            logger.warning(f"Plan change store could not be written: {e}")
+            return False
+
+    def scan_plan_changes(
+        self,
+        days: int = 7,
+        flip_ratio: float = 2.0,
+        min_executions: int = 5,
+        full_rescan: bool = False,
+        only_flagged: bool = True,
+        cancel_check: Optional[Callable[[], bool]] = None,
+        include_sensitive_data: bool = False,
+    ) -> List[PlanChangeImpact]:
+        """
+        Birden fazla planı olan tüm sorgularda plan flip / forcing adayı taraması
+
+        Sonuçlar bağlantı bazında yerel store'da (data_dir) tutulur; sonraki
+        çağrılar yalnızca watermark sonrası kapanmış interval'leri ve yeni
+        çok planlı hale gelen sorguları çeker.
+
+        Args:
+            days: Pencere (gün)
+            flip_ratio: Yeni plan best plana göre kaç kat kötüyse flip sayılır
+            min_executions: Plan karşılaştırması için minimum execution
+            full_rescan: Store'u sıfırlayıp tüm pencereyi yeniden tara
+            only_flagged: Yalnızca flip / forced plan regresyonu olanları döndür
+
+        Returns:
+            Sıralı PlanChangeImpact listesi
+        """
+        if not self.is_connected:
+            return []
+        if not self.use_query_store():
+            self._add_warning("Plan change tracking requires an operational Query Store.")
+            return []
+
+        from app.analysis.plan_change_tracker import PlanChangeTracker
+
+        days = max(1, int(days))
+        scope = self._get_connection_cache_key()
+        started = time.perf_counter()
+
+        with self._PLAN_CHANGE_LOCK:
+            store = self._load_plan_change_store()
+            scopes = dict(store.get("scopes", {}) or {})
+            tracker = PlanChangeTracker.from_dict(scopes.get(scope))
+            # Pencere genişlediyse eski watermark eksik veri bırakır: baştan tara
+            if full_rescan or days > tracker.window_days:
+                tracker.reset(window_days=days)
+            tracker.window_days = days
+
+        self._raise_if_cancelled(cancel_check)
+        try:
+            rows = self._execute_query_with_retry(
+                QueryStoreQueries.PLAN_PERFORMANCE_DELTA,
+                {
+                    "days": days,
+                    "last_interval_id": int(tracker.last_interval_id),
+                    "known_query_ids_json": json.dumps(tracker.known_query_ids()),
+                },
+                operation_name="scan_plan_changes",
+                cancel_check=cancel_check,
+            ) or []
+        except TaskCancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to scan plan changes: {e}")
+            return []
+
+        merged = tracker.merge_rows(rows)
+        pruned = tracker.prune(window_days=days)
+        with self._PLAN_CHANGE_LOCK:
+            store = self._load_plan_change_store()
+            scopes = dict(store.get("scopes", {}) or {})
+            scopes[scope] = tracker.to_dict()
+            self._save_plan_change_store({"version": 1, "scopes": scopes})
+
+        impacts = tracker.evaluate(flip_ratio=flip_ratio, min_executions=min_executions)
+        if only_flagged:
+            impacts = [i for i in impacts if i.is_plan_flip or i.forced_plan_regressed]
+
+        text_rows: List[Dict[str, Any]] = []
+        if impacts:
+            try:
+                text_rows = self._execute_query_with_retry(
+                    QueryStoreQueries.QUERY_TEXT_BATCH,
+                    {"query_ids_json": json.dumps([int(i.query_id) for i in impacts])},
+                    operation_name="scan_plan_changes.text",
+                    cancel_check=cancel_check,
+                ) or []
+            except TaskCancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Plan change query texts could not be loaded: {e}")
+        text_by_id = {int(r.get("query_id")): r for r in (text_rows or []) if r.get("query_id") is not None}
+        for impact in impacts:
+            row = text_by_id.get(int(impact.query_id))
+            if row is None:
+                continue
+            impact.query_hash = str(row.get("query_hash") or "")
+            impact.object_name = row.get("object_name")
+            impact.schema_name = row.get("schema_name")
+            impact.query_text = self._sanitize_query_text(
+                row.get("query_text"),
+                f"query_id={impact.query_id}",
+                include_sensitive_data=include_sensitive_data,
+            )
+
+        self._log_structured(
+            logging.INFO,
+            "scan_plan_changes",
+            delta_rows=merged,
+            pruned_plans=pruned,
+            tracked_plans=tracker.plan_count(),
+            last_interval_id=int(tracker.last_interval_id),
+            flips=sum(1 for i in impacts if i.is_plan_flip),
+            forcing_candidates=sum(1 for i in impacts if i.is_forcing_candidate),
+            elapsed_ms=round((time.perf_counter() - started) * 1000.0, 1),
+        )
+        return impacts
+
     # ==========================================================================
     # SORGU DETAYI
     # ==========================================================================
@@ -1667,17 +2140,20 @@ class QueryStatsService(IQueryStatsService):
             return None
         
         try:
-            # Temel bilgileri al
-            detail_result = self._execute_query_with_retry(
-                QueryStoreQueries.QUERY_DETAIL,
-                {"query_id": query_id},
-                operation_name="get_query_detail",
-            )
-            
-            if not detail_result:
-                return None
-            
-            row = detail_result[0]
+            # Temel bilgileri al (batch prefetch varsa başlık + trend katsayısı hazır)
+            row = self._get_prefetched_detail("header", query_id, days)
+            header_prefetched = row is not None
+            if not header_prefetched:
+                detail_result = self._execute_query_with_retry(
+                    QueryStoreQueries.QUERY_DETAIL,
+                    {"query_id": query_id},
+                    operation_name="get_query_detail",
+                )
+                
+                if not detail_result:
+                    return None
+                
+                row = detail_result[0]
             
             # QueryStats oluştur
             query_stats = QueryStats(
@@ -1708,7 +2184,10 @@ class QueryStatsService(IQueryStatsService):
             query_stats.daily_trend = self.get_query_trend(query_id, days)
             
             # Trend katsayısını hesapla
-            trend_info = self._get_trend_coefficient(query_id)
+            if header_prefetched:
+                trend_info = self._trend_info_from_row(row)
+            else:
+                trend_info = self._get_trend_coefficient(query_id)
             if trend_info:
                 query_stats.metrics.trend_coefficient = trend_info[0]
                 query_stats.metrics.change_percent = trend_info[1]
@@ -1722,8 +2201,25 @@ class QueryStatsService(IQueryStatsService):
             logger.error(f"Failed to get query detail for {query_id}: {e}")
             return None
     
+    def _row_to_query_metrics(self, row: Dict[str, Any], row_id: str) -> QueryMetrics:
+        """Metrik satırını QueryMetrics modeline dönüştür"""
+        return QueryMetrics(
+            avg_duration_ms=self._to_non_negative_float(row.get('avg_duration_ms', 0), "avg_duration_ms", row_id),
+            max_duration_ms=self._to_non_negative_float(row.get('max_duration_ms', 0), "max_duration_ms", row_id),
+            avg_cpu_ms=self._to_non_negative_float(row.get('avg_cpu_ms', 0), "avg_cpu_ms", row_id),
+            avg_logical_reads=self._to_non_negative_float(row.get('avg_logical_reads', 0), "avg_logical_reads", row_id),
+            avg_logical_writes=self._to_non_negative_float(row.get('avg_logical_writes', 0), "avg_logical_writes", row_id),
+            avg_physical_reads=self._to_non_negative_float(row.get('avg_physical_reads', 0), "avg_physical_reads", row_id),
+            total_executions=self._to_positive_int(row.get('total_executions', 0), "total_executions", row_id),
+            plan_count=max(1, self._to_positive_int(row.get('plan_count', 1), "plan_count", row_id)),
+        )
+
     def _get_query_metrics(self, query_id: int, days: int) -> QueryMetrics:
         """Sorgu metriklerini al"""
+        prefetched = self._get_prefetched_detail("metrics", query_id, days)
+        if prefetched is not None:
+            return deepcopy(prefetched)
+
         # TOP_QUERIES sorgusunu tek sorgu için kullan
         sql = """
         SELECT 
@@ -1754,18 +2250,7 @@ class QueryStatsService(IQueryStatsService):
             if not results:
                 return QueryMetrics()
             
-            row = results[0]
-            row_id = f"query_id={int(query_id or 0)}"
-            return QueryMetrics(
-                avg_duration_ms=self._to_non_negative_float(row.get('avg_duration_ms', 0), "avg_duration_ms", row_id),
-                max_duration_ms=self._to_non_negative_float(row.get('max_duration_ms', 0), "max_duration_ms", row_id),
-                avg_cpu_ms=self._to_non_negative_float(row.get('avg_cpu_ms', 0), "avg_cpu_ms", row_id),
-                avg_logical_reads=self._to_non_negative_float(row.get('avg_logical_reads', 0), "avg_logical_reads", row_id),
-                avg_logical_writes=self._to_non_negative_float(row.get('avg_logical_writes', 0), "avg_logical_writes", row_id),
-                avg_physical_reads=self._to_non_negative_float(row.get('avg_physical_reads', 0), "avg_physical_reads", row_id),
-                total_executions=self._to_positive_int(row.get('total_executions', 0), "total_executions", row_id),
-                plan_count=max(1, self._to_positive_int(row.get('plan_count', 1), "plan_count", row_id)),
-            )
+            return self._row_to_query_metrics(results[0], f"query_id={int(query_id or 0)}")
             
         except Exception as e:
             logger.error(f"Failed to get metrics for query {query_id}: {e}")
@@ -1788,6 +2273,10 @@ class QueryStatsService(IQueryStatsService):
         """
         if not self.is_connected:
             return []
+
+        prefetched = self._get_prefetched_detail("waits", query_id, days)
+        if prefetched is not None:
+            return deepcopy(prefetched)
         
         # SQL 2017+ gerekli
         if not self._supports_query_store_wait_stats():
@@ -1801,20 +2290,21 @@ class QueryStatsService(IQueryStatsService):
                 operation_name="get_query_wait_stats",
             )
             
-            waits = []
-            for row in results:
-                waits.append(WaitProfile(
-                    category=str(row.get('wait_category', 'Unknown') or 'Unknown'),
-                    total_wait_ms=float(row.get('total_wait_ms', 0) or 0),
-                    wait_percent=float(row.get('wait_percent', 0) or 0),
-                ))
-            
-            return waits
+            return [self._row_to_wait_profile(row) for row in results]
             
         except Exception as e:
             logger.error(f"Failed to get wait stats for query {query_id}: {e}")
             return []
     
+    @staticmethod
+    def _row_to_wait_profile(row: Dict[str, Any]) -> WaitProfile:
+        """Wait satırını WaitProfile modeline dönüştür"""
+        return WaitProfile(
+            category=str(row.get('wait_category', 'Unknown') or 'Unknown'),
+            total_wait_ms=float(row.get('total_wait_ms', 0) or 0),
+            wait_percent=float(row.get('wait_percent', 0) or 0),
+        )
+
     def _get_server_wait_stats(self) -> List[WaitProfile]:
         """Sunucu geneli wait stats (fallback)"""
         if not self.is_connected:
@@ -1826,15 +2316,7 @@ class QueryStatsService(IQueryStatsService):
                 operation_name="get_server_wait_stats",
             )
             
-            waits = []
-            for row in results:
-                waits.append(WaitProfile(
-                    category=str(row.get('wait_category', 'Unknown') or 'Unknown'),
-                    total_wait_ms=float(row.get('total_wait_ms', 0) or 0),
-                    wait_percent=float(row.get('wait_percent', 0) or 0),
-                ))
-            
-            return waits
+            return [self._row_to_wait_profile(row) for row in results]
             
         except Exception as e:
             logger.error(f"Failed to get server wait stats: {e}")
@@ -1857,6 +2339,10 @@ class QueryStatsService(IQueryStatsService):
         """
         if not self.is_connected or not self.use_query_store():
             return []
+
+        prefetched = self._get_prefetched_detail("plans", query_id, days)
+        if prefetched is not None:
+            return deepcopy(prefetched)
         
         try:
             results = self._execute_query_with_retry(
@@ -1865,26 +2351,31 @@ class QueryStatsService(IQueryStatsService):
                 operation_name="get_query_plans",
             )
             
-            plans = []
-            for row in results:
-                plans.append(PlanInfo(
-                    plan_id=int(row.get('plan_id', 0) or 0),
-                    plan_hash=str(row.get('query_plan_hash', '') or ''),
-                    is_forced=bool(row.get('is_forced_plan', False)),
-                    force_failure_count=int(row.get('force_failure_count', 0) or 0),
-                    first_seen=row.get('first_seen'),
-                    last_seen=row.get('last_seen'),
-                    execution_count=int(row.get('execution_count', 0) or 0),
-                    avg_duration_ms=float(row.get('avg_duration_ms', 0) or 0),
-                    stdev_duration_ms=float(row.get('stdev_duration_ms', 0) or 0),
-                ))
-            
-            return plans
+            return [self._row_to_plan_info(row) for row in results]
             
         except Exception as e:
             logger.error(f"Failed to get plans for query {query_id}: {e}")
             return []
     
+    @staticmethod
+    def _row_to_plan_info(row: Dict[str, Any]) -> PlanInfo:
+        """Plan stability satırını PlanInfo modeline dönüştür"""
+        plan_hash = row.get('query_plan_hash', '') or ''
+        if isinstance(plan_hash, (bytes, bytearray)):
+            # Showplan'daki QueryPlanHash ile aynı biçim (0x...)
+            plan_hash = "0x" + bytes(plan_hash).hex().upper()
+        return PlanInfo(
+            plan_id=int(row.get('plan_id', 0) or 0),
+            plan_hash=str(plan_hash),
+            is_forced=bool(row.get('is_forced_plan', False)),
+            force_failure_count=int(row.get('force_failure_count', 0) or 0),
+            first_seen=row.get('first_seen'),
+            last_seen=row.get('last_seen'),
+            execution_count=int(row.get('execution_count', 0) or 0),
+            avg_duration_ms=float(row.get('avg_duration_ms', 0) or 0),
+            stdev_duration_ms=float(row.get('stdev_duration_ms', 0) or 0),
+        )
+    
     # ==========================================================================
     # TREND ANALİZİ
     # ==========================================================================
@@ -1902,6 +2393,10 @@ class QueryStatsService(IQueryStatsService):
         """
         if not self.is_connected or not self.use_query_store():
             return []
+
+        prefetched = self._get_prefetched_detail("trend", query_id, days)
+        if prefetched is not None:
+            return deepcopy(prefetched)
         
         try:
             results = self._execute_query_with_retry(
@@ -1910,22 +2405,23 @@ class QueryStatsService(IQueryStatsService):
                 operation_name="get_query_trend",
             )
             
-            trends = []
-            for row in results:
-                trends.append(TrendData(
-                    date=row.get('trend_date'),
-                    executions=int(row.get('daily_executions', 0) or 0),
-                    avg_duration_ms=float(row.get('avg_duration_ms', 0) or 0),
-                    avg_cpu_ms=float(row.get('avg_cpu_ms', 0) or 0),
-                    avg_logical_reads=float(row.get('avg_logical_reads', 0) or 0),
-                ))
-            
-            return trends
+            return [self._row_to_trend_data(row) for row in results]
             
         except Exception as e:
             logger.error(f"Failed to get trend for query {query_id}: {e}")
             return []
     
+    @staticmethod
+    def _row_to_trend_data(row: Dict[str, Any]) -> TrendData:
+        """Günlük trend satırını TrendData modeline dönüştür"""
+        return TrendData(
+            date=row.get('trend_date'),
+            executions=int(row.get('daily_executions', 0) or 0),
+            avg_duration_ms=float(row.get('avg_duration_ms', 0) or 0),
+            avg_cpu_ms=float(row.get('avg_cpu_ms', 0) or 0),
+            avg_logical_reads=float(row.get('avg_logical_reads', 0) or 0),
+        )
+    
     def _get_trend_coefficient(self, query_id: int) -> Optional[Tuple[float, float]]:
         """
         Trend katsayısını hesapla
@@ -1946,16 +2442,299 @@ class QueryStatsService(IQueryStatsService):
             if not results:
                 return None
             
-            row = results[0]
-            trend_coef = float(row.get('trend_coefficient', 1.0) or 1.0)
-            change_pct = float(row.get('change_percent', 0) or 0)
-            
-            return (trend_coef, change_pct)
+            return self._trend_info_from_row(results[0])
             
         except Exception as e:
             logger.error(f"Failed to get trend coefficient for query {query_id}: {e}")
             return None
+
+    @staticmethod
+    def _trend_info_from_row(row: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+        """QUERY_TREND_COMPARISON / QUERY_DETAIL_BATCH satırından (katsayı, değişim %)"""
+        if row.get('trend_coefficient') is None:
+            return None
+        trend_coef = float(row.get('trend_coefficient', 1.0) or 1.0)
+        change_pct = float(row.get('change_percent', 0) or 0)
+        return (trend_coef, change_pct)
     
+    # ==========================================================================
+    # BATCH DETAY (ÇOKLU QUERY_ID)
+    # ==========================================================================
+
+    @staticmethod
+    def _normalize_query_ids(query_ids: Any) -> List[int]:
+        """Deduplicate query_id list while preserving caller order."""
+        ids: List[int] = []
+        seen = set()
+        for raw in list(query_ids or []):
+            try:
+                qid = int(raw)
+            except Exception:
+                continue
+            if qid <= 0 or qid in seen:
+                continue
+            seen.add(qid)
+            ids.append(qid)
+        return ids
+
+    def _execute_batch_detail_query(
+        self,
+        sql: str,
+        query_ids: List[int],
+        days: int,
+        operation_name: str,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Run one set-based detail query for many query_ids.
+
+        Returns None when the batch path failed (e.g. OPENJSON unavailable on
+        compatibility level < 130) so callers can fall back to per-query calls.
+        """
+        try:
+            return self._execute_query_with_retry(
+                sql,
+                {"query_ids_json": json.dumps(list(query_ids)), "days": int(days)},
+                operation_name=operation_name,
+            )
+        except Exception as e:
+            logger.warning(f"{operation_name} failed for {len(query_ids)} queries: {e}")
+            return None
+
+    @staticmethod
+    def _group_rows_by_query_id(
+        query_ids: List[int],
+        rows: List[Dict[str, Any]],
+        converter: Callable[[Dict[str, Any]], Any],
+    ) -> Dict[int, List[Any]]:
+        grouped: Dict[int, List[Any]] = {qid: [] for qid in query_ids}
+        for row in rows or []:
+            try:
+                qid = int(row.get('query_id', 0) or 0)
+            except Exception:
+                continue
+            if qid in grouped:
+                grouped[qid].append(converter(row))
+        return grouped
+
+    def get_query_metrics_batch(self, query_ids: List[int], days: int = 7) -> Dict[int, QueryMetrics]:
+        """
+        Birden fazla sorgunun metriklerini tek round trip ile getir
+
+        Returns:
+            query_id -> QueryMetrics (veri yoksa boş QueryMetrics); batch başarısızsa {}
+        """
+        ids = self._normalize_query_ids(query_ids)
+        if not ids or not self.is_connected or not self.use_query_store():
+            return {}
+
+        results = self._execute_batch_detail_query(
+            QueryStoreQueries.QUERY_METRICS_BATCH,
+            ids,
+            days,
+            operation_name="get_query_metrics_batch",
+        )
+        if results is None:
+            return {}
+
+        metrics: Dict[int, QueryMetrics] = {qid: QueryMetrics() for qid in ids}
+        for row in results:
+            qid = int(row.get('query_id', 0) or 0)
+            if qid in metrics:
+                metrics[qid] = self._row_to_query_metrics(row, f"query_id={qid}")
+        return metrics
+
+    def get_query_wait_stats_batch(self, query_ids: List[int], days: int = 7) -> Dict[int, List[WaitProfile]]:
+        """
+        Birden fazla sorgunun wait profilini tek round trip ile getir
+
+        Returns:
+            query_id -> WaitProfile listesi; batch başarısızsa {}
+        """
+        ids = self._normalize_query_ids(query_ids)
+        if not ids or not self.is_connected:
+            return {}
+
+        if not self._supports_query_store_wait_stats():
+            logger.info("Query Store Wait Stats requires SQL Server 2017+")
+            server_waits = self._get_server_wait_stats()
+            return {qid: deepcopy(server_waits) for qid in ids}
+
+        results = self._execute_batch_detail_query(
+            QueryStoreQueries.QUERY_WAIT_STATS_BATCH,
+            ids,
+            days,
+            operation_name="get_query_wait_stats_batch",
+        )
+        if results is None:
+            return {}
+        return self._group_rows_by_query_id(ids, results, self._row_to_wait_profile)
+
+    def get_query_plans_batch(self, query_ids: List[int], days: int = 7) -> Dict[int, List[PlanInfo]]:
+        """
+        Birden fazla sorgunun plan listesini tek round trip ile getir
+
+        Returns:
+            query_id -> PlanInfo listesi; batch başarısızsa {}
+        """
+        ids = self._normalize_query_ids(query_ids)
+        if not ids or not self.is_connected or not self.use_query_store():
+            return {}
+
+        results = self._execute_batch_detail_query(
+            QueryStoreQueries.QUERY_PLAN_STABILITY_BATCH,
+            ids,
+            days,
+            operation_name="get_query_plans_batch",
+        )
+        if results is None:
+            return {}
+        return self._group_rows_by_query_id(ids, results, self._row_to_plan_info)
+
+    def get_query_trend_batch(self, query_ids: List[int], days: int = 7) -> Dict[int, List[TrendData]]:
+        """
+        Birden fazla sorgunun günlük trendini tek round trip ile getir
+
+        Returns:
+            query_id -> TrendData listesi (tarihe göre sıralı); batch başarısızsa {}
+        """
+        ids = self._normalize_query_ids(query_ids)
+        if not ids or not self.is_connected or not self.use_query_store():
+            return {}
+
+        results = self._execute_batch_detail_query(
+            QueryStoreQueries.QUERY_DAILY_TREND_BATCH,
+            ids,
+            days,
+            operation_name="get_query_trend_batch",
+        )
+        if results is None:
+            return {}
+        return self._group_rows_by_query_id(ids, results, self._row_to_trend_data)
+
+    def get_query_detail_header_batch(self, query_ids: List[int], days: int = 7) -> Dict[int, Dict[str, Any]]:
+        """
+        Birden fazla sorgunun başlık bilgisini ve trend katsayısını tek round trip ile getir
+
+        Returns:
+            query_id -> QUERY_DETAIL_BATCH satırı (Query Store'da olmayanlar hariç); batch başarısızsa {}
+        """
+        ids = self._normalize_query_ids(query_ids)
+        if not ids or not self.is_connected or not self.use_query_store():
+            return {}
+
+        results = self._execute_batch_detail_query(
+            QueryStoreQueries.QUERY_DETAIL_BATCH,
+            ids,
+            days,
+            operation_name="get_query_detail_header_batch",
+        )
+        if results is None:
+            return {}
+
+        headers: Dict[int, Dict[str, Any]] = {}
+        for row in results:
+            qid = int(row.get('query_id', 0) or 0)
+            if qid in ids:
+                headers[qid] = dict(row)
+        return headers
+
+    def prefetch_query_details(self, query_ids: List[int], days: int = 7) -> int:
+        """
+        Preload header, trend coefficient, metrics, waits, plans and daily
+        trend for many queries.
+
+        Runs a fixed five set-based batch queries regardless of how many
+        query_ids are passed and keeps the grouped results on this service
+        instance, so subsequent single-query calls (`get_query_wait_stats`,
+        `get_query_plans`, `get_query_trend`, `get_query_detail`) for the
+        same query_id/days are served without a round trip. Batches that fail
+        simply leave those calls on the per-query path.
+
+        Returns:
+            Number of query_ids with at least one prefetched detail set
+        """
+        ids = self._normalize_query_ids(query_ids)
+        if not ids or not self.is_connected:
+            return 0
+
+        safe_days = int(days)
+        batches = (
+            ("header", self.get_query_detail_header_batch),
+            ("metrics", self.get_query_metrics_batch),
+            ("waits", self.get_query_wait_stats_batch),
+            ("plans", self.get_query_plans_batch),
+            ("trend", self.get_query_trend_batch),
+        )
+        prefetched_ids = set()
+        for kind, loader in batches:
+            grouped = loader(ids, days=safe_days)
+            for qid, value in grouped.items():
+                self._detail_prefetch[(kind, int(qid), safe_days)] = value
+                prefetched_ids.add(int(qid))
+        logger.debug(f"Prefetched query details for {len(prefetched_ids)}/{len(ids)} queries ({safe_days}d)")
+        return len(prefetched_ids)
+
+    def clear_detail_prefetch(self) -> None:
+        """Drop batch-prefetched query details held by this instance."""
+        self._detail_prefetch = {}
+
+    def _get_prefetched_detail(self, kind: str, query_id: int, days: int) -> Optional[Any]:
+        try:
+            key = (str(kind), int(query_id), int(days))
+        except Exception:
+            return None
+        return self._detail_prefetch.get(key)
+
+    def annotate_query_trends(
+        self,
+        queries: List[QueryStats],
+        days: int = 7,
+        cancel_check: Optional[Callable[[], bool]] = None,
+    ) -> Dict[int, Any]:
+        """
+        Compute trend signals for a whole top-N page in one round trip.
+
+        Fetches the daily trend matrix with QUERY_DAILY_TREND_BATCH, runs the
+        vectorized TrendEngine over all rows and writes slope, change percent,
+        volatility, change point and regression flag into each query's metrics.
+        Trend windows shorter than 7 days are widened to 7 so a daily series
+        exists even for the 24h filter.
+
+        Returns:
+            query_id -> TrendSignal
+        """
+        candidates = [q for q in (queries or []) if int(getattr(q, "query_id", 0) or 0) > 0]
+        if not candidates or not self.is_connected or not self.use_query_store():
+            return {}
+
+        trend_days = max(7, int(days or 7))
+        self._raise_if_cancelled(cancel_check)
+        trends = self.get_query_trend_batch([q.query_id for q in candidates], days=trend_days)
+        if not trends:
+            return {}
+        self._raise_if_cancelled(cancel_check)
+
+        from app.analysis.trend_engine import TrendEngine
+
+        signals = TrendEngine().analyze(trends, metric="avg_duration_ms")
+        for query in candidates:
+            qid = int(query.query_id)
+            query.daily_trend = list(trends.get(qid, []) or [])
+            signal = signals.get(qid)
+            if signal is None or signal.points <= 0:
+                continue
+            metrics = query.metrics
+            metrics.trend_slope = float(signal.slope_per_day)
+            metrics.change_percent = float(signal.percent_change)
+            metrics.trend_coefficient = float(signal.trend_coefficient)
+            metrics.trend_volatility = float(signal.volatility)
+            metrics.change_point_date = signal.change_point_date
+            metrics.regression_score = float(signal.regression_score)
+            metrics.is_regressing = bool(signal.is_regressing)
+        regressing = len([s for s in signals.values() if s.is_regressing])
+        logger.debug(f"Trend signals computed for {len(signals)} queries ({regressing} regressing)")
+        return signals
+
     # ==========================================================================
     # QUERY TEXT
     # ==========================================================================
@@ -2158,6 +2937,164 @@ class QueryStatsService(IQueryStatsService):
             logger.error(f"Failed to get plan XML for plan {plan_id}: {e}")
             return None
 
+    def compare_query_plans(
+        self,
+        left_plan_id: int,
+        right_plan_id: int,
+        include_sensitive_data: bool = False,
+    ) -> Optional["PlanDiffResult"]:
+        """
+        Aynı sorgunun iki planını karşılaştır (erişim yolu, join, memory grant, DOP, maliyet)
+        
+        Args:
+            left_plan_id: Referans (eski) plan ID
+            right_plan_id: Karşılaştırılan (yeni) plan ID
+        
+        Returns:
+            PlanDiffResult veya None (plan alınamazsa)
+        """
+        from app.analysis.plan_diff import PlanDiffEngine
+
+        left_xml = self.get_plan_xml_by_id(left_plan_id, include_sensitive_data=include_sensitive_data)
+        right_xml = self.get_plan_xml_by_id(right_plan_id, include_sensitive_data=include_sensitive_data)
+        if not left_xml or not right_xml:
+            return None
+        try:
+            return PlanDiffEngine().diff_xml(left_xml, right_xml)
+        except ET.ParseError as e:
+            logger.error(f"Failed to diff plans {left_plan_id} and {right_plan_id}: {e}")
+            return None
+
+    def get_consolidated_missing_indexes(
+        self,
+        top_n: int = 50,
+        plan_xmls: Optional[List[str]] = None,
+        dmv_limit: int = 2000,
+    ) -> List["ConsolidatedMissingIndex"]:
+        """
+        DMV ve plan missing index önerilerini birleştirip skorla
+        
+        Örtüşen öneriler (aynı anahtar, anahtar alt kümesi, include farkı)
+        tek index önerisinde toplanır; skor impact x execution toplamıdır.
+        
+        Args:
+            top_n: Döndürülecek öneri sayısı
+            plan_xmls: Ek olarak taranacak plan XML'leri (ör. Query Store planları)
+            dmv_limit: DMV'den okunacak en fazla öneri
+        
+        Returns:
+            Skora göre sıralı ConsolidatedMissingIndex listesi
+        """
+        from app.analysis.missing_index_consolidator import MissingIndexConsolidator
+        from app.analysis.plan_model import get_plan_model
+
+        consolidator = MissingIndexConsolidator()
+        if self.is_connected:
+            try:
+                rows = self._execute_query_with_retry(
+                    QueryStoreQueries.MISSING_INDEX_DETAILS,
+                    {"top_n": max(1, int(dmv_limit))},
+                    operation_name="get_missing_index_details",
+                )
+                consolidator.add_dmv_rows(rows)
+            except Exception as e:
+                logger.warning(f"Failed to read missing index DMVs: {e}")
+        for plan_xml in plan_xmls or []:
+            if not plan_xml:
+                continue
+            try:
+                consolidator.add_plan_model(get_plan_model(plan_xml))
+            except ET.ParseError as e:
+                logger.debug(f"Skipping invalid plan XML for missing index consolidation: {e}")
+        return consolidator.consolidate(top_n=top_n)
+
+    def scan_plan_cache(
+        self,
+        top_n: int = 500,
+        max_workers: int = 4,
+        cancel_check: Optional[Callable[[], bool]] = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+    ) -> Optional["PlanCacheScanResult"]:
+        """
+        Plan cache'teki en pahalı N planı anti-pattern'ler için tara
+        
+        Plan handle listesi tek sorguda alınır; XML'ler sınırlı bir worker
+        havuzunda tek tek çekilip parse edilir ve bulgular çıkarıldıktan
+        sonra atılır. SQL Server 2019+ üzerinde LAST_QUERY_PLAN_STATS açıksa
+        son actual plan kullanılır (spill / thread skew bulguları için).
+        
+        Args:
+            top_n: Toplam CPU'ya göre taranacak plan sayısı
+            max_workers: Eş zamanlı worker (bağlantı havuzu boyutuyla sınırlı)
+        
+        Returns:
+            PlanCacheScanResult veya None (bağlantı yoksa / liste alınamazsa)
+        """
+        from app.analysis.plan_cache_scanner import PlanCacheScanner, iter_plan_cache_entries
+        from app.core.config import get_settings
+
+        if not self.is_connected:
+            return None
+
+        safe_top_n = max(1, min(int(top_n), 5000))
+        version = self._get_sql_version()
+        handles_sql = (
+            QueryStoreQueries.PLAN_CACHE_TOP_HANDLES
+            if version >= 13
+            else QueryStoreQueries.PLAN_CACHE_TOP_HANDLES_LEGACY
+        )
+        plan_sql = (
+            QueryStoreQueries.PLAN_CACHE_PLAN_XML_WITH_STATS
+            if version >= 15
+            else QueryStoreQueries.PLAN_CACHE_PLAN_XML
+        )
+        try:
+            rows = self._execute_query_with_retry(
+                handles_sql,
+                {"top_n": safe_top_n},
+                operation_name="scan_plan_cache_handles",
+                cancel_check=cancel_check,
+            )
+        except TaskCancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to list plan cache entries: {e}")
+            return None
+        entries = list(iter_plan_cache_entries(rows))
+
+        def fetch_plan_xml(entry) -> Optional[str]:
+            results = self._execute_query_with_retry(
+                plan_sql,
+                {"plan_handle": entry.plan_handle},
+                operation_name="scan_plan_cache_plan",
+                max_attempts=2,
+            )
+            if not results:
+                return None
+            row = results[0]
+            entry.database_name = str(row.get("database_name") or "")
+            entry.object_name = str(row.get("object_name") or "")
+            plan_xml = row.get("query_plan_xml")
+            return str(plan_xml) if plan_xml else None
+
+        pool_size = int(get_settings().database.max_pool_size)
+        scanner = PlanCacheScanner(
+            fetch_plan_xml,
+            max_workers=max(1, min(int(max_workers), pool_size)),
+        )
+        result = scanner.scan(entries, cancel_check=cancel_check, progress_callback=progress_callback)
+        self._log_structured(
+            logging.INFO,
+            "plan_cache_scan_completed",
+            plans_requested=result.plans_requested,
+            plans_scanned=result.plans_scanned,
+            plans_failed=result.plans_failed,
+            findings=result.finding_count,
+            cancelled=result.cancelled,
+            duration_ms=result.duration_ms,
+        )
+        return result
+
     # ==========================================================================
     # CROSS-MODULE CONTEXT
     # ==========================================================================
@@ -0,0 +1,98 @@
+"""
+Store Lock - thread + cross-process lock for shared JSONL stores
+
+The desktop app and the headless collector (``python -m app.headless``) append
+to and trim the same files under the data directory. A threading lock alone
+only serializes one process, so the outermost acquire also takes an exclusive
+OS lock on a sidecar lock file (fcntl.flock on POSIX, msvcrt.locking on
+Windows). Re-entrant within a thread, like the RLock it wraps.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from time import sleep
+from typing import Any, Callable, Optional
+
+from app.core.logger import get_logger
+
+logger = get_logger("services.store_lock")
+
+if os.name == "nt":
+    import msvcrt
+
+    def _lock_handle(handle: Any) -> None:
+        handle.seek(0)
+        while True:
+            try:
+                # LK_LOCK ~10 sn dener, sonra OSError verir; sahip bırakana kadar bekle
+                msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                sleep(0.05)
+
+    def _unlock_handle(handle: Any) -> None:
+        handle.seek(0)
+        msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+else:
+    import fcntl
+
+    def _lock_handle(handle: Any) -> None:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+
+    def _unlock_handle(handle: Any) -> None:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+class StoreLock:
+    """
+    Context manager combining an in-process RLock with an OS file lock.
+
+    ``path_factory`` is resolved on first acquire so the data directory is read
+    from settings lazily. If the lock file cannot be opened/locked the store
+    falls back to in-process serialization and logs once at debug level.
+    """
+
+    def __init__(self, path_factory: Callable[[], Path]) -> None:
+        self._path_factory = path_factory
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._handle: Optional[Any] = None
+
+    def __enter__(self) -> "StoreLock":
+        self._lock.acquire()
+        if self._depth == 0:
+            self._handle = self._acquire_file_lock()
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._depth -= 1
+        try:
+            if self._depth == 0 and self._handle is not None:
+                handle, self._handle = self._handle, None
+                try:
+                    _unlock_handle(handle)
+                finally:
+                    handle.close()
+        except Exception as ex:
+            logger.debug(f"Store lock release failed: {ex}")
+        finally:
+            self._lock.release()
+
+    def _acquire_file_lock(self) -> Optional[Any]:
+        handle = None
+        try:
+            path = Path(self._path_factory())
+            path.parent.mkdir(parents=True, exist_ok=True)
+            handle = open(path, "a+b")
+            _lock_handle(handle)
+            return handle
+        except Exception as ex:
+            if handle is not None:
+                handle.close()
+            logger.debug(f"Store file lock unavailable, using in-process lock only: {ex}")
+            return None
@@ -0,0 +1,301 @@
+"""
+Wait Alert Engine - stateful threshold alert evaluation with hysteresis
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import Enum
+from threading import Lock
+from time import monotonic
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+DEFAULT_PENDING_SECONDS = 10.0
+DEFAULT_RESOLVE_SECONDS = 30.0
+DEFAULT_HYSTERESIS_RATIO = 0.10
+DEFAULT_RESOLVED_HOLD_SECONDS = 120.0
+MAX_ALERT_TRANSITIONS = 1000
+
+
+class AlertState(Enum):
+    """Lifecycle state of a single (server, alert_id) tracker."""
+
+    INACTIVE = "inactive"
+    PENDING = "pending"
+    FIRING = "firing"
+    RESOLVED = "resolved"
+
+
+@dataclass
+class AlertSignal:
+    """
+    One metric observation for an alert rule.
+
+    ``alert`` is the rule's alert object when the metric breaches its trigger
+    threshold, ``None`` otherwise; ``value``/``threshold`` drive the clear-side
+    hysteresis band while the alert is firing.
+    """
+
+    alert_id: str
+    value: float
+    threshold: float
+    alert: Optional[Any] = None
+
+    @property
+    def breached(self) -> bool:
+        return self.alert is not None
+
+
+@dataclass
+class AlertTransition:
+    """State change emitted by the engine; consumers read them by sequence number."""
+
+    seq: int
+    server: str
+    alert_id: str
+    from_state: AlertState
+    to_state: AlertState
+    severity: str
+    title: str
+    metric_value: float
+    threshold_value: float
+    at: datetime = field(default_factory=datetime.now)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "seq": int(self.seq),
+            "server": self.server,
+            "alert_id": self.alert_id,
+            "from_state": self.from_state.value,
+            "to_state": self.to_state.value,
+            "severity": self.severity,
+            "title": self.title,
+            "metric_value": round(float(self.metric_value), 4),
+            "threshold_value": round(float(self.threshold_value), 4),
+            "at": self.at.isoformat(timespec="seconds"),
+        }
+
+
+@dataclass
+class _AlertTracker:
+    state: AlertState = AlertState.INACTIVE
+    entered_at: float = 0.0
+    breach_since: Optional[float] = None
+    clear_since: Optional[float] = None
+    fired_at: Optional[datetime] = None
+    alert: Optional[Any] = None
+
+
+# (input key, builder) - builder is only invoked when the key differs from the last evaluation.
+SignalGroup = Tuple[Hashable, Callable[[], List[AlertSignal]]]
+
+
+class WaitAlertEngine:
+    """
+    Per-server alert state machine.
+
+    INACTIVE -> PENDING when a rule breaches, PENDING -> FIRING once the breach
+    has held for ``pending_seconds``; FIRING -> RESOLVED once the metric stayed
+    below ``threshold * (1 - hysteresis_ratio)`` for ``resolve_seconds``.
+    Values inside the hysteresis band keep the current state, so a metric
+    oscillating around its threshold does not flap.
+
+    Signal builders are grouped by the inputs they read; a group whose input
+    key is unchanged since the last call reuses its cached signals and only
+    the time-based transitions are re-checked.
+    """
+
+    def __init__(
+        self,
+        pending_seconds: float = DEFAULT_PENDING_SECONDS,
+        resolve_seconds: float = DEFAULT_RESOLVE_SECONDS,
+        hysteresis_ratio: float = DEFAULT_HYSTERESIS_RATIO,
+        resolved_hold_seconds: float = DEFAULT_RESOLVED_HOLD_SECONDS,
+        max_transitions: int = MAX_ALERT_TRANSITIONS,
+    ) -> None:
+        self.pending_seconds = max(0.0, float(pending_seconds))
+        self.resolve_seconds = max(0.0, float(resolve_seconds))
+        self.hysteresis_ratio = min(0.9, max(0.0, float(hysteresis_ratio)))
+        self.resolved_hold_seconds = max(0.0, float(resolved_hold_seconds))
+        self._trackers: Dict[str, Dict[str, _AlertTracker]] = {}
+        self._group_keys: Dict[str, Dict[str, Hashable]] = {}
+        self._group_signals: Dict[str, Dict[str, List[AlertSignal]]] = {}
+        self._transitions: Deque[AlertTransition] = deque(maxlen=max(1, int(max_transitions)))
+        self._seq = 0
+        self._lock = Lock()
+        self.last_recomputed_groups = 0
+
+    @property
+    def last_seq(self) -> int:
+        return self._seq
+
+    def evaluate(
+        self,
+        server: str,
+        groups: Dict[str, SignalGroup],
+        now: Optional[float] = None,
+    ) -> List[AlertTransition]:
+        """Refresh changed signal groups and advance every tracker of ``server``."""
+        server_key = str(server or "")
+        ts = monotonic() if now is None else float(now)
+        with self._lock:
+            keys = self._group_keys.setdefault(server_key, {})
+            cached = self._group_signals.setdefault(server_key, {})
+            recomputed = 0
+            for name, (input_key, builder) in groups.items():
+                if name in cached and keys.get(name) == input_key:
+                    continue
+                cached[name] = list(builder() or [])
+                keys[name] = input_key
+                recomputed += 1
+            for stale in [name for name in cached if name not in groups]:
+                cached.pop(stale, None)
+                keys.pop(stale, None)
+            self.last_recomputed_groups = recomputed
+
+            trackers = self._trackers.setdefault(server_key, {})
+            emitted: List[AlertTransition] = []
+            seen: set = set()
+            for signals in cached.values():
+                for signal in signals:
+                    seen.add(signal.alert_id)
+                    tracker = trackers.setdefault(signal.alert_id, _AlertTracker(entered_at=ts))
+                    emitted.extend(self._advance(server_key, tracker, signal, ts))
+            # A rule that vanished (e.g. group removed) is treated as fully cleared.
+            for alert_id, tracker in trackers.items():
+                if alert_id not in seen and tracker.state != AlertState.INACTIVE:
+                    emitted.extend(self._advance(server_key, tracker, AlertSignal(alert_id, 0.0, 0.0), ts))
+            return emitted
+
+    def _advance(
+        self,
+        server: str,
+        tracker: _AlertTracker,
+        signal: AlertSignal,
+        ts: float,
+    ) -> List[AlertTransition]:
+        out: List[AlertTransition] = []
+        clear_level = float(signal.threshold) * (1.0 - self.hysteresis_ratio)
+        cleared = not signal.breached and (signal.threshold <= 0 or float(signal.value) < clear_level)
+
+        if tracker.state in (AlertState.INACTIVE, AlertState.RESOLVED):
+            if signal.breached:
+                tracker.breach_since = ts
+                tracker.alert = signal.alert
+                out.append(self._move(server, tracker, signal, AlertState.PENDING, ts))
+                if self.pending_seconds <= 0:
+                    tracker.fired_at = datetime.now()
+                    tracker.clear_since = None
+                    out.append(self._move(server, tracker, signal, AlertState.FIRING, ts))
+            elif tracker.state == AlertState.RESOLVED and ts - tracker.entered_at >= self.resolved_hold_seconds:
+                tracker.state = AlertState.INACTIVE
+                tracker.entered_at = ts
+                tracker.alert = None
+            return out
+
+        if tracker.state == AlertState.PENDING:
+            if not signal.breached:
+                tracker.breach_since = None
+                out.append(self._move(server, tracker, signal, AlertState.INACTIVE, ts))
+                tracker.alert = None
+                return out
+            tracker.alert = signal.alert
+            since = tracker.breach_since if tracker.breach_since is not None else ts
+            if ts - since >= self.pending_seconds:
+                tracker.fired_at = datetime.now()
+                tracker.clear_since = None
+                out.append(self._move(server, tracker, signal, AlertState.FIRING, ts))
+            return out
+
+        # FIRING
+        if signal.breached:
+            tracker.clear_since = None
+            previous = tracker.alert
+            tracker.alert = signal.alert
+            if str(getattr(previous, "severity", "")) != str(getattr(signal.alert, "severity", "")):
+                out.append(self._move(server, tracker, signal, AlertState.FIRING, ts))
+            return out
+        if not cleared:
+            tracker.clear_since = None
+            return out
+        if tracker.clear_since is None:
+            tracker.clear_since = ts
+        if ts - tracker.clear_since >= self.resolve_seconds:
+            tracker.breach_since = None
+            tracker.clear_since = None
+            out.append(self._move(server, tracker, signal, AlertState.RESOLVED, ts))
+        return out
+
+    def _move(
+        self,
+        server: str,
+        tracker: _AlertTracker,
+        signal: AlertSignal,
+        to_state: AlertState,
+        ts: float,
+    ) -> AlertTransition:
+        from_state = tracker.state
+        tracker.state = to_state
+        if from_state != to_state:
+            tracker.entered_at = ts
+        alert = signal.alert or tracker.alert
+        self._seq += 1
+        transition = AlertTransition(
+            seq=self._seq,
+            server=server,
+            alert_id=signal.alert_id,
+            from_state=from_state,
+            to_state=to_state,
+            severity=str(getattr(alert, "severity", "") or ""),
+            title=str(getattr(alert, "title", "") or signal.alert_id),
+            metric_value=float(signal.value),
+            threshold_value=float(signal.threshold),
+        )
+        self._transitions.append(transition)
+        return transition
+
+    def active_alerts(self, server: str) -> List[Tuple[Any, datetime]]:
+        """Alerts currently FIRING for ``server`` with the time they started firing."""
+        with self._lock:
+            return [
+                (tracker.alert, tracker.fired_at or datetime.now())
+                for tracker in self._trackers.get(str(server or ""), {}).values()
+                if tracker.state == AlertState.FIRING and tracker.alert is not None
+            ]
+
+    def state_counts(self, server: str) -> Dict[str, int]:
+        counts = {state.value: 0 for state in AlertState}
+        with self._lock:
+            for tracker in self._trackers.get(str(server or ""), {}).values():
+                counts[tracker.state.value] += 1
+        return counts
+
+    def states(self, server: str) -> Dict[str, str]:
+        with self._lock:
+            return {
+                alert_id: tracker.state.value
+                for alert_id, tracker in self._trackers.get(str(server or ""), {}).items()
+                if tracker.state != AlertState.INACTIVE
+            }
+
+    def transitions_since(self, after_seq: int = 0, server: Optional[str] = None) -> List[AlertTransition]:
+        with self._lock:
+            return [
+                item
+                for item in self._transitions
+                if item.seq > int(after_seq or 0) and (server is None or item.server == server)
+            ]
+
+    def reset(self, server: Optional[str] = None) -> None:
+        with self._lock:
+            if server is None:
+                self._trackers.clear()
+                self._group_keys.clear()
+                self._group_signals.clear()
+                return
+            key = str(server or "")
+            self._trackers.pop(key, None)
+            self._group_keys.pop(key, None)
+            self._group_signals.pop(key, None)
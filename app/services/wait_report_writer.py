@@ -0,0 +1,189 @@
+"""
+Wait Report Writer - single-pass JSON/CSV/Markdown report streaming
+
+All requested formats are open at the same time and every report section is
+pushed to each of them as it is produced, so a section backed by an iterator
+(e.g. the local snapshot time-series) is walked exactly once and never held in
+memory. Output can optionally be gzip-compressed (``.json.gz`` etc.).
+
+A failure in one format closes and removes only that file; the remaining
+formats keep streaming.
+"""
+
+from __future__ import annotations
+
+import csv
+import gzip
+import json
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from app.core.logger import get_logger
+
+logger = get_logger("services.wait_report_writer")
+
+REPORT_FORMATS = ("json", "csv", "md")
+
+
+class WaitReportWriter:
+    """
+    Streams one report into several formats at once.
+
+    JSON is written as a top-level object whose list sections are emitted one
+    element at a time; CSV uses a fixed column set declared up front (a
+    ``section`` column tells row kinds apart); Markdown receives explicit
+    lines plus optional per-row table renderers.
+    """
+
+    def __init__(
+        self,
+        base_path: Path,
+        formats: Iterable[str],
+        csv_columns: Sequence[str] = (),
+        compress: bool = False,
+    ) -> None:
+        self._handles: Dict[str, IO[str]] = {}
+        self._paths: Dict[str, Path] = {}
+        self._csv: Optional[csv.DictWriter] = None
+        self._csv_columns = list(csv_columns or ["section"])
+        self._json_needs_comma = False
+        base = Path(base_path)
+        for fmt in formats:
+            fmt = str(fmt or "").strip().lower()
+            if fmt not in REPORT_FORMATS or fmt in self._handles:
+                continue
+            path = base.with_name(f"{base.name}.{fmt}" + (".gz" if compress else ""))
+            encoding = "utf-8-sig" if fmt == "csv" else "utf-8"
+            newline = "" if fmt == "csv" else None
+            try:
+                if compress:
+                    handle: IO[str] = gzip.open(path, "wt", encoding=encoding, newline=newline, compresslevel=6)
+                else:
+                    handle = open(path, "w", encoding=encoding, newline=newline)
+            except Exception as ex:
+                logger.warning(f"Failed to open wait report [{fmt}]: {ex}")
+                continue
+            self._handles[fmt] = handle
+            self._paths[fmt] = path
+        self._guard("csv", self._start_csv)
+        self._guard("json", lambda handle: handle.write("{"))
+
+    def __enter__(self) -> "WaitReportWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close(success=exc_type is None)
+
+    @property
+    def formats(self) -> List[str]:
+        return list(self._handles.keys())
+
+    def _start_csv(self, handle: IO[str]) -> None:
+        self._csv = csv.DictWriter(handle, fieldnames=self._csv_columns, extrasaction="ignore", restval="")
+        self._csv.writeheader()
+
+    def _guard(self, fmt: str, action: Callable[[IO[str]], None]) -> None:
+        handle = self._handles.get(fmt)
+        if handle is None:
+            return
+        try:
+            action(handle)
+        except Exception as ex:
+            logger.warning(f"Failed to write automated wait report [{fmt}]: {ex}")
+            self._discard(fmt)
+
+    def _discard(self, fmt: str) -> None:
+        handle = self._handles.pop(fmt, None)
+        path = self._paths.pop(fmt, None)
+        try:
+            if handle is not None:
+                handle.close()
+        except Exception:
+            pass
+        try:
+            if path is not None:
+                path.unlink(missing_ok=True)
+        except Exception:
+            pass
+
+    def _json_key(self, handle: IO[str], key: str) -> None:
+        handle.write(",\n  " if self._json_needs_comma else "\n  ")
+        handle.write(json.dumps(str(key), ensure_ascii=False) + ": ")
+        self._json_needs_comma = True
+
+    def value(self, key: str, value: Any) -> None:
+        """Write a small (already materialized) section to JSON."""
+
+        def _write(handle: IO[str]) -> None:
+            self._json_key(handle, key)
+            handle.write(json.dumps(value, ensure_ascii=False, default=str))
+
+        self._guard("json", _write)
+
+    def md(self, *lines: str) -> None:
+        self._guard("md", lambda handle: handle.write("".join(f"{line}\n" for line in lines)))
+
+    def csv_row(self, row: Dict[str, Any]) -> None:
+        self._guard("csv", lambda _handle: self._csv.writerow(self._flatten(row)) if self._csv else None)
+
+    @staticmethod
+    def _flatten(row: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            key: json.dumps(value, ensure_ascii=False, default=str) if isinstance(value, (dict, list)) else value
+            for key, value in row.items()
+        }
+
+    def rows(
+        self,
+        key: str,
+        items: Iterable[Dict[str, Any]],
+        csv_section: Optional[str] = None,
+        md_row: Optional[Callable[[Dict[str, Any]], str]] = None,
+        md_limit: Optional[int] = None,
+    ) -> int:
+        """
+        Stream a list section: each item goes to JSON (array element), CSV
+        (when ``csv_section`` is set) and Markdown (via ``md_row`` up to
+        ``md_limit`` rows) before the next item is pulled.
+        """
+        state = {"first": True}
+
+        def _open(handle: IO[str]) -> None:
+            self._json_key(handle, key)
+            handle.write("[")
+
+        def _item(item: Dict[str, Any]) -> Callable[[IO[str]], None]:
+            def _write(handle: IO[str]) -> None:
+                handle.write("\n    " if state["first"] else ",\n    ")
+                handle.write(json.dumps(item, ensure_ascii=False, default=str))
+
+            return _write
+
+        self._guard("json", _open)
+        count = 0
+        for item in items:
+            self._guard("json", _item(item))
+            state["first"] = False
+            if csv_section is not None:
+                self.csv_row({"section": csv_section, **item})
+            if md_row is not None and (md_limit is None or count < md_limit):
+                self.md(md_row(item))
+            count += 1
+        self._guard("json", lambda handle: handle.write("]" if state["first"] else "\n  ]"))
+        return count
+
+    def close(self, success: bool = True) -> List[Path]:
+        """Finish every open format; returns written paths (none when ``success`` is False)."""
+        self._guard("json", lambda handle: handle.write("\n}\n"))
+        written: List[Path] = []
+        for fmt in list(self._handles.keys()):
+            if not success:
+                self._discard(fmt)
+                continue
+            try:
+                self._handles.pop(fmt).close()
+                written.append(self._paths.pop(fmt))
+            except Exception as ex:
+                logger.warning(f"Failed to finalize automated wait report [{fmt}]: {ex}")
+                self._discard(fmt)
+        return written
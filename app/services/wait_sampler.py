@@ -0,0 +1,371 @@
+"""
+High-frequency wait sampler - sub-second sys.dm_os_waiting_tasks capture
+
+The 5s monitor only sees the waiters alive at the instant CURRENT_WAITS runs,
+so short blocking or PAGELATCH bursts slip between refreshes. The sampler polls
+a narrow waiting-tasks projection every 250-500 ms on its own autocommit pyodbc
+connection (opened outside the SQLAlchemy pool, so it never holds a pool slot),
+keeps compact tuples in a fixed-size ring buffer and summarizes them into
+per-wait-type / per-resource histograms when the UI refreshes.
+
+Budget guards:
+    - one held DBAPI connection, owned by the poll thread (no checkout per poll)
+    - TOP (256) narrow projection, tuples only (no per-row dicts)
+    - EWMA of poll cost; the interval backs off when polling exceeds its
+      share of the interval and recovers once it is cheap again
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+from bisect import bisect_left
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from time import monotonic, perf_counter
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from app.core.logger import get_logger
+from app.database.queries.wait_stats_queries import WaitCategory, WaitStatsQueries, get_wait_category
+
+logger = get_logger("services.wait_sampler")
+
+MIN_SAMPLE_INTERVAL_MS = 250
+MAX_SAMPLE_INTERVAL_MS = 5000
+DEFAULT_SAMPLE_INTERVAL_MS = 500
+DEFAULT_RING_CAPACITY = 20_000
+# Upper bounds (ms) of the duration histogram buckets; the last bucket is open-ended
+DURATION_BUCKETS_MS: Tuple[int, ...] = (1, 5, 10, 50, 100, 500, 1000, 5000)
+DURATION_BUCKET_LABELS: Tuple[str, ...] = tuple(
+    [f"<={bound}ms" for bound in DURATION_BUCKETS_MS] + [f">{DURATION_BUCKETS_MS[-1]}ms"]
+)
+
+# (poll_seq, monotonic_ts, wait_type, wait_duration_ms, session_id, blocking_session_id, resource)
+WaitSampleRow = Tuple[int, float, str, int, int, int, str]
+
+
+@dataclass
+class WaitTypeHistogram:
+    """Sampled observations of one wait type."""
+
+    wait_type: str
+    category: WaitCategory
+    observations: int = 0
+    polls_seen: int = 0
+    sessions: int = 0
+    blocked_observations: int = 0
+    max_duration_ms: int = 0
+    bucket_counts: List[int] = field(default_factory=lambda: [0] * (len(DURATION_BUCKETS_MS) + 1))
+    top_resources: List[Tuple[str, int]] = field(default_factory=list)
+
+    def percentile_ms(self, pct: float) -> int:
+        """Bucket upper bound that covers pct% of observations."""
+        if self.observations <= 0:
+            return 0
+        target = self.observations * max(0.0, min(100.0, float(pct))) / 100.0
+        running = 0
+        for index, count in enumerate(self.bucket_counts):
+            running += count
+            if running >= target:
+                if index < len(DURATION_BUCKETS_MS):
+                    return min(DURATION_BUCKETS_MS[index], self.max_duration_ms)
+                return self.max_duration_ms
+        return self.max_duration_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "wait_type": self.wait_type,
+            "category": self.category.value,
+            "observations": int(self.observations),
+            "polls_seen": int(self.polls_seen),
+            "sessions": int(self.sessions),
+            "blocked_observations": int(self.blocked_observations),
+            "max_duration_ms": int(self.max_duration_ms),
+            "p95_duration_ms": int(self.percentile_ms(95.0)),
+            "buckets": {
+                label: int(count) for label, count in zip(DURATION_BUCKET_LABELS, self.bucket_counts) if count
+            },
+            "top_resources": [{"resource": res, "observations": int(cnt)} for res, cnt in self.top_resources],
+        }
+
+
+@dataclass
+class WaitSamplerSummary:
+    """Histogram summary of the samples taken since the previous summary."""
+
+    polls: int = 0
+    observations: int = 0
+    window_seconds: float = 0.0
+    effective_interval_ms: int = 0
+    avg_poll_ms: float = 0.0
+    backoff_active: bool = False
+    dropped_samples: int = 0
+    last_error: str = ""
+    wait_types: List[WaitTypeHistogram] = field(default_factory=list)
+    top_resources: List[Tuple[str, int]] = field(default_factory=list)
+    collected_at: datetime = field(default_factory=datetime.now)
+
+    def to_dict(self, top_n: int = 10) -> Dict[str, Any]:
+        return {
+            "polls": int(self.polls),
+            "observations": int(self.observations),
+            "window_seconds": round(float(self.window_seconds), 2),
+            "effective_interval_ms": int(self.effective_interval_ms),
+            "avg_poll_ms": round(float(self.avg_poll_ms), 2),
+            "backoff_active": bool(self.backoff_active),
+            "dropped_samples": int(self.dropped_samples),
+            "last_error": str(self.last_error or ""),
+            "wait_types": [item.to_dict() for item in self.wait_types[:top_n]],
+            "top_resources": [{"resource": res, "observations": int(cnt)} for res, cnt in self.top_resources[:top_n]],
+            "collected_at": self.collected_at.isoformat(timespec="seconds"),
+        }
+
+
+class WaitSampler:
+    """
+    Background poller for sys.dm_os_waiting_tasks.
+
+    connect: returns a DBAPI connection (DatabaseConnection.open_dedicated_dbapi_connection,
+    a separate autocommit connection). The poll thread owns it: it opens the
+    connection, reopens it after failures and resets/closes it when the thread
+    exits, so stop() never closes a connection under an in-flight execute.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        interval_ms: int = DEFAULT_SAMPLE_INTERVAL_MS,
+        capacity: int = DEFAULT_RING_CAPACITY,
+        poll_budget_ratio: float = 0.2,
+        max_consecutive_errors: int = 5,
+        sql: str = WaitStatsQueries.WAITING_TASKS_SAMPLE,
+    ):
+        self._connect = connect
+        self._sql = sql
+        self._base_interval_ms = max(MIN_SAMPLE_INTERVAL_MS, min(MAX_SAMPLE_INTERVAL_MS, int(interval_ms)))
+        self._interval_ms = self._base_interval_ms
+        self._poll_budget_ratio = max(0.01, float(poll_budget_ratio))
+        self._max_consecutive_errors = max(1, int(max_consecutive_errors))
+        self._ring: Deque[WaitSampleRow] = deque(maxlen=max(100, int(capacity)))
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._poll_seq = 0
+        self._summary_seq = 0
+        self._summary_ts = monotonic()
+        self._ewma_poll_ms = 0.0
+        self._dropped = 0
+        self._consecutive_errors = 0
+        self._last_error = ""
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def interval_ms(self) -> int:
+        return self._interval_ms
+
+    @property
+    def last_error(self) -> str:
+        return self._last_error
+
+    def start(self) -> bool:
+        if self.is_running:
+            return True
+        # Her çalıştırmanın kendi olayı var; durmakta olan eski thread yeniden canlanmaz
+        stop_event = threading.Event()
+        self._stop_event = stop_event
+        self._consecutive_errors = 0
+        self._last_error = ""
+        with self._lock:
+            self._summary_seq = self._poll_seq
+            self._summary_ts = monotonic()
+        self._thread = threading.Thread(target=self._run, args=(stop_event,), name="wait-sampler", daemon=True)
+        self._thread.start()
+        logger.info(f"Wait sampler started ({self._base_interval_ms} ms)")
+        return True
+
+    def stop(self, timeout: float = 2.0) -> None:
+        self._stop_event.set()
+        thread, self._thread = self._thread, None
+        if thread is None or thread is threading.current_thread():
+            return
+        thread.join(timeout=max(0.0, float(timeout)))
+        if thread.is_alive():
+            logger.info("Wait sampler poll still in flight; its thread closes the connection when it returns")
+
+    @staticmethod
+    def _close_connection(conn: Any) -> None:
+        if conn is None:
+            return
+        # connect() may hand out a pooled connection; never return it with
+        # dirty-read / low-priority session settings or an open transaction.
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    "SET DEADLOCK_PRIORITY NORMAL; "
+                    "SET TRANSACTION ISOLATION LEVEL READ COMMITTED;"
+                )
+            finally:
+                cursor.close()
+            conn.rollback()
+        except Exception:
+            pass
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _open_connection(self) -> Any:
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    "SET NOCOUNT ON; SET DEADLOCK_PRIORITY LOW; "
+                    "SET TRANSACTION ISOLATION LEVEL READ UNCOMMITTED;"
+                )
+            finally:
+                cursor.close()
+        except Exception:
+            self._close_connection(conn)
+            raise
+        return conn
+
+    def _run(self, stop_event: threading.Event) -> None:
+        conn: Any = None
+        try:
+            while not stop_event.is_set():
+                started = perf_counter()
+                try:
+                    if conn is None:
+                        conn = self._open_connection()
+                    self.poll_once(conn)
+                    self._consecutive_errors = 0
+                except Exception as ex:
+                    self._consecutive_errors += 1
+                    self._last_error = str(ex)
+                    self._close_connection(conn)
+                    conn = None
+                    logger.warning(f"Wait sampler poll failed ({self._consecutive_errors}): {ex}")
+                    if self._consecutive_errors >= self._max_consecutive_errors:
+                        logger.warning("Wait sampler stopped after repeated failures")
+                        break
+                elapsed_ms = (perf_counter() - started) * 1000.0
+                self._adapt_interval(elapsed_ms)
+                stop_event.wait(max(0.0, (self._interval_ms - elapsed_ms) / 1000.0))
+        finally:
+            self._close_connection(conn)
+
+    def poll_once(self, conn: Any) -> int:
+        """Take one sample on ``conn``; returns the number of waiting tasks captured."""
+        cursor = conn.cursor()
+        try:
+            cursor.execute(self._sql)
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+
+        now = monotonic()
+        intern = sys.intern
+        with self._lock:
+            self._poll_seq += 1
+            seq = self._poll_seq
+            ring = self._ring
+            if ring.maxlen is not None:
+                overflow = len(ring) + len(rows) - ring.maxlen
+                if overflow > 0:
+                    self._dropped += overflow
+            for session_id, wait_type, duration_ms, blocking_session_id, resource in rows:
+                ring.append((
+                    seq,
+                    now,
+                    intern(str(wait_type or "")),
+                    int(duration_ms or 0),
+                    int(session_id or 0),
+                    int(blocking_session_id or 0),
+                    str(resource or ""),
+                ))
+        return len(rows)
+
+    def _adapt_interval(self, poll_ms: float) -> None:
+        alpha = 0.2
+        self._ewma_poll_ms = poll_ms if self._ewma_poll_ms <= 0 else (alpha * poll_ms + (1 - alpha) * self._ewma_poll_ms)
+        budget_ms = self._interval_ms * self._poll_budget_ratio
+        if self._ewma_poll_ms > budget_ms and self._interval_ms < MAX_SAMPLE_INTERVAL_MS:
+            self._interval_ms = min(MAX_SAMPLE_INTERVAL_MS, self._interval_ms * 2)
+            logger.info(f"Wait sampler backing off to {self._interval_ms} ms (poll {self._ewma_poll_ms:.1f} ms)")
+        elif (
+            self._interval_ms > self._base_interval_ms
+            and self._ewma_poll_ms < (self._interval_ms // 2) * self._poll_budget_ratio / 2
+        ):
+            self._interval_ms = max(self._base_interval_ms, self._interval_ms // 2)
+
+    def summarize(self, top_resources: int = 5, consume: bool = True) -> WaitSamplerSummary:
+        """
+        Build histograms from the samples taken since the previous summary.
+
+        consume=False leaves the summary cursor in place (peek).
+        """
+        with self._lock:
+            since_seq = self._summary_seq
+            polls = self._poll_seq - since_seq
+            samples = [row for row in self._ring if row[0] > since_seq]
+            now = monotonic()
+            window_seconds = now - self._summary_ts
+            if consume:
+                self._summary_seq = self._poll_seq
+                self._summary_ts = now
+            dropped = self._dropped
+            if consume:
+                self._dropped = 0
+
+        per_type: Dict[str, WaitTypeHistogram] = {}
+        type_polls: Dict[str, set] = {}
+        type_sessions: Dict[str, set] = {}
+        type_resources: Dict[str, Dict[str, int]] = {}
+        resource_counts: Dict[str, int] = {}
+
+        for seq, _ts, wait_type, duration_ms, session_id, blocking_session_id, resource in samples:
+            hist = per_type.get(wait_type)
+            if hist is None:
+                hist = WaitTypeHistogram(wait_type=wait_type, category=get_wait_category(wait_type))
+                per_type[wait_type] = hist
+                type_polls[wait_type] = set()
+                type_sessions[wait_type] = set()
+                type_resources[wait_type] = {}
+            hist.observations += 1
+            hist.bucket_counts[bisect_left(DURATION_BUCKETS_MS, duration_ms)] += 1
+            if duration_ms > hist.max_duration_ms:
+                hist.max_duration_ms = duration_ms
+            if blocking_session_id:
+                hist.blocked_observations += 1
+            type_polls[wait_type].add(seq)
+            type_sessions[wait_type].add(session_id)
+            if resource:
+                bucket = type_resources[wait_type]
+                bucket[resource] = bucket.get(resource, 0) + 1
+                resource_counts[resource] = resource_counts.get(resource, 0) + 1
+
+        for wait_type, hist in per_type.items():
+            hist.polls_seen = len(type_polls[wait_type])
+            hist.sessions = len(type_sessions[wait_type])
+            hist.top_resources = sorted(
+                type_resources[wait_type].items(), key=lambda item: item[1], reverse=True
+            )[:top_resources]
+
+        return WaitSamplerSummary(
+            polls=polls,
+            observations=len(samples),
+            window_seconds=window_seconds,
+            effective_interval_ms=self._interval_ms,
+            avg_poll_ms=self._ewma_poll_ms,
+            backoff_active=self._interval_ms > self._base_interval_ms,
+            dropped_samples=dropped,
+            last_error=self._last_error,
+            wait_types=sorted(per_type.values(), key=lambda h: (h.observations, h.max_duration_ms), reverse=True),
+            top_resources=sorted(resource_counts.items(), key=lambda item: item[1], reverse=True)[:top_resources],
+        )
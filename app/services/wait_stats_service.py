@@ -6,17 +6,19 @@ from __future__ import annotations
 
 import json
 import re
-import csv
-from dataclasses import dataclass, field, asdict
+from dataclasses import dataclass, field, asdict, replace
 from datetime import datetime, timedelta
 from pathlib import Path
+from threading import Lock
 from time import perf_counter, sleep
-from typing import Any, Callable, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
+from app.analysis.wait_delta_engine import WaitDeltaEngine, WaitIntervalDelta
 from app.core.config import get_settings
 from app.core.logger import get_logger
 from app.database.connection import get_connection_manager
 from app.database.queries.wait_stats_queries import (
+    CompiledPatternMatcher,
     WaitCategory,
     WaitStatsQueries,
     get_category_color,
@@ -26,11 +28,39 @@ from app.database.queries.wait_stats_queries import (
 from app.models.analysis_context import AnalysisContext
 from app.services.analysis_message_bus import get_analysis_message_bus
 from app.services.blocking_service import BlockingService
+from app.services.metrics_exporter import MetricSample, metric, pool_samples, publish_metrics, render_prometheus_text
+from app.services.monitoring_outbox import MonitoringOutbox
+from app.services.store_lock import StoreLock
+from app.services.wait_alert_engine import AlertSignal, AlertTransition, SignalGroup, WaitAlertEngine
+from app.services.wait_report_writer import WaitReportWriter
+from app.services.wait_sampler import DEFAULT_SAMPLE_INTERVAL_MS, WaitSampler, WaitSamplerSummary
+from app.services.xe_collector import XE_TARGET_RING_BUFFER, XeCollectResult, XeTelemetryCollector
 
 logger = get_logger("services.wait_stats")
 
 MAX_HISTORY_SNAPSHOTS = 4000
 MAX_TELEMETRY_SNAPSHOTS = 5000
+WAIT_DELTA_WINDOW_SECONDS = 300.0
+# Serializes append+trim of the shared JSONL stores across collector threads
+# and across processes (GUI + headless collector share the data directory).
+_STORE_LOCK = StoreLock(lambda: get_settings().data_dir / "wait_stats_store.lock")
+REPORT_CSV_COLUMNS = [
+    "section",
+    "captured_at",
+    "category",
+    "database",
+    "dominant_category",
+    "generated_at",
+    "resource_wait_percent",
+    "server",
+    "signal_wait_percent",
+    "total_wait_ms",
+    "total_wait_time_ms",
+    "trend_date",
+    "wait_percent",
+    "wait_time_ms",
+    "wait_type",
+]
 
 
 @dataclass
@@ -85,6 +115,13 @@ class WaitSummary:
     all_waits: List[WaitStat] = field(default_factory=list)
     current_waits: List[CurrentWait] = field(default_factory=list)
     collected_at: datetime = field(default_factory=datetime.now)
+    # Interval deltas (None on the first refresh of a server: baseline only)
+    interval: Optional[WaitIntervalDelta] = None
+    interval_window: Optional[WaitIntervalDelta] = None
+    # Sub-second waiting-task histograms since the previous refresh (sampler running only)
+    sampled_waits: Optional[WaitSamplerSummary] = None
+    # Extended Events captured since the previous refresh (XE collection enabled only)
+    xe_telemetry: Optional[XeCollectResult] = None
 
 
 @dataclass
@@ -256,6 +293,7 @@ class WaitScheduleConfig:
     interval_minutes: int = 15
     output_dir: str = ""
     formats: List[str] = field(default_factory=lambda: ["json", "md"])
+    compress: bool = False
 
 
 @dataclass
@@ -292,6 +330,12 @@ class WaitStatsMetrics:
     multi_server_snapshots: int = 0
     plan_correlation_available: bool = False
     plan_correlation_confidence: float = 0.0
+    interval_seconds: float = 0.0
+    interval_wait_ms_per_sec: float = 0.0
+    counter_reset: bool = False
+    sampler_polls: int = 0
+    sampler_avg_poll_ms: float = 0.0
+    xe_events: int = 0
     collected_at: datetime = field(default_factory=datetime.now)
 
     def to_lightweight_contract(self) -> Dict[str, Any]:
@@ -317,6 +361,12 @@ class WaitStatsMetrics:
             "multi_server_snapshots": int(self.multi_server_snapshots or 0),
             "plan_correlation_available": bool(self.plan_correlation_available),
             "plan_correlation_confidence": float(self.plan_correlation_confidence or 0.0),
+            "interval_seconds": round(float(self.interval_seconds or 0.0), 2),
+            "interval_wait_ms_per_sec": round(float(self.interval_wait_ms_per_sec or 0.0), 2),
+            "counter_reset": bool(self.counter_reset),
+            "sampler_polls": int(self.sampler_polls or 0),
+            "sampler_avg_poll_ms": round(float(self.sampler_avg_poll_ms or 0.0), 2),
+            "xe_events": int(self.xe_events or 0),
             "errors": [str(item) for item in list(self.errors or [])[:5]],
         }
 
@@ -327,13 +377,21 @@ class WaitStatsService:
     """
 
     _instance: Optional["WaitStatsService"] = None
+    _instance_lock = Lock()
 
     def __new__(cls):
         if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance._last_context = None
-            cls._instance._is_subscribed = False
-            cls._instance._ensure_subscription()
+            # Headless collector threads can reach the singleton at the same time on the first tick
+            with cls._instance_lock:
+                if cls._instance is None:
+                    instance = super().__new__(cls)
+                    instance._last_context = None
+                    instance._is_subscribed = False
+                    instance._delta_engine = WaitDeltaEngine(window_seconds=WAIT_DELTA_WINDOW_SECONDS)
+                    instance._alert_engine = WaitAlertEngine()
+                    instance._outbox_lock = Lock()
+                    instance._ensure_subscription()
+                    cls._instance = instance
         return cls._instance
 
     def _ensure_subscription(self) -> None:
@@ -354,6 +412,76 @@ class WaitStatsService:
         conn = self.connection
         return conn is not None and conn.is_connected
 
+    def get_delta_engine(self) -> WaitDeltaEngine:
+        """Per-server interval delta engine (created with the singleton)."""
+        return self._delta_engine
+
+    def get_wait_sampler(self) -> Optional[WaitSampler]:
+        return getattr(self, "_wait_sampler", None)
+
+    def start_wait_sampler(self, interval_ms: int = DEFAULT_SAMPLE_INTERVAL_MS) -> bool:
+        """Start the sub-second waiting-tasks sampler on its own autocommit pyodbc connection."""
+        conn = self.connection
+        if conn is None or not conn.is_connected:
+            return False
+        sampler = self.get_wait_sampler()
+        if sampler is not None and sampler.is_running:
+            if sampler.interval_ms == interval_ms:
+                return True
+            sampler.stop()
+        sampler = WaitSampler(conn.open_dedicated_dbapi_connection, interval_ms=interval_ms)
+        setattr(self, "_wait_sampler", sampler)
+        return sampler.start()
+
+    def stop_wait_sampler(self) -> None:
+        sampler = self.get_wait_sampler()
+        if sampler is not None:
+            sampler.stop()
+        setattr(self, "_wait_sampler", None)
+
+    def get_xe_collector(self) -> Optional[XeTelemetryCollector]:
+        return getattr(self, "_xe_collector", None)
+
+    def enable_xe_collection(
+        self,
+        target: str = XE_TARGET_RING_BUFFER,
+        min_wait_ms: int = 10,
+    ) -> Tuple[bool, str]:
+        """
+        Create/start the XE telemetry session on the active server.
+        Returns (ok, message); requires ALTER ANY EVENT SESSION.
+        """
+        conn = self.connection
+        if conn is None or not conn.is_connected:
+            return False, "No active connection."
+        server, _database = self._active_server_database()
+        collector = XeTelemetryCollector(
+            server=server,
+            execute_query=conn.execute_query,
+            execute_ddl=conn.execute_autocommit,
+            store_path=self._xe_events_file_path(),
+            cursor_path=self._xe_cursor_file_path(),
+            target=target,
+            min_wait_ms=min_wait_ms,
+        )
+        try:
+            collector.ensure_session()
+        except Exception as ex:
+            logger.warning(f"XE session setup failed: {ex}")
+            return False, f"XE session setup failed: {ex}"
+        setattr(self, "_xe_collector", collector)
+        return True, f"XE session {collector.session_name} running ({collector.target})."
+
+    def disable_xe_collection(self, drop_session: bool = True) -> None:
+        collector = self.get_xe_collector()
+        setattr(self, "_xe_collector", None)
+        if collector is None or not drop_session:
+            return
+        try:
+            collector.drop_session()
+        except Exception as ex:
+            logger.warning(f"XE session cleanup failed: {ex}")
+
     def get_blocking_service(self) -> BlockingService:
         """Lazily provision unified blocking service for cross-view reuse."""
         service = getattr(self, "_blocking_service", None)
@@ -456,11 +584,31 @@ class WaitStatsService:
         path.parent.mkdir(parents=True, exist_ok=True)
         return path
 
+    def _monitoring_outbox_file_path(self) -> Path:
+        path = get_settings().data_dir / "wait_stats_monitoring_outbox.jsonl"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def _monitoring_dead_letter_file_path(self) -> Path:
+        path = get_settings().data_dir / "wait_stats_monitoring_dead_letter.jsonl"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
+
     def _telemetry_file_path(self) -> Path:
         path = get_settings().data_dir / "wait_stats_telemetry.jsonl"
         path.parent.mkdir(parents=True, exist_ok=True)
         return path
 
+    def _xe_events_file_path(self) -> Path:
+        path = get_settings().data_dir / "wait_stats_xe_events.jsonl"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def _xe_cursor_file_path(self) -> Path:
+        path = get_settings().data_dir / "wait_stats_xe_cursor.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
+
     def _scheduled_reports_dir(self) -> Path:
         root = get_settings().data_dir / "reports" / "wait_stats"
         root.mkdir(parents=True, exist_ok=True)
@@ -494,12 +642,14 @@ class WaitStatsService:
         max_attempts: int = 3,
         base_backoff_seconds: float = 0.2,
         retry_callback: Optional[Callable[[str, int, int, float, Exception], None]] = None,
-    ) -> Tuple[List[Dict[str, Any]], int, int]:
+        multi_result: bool = False,
+    ) -> Tuple[List[Any], int, int]:
         """
         Execute DB query with retry for transient failures.
 
         Returns:
             rows, retries_used, duration_ms
+            (multi_result=True: rows is one row list per result set)
         """
         started = perf_counter()
         attempts = max(1, int(max_attempts))
@@ -513,7 +663,10 @@ class WaitStatsService:
                 raise err
 
             try:
-                rows = conn.execute_query(sql, params)
+                if multi_result:
+                    rows = conn.execute_query_multi(sql)
+                else:
+                    rows = conn.execute_query(sql, params)
                 duration_ms = int((perf_counter() - started) * 1000)
                 return list(rows or []), attempt - 1, duration_ms
             except Exception as ex:
@@ -559,24 +712,57 @@ class WaitStatsService:
             )
         return waits
 
-    def _map_all_wait_rows(self, rows: List[Dict[str, Any]]) -> List[WaitStat]:
-        waits: List[WaitStat] = []
+    def _apply_counter_rows(self, summary: WaitSummary, rows: List[Dict[str, Any]], top_n: int = 10) -> None:
+        """
+        Derive summary totals, signal/resource ratio, top-N and category stats
+        from the raw WAIT_COUNTERS rowset (client-side WAIT_SUMMARY / SIGNAL_VS_RESOURCE / TOP_WAITS).
+        """
+        counters = []
+        category_stats = {cat: 0 for cat in WaitCategory}
+        all_waits: List[WaitStat] = []
         for row in rows or []:
             wait_type = str(row.get("wait_type", "") or "")
-            waits.append(
+            category = get_wait_category(wait_type)
+            tasks = self._safe_int(row.get("waiting_tasks_count", 0))
+            wait_ms = self._safe_int(row.get("wait_time_ms", 0))
+            signal_ms = self._safe_int(row.get("signal_wait_time_ms", 0))
+            counters.append((wait_type, category, tasks, wait_ms, signal_ms, self._safe_int(row.get("max_wait_time_ms", 0))))
+            category_stats[category] += wait_ms
+            all_waits.append(WaitStat(wait_type=wait_type, category=category, waiting_tasks=tasks, wait_time_ms=wait_ms))
+        counters.sort(key=lambda item: item[3], reverse=True)
+
+        total_wait = sum(item[3] for item in counters)
+        total_signal = sum(item[4] for item in counters)
+        summary.total_wait_types = len(counters)
+        summary.total_waiting_tasks = sum(item[2] for item in counters)
+        summary.total_wait_time_ms = total_wait
+        summary.total_signal_wait_ms = total_signal
+        summary.total_resource_wait_ms = total_wait - total_signal
+        summary.max_single_wait_ms = max((item[5] for item in counters), default=0)
+        if total_wait > 0:
+            summary.signal_wait_percent = round(total_signal * 100.0 / total_wait, 2)
+            summary.resource_wait_percent = round((total_wait - total_signal) * 100.0 / total_wait, 2)
+
+        top_waits: List[WaitStat] = []
+        running = 0
+        for wait_type, category, tasks, wait_ms, signal_ms, max_wait_ms in counters[:max(0, int(top_n))]:
+            running += wait_ms
+            top_waits.append(
                 WaitStat(
                     wait_type=wait_type,
-                    category=get_wait_category(wait_type),
-                    waiting_tasks=self._safe_int(row.get("waiting_tasks_count", 0)),
-                    wait_time_ms=self._safe_int(row.get("wait_time_ms", 0)),
-                    max_wait_time_ms=0,
-                    signal_wait_ms=0,
-                    resource_wait_ms=0,
-                    wait_percent=0.0,
-                    cumulative_percent=0.0,
+                    category=category,
+                    waiting_tasks=tasks,
+                    wait_time_ms=wait_ms,
+                    max_wait_time_ms=max_wait_ms,
+                    signal_wait_ms=signal_ms,
+                    resource_wait_ms=wait_ms - signal_ms,
+                    wait_percent=round(wait_ms * 100.0 / total_wait, 2) if total_wait else 0.0,
+                    cumulative_percent=round(running * 100.0 / total_wait, 2) if total_wait else 0.0,
                 )
             )
-        return waits
+        summary.top_waits = top_waits
+        summary.category_stats = category_stats
+        summary.all_waits = all_waits
 
     def _map_category_rows(self, rows: List[Dict[str, Any]]) -> Dict[WaitCategory, int]:
         stats = {cat: 0 for cat in WaitCategory}
@@ -624,29 +810,38 @@ class WaitStatsService:
                 },
             }
 
-            with open(history_path, "a", encoding="utf-8") as handle:
-                handle.write(json.dumps(snapshot, ensure_ascii=False) + "\n")
+            with _STORE_LOCK:
+                with open(history_path, "a", encoding="utf-8") as handle:
+                    handle.write(json.dumps(snapshot, ensure_ascii=False) + "\n")
 
-            # Keep file bounded.
-            try:
-                with open(history_path, "r", encoding="utf-8") as handle:
-                    lines = handle.readlines()
-                if len(lines) > MAX_HISTORY_SNAPSHOTS:
-                    lines = lines[-MAX_HISTORY_SNAPSHOTS:]
-                    with open(history_path, "w", encoding="utf-8") as handle:
-                        handle.writelines(lines)
-            except Exception:
-                pass
+                # Keep file bounded.
+                try:
+                    with open(history_path, "r", encoding="utf-8") as handle:
+                        lines = handle.readlines()
+                    if len(lines) > MAX_HISTORY_SNAPSHOTS:
+                        lines = lines[-MAX_HISTORY_SNAPSHOTS:]
+                        with open(history_path, "w", encoding="utf-8") as handle:
+                            handle.writelines(lines)
+                except Exception:
+                    pass
         except Exception as ex:
             logger.debug(f"Failed to append wait stats history snapshot: {ex}")
 
-    def _load_recent_history(self, days: int) -> List[Dict[str, Any]]:
+    def _iter_history(
+        self,
+        days: int,
+        server: Optional[str] = None,
+        database: Optional[str] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream local history snapshots newer than ``days`` (optionally for one
+        server/database) line by line; callers aggregate without loading the file.
+        """
         path = self._history_file_path()
         if not path.exists():
-            return []
+            return
 
         cutoff = datetime.now() - timedelta(days=max(1, int(days)))
-        rows: List[Dict[str, Any]] = []
         try:
             with open(path, "r", encoding="utf-8") as handle:
                 for line in handle:
@@ -664,10 +859,13 @@ class WaitStatsService:
                         continue
                     if captured_at < cutoff:
                         continue
-                    rows.append(payload)
+                    if server is not None and str(payload.get("server", "") or "") != server:
+                        continue
+                    if database is not None and str(payload.get("database", "") or "") != database:
+                        continue
+                    yield payload
         except Exception as ex:
             logger.debug(f"Failed to read wait stats history: {ex}")
-        return rows
 
     def _trim_jsonl_file(self, path: Path, max_lines: int) -> None:
         if not path.exists():
@@ -690,11 +888,12 @@ class WaitStatsService:
         path = self._telemetry_file_path()
         payload = metrics.to_lightweight_contract()
         try:
-            with open(path, "a", encoding="utf-8") as handle:
-                handle.write(json.dumps(payload, ensure_ascii=False) + "\n")
-            # Periodic maintenance to keep telemetry bounded.
-            if int(path.stat().st_size or 0) > 8 * 1024 * 1024:
-                self._trim_jsonl_file(path, MAX_TELEMETRY_SNAPSHOTS)
+            with _STORE_LOCK:
+                with open(path, "a", encoding="utf-8") as handle:
+                    handle.write(json.dumps(payload, ensure_ascii=False) + "\n")
+                # Periodic maintenance to keep telemetry bounded.
+                if int(path.stat().st_size or 0) > 8 * 1024 * 1024:
+                    self._trim_jsonl_file(path, MAX_TELEMETRY_SNAPSHOTS)
             return True
         except Exception as ex:
             logger.debug(f"Failed to record wait stats telemetry: {ex}")
@@ -939,9 +1138,9 @@ class WaitStatsService:
             except Exception as ex:
                 logger.info(f"Historical trend Query Store fallback to local history: {ex}")
 
-        history_rows = self._load_recent_history(requested_days)
-        if history_rows:
-            return self._build_trend_from_local_history(history_rows), "local_history"
+        points = self._build_trend_from_local_history(self._iter_history(requested_days))
+        if points:
+            return points, "local_history"
         return [], "none"
 
     def _build_trend_from_query_store_rows(self, rows: List[Dict[str, Any]]) -> List[WaitTrendPoint]:
@@ -983,7 +1182,7 @@ class WaitStatsService:
             )
         return points
 
-    def _build_trend_from_local_history(self, rows: List[Dict[str, Any]]) -> List[WaitTrendPoint]:
+    def _build_trend_from_local_history(self, rows: Iterable[Dict[str, Any]]) -> List[WaitTrendPoint]:
         grouped: Dict[str, Dict[str, int]] = {}
         for row in rows:
             ts = str(row.get("captured_at", "") or "")
@@ -1093,22 +1292,26 @@ class WaitStatsService:
         if not active_rules:
             return {}
 
-        compiled: List[Tuple[CustomWaitCategoryRule, re.Pattern[str]]] = []
-        for rule in active_rules:
-            try:
-                compiled.append((rule, re.compile(rule.pattern, re.IGNORECASE)))
-            except re.error:
-                logger.warning(f"Skipping invalid custom wait category regex: {rule.pattern}")
-
+        matcher = self._custom_rule_matcher(active_rules)
         totals: Dict[str, int] = {}
         for wait in waits or []:
-            wait_type = str(wait.wait_type or "")
-            for rule, pattern in compiled:
-                if pattern.search(wait_type):
-                    totals[rule.name] = totals.get(rule.name, 0) + self._safe_int(wait.wait_time_ms)
-                    break
+            rule_name = matcher.match(str(wait.wait_type or ""))
+            if rule_name is not None:
+                totals[rule_name] = totals.get(rule_name, 0) + self._safe_int(wait.wait_time_ms)
         return dict(sorted(totals.items(), key=lambda x: x[1], reverse=True))
 
+    def _custom_rule_matcher(self, active_rules: List[CustomWaitCategoryRule]) -> CompiledPatternMatcher[str]:
+        """Compile active rules once; the matcher (and its wait_type memo) lives until the rules change."""
+        key = tuple((rule.name, rule.pattern) for rule in active_rules)
+        cached = getattr(self, "_custom_matcher_cache", None)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        matcher: CompiledPatternMatcher[str] = CompiledPatternMatcher(key)
+        if matcher.rule_count < len(key):
+            logger.warning(f"Skipping {len(key) - matcher.rule_count} invalid custom wait category regex rule(s)")
+        setattr(self, "_custom_matcher_cache", (key, matcher))
+        return matcher
+
     @staticmethod
     def _severity_order(value: str) -> int:
         mapping = {"critical": 0, "warning": 1, "info": 2}
@@ -1137,22 +1340,140 @@ class WaitStatsService:
         }
         return self._write_json(self._thresholds_file_path(), payload)
 
-    def evaluate_threshold_alerts(
+    def get_alert_engine(self) -> WaitAlertEngine:
+        """Per-server alert state machine (created with the singleton)."""
+        return self._alert_engine
+
+    def get_alert_transitions(self, after_seq: int = 0, server: Optional[str] = None) -> List[AlertTransition]:
+        return self.get_alert_engine().transitions_since(after_seq, server=server)
+
+    def get_alert_state_counts(self) -> Dict[str, int]:
+        server, _database = self._active_server_database()
+        return self.get_alert_engine().state_counts(server)
+
+    def _alert_signal_groups(
         self,
         summary: WaitSummary,
         chain: Any,
-        thresholds: Optional[WaitAlertThresholds] = None,
-    ) -> List[WaitAlert]:
-        limits = thresholds or self.load_alert_thresholds()
-        alerts: List[WaitAlert] = []
+        limits: WaitAlertThresholds,
+    ) -> Dict[str, SignalGroup]:
+        """
+        Alert rules grouped by the summary inputs they read.
 
+        Each group carries a cheap input key; WaitAlertEngine only rebuilds a
+        group's signals when that key changes between refreshes.
+        """
+        category_stats = dict(summary.category_stats or {})
+        category_key = tuple(sorted((str(cat.value), self._safe_int(value)) for cat, value in category_stats.items()))
+        waits = list(summary.top_waits or [])
+        top_key = tuple((str(item.wait_type or ""), self._safe_int(item.wait_time_ms)) for item in waits)
         total_wait_ms = self._safe_int(summary.total_wait_time_ms)
-        total_category_wait = max(1, sum((summary.category_stats or {}).values()))
-        lock_wait_pct = (self._safe_int((summary.category_stats or {}).get(WaitCategory.LOCK, 0)) * 100.0) / float(total_category_wait)
-        io_wait_pct = (self._safe_int((summary.category_stats or {}).get(WaitCategory.IO, 0)) * 100.0) / float(total_category_wait)
         resource_wait_ratio = self._safe_float(summary.resource_wait_percent)
+        chain_blocked_sessions = self._chain_total_blocked_sessions(chain)
+        chain_depth = self._chain_max_depth(chain)
         max_current_wait = max((self._safe_int(w.wait_time_ms) for w in (summary.current_waits or [])), default=0)
-        waits = list(summary.top_waits or [])
+
+        return {
+            "totals": (
+                (total_wait_ms, round(resource_wait_ratio, 4), limits.total_wait_time_ms),
+                lambda: self._total_alert_signals(total_wait_ms, resource_wait_ratio, limits),
+            ),
+            "categories": (
+                (category_key, limits.lock_wait_percent, limits.io_wait_percent),
+                lambda: self._category_alert_signals(category_stats, limits),
+            ),
+            "top_waits": (
+                (top_key, category_key),
+                lambda: self._top_wait_alert_signals(waits, category_stats),
+            ),
+            "chain": (
+                (chain_blocked_sessions, chain_depth, limits.blocked_sessions, limits.chain_depth),
+                lambda: self._chain_alert_signals(chain_blocked_sessions, chain_depth, limits),
+            ),
+            "current": (
+                (max_current_wait, limits.single_wait_ms),
+                lambda: self._current_wait_alert_signals(max_current_wait, limits),
+            ),
+        }
+
+    @staticmethod
+    def _total_alert_signals(
+        total_wait_ms: int,
+        resource_wait_ratio: float,
+        limits: WaitAlertThresholds,
+    ) -> List[AlertSignal]:
+        total_alert: Optional[WaitAlert] = None
+        if total_wait_ms >= limits.total_wait_time_ms:
+            total_wait_severity = "critical" if total_wait_ms >= max(limits.total_wait_time_ms * 5, 30_000_000) else "warning"
+            total_alert = WaitAlert(
+                alert_id="total_wait_high",
+                severity=total_wait_severity,
+                title="Total Wait Time Threshold Breached",
+                message=f"Total wait time {total_wait_ms:,} ms is above threshold {limits.total_wait_time_ms:,} ms.",
+                metric_value=float(total_wait_ms),
+                threshold_value=float(limits.total_wait_time_ms),
+            )
+
+        ratio_alert: Optional[WaitAlert] = None
+        if resource_wait_ratio >= 80.0:
+            ratio_alert = WaitAlert(
+                alert_id="resource_wait_ratio_high",
+                severity="critical" if resource_wait_ratio >= 90.0 else "warning",
+                title="Resource Wait Ratio High",
+                message=(
+                    f"Resource wait ratio is {resource_wait_ratio:.1f}% "
+                    "(recommended < 80.0%)."
+                ),
+                metric_value=resource_wait_ratio,
+                threshold_value=80.0,
+            )
+
+        return [
+            AlertSignal("total_wait_high", float(total_wait_ms), float(limits.total_wait_time_ms), total_alert),
+            AlertSignal("resource_wait_ratio_high", resource_wait_ratio, 80.0, ratio_alert),
+        ]
+
+    def _category_alert_signals(
+        self,
+        category_stats: Dict[WaitCategory, int],
+        limits: WaitAlertThresholds,
+    ) -> List[AlertSignal]:
+        total_category_wait = max(1, sum(category_stats.values()))
+        lock_wait_pct = (self._safe_int(category_stats.get(WaitCategory.LOCK, 0)) * 100.0) / float(total_category_wait)
+        io_wait_pct = (self._safe_int(category_stats.get(WaitCategory.IO, 0)) * 100.0) / float(total_category_wait)
+
+        lock_alert: Optional[WaitAlert] = None
+        if lock_wait_pct >= limits.lock_wait_percent:
+            lock_alert = WaitAlert(
+                alert_id="lock_wait_high",
+                severity="critical" if lock_wait_pct >= max(25.0, limits.lock_wait_percent * 1.5) else "warning",
+                title="Lock Wait Pressure",
+                message=f"Lock wait share is {lock_wait_pct:.1f}% (threshold {limits.lock_wait_percent:.1f}%).",
+                metric_value=lock_wait_pct,
+                threshold_value=limits.lock_wait_percent,
+            )
+
+        io_alert: Optional[WaitAlert] = None
+        if io_wait_pct >= limits.io_wait_percent:
+            io_alert = WaitAlert(
+                alert_id="io_wait_high",
+                severity="critical" if io_wait_pct >= max(50.0, limits.io_wait_percent * 1.8) else "warning",
+                title="I/O Wait Pressure",
+                message=f"I/O wait share is {io_wait_pct:.1f}% (threshold {limits.io_wait_percent:.1f}%).",
+                metric_value=io_wait_pct,
+                threshold_value=limits.io_wait_percent,
+            )
+
+        return [
+            AlertSignal("lock_wait_high", lock_wait_pct, float(limits.lock_wait_percent), lock_alert),
+            AlertSignal("io_wait_high", io_wait_pct, float(limits.io_wait_percent), io_alert),
+        ]
+
+    def _top_wait_alert_signals(
+        self,
+        waits: List[WaitStat],
+        category_stats: Dict[WaitCategory, int],
+    ) -> List[AlertSignal]:
         total_top_wait_ms = max(1, sum(self._safe_int(item.wait_time_ms) for item in waits))
         pageiolatch_ms = sum(
             self._safe_int(item.wait_time_ms) for item in waits if str(item.wait_type or "").upper().startswith("PAGEIOLATCH")
@@ -1170,141 +1491,143 @@ class WaitStatsService:
             if str(item.wait_type or "").upper().startswith(("CXPACKET", "CXCONSUMER", "CXSYNC"))
         )
         cx_pct = float(cx_ms) * 100.0 / float(total_top_wait_ms)
-        latch_wait_pct = (self._safe_int((summary.category_stats or {}).get(WaitCategory.LATCH, 0)) * 100.0) / float(total_category_wait)
-
-        if total_wait_ms >= limits.total_wait_time_ms:
-            total_wait_severity = "critical" if total_wait_ms >= max(limits.total_wait_time_ms * 5, 30_000_000) else "warning"
-            alerts.append(
-                WaitAlert(
-                    alert_id="total_wait_high",
-                    severity=total_wait_severity,
-                    title="Total Wait Time Threshold Breached",
-                    message=f"Total wait time {total_wait_ms:,} ms is above threshold {limits.total_wait_time_ms:,} ms.",
-                    metric_value=float(total_wait_ms),
-                    threshold_value=float(limits.total_wait_time_ms),
-                )
-            )
-
-        if lock_wait_pct >= limits.lock_wait_percent:
-            alerts.append(
-                WaitAlert(
-                    alert_id="lock_wait_high",
-                    severity="critical" if lock_wait_pct >= max(25.0, limits.lock_wait_percent * 1.5) else "warning",
-                    title="Lock Wait Pressure",
-                    message=f"Lock wait share is {lock_wait_pct:.1f}% (threshold {limits.lock_wait_percent:.1f}%).",
-                    metric_value=lock_wait_pct,
-                    threshold_value=limits.lock_wait_percent,
-                )
-            )
-
-        if io_wait_pct >= limits.io_wait_percent:
-            alerts.append(
-                WaitAlert(
-                    alert_id="io_wait_high",
-                    severity="critical" if io_wait_pct >= max(50.0, limits.io_wait_percent * 1.8) else "warning",
-                    title="I/O Wait Pressure",
-                    message=f"I/O wait share is {io_wait_pct:.1f}% (threshold {limits.io_wait_percent:.1f}%).",
-                    metric_value=io_wait_pct,
-                    threshold_value=limits.io_wait_percent,
-                )
-            )
-
-        if resource_wait_ratio >= 80.0:
-            alerts.append(
-                WaitAlert(
-                    alert_id="resource_wait_ratio_high",
-                    severity="critical" if resource_wait_ratio >= 90.0 else "warning",
-                    title="Resource Wait Ratio High",
-                    message=(
-                        f"Resource wait ratio is {resource_wait_ratio:.1f}% "
-                        "(recommended < 80.0%)."
-                    ),
-                    metric_value=resource_wait_ratio,
-                    threshold_value=80.0,
-                )
-            )
+        total_category_wait = max(1, sum(category_stats.values()))
+        latch_wait_pct = (self._safe_int(category_stats.get(WaitCategory.LATCH, 0)) * 100.0) / float(total_category_wait)
 
+        pageiolatch_alert: Optional[WaitAlert] = None
         if pageiolatch_pct >= 30.0:
-            alerts.append(
-                WaitAlert(
-                    alert_id="pageiolatch_share_high",
-                    severity="warning",
-                    title="PAGEIOLATCH Dominance",
-                    message=f"PAGEIOLATCH waits account for {pageiolatch_pct:.1f}% of top wait time.",
-                    metric_value=pageiolatch_pct,
-                    threshold_value=30.0,
-                )
+            pageiolatch_alert = WaitAlert(
+                alert_id="pageiolatch_share_high",
+                severity="warning",
+                title="PAGEIOLATCH Dominance",
+                message=f"PAGEIOLATCH waits account for {pageiolatch_pct:.1f}% of top wait time.",
+                metric_value=pageiolatch_pct,
+                threshold_value=30.0,
             )
 
+        async_alert: Optional[WaitAlert] = None
         if async_io_pct >= 20.0:
-            alerts.append(
-                WaitAlert(
-                    alert_id="async_io_spike",
-                    severity="warning",
-                    title="ASYNC/BACKUP I/O Spike",
-                    message=f"ASYNC_IO/BACKUP waits represent {async_io_pct:.1f}% of top wait time.",
-                    metric_value=async_io_pct,
-                    threshold_value=20.0,
-                )
+            async_alert = WaitAlert(
+                alert_id="async_io_spike",
+                severity="warning",
+                title="ASYNC/BACKUP I/O Spike",
+                message=f"ASYNC_IO/BACKUP waits represent {async_io_pct:.1f}% of top wait time.",
+                metric_value=async_io_pct,
+                threshold_value=20.0,
             )
 
+        combo_alert: Optional[WaitAlert] = None
         if cx_pct >= 10.0 and latch_wait_pct >= 10.0:
-            alerts.append(
-                WaitAlert(
-                    alert_id="parallel_latch_combo",
-                    severity="warning",
-                    title="Parallelism + Latch Combo",
-                    message=(
-                        f"CX waits {cx_pct:.1f}% with latch share {latch_wait_pct:.1f}% "
-                        "suggests MAXDOP/parallelism tuning opportunity."
-                    ),
-                    metric_value=max(cx_pct, latch_wait_pct),
-                    threshold_value=10.0,
-                )
+            combo_alert = WaitAlert(
+                alert_id="parallel_latch_combo",
+                severity="warning",
+                title="Parallelism + Latch Combo",
+                message=(
+                    f"CX waits {cx_pct:.1f}% with latch share {latch_wait_pct:.1f}% "
+                    "suggests MAXDOP/parallelism tuning opportunity."
+                ),
+                metric_value=max(cx_pct, latch_wait_pct),
+                threshold_value=10.0,
             )
 
-        chain_blocked_sessions = self._chain_total_blocked_sessions(chain)
-        chain_depth = self._chain_max_depth(chain)
+        return [
+            AlertSignal("pageiolatch_share_high", pageiolatch_pct, 30.0, pageiolatch_alert),
+            AlertSignal("async_io_spike", async_io_pct, 20.0, async_alert),
+            # Both shares must stay high, so the weaker one drives the clear band.
+            AlertSignal("parallel_latch_combo", min(cx_pct, latch_wait_pct), 10.0, combo_alert),
+        ]
 
+    @staticmethod
+    def _chain_alert_signals(
+        chain_blocked_sessions: int,
+        chain_depth: int,
+        limits: WaitAlertThresholds,
+    ) -> List[AlertSignal]:
+        blocked_alert: Optional[WaitAlert] = None
         if chain_blocked_sessions >= limits.blocked_sessions:
-            alerts.append(
-                WaitAlert(
-                    alert_id="blocked_sessions_high",
-                    severity="critical",
-                    title="Blocked Session Count High",
-                    message=(
-                        f"{chain_blocked_sessions} blocked session(s) detected "
-                        f"(threshold {limits.blocked_sessions})."
-                    ),
-                    metric_value=float(chain_blocked_sessions),
-                    threshold_value=float(limits.blocked_sessions),
-                )
+            blocked_alert = WaitAlert(
+                alert_id="blocked_sessions_high",
+                severity="critical",
+                title="Blocked Session Count High",
+                message=(
+                    f"{chain_blocked_sessions} blocked session(s) detected "
+                    f"(threshold {limits.blocked_sessions})."
+                ),
+                metric_value=float(chain_blocked_sessions),
+                threshold_value=float(limits.blocked_sessions),
             )
 
+        depth_alert: Optional[WaitAlert] = None
         if chain_depth >= limits.chain_depth:
-            alerts.append(
-                WaitAlert(
-                    alert_id="blocking_depth_high",
-                    severity="critical",
-                    title="Blocking Chain Depth High",
-                    message=f"Blocking chain depth {chain_depth} (threshold {limits.chain_depth}).",
-                    metric_value=float(chain_depth),
-                    threshold_value=float(limits.chain_depth),
-                )
+            depth_alert = WaitAlert(
+                alert_id="blocking_depth_high",
+                severity="critical",
+                title="Blocking Chain Depth High",
+                message=f"Blocking chain depth {chain_depth} (threshold {limits.chain_depth}).",
+                metric_value=float(chain_depth),
+                threshold_value=float(limits.chain_depth),
             )
 
+        return [
+            AlertSignal("blocked_sessions_high", float(chain_blocked_sessions), float(limits.blocked_sessions), blocked_alert),
+            AlertSignal("blocking_depth_high", float(chain_depth), float(limits.chain_depth), depth_alert),
+        ]
+
+    @staticmethod
+    def _current_wait_alert_signals(max_current_wait: int, limits: WaitAlertThresholds) -> List[AlertSignal]:
+        single_alert: Optional[WaitAlert] = None
         if max_current_wait >= limits.single_wait_ms:
-            alerts.append(
-                WaitAlert(
-                    alert_id="single_wait_high",
-                    severity="warning",
-                    title="Long Individual Wait Detected",
-                    message=f"Longest active wait is {max_current_wait:,} ms (threshold {limits.single_wait_ms:,} ms).",
-                    metric_value=float(max_current_wait),
-                    threshold_value=float(limits.single_wait_ms),
-                )
+            single_alert = WaitAlert(
+                alert_id="single_wait_high",
+                severity="warning",
+                title="Long Individual Wait Detected",
+                message=f"Longest active wait is {max_current_wait:,} ms (threshold {limits.single_wait_ms:,} ms).",
+                metric_value=float(max_current_wait),
+                threshold_value=float(limits.single_wait_ms),
             )
+        return [AlertSignal("single_wait_high", float(max_current_wait), float(limits.single_wait_ms), single_alert)]
+
+    def evaluate_threshold_breaches(
+        self,
+        summary: WaitSummary,
+        chain: Any,
+        thresholds: Optional[WaitAlertThresholds] = None,
+    ) -> List[WaitAlert]:
+        """Stateless view: every rule currently above its trigger threshold."""
+        limits = thresholds or self.load_alert_thresholds()
+        alerts = [
+            signal.alert
+            for _key, builder in self._alert_signal_groups(summary, chain, limits).values()
+            for signal in builder()
+            if signal.alert is not None
+        ]
+        return sorted(alerts, key=lambda item: (self._severity_order(item.severity), -item.metric_value))
 
+    def evaluate_threshold_alerts(
+        self,
+        summary: WaitSummary,
+        chain: Any,
+        thresholds: Optional[WaitAlertThresholds] = None,
+    ) -> List[WaitAlert]:
+        """
+        Advance the per-server alert state machine and return the FIRING alerts.
+
+        A breach is reported only after it held for the engine's pending window
+        and stays firing until the metric drops below the hysteresis band, so
+        refreshes no longer re-emit or flap alerts. State changes are available
+        through ``get_alert_transitions``.
+        """
+        limits = thresholds or self.load_alert_thresholds()
+        server, _database = self._active_server_database()
+        engine = self.get_alert_engine()
+        transitions = engine.evaluate(server, self._alert_signal_groups(summary, chain, limits))
+        for item in transitions:
+            logger.info(
+                f"Wait alert {item.alert_id} on {item.server}: "
+                f"{item.from_state.value} -> {item.to_state.value} (value={item.metric_value:.2f})"
+            )
+        alerts = [replace(alert, triggered_at=fired_at) for alert, fired_at in engine.active_alerts(server)]
+        publish_metrics("wait_alerts", server, self._wait_chain_samples(chain, alerts, engine.states(server)))
         return sorted(alerts, key=lambda item: (self._severity_order(item.severity), -item.metric_value))
 
     @staticmethod
@@ -1454,30 +1777,28 @@ class WaitStatsService:
         return waits_out
 
     def get_multi_server_wait_comparison(self, days: int = 7, max_servers: int = 20) -> List[MultiServerWaitSnapshot]:
-        rows = self._load_recent_history(days=max(1, int(days or 7)))
-        grouped: Dict[str, List[Dict[str, Any]]] = {}
-        for row in rows:
+        # Sunucu basina yalnizca ilk/son snapshot tutulur; bellek gecmis boyutundan bagimsiz.
+        bounds: Dict[str, List[Tuple[datetime, Dict[str, Any]]]] = {}
+        for row in self._iter_history(days=max(1, int(days or 7))):
             server = str(row.get("server", "") or "unknown")
             database = str(row.get("database", "") or "unknown")
             key = f"{server}|{database}"
-            grouped.setdefault(key, []).append(row)
-
-        snapshots: List[MultiServerWaitSnapshot] = []
-        for key, items in grouped.items():
-            if not items:
+            try:
+                captured = datetime.fromisoformat(str(row.get("captured_at")))
+            except Exception:
                 continue
-            parsed: List[Tuple[datetime, Dict[str, Any]]] = []
-            for item in items:
-                try:
-                    parsed.append((datetime.fromisoformat(str(item.get("captured_at"))), item))
-                except Exception:
-                    continue
-            if not parsed:
+            edge = bounds.get(key)
+            if edge is None:
+                bounds[key] = [(captured, row), (captured, row)]
                 continue
-            parsed.sort(key=lambda x: x[0])
-            first_ts, first_item = parsed[0]
-            last_ts, last_item = parsed[-1]
-            del first_ts  # used for ordering only
+            if captured < edge[0][0]:
+                edge[0] = (captured, row)
+            if captured >= edge[1][0]:
+                edge[1] = (captured, row)
+
+        snapshots: List[MultiServerWaitSnapshot] = []
+        for key, edge in bounds.items():
+            (_first_ts, first_item), (last_ts, last_item) = edge
             first_total = self._safe_int(first_item.get("total_wait_time_ms", 0))
             last_total = self._safe_int(last_item.get("total_wait_time_ms", 0))
             cat_stats = dict(last_item.get("category_stats", {}) or {})
@@ -1511,6 +1832,7 @@ class WaitStatsService:
                 for item in list(payload.get("formats", ["json", "md"]) or ["json", "md"])
                 if str(item).strip().lower() in {"json", "md", "csv"}
             ] or ["json", "md"],
+            compress=bool(payload.get("compress", False)),
         )
 
     def save_schedule_config(self, config: WaitScheduleConfig) -> bool:
@@ -1519,6 +1841,7 @@ class WaitStatsService:
             "interval_minutes": max(1, self._safe_int(config.interval_minutes)),
             "output_dir": str(config.output_dir or ""),
             "formats": [f for f in list(config.formats or []) if str(f).lower() in {"json", "md", "csv"}] or ["json"],
+            "compress": bool(getattr(config, "compress", False)),
         }
         return self._write_json(self._schedule_config_file_path(), payload)
 
@@ -1537,7 +1860,7 @@ class WaitStatsService:
             },
         }
         try:
-            with open(self._scheduled_history_file_path(), "a", encoding="utf-8") as handle:
+            with _STORE_LOCK, open(self._scheduled_history_file_path(), "a", encoding="utf-8") as handle:
                 handle.write(json.dumps(row, ensure_ascii=False) + "\n")
             return True
         except Exception as ex:
@@ -1549,6 +1872,11 @@ class WaitStatsService:
         export_payload: Dict[str, Any],
         config: Optional[WaitScheduleConfig] = None,
     ) -> List[Path]:
+        """
+        Write scheduled reports in a single pass: every section of the payload is
+        streamed to all configured formats at once, followed by the raw local
+        history snapshots of the trend window read straight from the store.
+        """
         cfg = config or self.load_schedule_config()
         out_dir = Path(cfg.output_dir) if str(cfg.output_dir or "").strip() else self._scheduled_reports_dir()
         out_dir.mkdir(parents=True, exist_ok=True)
@@ -1556,91 +1884,98 @@ class WaitStatsService:
         ts = generated_at.replace(":", "").replace("-", "").replace("T", "_").replace(" ", "_")[:15]
         server, database = self._active_server_database()
         prefix = f"wait_stats_{server.replace('\\\\', '_').replace('/', '_')}_{database}_{ts}"
-        written: List[Path] = []
+        trend_days = max(1, self._safe_int(export_payload.get("trend_window_days", 7)))
 
-        formats = [str(x).lower() for x in list(cfg.formats or [])]
-        for fmt in formats:
-            path = out_dir / f"{prefix}.{fmt}"
-            try:
-                if fmt == "json":
-                    with open(path, "w", encoding="utf-8") as handle:
-                        json.dump(export_payload, handle, indent=2, ensure_ascii=False)
-                elif fmt == "csv":
-                    summary = dict(export_payload.get("summary", {}) or {})
-                    waits = list(export_payload.get("top_waits", []) or [])
-                    rows: List[Dict[str, Any]] = [
-                        {
-                            "section": "summary",
-                            "generated_at": export_payload.get("generated_at", ""),
-                            "server": server,
-                            "database": database,
-                            "total_wait_time_ms": summary.get("total_wait_time_ms", 0),
-                            "signal_wait_percent": summary.get("signal_wait_percent", 0.0),
-                            "resource_wait_percent": summary.get("resource_wait_percent", 0.0),
-                        }
-                    ]
-                    for wait in waits:
-                        rows.append(
-                            {
-                                "section": "top_wait",
-                                "wait_type": wait.get("wait_type", ""),
-                                "category": wait.get("category", ""),
-                                "wait_time_ms": wait.get("wait_time_ms", 0),
-                                "wait_percent": wait.get("wait_percent", 0.0),
-                            }
-                        )
-                    fieldnames = sorted({key for row in rows for key in row.keys()})
-                    with open(path, "w", encoding="utf-8-sig", newline="") as handle:
-                        writer = csv.DictWriter(handle, fieldnames=fieldnames)
-                        writer.writeheader()
-                        writer.writerows(rows)
-                elif fmt == "md":
-                    summary = dict(export_payload.get("summary", {}) or {})
-                    alerts = list(export_payload.get("alerts", []) or [])
-                    top_waits = list(export_payload.get("top_waits", []) or [])
-                    lines = [
-                        "# Wait Stats Automated Report",
-                        "",
-                        f"- Generated: {export_payload.get('generated_at', '')}",
-                        f"- Server: {server}",
-                        f"- Database: {database}",
-                        "",
-                        "## Summary",
-                        "",
-                        f"- Total Wait (ms): {int(summary.get('total_wait_time_ms', 0) or 0):,}",
-                        f"- Signal Wait %: {float(summary.get('signal_wait_percent', 0.0) or 0.0):.2f}",
-                        f"- Resource Wait %: {float(summary.get('resource_wait_percent', 0.0) or 0.0):.2f}",
-                        "",
-                        "## Alerts",
-                        "",
-                    ]
-                    if alerts:
-                        for alert in alerts:
-                            lines.append(f"- [{alert.get('severity', '').upper()}] {alert.get('title', '')}: {alert.get('message', '')}")
-                    else:
-                        lines.append("- No active alerts.")
-                    lines.extend(
-                        [
-                            "",
-                            "## Top Waits",
-                            "",
-                            "| Wait Type | Category | Wait ms | Wait % |",
-                            "|---|---|---:|---:|",
-                        ]
-                    )
-                    for wait in top_waits[:20]:
-                        lines.append(
+        writer = WaitReportWriter(
+            out_dir / prefix,
+            formats=[str(x).lower() for x in list(cfg.formats or [])],
+            csv_columns=REPORT_CSV_COLUMNS,
+            compress=bool(getattr(cfg, "compress", False)),
+        )
+        try:
+            writer.md("# Wait Stats Automated Report", "", f"- Generated: {generated_at}", f"- Server: {server}", f"- Database: {database}")
+            for key, value in export_payload.items():
+                if key == "summary":
+                    self._write_report_summary(writer, dict(value or {}), export_payload, server, database)
+                elif key == "top_waits":
+                    writer.md("", "## Top Waits", "", "| Wait Type | Category | Wait ms | Wait % |", "|---|---|---:|---:|")
+                    writer.rows(
+                        key,
+                        list(value or []),
+                        csv_section="top_wait",
+                        md_row=lambda wait: (
                             f"| {wait.get('wait_type', '')} | {wait.get('category', '')} | "
                             f"{int(wait.get('wait_time_ms', 0) or 0):,} | {float(wait.get('wait_percent', 0.0) or 0.0):.2f} |"
-                        )
-                    with open(path, "w", encoding="utf-8") as handle:
-                        handle.write("\n".join(lines))
+                        ),
+                        md_limit=20,
+                    )
+                elif key == "trend":
+                    writer.md("", f"## Trend ({trend_days}d)", "", "| Date | Total Wait ms | Dominant Category |", "|---|---:|---|")
+                    count = writer.rows(
+                        key,
+                        list(value or []),
+                        csv_section="trend",
+                        md_row=lambda point: (
+                            f"| {point.get('trend_date', '')} | {int(point.get('total_wait_ms', 0) or 0):,} | "
+                            f"{point.get('dominant_category', '')} |"
+                        ),
+                    )
+                    if not count:
+                        writer.md("| - | 0 | - |")
+                elif isinstance(value, list):
+                    writer.rows(key, value)
                 else:
-                    continue
-                written.append(path)
-            except Exception as ex:
-                logger.warning(f"Failed to write automated wait report [{fmt}]: {ex}")
-        return written
+                    writer.value(key, value)
+
+            # Ham snapshot serisi store'dan satir satir okunur; liste olarak bellege alinmaz.
+            snapshot_count = writer.rows(
+                "history_snapshots",
+                self._iter_history(trend_days, server=server, database=database),
+                csv_section="snapshot",
+            )
+            writer.md("", "## History Snapshots", "", f"- {snapshot_count:,} local snapshot(s) in the last {trend_days} day(s).")
+        except Exception as ex:
+            logger.warning(f"Failed to write automated wait reports: {ex}")
+            writer.close(success=False)
+            return []
+        return writer.close()
+
+    @staticmethod
+    def _write_report_summary(
+        writer: WaitReportWriter,
+        summary: Dict[str, Any],
+        export_payload: Dict[str, Any],
+        server: str,
+        database: str,
+    ) -> None:
+        writer.value("summary", summary)
+        writer.csv_row(
+            {
+                "section": "summary",
+                "generated_at": export_payload.get("generated_at", ""),
+                "server": server,
+                "database": database,
+                "total_wait_time_ms": summary.get("total_wait_time_ms", 0),
+                "signal_wait_percent": summary.get("signal_wait_percent", 0.0),
+                "resource_wait_percent": summary.get("resource_wait_percent", 0.0),
+            }
+        )
+        writer.md(
+            "",
+            "## Summary",
+            "",
+            f"- Total Wait (ms): {int(summary.get('total_wait_time_ms', 0) or 0):,}",
+            f"- Signal Wait %: {float(summary.get('signal_wait_percent', 0.0) or 0.0):.2f}",
+            f"- Resource Wait %: {float(summary.get('resource_wait_percent', 0.0) or 0.0):.2f}",
+            "",
+            "## Alerts",
+            "",
+        )
+        alerts = list(export_payload.get("alerts", []) or [])
+        for alert in alerts:
+            writer.md(f"- [{str(alert.get('severity', '')).upper()}] {alert.get('title', '')}: {alert.get('message', '')}")
+        if not alerts:
+            writer.md("- No active alerts.")
 
     def load_monitoring_targets(self) -> List[WaitMonitoringTarget]:
         payload = list(self._read_json(self._monitoring_targets_file_path(), default=[]) or [])
@@ -1805,28 +2140,84 @@ class WaitStatsService:
             "edges": edges,
         }
 
+    @staticmethod
+    def _wait_summary_samples(summary: WaitSummary) -> List[MetricSample]:
+        samples = [
+            metric("sqlperf_wait_total_wait_time_ms", int(summary.total_wait_time_ms or 0)),
+            metric("sqlperf_wait_signal_percent", round(float(summary.signal_wait_percent or 0.0), 4)),
+            metric("sqlperf_wait_resource_percent", round(float(summary.resource_wait_percent or 0.0), 4)),
+        ]
+        for category, wait_ms in (summary.category_stats or {}).items():
+            cat = str(category.value).replace('"', "").replace("\\", "_").replace(" ", "_")
+            samples.append(metric("sqlperf_wait_category_wait_time_ms", int(wait_ms or 0), category=cat))
+        return samples
+
+    def _wait_chain_samples(
+        self,
+        chain: Any,
+        alerts: List[WaitAlert],
+        alert_states: Optional[Dict[str, str]] = None,
+    ) -> List[MetricSample]:
+        samples = [
+            metric("sqlperf_wait_blocked_sessions", int(self._chain_total_blocked_sessions(chain) or 0)),
+            metric("sqlperf_wait_chain_depth", int(self._chain_max_depth(chain) or 0)),
+            metric("sqlperf_wait_alert_count", len(alerts or [])),
+        ]
+        for alert_id, state in sorted((alert_states or {}).items()):
+            samples.append(metric("sqlperf_wait_alert_state", 1, alert=alert_id, state=state))
+        return samples
+
     def _build_prometheus_payload(
         self,
         summary: WaitSummary,
         chain: Any,
         alerts: List[WaitAlert],
+        alert_states: Optional[Dict[str, str]] = None,
     ) -> str:
         server, database = self._active_server_database()
-        blocked_sessions = self._chain_total_blocked_sessions(chain)
-        max_depth = self._chain_max_depth(chain)
-        labels = f'server="{server}",database="{database}"'
-        lines = [
-            f"sqlperf_wait_total_wait_time_ms{{{labels}}} {int(summary.total_wait_time_ms or 0)}",
-            f"sqlperf_wait_signal_percent{{{labels}}} {float(summary.signal_wait_percent or 0.0):.4f}",
-            f"sqlperf_wait_resource_percent{{{labels}}} {float(summary.resource_wait_percent or 0.0):.4f}",
-            f"sqlperf_wait_blocked_sessions{{{labels}}} {int(blocked_sessions or 0)}",
-            f"sqlperf_wait_chain_depth{{{labels}}} {int(max_depth or 0)}",
-            f"sqlperf_wait_alert_count{{{labels}}} {len(alerts or [])}",
-        ]
-        for category, wait_ms in (summary.category_stats or {}).items():
-            cat = str(category.value).replace('"', "").replace("\\", "_").replace(" ", "_")
-            lines.append(f'sqlperf_wait_category_wait_time_ms{{{labels},category="{cat}"}} {int(wait_ms or 0)}')
-        return "\n".join(lines) + "\n"
+        base_labels = (("server", server), ("database", database))
+        samples = self._wait_summary_samples(summary) + self._wait_chain_samples(chain, alerts, alert_states)
+        return render_prometheus_text(
+            MetricSample(item.name, item.value, base_labels + item.labels) for item in samples
+        )
+
+    def _publish_wait_metrics(self, summary: WaitSummary, metrics: WaitStatsMetrics) -> None:
+        """Hand the refreshed values to the scrape registry (no extra queries)."""
+        server, _database = self._active_server_database()
+        samples = self._wait_summary_samples(summary)
+        if summary.interval is not None:
+            samples.append(metric("sqlperf_wait_interval_wait_ms_per_second", round(float(summary.interval.wait_ms_per_sec), 3)))
+        samples.append(metric("sqlperf_wait_current_waiting_tasks", len(summary.current_waits or [])))
+        samples.append(metric("sqlperf_wait_refresh_duration_ms", int(metrics.load_duration_ms or 0)))
+        publish_metrics("wait", server, samples)
+        pool_health_fn = getattr(self.connection, "get_pool_health", None)
+        if callable(pool_health_fn):
+            publish_metrics("pool", server, pool_samples(pool_health_fn() or {}))
+
+    def get_monitoring_outbox(self) -> MonitoringOutbox:
+        """Lazily provision the persistent push outbox (delivery runs on its own loop)."""
+        outbox = getattr(self, "_monitoring_outbox", None)
+        if outbox is not None:
+            return outbox
+        with self._outbox_lock:
+            outbox = getattr(self, "_monitoring_outbox", None)
+            if outbox is None:
+                outbox = MonitoringOutbox(
+                    store_path=self._monitoring_outbox_file_path(),
+                    dead_letter_path=self._monitoring_dead_letter_file_path(),
+                    resolve_targets=self.load_monitoring_targets,
+                )
+                setattr(self, "_monitoring_outbox", outbox)
+        return outbox
+
+    def get_monitoring_outbox_status(self) -> Dict[str, Any]:
+        outbox = self.get_monitoring_outbox()
+        return {
+            "pending": outbox.pending_count(),
+            "dead_lettered": outbox.dead_letter_count(),
+            "running": outbox.is_running,
+            "last_result": outbox.last_result.to_dict(),
+        }
 
     def push_metrics_to_monitoring_targets(
         self,
@@ -1835,12 +2226,31 @@ class WaitStatsService:
         alerts: List[WaitAlert],
         targets: Optional[List[WaitMonitoringTarget]] = None,
         timeout_seconds: int = 5,
+        transitions: Optional[List[AlertTransition]] = None,
+        wait: bool = False,
     ) -> Dict[str, Any]:
+        """
+        Queue the current snapshot for every enabled target.
+
+        Payloads go to the on-disk outbox and are delivered by its background
+        loop (batched, concurrent, retried with backoff), so an unreachable
+        target never blocks the caller. Without ``wait`` nothing has been
+        delivered yet: ``success``/``failed`` stay 0 and ``queued`` counts the
+        enqueued targets. ``wait=True`` flushes due entries synchronously and
+        reports the delivery outcome.
+
+        ``transitions`` defaults to alert state changes not yet queued by a
+        previous push, so receivers see each firing/resolved event once.
+        """
         selected = [t for t in list(targets or self.load_monitoring_targets()) if t.enabled]
         if not selected:
-            return {"success": 0, "failed": 0, "results": []}
+            return {"success": 0, "failed": 0, "queued": 0, "results": []}
 
         server, database = self._active_server_database()
+        engine = self.get_alert_engine()
+        use_cursor = transitions is None
+        if use_cursor:
+            transitions = engine.transitions_since(int(getattr(self, "_pushed_alert_seq", 0) or 0), server=server)
         json_payload = {
             "generated_at": datetime.now().isoformat(timespec="seconds"),
             "server": server,
@@ -1860,46 +2270,53 @@ class WaitStatsService:
                 "max_depth": int(self._chain_max_depth(chain) or 0),
             },
             "alerts": [asdict(alert) | {"triggered_at": alert.triggered_at.isoformat(timespec="seconds")} for alert in (alerts or [])],
+            "alert_transitions": [item.to_dict() for item in (transitions or [])],
         }
-        prom_payload = self._build_prometheus_payload(summary, chain, alerts)
-
-        results: List[Dict[str, Any]] = []
-        success = 0
-        failed = 0
-        try:
-            import requests
-        except Exception as ex:
-            logger.warning(f"Monitoring push skipped (requests unavailable): {ex}")
-            return {"success": 0, "failed": len(selected), "results": [{"target": t.name, "status": "failed", "error": "requests unavailable"} for t in selected]}
+        prom_payload = self._build_prometheus_payload(summary, chain, alerts, engine.states(server))
 
+        outbox = self.get_monitoring_outbox()
+        outbox.request_timeout_seconds = max(0.5, float(timeout_seconds or 5))
+        if targets:
+            outbox.remember_targets(selected)
         for target in selected:
             fmt = str(target.payload_format or "json").strip().lower()
-            headers = dict(target.headers or {})
-            try:
-                if fmt == "prometheus":
-                    headers.setdefault("Content-Type", "text/plain; version=0.0.4")
-                    resp = requests.post(target.url, data=prom_payload.encode("utf-8"), headers=headers, timeout=timeout_seconds)
-                else:
-                    headers.setdefault("Content-Type", "application/json")
-                    resp = requests.post(target.url, json=json_payload, headers=headers, timeout=timeout_seconds)
-                if int(resp.status_code) >= 400:
-                    failed += 1
-                    results.append(
-                        {
-                            "target": target.name,
-                            "status": "failed",
-                            "code": int(resp.status_code),
-                            "error": str(resp.text or "")[:400],
-                        }
-                    )
-                else:
-                    success += 1
-                    results.append({"target": target.name, "status": "success", "code": int(resp.status_code)})
-            except Exception as ex:
-                failed += 1
-                results.append({"target": target.name, "status": "failed", "error": str(ex)})
+            outbox.enqueue(target.name, fmt, prom_payload if fmt == "prometheus" else json_payload)
+        if use_cursor and transitions:
+            setattr(self, "_pushed_alert_seq", max(item.seq for item in transitions))
 
-        return {"success": success, "failed": failed, "results": results}
+        if not wait:
+            outbox.kick()
+            return {
+                "success": 0,
+                "failed": 0,
+                "queued": len(selected),
+                "pending": outbox.pending_count(),
+                "results": [{"target": t.name, "status": "queued"} for t in selected],
+                "transitions": len(transitions or []),
+            }
+
+        try:
+            delivery = outbox.flush(timeout_seconds=max(5.0, float(timeout_seconds or 5) * 3))
+        except Exception as ex:
+            logger.warning(f"Monitoring outbox flush failed: {ex}")
+            return {
+                "success": 0,
+                "failed": len(selected),
+                "queued": len(selected),
+                "pending": outbox.pending_count(),
+                "results": [{"target": t.name, "status": "queued", "error": str(ex)} for t in selected],
+                "transitions": len(transitions or []),
+            }
+        failed = sum(1 for item in delivery.results if item.get("status") != "success")
+        return {
+            "success": len(delivery.results) - failed,
+            "failed": failed,
+            "queued": len(selected),
+            "pending": delivery.pending,
+            "dead_lettered": delivery.dead_lettered,
+            "results": delivery.results,
+            "transitions": len(transitions or []),
+        }
 
     def get_wait_plan_correlation(
         self,
@@ -2024,7 +2441,13 @@ class WaitStatsService:
             except Exception:
                 pass
 
-        def run_query(operation_name: str, sql: str, percent: int, message: str) -> List[Dict[str, Any]]:
+        def run_query(
+            operation_name: str,
+            sql: str,
+            percent: int,
+            message: str,
+            multi_result: bool = False,
+        ) -> List[Any]:
             emit_progress(percent, message)
             metrics.query_count += 1
             try:
@@ -2035,6 +2458,7 @@ class WaitStatsService:
                     max_attempts=max_attempts,
                     base_backoff_seconds=base_backoff_seconds,
                     retry_callback=retry_callback,
+                    multi_result=multi_result,
                 )
                 metrics.total_retries += int(retries_used)
                 metrics.retry_counts[operation_name] = int(retries_used)
@@ -2055,31 +2479,37 @@ class WaitStatsService:
 
         emit_progress(5, "Starting wait statistics refresh...")
 
-        summary_rows = run_query("wait_summary", WaitStatsQueries.WAIT_SUMMARY, 15, "Collecting summary metrics...")
-        if summary_rows:
-            row = summary_rows[0]
-            summary.total_wait_types = self._safe_int(row.get("total_wait_types", 0))
-            summary.total_waiting_tasks = self._safe_int(row.get("total_waiting_tasks", 0))
-            summary.total_wait_time_ms = self._safe_int(row.get("total_wait_time_ms", 0))
-            summary.total_signal_wait_ms = self._safe_int(row.get("total_signal_wait_ms", 0))
-            summary.total_resource_wait_ms = self._safe_int(row.get("total_resource_wait_ms", 0))
-            summary.max_single_wait_ms = self._safe_int(row.get("max_single_wait_ms", 0))
-
-        ratio_rows = run_query("signal_vs_resource", WaitStatsQueries.SIGNAL_VS_RESOURCE, 30, "Calculating signal/resource ratio...")
-        if ratio_rows:
-            row = ratio_rows[0]
-            summary.signal_wait_percent = self._safe_float(row.get("signal_wait_percent", 0))
-            summary.resource_wait_percent = self._safe_float(row.get("resource_wait_percent", 0))
-
-        top_rows = run_query("top_waits", WaitStatsQueries.TOP_WAITS, 50, "Loading top wait types...")
-        summary.top_waits = self._map_top_wait_rows(top_rows)
-
-        category_rows = run_query("waits_by_category", WaitStatsQueries.WAITS_BY_CATEGORY, 70, "Aggregating category totals...")
-        summary.category_stats = self._map_category_rows(category_rows)
-        summary.all_waits = self._map_all_wait_rows(category_rows)
-
-        current_rows = run_query("current_waits", WaitStatsQueries.CURRENT_WAITS, 88, "Loading active waiters...")
+        # One round trip: raw counters + currently waiting requests
+        result_sets = run_query(
+            "wait_snapshot",
+            WaitStatsQueries.WAIT_SNAPSHOT_BATCH,
+            20,
+            "Collecting wait snapshot...",
+            multi_result=True,
+        )
+        counter_rows = list(result_sets[0]) if len(result_sets) > 0 else []
+        current_rows = list(result_sets[1]) if len(result_sets) > 1 else []
+        metrics.rows_by_operation["wait_snapshot"] = len(counter_rows)
+        metrics.rows_by_operation["current_waits"] = len(current_rows)
+
+        emit_progress(60, "Aggregating wait totals...")
+        self._apply_counter_rows(summary, counter_rows)
+        if counter_rows:
+            self._apply_interval_deltas(summary, metrics, counter_rows)
+
+        emit_progress(88, "Loading active waiters...")
         summary.current_waits = self._map_current_wait_rows(current_rows)
+        sampler = self.get_wait_sampler()
+        if sampler is not None and sampler.is_running:
+            summary.sampled_waits = sampler.summarize()
+            metrics.sampler_polls = int(summary.sampled_waits.polls)
+            metrics.sampler_avg_poll_ms = float(summary.sampled_waits.avg_poll_ms)
+        collector = self.get_xe_collector()
+        if collector is not None:
+            summary.xe_telemetry = collector.collect()
+            metrics.xe_events = summary.xe_telemetry.total_events
+            if summary.xe_telemetry.error:
+                metrics.errors.append(f"xe_collect: {summary.xe_telemetry.error}")
         summary.collected_at = datetime.now()
 
         self._append_history_snapshot(summary)
@@ -2088,9 +2518,52 @@ class WaitStatsService:
         metrics.current_waits_count = len(summary.current_waits)
         metrics.collected_at = summary.collected_at
         metrics.load_duration_ms = int((perf_counter() - started) * 1000)
+        self._publish_wait_metrics(summary, metrics)
         emit_progress(100, "Wait statistics refresh completed.")
         return summary, metrics
 
+    def _apply_interval_deltas(
+        self,
+        summary: WaitSummary,
+        metrics: WaitStatsMetrics,
+        counter_rows: List[Dict[str, Any]],
+    ) -> None:
+        """Feed raw counters to the delta engine and attach interval/window views."""
+        server, _database = self._active_server_database()
+        engine = self.get_delta_engine()
+        try:
+            interval = engine.ingest(server, counter_rows)
+        except Exception as ex:
+            logger.warning(f"Wait stats interval delta failed: {ex}")
+            return
+        summary.interval = interval or engine.last_interval(server)
+        summary.interval_window = engine.window(server)
+        if interval is not None:
+            metrics.interval_seconds = float(interval.interval_seconds)
+            metrics.interval_wait_ms_per_sec = float(interval.wait_ms_per_sec)
+            metrics.counter_reset = bool(interval.counter_reset)
+
+    @staticmethod
+    def interval_wait_stats(delta: Optional[WaitIntervalDelta], limit: int = 15) -> List[WaitStat]:
+        """Top waits of an interval/window delta as WaitStat rows (what is waiting now)."""
+        if delta is None:
+            return []
+        waits: List[WaitStat] = []
+        cumulative = 0.0
+        for item in delta.top_waits(limit):
+            cumulative += float(item.wait_percent or 0.0)
+            waits.append(WaitStat(
+                wait_type=item.wait_type,
+                category=item.category,
+                waiting_tasks=int(item.waiting_tasks),
+                wait_time_ms=int(item.wait_time_ms),
+                signal_wait_ms=int(item.signal_wait_ms),
+                resource_wait_ms=int(item.resource_wait_ms),
+                wait_percent=float(item.wait_percent),
+                cumulative_percent=min(100.0, cumulative),
+            ))
+        return waits
+
     def get_wait_summary(self) -> WaitSummary:
         """Get comprehensive wait statistics summary."""
         summary, _metrics = self.get_wait_summary_with_metrics()
@@ -2142,6 +2615,8 @@ class WaitStatsService:
 
         try:
             self.connection.execute_query(WaitStatsQueries.CLEAR_WAIT_STATS)
+            server, _database = self._active_server_database()
+            self.get_delta_engine().reset(server)
             logger.info("Wait statistics cleared successfully")
             return True
         except Exception as e:
@@ -2199,6 +2674,10 @@ class WaitStatsService:
                     for category, value in (summary.category_stats or {}).items()
                 },
             },
+            "interval": summary.interval.to_dict() if summary.interval else None,
+            "interval_window": summary.interval_window.to_dict() if summary.interval_window else None,
+            "sampled_waits": summary.sampled_waits.to_dict() if summary.sampled_waits else None,
+            "xe_telemetry": summary.xe_telemetry.to_dict() if summary.xe_telemetry else None,
             "top_waits": [
                 {
                     "wait_type": str(wait.wait_type or ""),
@@ -0,0 +1,461 @@
+"""
+Extended Events telemetry collector - wait_completed / blocked_process_report / xml_deadlock_report
+
+Optional alternative to DMV polling: a lightweight server-side XE session
+captures every qualifying event and the collector reads only what is new since
+the previous call.
+
+Position cursor:
+    - event_file target: (file_name, file_offset) passed back to
+      sys.fn_xe_file_target_read_file, so the server skips what was read
+    - ring_buffer target: RingBufferTarget/@totalEventsProcessed; only the
+      trailing (total - previous_total) events of the buffer are new
+
+Event XML is parsed with XMLPullParser and each <event> element is cleared
+as soon as it is normalized, so large ring buffers are never materialized as
+a full tree. Normalized events are appended to a local JSONL time-series store.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.core.logger import get_logger
+from app.database.queries.wait_stats_queries import WaitStatsQueries
+
+logger = get_logger("services.xe_collector")
+
+XE_SESSION_NAME = "SpStudioPro_WaitTelemetry"
+XE_TARGET_RING_BUFFER = "ring_buffer"
+XE_TARGET_EVENT_FILE = "event_file"
+XE_EVENT_NAMES = ("wait_completed", "blocked_process_report", "xml_deadlock_report")
+MAX_XE_STORE_EVENTS = 20_000
+MAX_XE_REPORT_XML_CHARS = 64_000
+# XMLPullParser'a tek seferde beslenen karakter sayısı
+_FEED_CHUNK_CHARS = 1 << 16
+
+
+@dataclass
+class XeEvent:
+    """Normalized XE event."""
+
+    name: str
+    timestamp: Optional[datetime]
+    fields: Dict[str, Any] = field(default_factory=dict)
+
+    def to_record(self, server: str) -> Dict[str, Any]:
+        record: Dict[str, Any] = {
+            "ts": self.timestamp.isoformat() if self.timestamp else None,
+            "server": server,
+            "event": self.name,
+        }
+        record.update(self.fields)
+        return record
+
+
+@dataclass
+class XeCollectResult:
+    """Outcome of one incremental collection."""
+
+    target: str = XE_TARGET_RING_BUFFER
+    events: List[XeEvent] = field(default_factory=list)
+    counts: Dict[str, int] = field(default_factory=dict)
+    wait_ms_by_type: Dict[str, int] = field(default_factory=dict)
+    missed_events: int = 0
+    stored: int = 0
+    session_ready: bool = False
+    error: str = ""
+    collected_at: datetime = field(default_factory=datetime.now)
+
+    @property
+    def total_events(self) -> int:
+        return len(self.events)
+
+    def to_dict(self, top_n: int = 10) -> Dict[str, Any]:
+        top_waits = sorted(self.wait_ms_by_type.items(), key=lambda item: item[1], reverse=True)[:top_n]
+        return {
+            "target": self.target,
+            "total_events": int(self.total_events),
+            "counts": {name: int(count) for name, count in self.counts.items()},
+            "top_wait_ms_by_type": [{"wait_type": wt, "wait_ms": int(ms)} for wt, ms in top_waits],
+            "missed_events": int(self.missed_events),
+            "stored": int(self.stored),
+            "session_ready": bool(self.session_ready),
+            "error": str(self.error or ""),
+            "collected_at": self.collected_at.isoformat(timespec="seconds"),
+        }
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    text = str(value).strip().replace("Z", "+00:00")
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        # 7 haneli kesir (SQL Server) -> 6 haneye indir
+        if "." in text:
+            head, _, tail = text.partition(".")
+            digits = "".join(ch for ch in tail if ch.isdigit())
+            zone = tail[len(digits):]
+            try:
+                return datetime.fromisoformat(f"{head}.{digits[:6]}{zone}")
+            except ValueError:
+                return None
+        return None
+
+
+def _to_int(value: Any) -> int:
+    try:
+        return int(float(value or 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _data_value(data: ET.Element) -> Tuple[Optional[str], Optional[ET.Element]]:
+    """(text, embedded xml element) of a <data>/<action> node; map fields prefer <text>."""
+    text_node = data.find("text")
+    if text_node is not None and (text_node.text or "").strip():
+        return text_node.text.strip(), None
+    value_node = data.find("value")
+    if value_node is None:
+        return None, None
+    children = list(value_node)
+    if children:
+        return None, children[0]
+    return (value_node.text or "").strip(), None
+
+
+def _normalize_event(event: ET.Element) -> Optional[XeEvent]:
+    name = event.get("name") or ""
+    if name not in XE_EVENT_NAMES:
+        return None
+    values: Dict[str, str] = {}
+    embedded: Dict[str, ET.Element] = {}
+    for child in event:
+        if child.tag not in ("data", "action"):
+            continue
+        key = child.get("name") or ""
+        text, xml_node = _data_value(child)
+        if xml_node is not None:
+            embedded[key] = xml_node
+        elif text is not None:
+            values[key] = text
+
+    fields: Dict[str, Any] = {
+        "session_id": _to_int(values.get("session_id")),
+        "database_id": _to_int(values.get("database_id")),
+    }
+    if name == "wait_completed":
+        fields.update({
+            "wait_type": values.get("wait_type", ""),
+            "duration_ms": _to_int(values.get("duration")),
+            "signal_ms": _to_int(values.get("signal_duration")),
+        })
+    elif name == "blocked_process_report":
+        fields["duration_ms"] = _to_int(values.get("duration")) // 1000  # microseconds
+        report = embedded.get("blocked_process")
+        if report is not None:
+            blocked = report.find("blocked-process/process")
+            blocking = report.find("blocking-process/process")
+            if blocked is not None:
+                fields.update({
+                    "blocked_spid": _to_int(blocked.get("spid")),
+                    "wait_resource": blocked.get("waitresource", ""),
+                    "lock_mode": blocked.get("lockMode", ""),
+                    "wait_time_ms": _to_int(blocked.get("waittime")),
+                })
+            if blocking is not None:
+                fields["blocking_spid"] = _to_int(blocking.get("spid"))
+    elif name == "xml_deadlock_report":
+        report = embedded.get("xml_report")
+        if report is not None:
+            resource_list = report.find("resource-list")
+            fields.update({
+                "victims": len(report.findall("victim-list/victimProcess")),
+                "processes": len(report.findall("process-list/process")),
+                "resources": sorted({res.tag for res in resource_list}) if resource_list is not None else [],
+                "xml": ET.tostring(report, encoding="unicode")[:MAX_XE_REPORT_XML_CHARS],
+            })
+    return XeEvent(name=name, timestamp=_parse_timestamp(event.get("timestamp")), fields=fields)
+
+
+def iter_xe_events(xml_text: str, skip: int = 0) -> Iterator[XeEvent]:
+    """
+    Stream <event> elements out of ring_buffer / event_file XML.
+
+    skip: number of leading <event> elements to ignore (ring buffer cursor)
+    """
+    text = xml_text or ""
+    if not text.strip():
+        return
+    parser = ET.XMLPullParser(events=("start", "end"))
+    depth = 0
+    seen = 0
+    root: Optional[ET.Element] = None
+    for offset in range(0, len(text), _FEED_CHUNK_CHARS):
+        parser.feed(text[offset:offset + _FEED_CHUNK_CHARS])
+        for kind, element in parser.read_events():
+            if kind == "start":
+                if root is None:
+                    root = element
+                if element.tag == "event":
+                    depth += 1
+                continue
+            if element.tag != "event":
+                continue
+            depth -= 1
+            if depth > 0:
+                continue
+            seen += 1
+            if seen > skip:
+                normalized = _normalize_event(element)
+                if normalized is not None:
+                    yield normalized
+            element.clear()
+            if root is not None and root is not element:
+                # Tamamlanan event'leri kökten de kopar; bellek sabit kalır
+                for child in list(root):
+                    if child is element:
+                        root.remove(child)
+                        break
+    parser.close()
+
+
+def ring_buffer_event_total(xml_text: str) -> Tuple[int, int]:
+    """(totalEventsProcessed, eventCount) from the RingBufferTarget root attributes."""
+    parser = ET.XMLPullParser(events=("start",))
+    parser.feed((xml_text or "")[:4096])
+    for _kind, element in parser.read_events():
+        return _to_int(element.get("totalEventsProcessed")), _to_int(element.get("eventCount"))
+    return 0, 0
+
+
+class XeTelemetryCollector:
+    """
+    Manages the XE session and incremental reads for one server.
+
+    execute_query: (sql, params) -> rows (DatabaseConnection.execute_query)
+    execute_ddl:   (sql) -> None         (DatabaseConnection.execute_autocommit)
+    """
+
+    def __init__(
+        self,
+        server: str,
+        execute_query: Callable[[str, Optional[Dict[str, Any]]], List[Dict[str, Any]]],
+        execute_ddl: Callable[[str], None],
+        store_path: Path,
+        cursor_path: Path,
+        target: str = XE_TARGET_RING_BUFFER,
+        min_wait_ms: int = 10,
+        session_name: str = XE_SESSION_NAME,
+        ring_buffer_max_events: int = 5000,
+        max_store_events: int = MAX_XE_STORE_EVENTS,
+    ):
+        self.server = server
+        self.target = target if target in (XE_TARGET_RING_BUFFER, XE_TARGET_EVENT_FILE) else XE_TARGET_RING_BUFFER
+        self.session_name = session_name
+        self.min_wait_ms = max(0, int(min_wait_ms))
+        self._execute_query = execute_query
+        self._execute_ddl = execute_ddl
+        self._store_path = Path(store_path)
+        self._cursor_path = Path(cursor_path)
+        self._ring_buffer_max_events = max(100, int(ring_buffer_max_events))
+        self._max_store_events = max(100, int(max_store_events))
+        self._stored_since_trim = 0
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------ session
+
+    def _target_clause(self) -> str:
+        if self.target == XE_TARGET_EVENT_FILE:
+            return WaitStatsQueries.XE_EVENT_FILE_TARGET.format(file_name=self.session_name)
+        return WaitStatsQueries.XE_RING_BUFFER_TARGET.format(max_events=self._ring_buffer_max_events)
+
+    def _session_info(self) -> Tuple[bool, bool, str]:
+        rows = self._execute_query(WaitStatsQueries.XE_SESSION_STATE, {"session_name": self.session_name})
+        row = rows[0] if rows else {}
+        target = str(row.get("session_target") or "").strip().lower()
+        return bool(row.get("session_exists")), bool(row.get("session_running")), target
+
+    def session_state(self) -> Tuple[bool, bool]:
+        exists, running, _target = self._session_info()
+        return exists, running
+
+    def ensure_session(self) -> bool:
+        """
+        Create (if missing) and start the XE session. Requires ALTER ANY EVENT SESSION.
+
+        An existing session whose target type differs from ``self.target``
+        (e.g. created as ring_buffer, now configured for event_file) is
+        dropped and recreated, otherwise reads would query a target that the
+        session does not have.
+        """
+        exists, running, target = self._session_info()
+        if exists and target != self.target:
+            logger.info(
+                f"XE session {self.session_name} on {self.server} has target "
+                f"{target or 'none'}, recreating with {self.target}"
+            )
+            if running:
+                self._execute_ddl(WaitStatsQueries.XE_STOP_SESSION_TEMPLATE.format(session_name=self.session_name))
+            self._execute_ddl(WaitStatsQueries.XE_DROP_SESSION_TEMPLATE.format(session_name=self.session_name))
+            self._save_cursor({})
+            exists, running = False, False
+        if not exists:
+            self._execute_ddl(WaitStatsQueries.XE_CREATE_SESSION_TEMPLATE.format(
+                session_name=self.session_name,
+                min_wait_ms=self.min_wait_ms,
+                target_clause=self._target_clause(),
+            ))
+            logger.info(f"XE session {self.session_name} created on {self.server} ({self.target})")
+        if not running:
+            self._execute_ddl(WaitStatsQueries.XE_START_SESSION_TEMPLATE.format(session_name=self.session_name))
+            self._save_cursor({})
+        return True
+
+    def drop_session(self) -> None:
+        exists, running = self.session_state()
+        if running:
+            self._execute_ddl(WaitStatsQueries.XE_STOP_SESSION_TEMPLATE.format(session_name=self.session_name))
+        if exists:
+            self._execute_ddl(WaitStatsQueries.XE_DROP_SESSION_TEMPLATE.format(session_name=self.session_name))
+        self._save_cursor({})
+
+    # ------------------------------------------------------------------ cursor
+
+    def _load_cursor(self) -> Dict[str, Any]:
+        try:
+            with open(self._cursor_path, "r", encoding="utf-8") as handle:
+                payload = json.load(handle)
+            entry = payload.get(self.server, {}) if isinstance(payload, dict) else {}
+            if entry.get("target") != self.target or entry.get("session") != self.session_name:
+                return {}
+            return entry
+        except Exception:
+            return {}
+
+    def _save_cursor(self, cursor: Dict[str, Any]) -> None:
+        try:
+            payload: Dict[str, Any] = {}
+            if self._cursor_path.exists():
+                with open(self._cursor_path, "r", encoding="utf-8") as handle:
+                    loaded = json.load(handle)
+                payload = loaded if isinstance(loaded, dict) else {}
+            if cursor:
+                payload[self.server] = dict(cursor, target=self.target, session=self.session_name)
+            else:
+                payload.pop(self.server, None)
+            with open(self._cursor_path, "w", encoding="utf-8") as handle:
+                json.dump(payload, handle, indent=2, ensure_ascii=False)
+        except Exception as ex:
+            logger.debug(f"Failed to persist XE cursor: {ex}")
+
+    # ------------------------------------------------------------------ reads
+
+    def _read_ring_buffer(self, cursor: Dict[str, Any]) -> Optional[Tuple[List[XeEvent], Dict[str, Any], int]]:
+        rows = self._execute_query(WaitStatsQueries.XE_READ_RING_BUFFER, {"session_name": self.session_name})
+        if not rows:
+            return None  # session not running: the target only exists while started
+        xml_text = str(rows[0].get("target_data") or "")
+        if not xml_text:
+            return [], cursor, 0
+        total, event_count = ring_buffer_event_total(xml_text)
+        previous_total = _to_int(cursor.get("total_events_processed"))
+        if total < previous_total:
+            previous_total = 0  # session restarted
+        new_events = total - previous_total
+        missed = max(0, new_events - event_count)
+        skip = max(0, event_count - new_events)
+        events = list(iter_xe_events(xml_text, skip=skip)) if new_events > 0 else []
+        return events, {"total_events_processed": total}, missed
+
+    def _read_event_file(self, cursor: Dict[str, Any]) -> Tuple[List[XeEvent], Dict[str, Any], int]:
+        file_pattern = f"{self.session_name}*.xel"
+        if cursor.get("file_name"):
+            rows = self._execute_query(WaitStatsQueries.XE_READ_EVENT_FILE, {
+                "file_pattern": file_pattern,
+                "initial_file_name": cursor["file_name"],
+                "initial_offset": _to_int(cursor.get("file_offset")),
+            })
+        else:
+            rows = self._execute_query(WaitStatsQueries.XE_READ_EVENT_FILE_FROM_START, {"file_pattern": file_pattern})
+
+        events: List[XeEvent] = []
+        next_cursor = dict(cursor)
+        for row in rows or []:
+            events.extend(iter_xe_events(str(row.get("event_data") or "")))
+            next_cursor = {"file_name": row.get("file_name"), "file_offset": _to_int(row.get("file_offset"))}
+        return events, next_cursor, 0
+
+    def collect(self) -> XeCollectResult:
+        """Read events added since the previous call and append them to the store."""
+        result = XeCollectResult(target=self.target)
+        with self._lock:
+            try:
+                cursor = self._load_cursor()
+                if self.target == XE_TARGET_EVENT_FILE:
+                    exists, running = self.session_state()
+                    read = self._read_event_file(cursor) if exists and running else None
+                else:
+                    read = self._read_ring_buffer(cursor)
+                if read is None:
+                    result.error = f"XE session {self.session_name} is not running"
+                    return result
+                result.session_ready = True
+                events, next_cursor, missed = read
+            except Exception as ex:
+                result.error = str(ex)
+                logger.warning(f"XE collection failed on {self.server}: {ex}")
+                return result
+
+            result.events = events
+            result.missed_events = missed
+            for event in events:
+                result.counts[event.name] = result.counts.get(event.name, 0) + 1
+                if event.name == "wait_completed":
+                    wait_type = str(event.fields.get("wait_type") or "")
+                    result.wait_ms_by_type[wait_type] = (
+                        result.wait_ms_by_type.get(wait_type, 0) + _to_int(event.fields.get("duration_ms"))
+                    )
+            result.stored = self._append_to_store(events)
+            if next_cursor != cursor:
+                self._save_cursor(next_cursor)
+        if missed:
+            logger.info(f"XE ring buffer overran on {self.server}: {missed} events missed between reads")
+        return result
+
+    # ------------------------------------------------------------------ store
+
+    def _append_to_store(self, events: Iterable[XeEvent]) -> int:
+        written = 0
+        try:
+            with open(self._store_path, "a", encoding="utf-8") as handle:
+                for event in events:
+                    handle.write(json.dumps(event.to_record(self.server), ensure_ascii=False, default=str) + "\n")
+                    written += 1
+        except Exception as ex:
+            logger.debug(f"Failed to append XE events: {ex}")
+            return written
+        self._stored_since_trim += written
+        if self._stored_since_trim >= self._max_store_events // 10:
+            self._stored_since_trim = 0
+            self._trim_store()
+        return written
+
+    def _trim_store(self) -> None:
+        try:
+            with open(self._store_path, "r", encoding="utf-8") as handle:
+                lines = handle.readlines()
+            if len(lines) <= self._max_store_events:
+                return
+            with open(self._store_path, "w", encoding="utf-8") as handle:
+                handle.writelines(lines[-self._max_store_events:])
+        except Exception as ex:
+            logger.debug(f"Failed to trim XE event store: {ex}")
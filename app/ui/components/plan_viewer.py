@@ -6,21 +6,26 @@ SSMS tarzı tree view ve operatör detay paneli.
 Modern Light Theme uyumlu.
 """
 
-from typing import Optional, List
+from collections import deque
+from typing import Optional, List, Dict
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
     QTreeWidget, QTreeWidgetItem, QSplitter,
     QGroupBox, QScrollArea, QFrame, QTextEdit,
     QPushButton, QTabWidget, QProgressBar,
-    QGraphicsDropShadowEffect
+    QGraphicsDropShadowEffect, QComboBox
 )
-from PyQt6.QtCore import Qt, pyqtSignal
+from PyQt6.QtCore import Qt, pyqtSignal, QTimer
 from PyQt6.QtGui import QFont, QColor
 
 from app.core.logger import get_logger
-from app.ui.theme import Colors
-from app.analysis.plan_parser import ExecutionPlan, PlanOperator, MissingIndex, PlanWarning
-from app.models.query_stats_models import PlanStability
+from app.ui.theme import Colors, Theme as ThemeStyles
+from app.analysis.plan_parser import (
+    ExecutionPlan, PlanOperator, MissingIndex, PlanWarning, PlanParser,
+)
+from app.analysis.plan_model import get_plan_model
+from app.analysis.plan_diff import PlanDiffEngine, PlanDiffResult
+from app.models.query_stats_models import PlanStability, PlanInfo
 
 logger = get_logger('ui.plan_viewer')
 
@@ -51,14 +56,79 @@ OPERATOR_ICONS = {
     'Delete': '❌',
 }
 
+# Plan diff işaretleri (tree satırı rengi ve öneki)
+DIFF_MARKER_STYLES = {
+    'changed': ('#B45309', '△'),
+    'removed': (Colors.ERROR, '✖'),
+}
+
+DIFF_SEVERITY_ICONS = {'High': '🔴', 'Medium': '🟠', 'Low': '🟡'}
+
+# Progressive tree doldurma: event loop turu başına oluşturulan en fazla item
+TREE_ITEMS_PER_TICK = 250
+
+# Alt ağaç maliyet payı bu eşiğin altındaki düğümler kapalı başlar
+COLLAPSE_THRESHOLD_OPTIONS = [
+    ("Expand all", 0.0),
+    ("Collapse < 1% cost", 1.0),
+    ("Collapse < 5% cost", 5.0),
+    ("Collapse < 20% cost", 20.0),
+]
+
 
 class OperatorTreeItem(QTreeWidgetItem):
-    """Plan operatörü için tree item"""
+    """
+    Plan operatörü için tree item
+    
+    Çocuk item'lar ilk açılışta (populate_children), tooltip ise ilk
+    hover'da oluşturulur; büyük planlarda yalnızca görünen kısım maliyetlidir.
+    """
     
     def __init__(self, operator: PlanOperator, parent=None):
         super().__init__(parent)
         self.operator = operator
+        self.children_populated = False
+        self.diff_marker: Optional[str] = None
+        self._tooltip: Optional[str] = None
+        self._setup_item()
+        if operator.children:
+            self.setChildIndicatorPolicy(QTreeWidgetItem.ChildIndicatorPolicy.ShowIndicator)
+    
+    def populate_children(self) -> List["OperatorTreeItem"]:
+        """Çocuk operatör item'larını oluştur (bir kez)"""
+        if self.children_populated:
+            return []
+        self.children_populated = True
+        created = [OperatorTreeItem(child, self) for child in self.operator.children]
+        self.setChildIndicatorPolicy(QTreeWidgetItem.ChildIndicatorPolicy.DontShowIndicatorWhenChildless)
+        return created
+    
+    def data(self, column: int, role: int):
+        # Tooltip ilk istendiğinde üretilir
+        if column == 0 and role == Qt.ItemDataRole.ToolTipRole:
+            if self._tooltip is None:
+                self._tooltip = self._build_tooltip()
+                if self.diff_marker:
+                    self._tooltip = f"Plan diff: {self.diff_marker}<br><br>{self._tooltip}"
+            return self._tooltip
+        return super().data(column, role)
+    
+    def set_diff_marker(self, marker: Optional[str]) -> None:
+        """Diff işaretini uygula / kaldır"""
+        if marker == self.diff_marker:
+            return
+        self.diff_marker = marker
+        self._tooltip = None
+        # Önceki diff işaretini temizle, operatörün kendi stiline dön
+        for column in (0, 1):
+            self.setData(column, Qt.ItemDataRole.ForegroundRole, None)
         self._setup_item()
+        style = DIFF_MARKER_STYLES.get(marker) if marker else None
+        if style is None:
+            return
+        color, prefix = style
+        self.setText(0, f"{prefix} {self.text(0)}")
+        self.setForeground(0, QColor(color))
     
     def _setup_item(self) -> None:
         op = self.operator
@@ -94,10 +164,6 @@ class OperatorTreeItem(QTreeWidgetItem):
         elif op.is_expensive:
             self.setForeground(0, QColor("#D97706"))
             self.setForeground(1, QColor("#D97706"))
-        
-        # Tooltip
-        tooltip = self._build_tooltip()
-        self.setToolTip(0, tooltip)
     
     def _format_rows(self, rows: float) -> str:
         """Satır sayısını formatla"""
@@ -122,6 +188,13 @@ class OperatorTreeItem(QTreeWidgetItem):
             f"Row Size: {op.estimated_row_size} bytes",
         ]
         
+        if op.has_actual_stats:
+            lines.append(f"Actual Rows: {op.actual_rows:,} ({op.actual_executions or 0:,} executions)")
+            if op.misestimate_factor >= 10:
+                lines.append(f"<font color='red'>Row misestimate: {op.misestimate_factor:,.0f}x</font>")
+            lines.append(f"Actual Elapsed: {op.actual_self_elapsed_ms:,.0f} ms (subtree {op.actual_elapsed_ms:,.0f} ms)")
+            lines.append(f"Actual CPU: {op.actual_cpu_ms:,.0f} ms | Logical Reads: {op.actual_logical_reads:,}")
+        
         if op.parallel:
             lines.append(f"Parallel: Yes (DOP: {op.estimated_degree})")
         
@@ -160,6 +233,12 @@ class PlanTreeWidget(QWidget):
     def __init__(self, parent: Optional[QWidget] = None):
         super().__init__(parent)
         self._plan: Optional[ExecutionPlan] = None
+        self._items_by_node_id: Dict[int, OperatorTreeItem] = {}
+        self._diff_markers: Dict[int, str] = {}
+        # Progressive doldurma kuyruğu; yeni plan geldiğinde generation artar
+        self._expand_queue: deque = deque()
+        self._build_generation = 0
+        self._collapse_threshold = 0.0
         self._setup_ui()
     
     def _setup_ui(self) -> None:
@@ -167,6 +246,8 @@ class PlanTreeWidget(QWidget):
         layout.setContentsMargins(0, 0, 0, 0)
         
         # Plan özet satırı
+        summary_row = QHBoxLayout()
+        summary_row.setContentsMargins(0, 0, 0, 0)
         self._summary_label = QLabel("No plan loaded")
         self._summary_label.setStyleSheet(f"""
             color: {Colors.TEXT_SECONDARY}; 
@@ -175,7 +256,16 @@ class PlanTreeWidget(QWidget):
             background-color: {Colors.SURFACE};
             border-radius: 6px;
         """)
-        layout.addWidget(self._summary_label)
+        summary_row.addWidget(self._summary_label, 1)
+        
+        self._collapse_combo = QComboBox()
+        self._collapse_combo.setStyleSheet(ThemeStyles.combobox_style())
+        self._collapse_combo.setToolTip("Start subtrees below this share of plan cost collapsed")
+        for label, threshold in COLLAPSE_THRESHOLD_OPTIONS:
+            self._collapse_combo.addItem(label, threshold)
+        self._collapse_combo.currentIndexChanged.connect(self._on_collapse_threshold_changed)
+        summary_row.addWidget(self._collapse_combo)
+        layout.addLayout(summary_row)
         
         # Tree widget
         self._tree = QTreeWidget()
@@ -229,12 +319,17 @@ class PlanTreeWidget(QWidget):
         """)
         
         self._tree.itemClicked.connect(self._on_item_clicked)
+        self._tree.itemExpanded.connect(self._on_item_expanded)
         layout.addWidget(self._tree)
     
     def set_plan(self, plan: Optional[ExecutionPlan]) -> None:
         """Planı ayarla ve görselleştir"""
         self._plan = plan
+        self._build_generation += 1
+        self._expand_queue.clear()
         self._tree.clear()
+        self._items_by_node_id = {}
+        self._diff_markers = {}
         
         if not plan:
             self._summary_label.setText(
@@ -244,34 +339,114 @@ class PlanTreeWidget(QWidget):
         
         # Özet
         parallel_text = "⚡ Parallel" if plan.degree_of_parallelism > 1 else "Single Thread"
-        self._summary_label.setText(
+        summary = (
             f"📊 Operators: {plan.operator_count} | "
             f"💰 Cost: {plan.total_cost:.4f} | "
             f"{parallel_text}"
         )
-        
-        # Tree'yi oluştur
+        if plan.actual_elapsed_ms is not None:
+            summary += f" | ⏱️ Actual: {plan.actual_elapsed_ms:,.0f} ms"
+            hotspots = plan.runtime_hotspots(1)
+            if hotspots and hotspots[0].actual_self_elapsed_ms > 0:
+                summary += f" (slowest: {hotspots[0].short_name} {hotspots[0].actual_self_elapsed_ms:,.0f} ms)"
+        self._summary_label.setText(summary)
+        
+        # Kök aynı turda görünür; geri kalanı event loop turlarına bölünerek açılır
         if plan.root_operator:
-            self._add_operator_to_tree(plan.root_operator, None)
-        
-        # Tümünü genişlet
-        self._tree.expandAll()
-    
-    def _add_operator_to_tree(
-        self, 
-        operator: PlanOperator, 
-        parent_item: Optional[QTreeWidgetItem]
-    ) -> None:
-        """Operatörü tree'ye ekle"""
-        if parent_item is None:
-            item = OperatorTreeItem(operator)
-            self._tree.addTopLevelItem(item)
-        else:
-            item = OperatorTreeItem(operator, parent_item)
+            root_item = OperatorTreeItem(plan.root_operator)
+            self._tree.addTopLevelItem(root_item)
+            self._register_items([root_item])
+            self._expand_queue.append(root_item)
+            self._expand_progressively(self._build_generation)
+    
+    def _register_items(self, items: List[OperatorTreeItem]) -> None:
+        for item in items:
+            self._items_by_node_id[item.operator.node_id] = item
+            marker = self._diff_markers.get(item.operator.node_id)
+            if marker:
+                item.set_diff_marker(marker)
+    
+    def _populate(self, item: OperatorTreeItem) -> List[OperatorTreeItem]:
+        created = item.populate_children()
+        self._register_items(created)
+        return created
+    
+    def _should_expand(self, operator: PlanOperator) -> bool:
+        """Alt ağacın plan maliyetindeki payı eşiğin üzerindeyse açık başlar"""
+        if self._collapse_threshold <= 0 or self._plan is None or self._plan.total_cost <= 0:
+            return True
+        return operator.subtree_cost / self._plan.total_cost * 100.0 >= self._collapse_threshold
+    
+    def _expand_progressively(self, generation: int) -> None:
+        """Kuyruktaki item'ları sınırlı sayıda aç; kalan iş bir sonraki tura"""
+        if generation != self._build_generation:
+            return
+        created_count = 0
+        while self._expand_queue and created_count < TREE_ITEMS_PER_TICK:
+            item = self._expand_queue.popleft()
+            if not self._should_expand(item.operator):
+                continue
+            children = self._populate(item)
+            created_count += len(children) or 1
+            item.setExpanded(True)
+            self._expand_queue.extend(children)
+        if self._expand_queue:
+            QTimer.singleShot(0, lambda: self._expand_progressively(generation))
+    
+    def _on_item_expanded(self, item: QTreeWidgetItem) -> None:
+        """Kapalı başlayan düğümlerin çocukları ilk açılışta oluşturulur"""
+        if isinstance(item, OperatorTreeItem) and not item.children_populated:
+            self._populate(item)
+    
+    def _on_collapse_threshold_changed(self, combo_index: int) -> None:
+        threshold = self._collapse_combo.itemData(combo_index)
+        self._collapse_threshold = float(threshold or 0.0)
+        if self._plan is None:
+            return
+        markers = dict(self._diff_markers)
+        self.set_plan(self._plan)
+        if markers:
+            self.set_diff_markers(markers)
+    
+    def set_diff_markers(self, markers: Dict[int, str]) -> None:
+        """
+        Plan diff sonucunu tree üzerinde işaretle
+        
+        İşaretli operatörlerin henüz oluşturulmamış ataları açılır.
+        
+        Args:
+            markers: operatör node_id -> 'changed' / 'removed' (boş: işaretleri kaldır)
+        """
+        self._diff_markers = dict(markers)
+        for node_id, item in self._items_by_node_id.items():
+            item.set_diff_marker(markers.get(node_id))
+        if not markers or self._plan is None or self._plan.root_operator is None:
+            return
         
-        # Child operatörleri ekle
-        for child in operator.children:
-            self._add_operator_to_tree(child, item)
+        operators = {
+            op.node_id: op
+            for op in self._plan.root_operator.get_all_operators()
+            if op.node_id in markers and op.node_id not in self._items_by_node_id
+        }
+        for operator in operators.values():
+            self._reveal(operator)
+    
+    def _reveal(self, operator: PlanOperator) -> None:
+        """Operatöre giden yoldaki item'ları oluşturup aç"""
+        path = []
+        current = operator.parent
+        while current is not None and current.node_id not in self._items_by_node_id:
+            path.append(current)
+            current = current.parent
+        if current is None:
+            return
+        item = self._items_by_node_id[current.node_id]
+        for ancestor in [current] + list(reversed(path)):
+            item = self._items_by_node_id.get(ancestor.node_id)
+            if item is None:
+                return
+            self._populate(item)
+            item.setExpanded(True)
     
     def _on_item_clicked(self, item: QTreeWidgetItem, column: int) -> None:
         """Item tıklandığında"""
@@ -423,6 +598,17 @@ class OperatorDetailPanel(QWidget):
         if op.memory_grant_kb:
             metrics.append(("Memory Grant", f"{op.memory_grant_kb:,} KB", op.memory_grant_kb > 10000))
         
+        if op.has_actual_stats:
+            misestimate = op.misestimate_factor
+            metrics.extend([
+                ("Actual Rows", f"{op.actual_rows:,}", misestimate >= 10),
+                ("Executions", f"{op.actual_executions or 0:,}", False),
+                ("Row Misestimate", f"{misestimate:,.1f}x", misestimate >= 10),
+                ("Actual Elapsed", f"{op.actual_self_elapsed_ms:,.0f} ms", op.actual_self_elapsed_ms > 1000),
+                ("Actual CPU", f"{op.actual_cpu_ms:,.0f} ms", False),
+                ("Logical Reads", f"{op.actual_logical_reads:,}", op.actual_logical_reads > 100000),
+            ])
+        
         for name, value, is_warning in metrics:
             self._add_metric_row(self._metrics_layout, name, value, is_warning)
         
@@ -733,11 +919,19 @@ class PlanViewerWidget(QWidget):
     - Operatör detay paneli
     - Missing index önerileri
     - Plan uyarıları
+    - Aynı sorgunun başka bir planıyla diff
     """
     
+    compare_plan_requested = pyqtSignal(int)  # plan_id
+    
     def __init__(self, parent: Optional[QWidget] = None):
         super().__init__(parent)
         self._plan: Optional[ExecutionPlan] = None
+        # Çok statement'lı planlarda açılmış statement ağaçları (lazy)
+        self._statement_plans: Dict[int, ExecutionPlan] = {}
+        # Diff için karşılaştırılan planın XML'i (statement değişince yeniden uygulanır)
+        self._comparison_xml: Optional[str] = None
+        self._comparison_label: str = ""
         self._setup_ui()
     
     def _setup_ui(self) -> None:
@@ -746,6 +940,21 @@ class PlanViewerWidget(QWidget):
         layout = QVBoxLayout(self)
         layout.setContentsMargins(0, 0, 0, 0)
         
+        # Statement seçici (yalnızca çok statement'lı planlarda görünür)
+        self._statement_bar = QWidget()
+        statement_layout = QHBoxLayout(self._statement_bar)
+        statement_layout.setContentsMargins(0, 0, 0, 0)
+        statement_label = QLabel("Statement:")
+        statement_label.setStyleSheet(f"color: {Colors.TEXT_SECONDARY}; font-size: 11px; font-weight: 500;")
+        statement_layout.addWidget(statement_label)
+        self._statement_combo = QComboBox()
+        self._statement_combo.setStyleSheet(ThemeStyles.combobox_style())
+        self._statement_combo.setToolTip("Statements ordered by estimated cost share")
+        self._statement_combo.currentIndexChanged.connect(self._on_statement_changed)
+        statement_layout.addWidget(self._statement_combo, 1)
+        self._statement_bar.setVisible(False)
+        layout.addWidget(self._statement_bar)
+        
         # Tab widget
         self._tabs = QTabWidget()
         self._tabs.setStyleSheet(f"""
@@ -824,10 +1033,81 @@ class PlanViewerWidget(QWidget):
         
         self._tabs.addTab(warnings_page, "⚠️ Warnings")
         
+        # Tab 4: Plan Diff
+        diff_page = QWidget()
+        diff_page.setStyleSheet(f"background-color: {Colors.BACKGROUND};")
+        diff_layout = QVBoxLayout(diff_page)
+        diff_layout.setContentsMargins(16, 16, 16, 16)
+        diff_layout.setSpacing(8)
+        
+        compare_bar = QHBoxLayout()
+        compare_label = QLabel("Compare with:")
+        compare_label.setStyleSheet(f"color: {Colors.TEXT_SECONDARY}; font-size: 11px; font-weight: 500;")
+        compare_bar.addWidget(compare_label)
+        self._compare_combo = QComboBox()
+        self._compare_combo.setStyleSheet(ThemeStyles.combobox_style())
+        self._compare_combo.setToolTip("Other Query Store plans of this query")
+        self._compare_combo.currentIndexChanged.connect(self._on_compare_plan_changed)
+        compare_bar.addWidget(self._compare_combo, 1)
+        diff_layout.addLayout(compare_bar)
+        
+        self._diff_text = QTextEdit()
+        self._diff_text.setReadOnly(True)
+        self._diff_text.setStyleSheet(self._warnings_text.styleSheet())
+        self._diff_text.setPlaceholderText("Select another plan of this query to compare")
+        diff_layout.addWidget(self._diff_text)
+        
+        self._tabs.addTab(diff_page, "🔀 Plan Diff")
+        
         layout.addWidget(self._tabs)
     
     def set_plan(self, plan: Optional[ExecutionPlan]) -> None:
         """Planı ayarla"""
+        self._statement_plans = {}
+        if plan is not None:
+            self._statement_plans[int(plan.statement_index)] = plan
+        self._comparison_xml = None
+        self._comparison_label = ""
+        self._compare_combo.blockSignals(True)
+        self._compare_combo.setCurrentIndex(0 if self._compare_combo.count() else -1)
+        self._compare_combo.blockSignals(False)
+        self._populate_statement_selector(plan)
+        self._show_plan(plan)
+    
+    def _populate_statement_selector(self, plan: Optional[ExecutionPlan]) -> None:
+        """Statement listesini maliyet payına göre sıralı doldur"""
+        self._statement_combo.blockSignals(True)
+        try:
+            self._statement_combo.clear()
+            if plan is None or not plan.is_multi_statement:
+                self._statement_bar.setVisible(False)
+                return
+            for info in plan.top_statements(len(plan.statements)):
+                self._statement_combo.addItem(info.display_name, int(info.statement_index))
+                if int(info.statement_index) == int(plan.statement_index):
+                    self._statement_combo.setCurrentIndex(self._statement_combo.count() - 1)
+            self._statement_bar.setVisible(True)
+        finally:
+            self._statement_combo.blockSignals(False)
+    
+    def _on_statement_changed(self, combo_index: int) -> None:
+        """Seçilen statement'ın ağacını ilk açılışta kur"""
+        if combo_index < 0 or self._plan is None:
+            return
+        statement_index = self._statement_combo.itemData(combo_index)
+        if statement_index is None:
+            return
+        statement_plan = self._statement_plans.get(int(statement_index))
+        if statement_plan is None:
+            statement_plan = PlanParser().parse(self._plan.plan_xml, statement_index=int(statement_index))
+            if statement_plan is None:
+                logger.warning(f"Failed to build plan for statement {statement_index}")
+                return
+            self._statement_plans[int(statement_index)] = statement_plan
+        self._show_plan(statement_plan)
+    
+    def _show_plan(self, plan: Optional[ExecutionPlan]) -> None:
+        """Tek statement planını tree / missing index / warning sekmelerine uygula"""
         self._plan = plan
         
         # Tree'yi güncelle
@@ -862,6 +1142,124 @@ class PlanViewerWidget(QWidget):
             self._tabs.setTabText(1, "📈 Missing Indexes")
             self._tabs.setTabText(2, "⚠️ Warnings")
             self._warnings_text.clear()
+        
+        self._apply_comparison()
+    
+    def set_compare_candidates(self, plans: List[PlanInfo], current_plan_hash: str = "") -> None:
+        """
+        Karşılaştırılabilecek diğer planları listele
+        
+        Args:
+            plans: Sorgunun Query Store planları
+            current_plan_hash: Gösterilen planın QueryPlanHash'i (listeden çıkarılır)
+        """
+        current = (current_plan_hash or "").upper()
+        self._compare_combo.blockSignals(True)
+        try:
+            self._compare_combo.clear()
+            self._compare_combo.addItem("— Select plan —", None)
+            for info in plans:
+                if current and (info.plan_hash or "").upper() == current:
+                    continue
+                label = f"Plan {info.plan_id}"
+                if info.is_forced:
+                    label += " (forced)"
+                label += f" · {info.execution_count:,} exec · {info.avg_duration_ms:,.1f} ms avg"
+                self._compare_combo.addItem(label, int(info.plan_id))
+            self._compare_combo.setEnabled(self._compare_combo.count() > 1)
+        finally:
+            self._compare_combo.blockSignals(False)
+        if self._compare_combo.count() <= 1:
+            self._diff_text.setMarkdown("No other plans recorded for this query.")
+    
+    def set_comparison_plan(self, plan_xml: Optional[str], label: str = "") -> None:
+        """Gösterilen planı verilen plan XML'i ile karşılaştır"""
+        self._comparison_xml = plan_xml or None
+        self._comparison_label = label
+        if plan_xml is None:
+            self._diff_text.setMarkdown("⚠️ Plan XML for the selected plan is not available.")
+        self._apply_comparison()
+    
+    def _on_compare_plan_changed(self, combo_index: int) -> None:
+        plan_id = self._compare_combo.itemData(combo_index) if combo_index >= 0 else None
+        if plan_id is None:
+            self._comparison_xml = None
+            self._comparison_label = ""
+            self._apply_comparison()
+            return
+        self.compare_plan_requested.emit(int(plan_id))
+    
+    def _apply_comparison(self) -> None:
+        """Diff sekmesini ve tree işaretlerini mevcut statement için güncelle"""
+        plan = self._plan
+        if plan is None or not plan.plan_xml or not self._comparison_xml:
+            self._tree_widget.set_diff_markers({})
+            self._tabs.setTabText(3, "🔀 Plan Diff")
+            if plan is None or self._compare_combo.currentData() is None:
+                self._diff_text.clear()
+            return
+        
+        try:
+            result = PlanDiffEngine().diff_xml(
+                plan.plan_xml,
+                self._comparison_xml,
+                left_statement_index=plan.statement_index,
+            )
+        except Exception as e:
+            logger.warning(f"Plan diff failed: {e}")
+            result = None
+        if result is None:
+            self._tree_widget.set_diff_markers({})
+            self._tabs.setTabText(3, "🔀 Plan Diff")
+            self._diff_text.setMarkdown("⚠️ The selected plans could not be compared.")
+            return
+        
+        self._tree_widget.set_diff_markers(self._diff_markers(plan, result))
+        change_count = len(result.changes)
+        self._tabs.setTabText(3, f"🔀 Plan Diff ({change_count})" if change_count else "🔀 Plan Diff")
+        self._diff_text.setMarkdown(self._format_diff(result))
+    
+    @staticmethod
+    def _diff_markers(plan: ExecutionPlan, result: PlanDiffResult) -> Dict[int, str]:
+        """Diff model düğümlerini tree operatör node_id'lerine çevir"""
+        model = get_plan_model(plan.plan_xml)
+        stmt = model.statements[result.left_statement_index]
+        operator_ids = PlanParser.operator_ids(model, stmt)
+        markers: Dict[int, str] = {}
+        for node_index in result.changed_nodes:
+            if node_index in operator_ids:
+                markers[operator_ids[node_index]] = 'changed'
+        for node_index in result.removed_nodes:
+            if node_index in operator_ids:
+                markers[operator_ids[node_index]] = 'removed'
+        return markers
+    
+    def _format_diff(self, result: PlanDiffResult) -> str:
+        """Diff sonucunu markdown olarak biçimlendir"""
+        title = self._comparison_label or "selected plan"
+        text = f"## 🔀 Current plan vs {title}\n\n"
+        text += (
+            f"**Operators:** {result.left_operator_count} → {result.right_operator_count} | "
+            f"**Cost:** {result.left_cost:.4f} → {result.right_cost:.4f} "
+            f"({result.cost_change_percent:+.0f}%) | "
+            f"**Similarity:** {result.similarity * 100:.0f}%\n\n"
+        )
+        if result.is_identical:
+            text += "✅ **Plans are structurally identical**\n"
+            return text
+        
+        for severity in ("High", "Medium", "Low"):
+            changes = [c for c in result.changes if c.severity == severity]
+            if not changes:
+                continue
+            icon = DIFF_SEVERITY_ICONS.get(severity, "•")
+            text += f"### {icon} {severity} ({len(changes)})\n"
+            for change in changes:
+                text += f"- {change.message}\n"
+            text += "\n"
+        if result.changed_nodes or result.removed_nodes:
+            text += "_Changed (△) and removed (✖) operators are marked in the Execution Plan tab._\n"
+        return text
 
     def set_plan_stability(self, plan_stability: Optional[PlanStability], plan_count: Optional[int]) -> None:
         """Plan stabilite bilgisini detay paneline ilet"""
@@ -4,7 +4,7 @@ Execution stats, CPU, IO and duration trends for workload.
 """
 
 from typing import Optional, List, Dict, Set, Any, Callable
-from datetime import datetime
+from datetime import datetime, timedelta
 import threading
 import uuid
 import csv
@@ -17,7 +17,7 @@ from PyQt6.QtWidgets import (
     QFrame, QSizePolicy, QListWidget, QListWidgetItem,
     QDialog, QPlainTextEdit, QTextEdit, QMessageBox, QGraphicsDropShadowEffect,
     QTabWidget, QProgressBar, QCheckBox, QFileDialog,
-    QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView, QListView
+    QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView, QListView, QMenu
 )
 from PyQt6.QtCore import Qt, pyqtSignal, QSize, QTimer, QPropertyAnimation, QEasingCurve, QThread
 from PyQt6.QtGui import QFont, QFontMetrics, QPainter, QColor, QPen
@@ -32,6 +32,7 @@ from app.ui.theme import Colors, Theme as ThemeStyles
 from app.core.logger import get_logger
 from app.services.query_stats_contract import IQueryStatsService
 from app.services.service_factory import ServiceFactory
+from app.core.exceptions import TaskCancelledError
 from app.models.query_stats_models import (
     QueryStats, 
     QueryStatsFilter, 
@@ -263,6 +264,19 @@ class QueryStatsLoadWorker(QThread):
                 include_sensitive_data=self._include_sensitive_data,
             )
             self._emit_progress(3, 4, "Processing results... (3/4)", determinate=True)
+            annotate_fn = getattr(self._service, "annotate_query_trends", None)
+            if queries and callable(annotate_fn) and not self._is_cancelled():
+                self._emit_progress(3, 4, "Computing trend signals... (3/4)", determinate=True)
+                try:
+                    annotate_fn(
+                        queries,
+                        days=int(self._filter_snapshot.time_range_days or 7),
+                        cancel_check=self._is_cancelled,
+                    )
+                except TaskCancelledError:
+                    return
+                except Exception as e:
+                    logger.warning(f"Trend signal computation failed: {e}")
             warnings = self._service.get_runtime_warnings()
             merged_warnings: List[str] = []
             for w in [*self._health_warnings, *warnings]:
@@ -305,10 +319,12 @@ class BatchAIAnalysisWorker(QThread):
         queries: List[QueryStats],
         include_sensitive_data: bool = False,
         service_factory: Optional[Callable[[], IQueryStatsService]] = None,
+        days: int = 7,
         parent=None,
     ):
         super().__init__(parent)
         self._queries = list(queries or [])
+        self._days = max(1, int(days or 7))
         self._include_sensitive_data = bool(include_sensitive_data)
         self._cancel_event = threading.Event()
         self._service_factory = service_factory or ServiceFactory.create_query_stats_service
@@ -406,6 +422,14 @@ class BatchAIAnalysisWorker(QThread):
                 self.analysis_finished.emit([])
                 return
 
+            # Set-based prefetch: 5 round trips for all selected queries instead of 6 per query.
+            prefetch_fn = getattr(self._service, "prefetch_query_details", None)
+            if callable(prefetch_fn):
+                try:
+                    prefetch_fn([q.query_id for q in self._queries], days=self._days)
+                except Exception as e:
+                    logger.debug(f"Batch detail prefetch failed, using per-query path: {e}")
+
             contexts: List[Dict[str, Any]] = []
             for idx, query in enumerate(self._queries, start=1):
                 if self._is_cancelled():
@@ -607,6 +631,268 @@ class BatchAnalysisResultDialog(QDialog):
             QMessageBox.warning(self, "Export HTML", f"Failed to export HTML: {exc}")
 
 
+WORKLOAD_SCAN_LABELS = {
+    "regressions": "Workload Regressions",
+    "plan_changes": "Plan Changes / Flips",
+    "plan_cache": "Plan Cache Anti-Patterns",
+    "missing_indexes": "Consolidated Missing Indexes",
+}
+
+
+class WorkloadScanWorker(QThread):
+    """Runs one workload-wide scan (regressions, plan changes, plan cache, missing indexes)."""
+
+    progress = pyqtSignal(int, int, str)  # current, total, message
+    scan_finished = pyqtSignal(str, object, object)  # kind, scan result, List[str] warnings
+    failed = pyqtSignal(str, str)  # kind, error_message
+
+    def __init__(
+        self,
+        kind: str,
+        days: int = 1,
+        include_sensitive_data: bool = False,
+        service_factory: Optional[Callable[[], IQueryStatsService]] = None,
+        parent=None,
+    ):
+        super().__init__(parent)
+        self._kind = str(kind)
+        self._days = max(1, int(days or 1))
+        self._include_sensitive_data = bool(include_sensitive_data)
+        self._cancel_event = threading.Event()
+        self._service_factory = service_factory or ServiceFactory.create_query_stats_service
+        self._service = self._service_factory()
+
+    @property
+    def kind(self) -> str:
+        return self._kind
+
+    def cancel(self) -> None:
+        self._cancel_event.set()
+        self.requestInterruption()
+        try:
+            self._service.cancel_current_operation()
+        except Exception:
+            pass
+
+    def _is_cancelled(self) -> bool:
+        return self.isInterruptionRequested() or self._cancel_event.is_set()
+
+    def _emit_scan_progress(self, current: int, total: int) -> None:
+        self.progress.emit(int(current), int(total), f"Scanning cached plans ({current}/{total})...")
+
+    def run(self) -> None:
+        try:
+            known_warnings = set(self._service.get_runtime_warnings())
+            if self._kind == "regressions":
+                # Seçili süre penceresi, hemen önceki aynı uzunluktaki pencereyle karşılaştırılır
+                recent_end = datetime.now()
+                result = self._service.detect_workload_regressions(
+                    recent_start=recent_end - timedelta(days=self._days),
+                    recent_end=recent_end,
+                    cancel_check=self._is_cancelled,
+                    include_sensitive_data=self._include_sensitive_data,
+                )
+            elif self._kind == "plan_changes":
+                result = self._service.scan_plan_changes(
+                    days=self._days,
+                    cancel_check=self._is_cancelled,
+                    include_sensitive_data=self._include_sensitive_data,
+                )
+            elif self._kind == "plan_cache":
+                result = self._service.scan_plan_cache(
+                    cancel_check=self._is_cancelled,
+                    progress_callback=self._emit_scan_progress,
+                )
+            elif self._kind == "missing_indexes":
+                result = self._service.get_consolidated_missing_indexes(top_n=50)
+            else:
+                raise ValueError(f"Unknown workload scan: {self._kind}")
+            # Örn. "Query Store gerekli" uyarıları boş sonucun nedenini açıklar
+            warnings = [w for w in self._service.get_runtime_warnings() if w not in known_warnings]
+            self.scan_finished.emit(self._kind, result, warnings)
+        except TaskCancelledError:
+            self.failed.emit(self._kind, "Cancelled")
+        except Exception as e:
+            logger.error(f"Workload scan '{self._kind}' failed: {e}", exc_info=True)
+            self.failed.emit(self._kind, str(e))
+
+
+def build_workload_scan_report(kind: str, result: Any) -> Dict[str, Any]:
+    """Scan result -> {summary, headers, rows, details} for WorkloadScanResultDialog."""
+    if kind == "regressions":
+        items = list(result or [])
+        headers = ["Query", "Status", "Duration Δ%", "CPU Δ%", "Reads Δ%", "Extra Time (ms)", "Plans", "Executions"]
+        rows = []
+        details = []
+        for item in items:
+            status = "Regression" if item.is_regression else "Plan changed"
+            rows.append([
+                item.display_name,
+                status,
+                f"{item.duration.change_percent:+.1f}" if item.duration else "",
+                f"{item.cpu.change_percent:+.1f}" if item.cpu else "",
+                f"{item.logical_reads.change_percent:+.1f}" if item.logical_reads else "",
+                f"{item.impact_ms:,.0f}",
+                f"{item.baseline_plan_id} → {item.recent_plan_id}" if item.plan_changed else str(item.recent_plan_id or ""),
+                f"{item.baseline_executions} → {item.recent_executions}",
+            ])
+            details.append(f"-- query_id={item.query_id} [{status}] {', '.join(item.significant_metrics)}")
+            details.append(str(item.query_text or "").strip())
+            details.append("")
+        regressions = sum(1 for item in items if item.is_regression)
+        summary = f"{regressions} regression(s), {len(items) - regressions} plan change(s) vs. the previous window"
+        return {"summary": summary, "headers": headers, "rows": rows, "details": "\n".join(details)}
+
+    if kind == "plan_changes":
+        items = list(result or [])
+        headers = ["Query", "Current Plan", "Best Plan", "Forced Plan", "Worse ×", "Extra Time (ms)", "Flags"]
+        rows = []
+        details = []
+        for item in items:
+            flags = []
+            if item.is_plan_flip:
+                flags.append("flip")
+            if item.forced_plan_regressed:
+                flags.append("forced plan regressed")
+            if item.is_forcing_candidate:
+                flags.append("forcing candidate")
+            rows.append([
+                item.display_name,
+                str(item.current_plan_id or ""),
+                str(item.best_plan_id or ""),
+                str(item.forced_plan_id or ""),
+                f"{item.worse_ratio:.1f}",
+                f"{item.impact_ms:,.0f}",
+                ", ".join(flags),
+            ])
+            if item.is_forcing_candidate:
+                details.append(
+                    f"EXEC sp_query_store_force_plan @query_id = {item.query_id}, @plan_id = {item.best_plan_id};"
+                )
+        flips = sum(1 for item in items if item.is_plan_flip)
+        candidates = sum(1 for item in items if item.is_forcing_candidate)
+        summary = f"{flips} plan flip(s), {candidates} forcing candidate(s)"
+        return {"summary": summary, "headers": headers, "rows": rows, "details": "\n".join(details)}
+
+    if kind == "plan_cache":
+        if result is None:
+            return {"summary": "Plan cache could not be scanned.", "headers": [], "rows": [], "details": ""}
+        from app.analysis.plan_cache_scanner import CATEGORY_LABELS
+
+        headers = ["Object", "Findings", "Plans", "Plan CPU (ms)", "Categories"]
+        rows = []
+        details = []
+        for item in result.top_objects(50):
+            categories = ", ".join(
+                f"{CATEGORY_LABELS.get(category, category)}: {count}"
+                for category, count in item.category_counts.most_common()
+            )
+            rows.append([
+                item.display_name,
+                str(item.finding_count),
+                str(item.plan_count),
+                f"{item.total_cpu_ms:,.0f}",
+                categories,
+            ])
+            details.extend(f"{item.display_name}: {finding.detail}" for finding in item.samples)
+        details.extend(index.create_statement for index in result.missing_indexes[:20])
+        return {"summary": result.get_summary(), "headers": headers, "rows": rows, "details": "\n".join(details)}
+
+    if kind == "missing_indexes":
+        items = list(result or [])
+        headers = ["Table", "Key Columns", "Include Columns", "Score", "Impact %", "Merged"]
+        rows = [
+            [
+                f"{item.database}.{item.schema_name}.{item.table_name}".strip("."),
+                ", ".join(item.key_columns),
+                ", ".join(item.include_columns),
+                f"{item.score:,.0f}",
+                f"{item.weighted_impact:.1f}",
+                str(item.suggestion_count),
+            ]
+            for item in items
+        ]
+        summary = f"{len(items)} consolidated index suggestion(s)"
+        details = "\n".join(item.create_statement for item in items)
+        return {"summary": summary, "headers": headers, "rows": rows, "details": details}
+
+    raise ValueError(f"Unknown workload scan: {kind}")
+
+
+class WorkloadScanResultDialog(QDialog):
+    """Table + detail text for one workload scan, with CSV export."""
+
+    def __init__(self, title: str, report: Dict[str, Any], parent=None):
+        super().__init__(parent)
+        self._title = str(title)
+        self._report = dict(report or {})
+        self.setWindowTitle(self._title)
+        self.resize(1100, 640)
+        self._setup_ui()
+
+    def _setup_ui(self) -> None:
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(14, 14, 14, 14)
+        layout.setSpacing(10)
+
+        summary = QLabel(str(self._report.get("summary", "")))
+        summary.setStyleSheet(f"color: {Colors.TEXT_PRIMARY}; font-size: 12px; font-weight: 600;")
+        layout.addWidget(summary)
+
+        headers = list(self._report.get("headers", []) or [])
+        rows = list(self._report.get("rows", []) or [])
+        table = QTableWidget()
+        table.setColumnCount(len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.setRowCount(len(rows))
+        table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        for i, row in enumerate(rows):
+            for col, value in enumerate(row):
+                table.setItem(i, col, QTableWidgetItem(str(value)))
+        if headers:
+            table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+            for col in range(1, len(headers)):
+                table.horizontalHeader().setSectionResizeMode(col, QHeaderView.ResizeMode.ResizeToContents)
+        layout.addWidget(table, stretch=1)
+
+        details = str(self._report.get("details", "") or "")
+        if details:
+            self._details = QPlainTextEdit()
+            self._details.setReadOnly(True)
+            self._details.setPlainText(details)
+            self._details.setStyleSheet(
+                f"QPlainTextEdit {{ background-color: #f8fafc; border: 1px solid {Colors.BORDER}; border-radius: 8px; }}"
+            )
+            layout.addWidget(self._details, stretch=1)
+
+        btn_layout = QHBoxLayout()
+        btn_layout.addStretch()
+
+        export_csv_btn = QPushButton("Export CSV")
+        export_csv_btn.setEnabled(bool(rows))
+        export_csv_btn.clicked.connect(self._export_csv)
+        btn_layout.addWidget(export_csv_btn)
+
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.accept)
+        btn_layout.addWidget(close_btn)
+        layout.addLayout(btn_layout)
+
+    def _export_csv(self) -> None:
+        default_name = self._title.lower().replace(" / ", "_").replace(" ", "_") + ".csv"
+        path, _ = QFileDialog.getSaveFileName(self, "Export CSV", default_name, "CSV Files (*.csv)")
+        if not path:
+            return
+        try:
+            with open(path, "w", newline="", encoding="utf-8-sig") as f:
+                writer = csv.writer(f)
+                writer.writerow(self._report.get("headers", []))
+                writer.writerows(self._report.get("rows", []))
+            QMessageBox.information(self, "Export CSV", "Scan results exported successfully.")
+        except Exception as exc:
+            QMessageBox.warning(self, "Export CSV", f"Failed to export CSV: {exc}")
+
+
 class QueryStatsView(BaseView):
     """
     Query Statistics View - GUI-05 Style
@@ -623,6 +909,7 @@ class QueryStatsView(BaseView):
         2: "total_cpu",
         3: "execution_count",
         4: "logical_reads",
+        5: "regression",
     }
     _ORDER_VALUE_TO_INDEX = {
         "impact_score": 0,
@@ -630,6 +917,7 @@ class QueryStatsView(BaseView):
         "total_cpu": 2,
         "execution_count": 3,
         "logical_reads": 4,
+        "regression": 5,
     }
     _TOP_N_VALUES = [500, 1000, 2000, 5000]
     
@@ -653,6 +941,7 @@ class QueryStatsView(BaseView):
         self._load_worker: Optional[QueryStatsLoadWorker] = None
         self._batch_ai_worker: Optional[BatchAIAnalysisWorker] = None
         self._batch_ai_total_queries: int = 0
+        self._workload_scan_worker: Optional[WorkloadScanWorker] = None
         self._active_load_request_id: int = 0
         self._suspend_filter_events = False
         self._last_filter_db_key: str = ""
@@ -750,7 +1039,8 @@ class QueryStatsView(BaseView):
             "Average Duration",
             "Total CPU",
             "Execution Count",
-            "Logical Reads"
+            "Logical Reads",
+            "Regression",
         ])
         self._cmb_order.setCurrentIndex(0)
         self._cmb_order.currentIndexChanged.connect(self._on_filter_changed)
@@ -895,6 +1185,19 @@ class QueryStatsView(BaseView):
         self._btn_clear_selection.clicked.connect(self._clear_query_selection)
         batch_layout.addWidget(self._btn_clear_selection)
 
+        self._btn_workload_scans = QPushButton("Workload Scans")
+        self._btn_workload_scans.setCursor(Qt.CursorShape.PointingHandCursor)
+        self._btn_workload_scans.setToolTip(
+            "Server-wide scans over the selected duration:\n"
+            "- regressions vs. the previous window of the same length\n"
+            "- plan flips / forcing candidates\n"
+            "- plan cache anti-patterns\n"
+            "- consolidated missing index suggestions"
+        )
+        self._btn_workload_scans.setStyleSheet(self._btn_reset_filters.styleSheet())
+        self._btn_workload_scans.clicked.connect(self._show_workload_scan_menu)
+        batch_layout.addWidget(self._btn_workload_scans)
+
         self._selected_count_label = QLabel("Selected: 0")
         self._selected_count_label.setStyleSheet(
             f"color: {Colors.TEXT_SECONDARY}; font-size: 11px; font-weight: 600;"
@@ -1183,6 +1486,88 @@ class QueryStatsView(BaseView):
             except Exception:
                 pass
 
+    def _show_workload_scan_menu(self) -> None:
+        menu = QMenu(self)
+        menu.setStyleSheet(f"""
+            QMenu {{
+                background-color: {Colors.SURFACE};
+                border: 1px solid {Colors.BORDER};
+                border-radius: 8px;
+                padding: 8px;
+            }}
+            QMenu::item {{
+                padding: 8px 16px;
+                border-radius: 4px;
+            }}
+            QMenu::item:selected {{
+                background-color: {Colors.PRIMARY};
+                color: white;
+            }}
+        """)
+        for kind, label in WORKLOAD_SCAN_LABELS.items():
+            action = menu.addAction(label)
+            action.triggered.connect(lambda _checked=False, k=kind: self._start_workload_scan(k))
+        menu.exec(self._btn_workload_scans.mapToGlobal(self._btn_workload_scans.rect().bottomLeft()))
+
+    def _start_workload_scan(self, kind: str) -> None:
+        label = WORKLOAD_SCAN_LABELS.get(kind, kind)
+        if not self._service.is_connected:
+            QMessageBox.information(self, label, "Connect to a server first.")
+            return
+        if self._workload_scan_worker and self._workload_scan_worker.isRunning():
+            QMessageBox.information(self, label, "A workload scan is already running.")
+            return
+
+        days = self._DURATION_INDEX_TO_DAYS.get(self._cmb_duration.currentIndex(), 1)
+        self._show_loading(f"{label}...")
+        self._workload_scan_worker = WorkloadScanWorker(
+            kind,
+            days=days,
+            include_sensitive_data=self._show_sensitive_data,
+            service_factory=self._service_factory,
+            parent=self,
+        )
+        self._workload_scan_worker.progress.connect(self._on_workload_scan_progress)
+        self._workload_scan_worker.scan_finished.connect(self._on_workload_scan_finished)
+        self._workload_scan_worker.failed.connect(self._on_workload_scan_failed)
+        self._workload_scan_worker.finished.connect(self._on_workload_scan_worker_finished)
+        self._workload_scan_worker.start()
+
+    def _on_workload_scan_progress(self, current: int, total: int, message: str) -> None:
+        self._update_loading_progress(current, max(1, total), message, determinate=True)
+
+    def _on_workload_scan_finished(self, kind: str, result: object, warnings_obj: object) -> None:
+        self._hide_loading()
+        label = WORKLOAD_SCAN_LABELS.get(kind, kind)
+        try:
+            report = build_workload_scan_report(kind, result)
+        except Exception as e:
+            logger.error(f"Workload scan report could not be built: {e}", exc_info=True)
+            QMessageBox.warning(self, label, f"Scan finished but results could not be displayed: {e}")
+            return
+        warnings = list(warnings_obj or []) if isinstance(warnings_obj, list) else []
+        if warnings:
+            self._show_runtime_warning(warnings)
+        dialog = WorkloadScanResultDialog(label, report, self)
+        dialog.exec()
+
+    def _on_workload_scan_failed(self, kind: str, error_message: str) -> None:
+        self._hide_loading()
+        if error_message == "Cancelled":
+            return
+        label = WORKLOAD_SCAN_LABELS.get(kind, kind)
+        QMessageBox.warning(self, label, f"{label} failed: {error_message}")
+
+    def _on_workload_scan_worker_finished(self) -> None:
+        worker = self.sender()
+        if worker is self._workload_scan_worker:
+            self._workload_scan_worker = None
+        if worker is not None:
+            try:
+                worker.deleteLater()
+            except Exception:
+                pass
+
     def _export_selected_to_csv(self) -> None:
         selected = self._get_selected_queries()
         if not selected:
@@ -1418,11 +1803,14 @@ class QueryStatsView(BaseView):
         self._invalidate_pending_load()
         if self._batch_ai_worker and self._batch_ai_worker.isRunning():
             self._batch_ai_worker.cancel()
+        if self._workload_scan_worker and self._workload_scan_worker.isRunning():
+            self._workload_scan_worker.cancel()
         self._hide_loading()
 
     def _cancel_current_load(self) -> None:
         """Cancel current background load on user request."""
         batch_running = bool(self._batch_ai_worker and self._batch_ai_worker.isRunning())
+        scan_running = bool(self._workload_scan_worker and self._workload_scan_worker.isRunning())
         load_running = bool(self._load_worker and self._load_worker.isRunning())
         is_load_more = int(getattr(self._current_filter, "offset", 0) or 0) > 0
 
@@ -1430,6 +1818,8 @@ class QueryStatsView(BaseView):
             self._invalidate_pending_load()
         if batch_running and self._batch_ai_worker:
             self._batch_ai_worker.cancel()
+        if scan_running and self._workload_scan_worker:
+            self._workload_scan_worker.cancel()
         self._hide_loading()
         if load_running:
             if not is_load_more:
@@ -1437,6 +1827,8 @@ class QueryStatsView(BaseView):
             logger.info("Query stats loading cancelled by user.")
         elif batch_running:
             logger.info("Batch AI analysis cancelled by user.")
+        elif scan_running:
+            logger.info("Workload scan cancelled by user.")
     
     def _refresh_data(self, reset_list: bool = True) -> None:
         """Refresh query data from service."""
@@ -1596,8 +1988,23 @@ class QueryStatsView(BaseView):
             self._checked_query_ids.clear()
         if page_queries:
             self._queries.extend(page_queries)
-            for query in page_queries:
-                self._add_query_item(query)
+            if str(self._current_filter.sort_by or "") == "regression":
+                # Regression ordering is client-side over everything loaded so far.
+                self._queries = self._sort_by_regression(self._queries)
+                self._queries_list.clear()
+                self._query_checkboxes.clear()
+                self._query_item_by_id.clear()
+                for query in self._queries:
+                    self._add_query_item(query)
+            else:
+                for query in page_queries:
+                    self._add_query_item(query)
+        regressing_count = len([q for q in self._queries if bool(q.metrics.is_regressing)])
+        if regressing_count:
+            warnings = list(warnings) + [
+                f"{regressing_count} regressing queries detected (duration trend or change point)."
+            ]
+            self._show_runtime_warning(warnings)
 
         self._loaded_count = len(self._queries)
         limit_cap = int(self._current_filter.top_n or self._total_count or 0)
@@ -1616,6 +2023,18 @@ class QueryStatsView(BaseView):
             f"loaded_total={self._loaded_count}, available={self._total_count}"
         )
 
+    @staticmethod
+    def _sort_by_regression(queries: List[QueryStats]) -> List[QueryStats]:
+        """Regressing queries first (highest regression score), then by impact score."""
+        return sorted(
+            list(queries or []),
+            key=lambda q: (
+                0 if bool(q.metrics.is_regressing) else 1,
+                -float(q.metrics.regression_score or 0.0),
+                -float(q.metrics.impact_score or 0.0),
+            ),
+        )
+
     def _on_queries_failed(
         self,
         request_id: int,
@@ -1791,6 +2210,7 @@ class QueryDetailDialog(QDialog):
         
         self._plan_viewer = PlanViewerWidget()
         self._plan_viewer.set_plan_stability(self.query.plan_stability, self.query.metrics.plan_count)
+        self._plan_viewer.compare_plan_requested.connect(self._on_compare_plan_requested)
         plan_layout.addWidget(self._plan_viewer)
         
         self._content_tabs.addTab(plan_tab, "📊 Execution Plan")
@@ -2014,6 +2434,7 @@ class QueryDetailDialog(QDialog):
                 
                 if plan:
                     self._plan_viewer.set_plan(plan)
+                    self._load_compare_candidates(plan.plan_hash)
                     
                     # Update tab title with warnings count
                     warning_count = len(plan.warnings)
@@ -2036,6 +2457,27 @@ class QueryDetailDialog(QDialog):
             logger.error(f"Failed to load execution plan: {e}", exc_info=True)
             self._plan_viewer.set_plan(None)
 
+    def _load_compare_candidates(self, current_plan_hash: str) -> None:
+        """Fill the plan diff selector with the other Query Store plans of this query"""
+        try:
+            plans = self.service.get_query_plans(self.query.query_id)
+        except Exception as e:
+            logger.warning(f"Failed to load plans for comparison: {e}")
+            plans = []
+        self._plan_viewer.set_compare_candidates(plans, current_plan_hash)
+
+    def _on_compare_plan_requested(self, plan_id: int) -> None:
+        """Load the selected plan's XML and diff it against the displayed plan"""
+        try:
+            plan_xml = self.service.get_plan_xml_by_id(
+                plan_id,
+                include_sensitive_data=self._show_sensitive_data,
+            )
+        except Exception as e:
+            logger.error(f"Failed to load plan {plan_id} for comparison: {e}", exc_info=True)
+            plan_xml = None
+        self._plan_viewer.set_comparison_plan(plan_xml, label=f"Plan {plan_id}")
+
     def _is_active_ai_provider_local(self) -> bool:
         try:
             return bool(get_llm_client().is_active_provider_local())
@@ -36,6 +36,7 @@ from PyQt6.QtGui import QFont
 from app.ui.theme import Colors, Theme as ThemeStyles
 from app.ui.views.base_view import BaseView
 from app.core.logger import get_logger
+from app.analysis.wait_delta_engine import WaitIntervalDelta
 from app.services.app_event_bus import get_app_event_bus
 from app.services.blocking_service import BlockingChainAnalysis
 from app.services.wait_stats_service import (
@@ -354,6 +355,8 @@ class WaitStatsView(BaseView):
         self._category_value_labels: Dict[WaitCategory, QLabel] = {}
         self._category_percent_labels: Dict[WaitCategory, QLabel] = {}
         self._category_progress_bars: Dict[WaitCategory, QProgressBar] = {}
+        self._category_title_label: Optional[QLabel] = None
+        self._waits_title_label: Optional[QLabel] = None
         self._action_plan_label: Optional[QLabel] = None
         self._alerts_block: Optional[QFrame] = None
         self._schedule_status_badge: Optional[QLabel] = None
@@ -366,6 +369,7 @@ class WaitStatsView(BaseView):
         self._refresh_worker: Optional[WaitStatsRefreshWorker] = None
         self._last_metrics: Optional[WaitStatsMetrics] = None
         self._last_payload: Optional[WaitStatsRefreshPayload] = None
+        self._alert_transition_seq: int = 0
         self._trend_points_cache: List[WaitTrendPoint] = []
         self._trend_source_cache: str = "none"
         self._trend_days_cache: int = 7
@@ -528,6 +532,20 @@ class WaitStatsView(BaseView):
         ThemeStyles.style_combobox_instance(self._trend_combo)
         filter_layout.addSpacing(6)
 
+        scope_lbl = QLabel("Waits:")
+        scope_lbl.setStyleSheet(section_subtitle_style)
+        filter_layout.addWidget(scope_lbl)
+
+        # Interval = delta between refreshes (what is waiting now); cumulative = since restart.
+        self._wait_scope_combo = QComboBox()
+        self._wait_scope_combo.addItem("Now (Interval)", "interval")
+        self._wait_scope_combo.addItem("Since Restart", "cumulative")
+        self._wait_scope_combo.currentIndexChanged.connect(self._on_wait_scope_changed)
+        self._wait_scope_combo.setMaximumWidth(150)
+        filter_layout.addWidget(self._wait_scope_combo)
+        ThemeStyles.style_combobox_instance(self._wait_scope_combo)
+        filter_layout.addSpacing(6)
+
         db_lbl = QLabel("DB Filter:")
         db_lbl.setStyleSheet(section_subtitle_style)
         filter_layout.addWidget(db_lbl)
@@ -815,6 +833,7 @@ class WaitStatsView(BaseView):
         category_title = QLabel("Wait Categories")
         category_title.setStyleSheet(section_title_style)
         category_card_layout.addWidget(category_title)
+        self._category_title_label = category_title
 
         category_values = QWidget()
         category_values.setStyleSheet("background: transparent;")
@@ -906,6 +925,7 @@ class WaitStatsView(BaseView):
         waits_title = QLabel("Top Wait Types")
         waits_title.setStyleSheet(section_title_style)
         waits_tab_layout.addWidget(waits_title)
+        self._waits_title_label = waits_title
 
         self._waits_container = QFrame()
         self._waits_container.setStyleSheet(f"""
@@ -1186,6 +1206,11 @@ class WaitStatsView(BaseView):
         schedule_interval_row.addStretch()
         schedule_cfg_layout.addLayout(schedule_interval_row)
 
+        self._schedule_compress_chk = QCheckBox("Gzip Report Files")
+        self._schedule_compress_chk.setChecked(bool(self._schedule_config.compress))
+        self._schedule_compress_chk.stateChanged.connect(self._on_schedule_settings_changed)
+        schedule_cfg_layout.addWidget(self._schedule_compress_chk)
+
         self._save_schedule_btn = QPushButton("Save Schedule")
         self._save_schedule_btn.setStyleSheet(automation_button_style)
         self._save_schedule_btn.clicked.connect(self._on_save_schedule_clicked)
@@ -1228,6 +1253,33 @@ class WaitStatsView(BaseView):
         self._monitor_enabled_chk.stateChanged.connect(self._on_monitor_toggle_changed)
         monitor_cfg_layout.addWidget(self._monitor_enabled_chk)
 
+        self._sampler_enabled_chk = QCheckBox("Sub-second Wait Sampler (500ms)")
+        self._sampler_enabled_chk.setChecked(False)
+        self._sampler_enabled_chk.setToolTip(
+            "Polls sys.dm_os_waiting_tasks on a dedicated connection to catch short blocking/latch bursts"
+        )
+        self._sampler_enabled_chk.stateChanged.connect(self._on_sampler_toggle_changed)
+        monitor_cfg_layout.addWidget(self._sampler_enabled_chk)
+
+        self._sampler_status_label = QLabel("Sampler off")
+        self._sampler_status_label.setWordWrap(True)
+        self._sampler_status_label.setStyleSheet(section_subtitle_style)
+        monitor_cfg_layout.addWidget(self._sampler_status_label)
+
+        self._xe_enabled_chk = QCheckBox("XE Telemetry (waits / blocking / deadlocks)")
+        self._xe_enabled_chk.setChecked(False)
+        self._xe_enabled_chk.setToolTip(
+            "Creates a lightweight Extended Events session (ring_buffer) and reads new events on each refresh. "
+            "Requires ALTER ANY EVENT SESSION; blocked process reports also need 'blocked process threshold'."
+        )
+        self._xe_enabled_chk.stateChanged.connect(self._on_xe_toggle_changed)
+        monitor_cfg_layout.addWidget(self._xe_enabled_chk)
+
+        self._xe_status_label = QLabel("XE telemetry off")
+        self._xe_status_label.setWordWrap(True)
+        self._xe_status_label.setStyleSheet(section_subtitle_style)
+        monitor_cfg_layout.addWidget(self._xe_status_label)
+
         monitor_threshold_grid = QGridLayout()
         monitor_threshold_grid.setContentsMargins(0, 0, 0, 0)
         monitor_threshold_grid.setHorizontalSpacing(8)
@@ -1474,6 +1526,8 @@ class WaitStatsView(BaseView):
                 )
         if hasattr(self, "_monitor_enabled_chk") and self._monitor_enabled_chk.isChecked():
             self._monitor_timer.start()
+        if hasattr(self, "_sampler_enabled_chk") and self._sampler_enabled_chk.isChecked():
+            self._service.start_wait_sampler()
         self._refresh_monitoring_target_status()
         self._refresh_automation_badges()
         self.refresh()
@@ -1482,6 +1536,7 @@ class WaitStatsView(BaseView):
         """Called when view is hidden"""
         if hasattr(self, "_monitor_timer"):
             self._monitor_timer.stop()
+        self._service.stop_wait_sampler()
         if self._refresh_worker and self._refresh_worker.isRunning():
             self._refresh_worker.cancel()
         if self._schedule_worker and self._schedule_worker.isRunning():
@@ -1516,6 +1571,59 @@ class WaitStatsView(BaseView):
         if self._is_initialized:
             self.refresh()
 
+    def _on_wait_scope_changed(self, _index: int) -> None:
+        payload = self._last_payload
+        if payload is None:
+            return
+        self._render_category_panel(payload.summary)
+        self._render_waits_for_scope(payload)
+
+    def _scope_interval(self, summary: WaitSummary) -> Optional[WaitIntervalDelta]:
+        """Rolling-window delta when the interval scope is selected (None: cumulative view)."""
+        if self._wait_scope_combo.currentData() != "interval":
+            return None
+        delta = summary.interval_window or summary.interval
+        if delta is None or delta.interval_seconds <= 0:
+            return None
+        return delta
+
+    def _scope_title_suffix(self, summary: WaitSummary) -> str:
+        delta = self._scope_interval(summary)
+        if delta is not None:
+            return f" (last {delta.interval_seconds:.0f}s)"
+        if self._wait_scope_combo.currentData() == "interval":
+            return " (since restart, interval baseline pending)"
+        return " (since restart)"
+
+    def _render_waits_for_scope(self, payload: WaitStatsRefreshPayload) -> None:
+        summary = payload.summary
+        if self._waits_title_label is not None:
+            suffix = " (query correlation)" if payload.correlation_used else self._scope_title_suffix(summary)
+            self._waits_title_label.setText(f"Top Wait Types{suffix}")
+        if payload.correlation_used:
+            self._update_waits_list(
+                payload.waits_to_render,
+                trend_points=payload.trend_points,
+                baseline=payload.baseline_comparison,
+                total_wait_ms=summary.total_wait_time_ms,
+            )
+            return
+        delta = self._scope_interval(summary)
+        if delta is not None:
+            # Baseline deltas are cumulative-scale; they do not apply to interval rows.
+            self._update_waits_list(
+                self._service.interval_wait_stats(delta),
+                trend_points=payload.trend_points,
+                total_wait_ms=delta.total_wait_time_ms,
+            )
+            return
+        self._update_waits_list(
+            summary.top_waits,
+            trend_points=payload.trend_points,
+            baseline=payload.baseline_comparison,
+            total_wait_ms=summary.total_wait_time_ms,
+        )
+
     def _on_trend_display_mode_changed(self, _index: int) -> None:
         self._render_trend(
             self._trend_points_cache,
@@ -1531,6 +1639,70 @@ class WaitStatsView(BaseView):
             self._monitor_timer.stop()
         self._refresh_automation_badges()
 
+    def _on_sampler_toggle_changed(self, _state: int) -> None:
+        if self._sampler_enabled_chk.isChecked() and self._is_initialized:
+            if not self._service.start_wait_sampler():
+                self._sampler_status_label.setText("Sampler unavailable (no active connection)")
+                return
+            self._sampler_status_label.setText("Sampler running, histograms appear on the next refresh")
+        else:
+            self._service.stop_wait_sampler()
+            self._sampler_status_label.setText("Sampler off")
+
+    def _on_xe_toggle_changed(self, _state: int) -> None:
+        if self._xe_enabled_chk.isChecked():
+            ok, message = self._service.enable_xe_collection()
+            self._xe_status_label.setText(message)
+            if not ok:
+                self._xe_enabled_chk.blockSignals(True)
+                self._xe_enabled_chk.setChecked(False)
+                self._xe_enabled_chk.blockSignals(False)
+        else:
+            self._service.disable_xe_collection()
+            self._xe_status_label.setText("XE telemetry off")
+
+    def _render_xe_telemetry(self, summary: WaitSummary) -> None:
+        label = getattr(self, "_xe_status_label", None)
+        telemetry = summary.xe_telemetry
+        if label is None or telemetry is None:
+            return
+        if telemetry.error:
+            label.setText(f"XE: {telemetry.error}")
+            return
+        counts = telemetry.counts
+        text = (
+            f"XE: {telemetry.total_events} new events | waits {counts.get('wait_completed', 0)}, "
+            f"blocked reports {counts.get('blocked_process_report', 0)}, "
+            f"deadlocks {counts.get('xml_deadlock_report', 0)}"
+        )
+        if telemetry.wait_ms_by_type:
+            top_type, top_ms = max(telemetry.wait_ms_by_type.items(), key=lambda item: item[1])
+            text += f" | top {top_type} {self._format_ms_compact(int(top_ms))}"
+        if telemetry.missed_events:
+            text += f" | {telemetry.missed_events} missed (ring buffer overrun)"
+        label.setText(text)
+
+    def _render_sampled_waits(self, summary: WaitSummary) -> None:
+        label = getattr(self, "_sampler_status_label", None)
+        sampled = summary.sampled_waits
+        if label is None or sampled is None:
+            return
+        if sampled.polls <= 0:
+            label.setText(f"Sampler: no polls yet {sampled.last_error}".strip())
+            return
+        parts = [
+            f"{hist.wait_type} x{hist.observations} (p95 {hist.percentile_ms(95.0)}ms, max {hist.max_duration_ms}ms)"
+            for hist in sampled.wait_types[:3]
+        ]
+        text = (
+            f"{sampled.polls} polls / {sampled.window_seconds:.0f}s @ {sampled.effective_interval_ms}ms "
+            f"(avg poll {sampled.avg_poll_ms:.1f}ms): "
+            + ("; ".join(parts) if parts else "no waiting tasks sampled")
+        )
+        if sampled.backoff_active:
+            text += " [backed off]"
+        label.setText(text)
+
     def _on_monitor_tick(self) -> None:
         if not self._is_initialized:
             return
@@ -1641,12 +1813,7 @@ class WaitStatsView(BaseView):
         steps = [
             lambda: self._update_ui(payload.summary),
             lambda: self._render_trend(payload.trend_points, payload.trend_source, payload.trend_days),
-            lambda: self._update_waits_list(
-                payload.waits_to_render if payload.correlation_used else payload.summary.top_waits,
-                trend_points=payload.trend_points,
-                baseline=payload.baseline_comparison,
-                total_wait_ms=payload.summary.total_wait_time_ms,
-            ),
+            lambda: self._render_waits_for_scope(payload),
             lambda: self._render_signature_baseline(payload.signatures, payload.baseline_comparison),
             lambda: self._render_wait_chain(payload.blocking_analysis),
             lambda: self._render_alerts(payload.alerts, payload.thresholds),
@@ -1917,6 +2084,18 @@ class WaitStatsView(BaseView):
         if self._alerts_block is not None:
             self._alerts_block.setStyleSheet(block_style_default)
 
+        transitions = self._service.get_alert_transitions(self._alert_transition_seq)
+        if transitions:
+            self._alert_transition_seq = transitions[-1].seq
+        pending_count = int(self._service.get_alert_state_counts().get("pending", 0) or 0)
+        state_notes: List[str] = []
+        if pending_count > 0:
+            state_notes.append(f"{pending_count} pending")
+        if transitions:
+            latest = transitions[-1]
+            state_notes.append(f"last change: {latest.title} {latest.from_state.value} -> {latest.to_state.value}")
+        state_line = ("\n" + " | ".join(state_notes)) if state_notes else ""
+
         if not alerts:
             self._alert_label.setStyleSheet(
                 f"color: {Colors.SUCCESS}; font-size: 12px; background: transparent;"
@@ -1925,6 +2104,7 @@ class WaitStatsView(BaseView):
                 "No active wait alerts.\n"
                 f"Thresholds: wait>={thresholds.total_wait_time_ms:,}ms | "
                 f"lock>={thresholds.lock_wait_percent:.1f}% | blocked>={thresholds.blocked_sessions}"
+                + state_line
             )
             return
 
@@ -1948,7 +2128,7 @@ class WaitStatsView(BaseView):
             for alert in alerts[:3]
         ]
         extra = f"\n+{len(alerts) - 3} more alert(s)" if len(alerts) > 3 else ""
-        self._alert_label.setText(f"{len(alerts)} active alert(s)\n" + "\n".join(lines) + extra)
+        self._alert_label.setText(f"{len(alerts)} active alert(s)\n" + "\n".join(lines) + extra + state_line)
 
     def _render_comparative(self, analysis: WaitComparativeAnalysis) -> None:
         status = str(analysis.status or "insufficient-data")
@@ -2124,6 +2304,7 @@ class WaitStatsView(BaseView):
     def _on_schedule_settings_changed(self, _value: int) -> None:
         self._schedule_config.enabled = bool(self._schedule_enabled_chk.isChecked())
         self._schedule_config.interval_minutes = int(self._schedule_interval_spin.value())
+        self._schedule_config.compress = bool(self._schedule_compress_chk.isChecked())
         self._refresh_automation_badges()
 
     def _on_save_schedule_clicked(self) -> None:
@@ -2188,6 +2369,11 @@ class WaitStatsView(BaseView):
             f"color: {Colors.TEXT_SECONDARY}; font-size: 12px; background: transparent;"
         )
         header_text = f"Enabled: {len(enabled)}/{len(targets)}"
+        outbox = self._service.get_monitoring_outbox_status()
+        pending = int(outbox.get("pending", 0) or 0)
+        dead = int(outbox.get("dead_lettered", 0) or 0)
+        if pending or dead:
+            header_text += f" | outbox pending={pending}, dead-letter={dead}"
         if label_text:
             self._monitoring_status_label.setText(f"{header_text}\n{label_text}{more}")
         else:
@@ -2247,12 +2433,17 @@ class WaitStatsView(BaseView):
             chain=payload.blocking_analysis,
             alerts=payload.alerts,
         )
-        success = int(result.get("success", 0) or 0)
-        failed = int(result.get("failed", 0) or 0)
-        if failed > 0:
-            self._set_status(f"Monitoring push complete: success={success}, failed={failed}.", Colors.WARNING)
-        else:
-            self._set_status(f"Monitoring push complete: success={success}, failed={failed}.", Colors.SUCCESS)
+        queued = int(result.get("queued", 0) or 0)
+        pending = int(result.get("pending", 0) or 0)
+        if queued <= 0:
+            self._set_status("No enabled monitoring targets to push.", Colors.WARNING)
+            return
+        # Enqueued only; delivery happens in the outbox background loop.
+        self._set_status(
+            f"Monitoring push queued for {queued} target(s), delivery pending | outbox pending={pending}.",
+            Colors.INFO,
+        )
+        self._refresh_monitoring_target_status()
 
     def _on_save_before_clicked(self) -> None:
         payload = self._last_payload
@@ -2742,15 +2933,35 @@ class WaitStatsView(BaseView):
             self._summary_health_label.setStyleSheet(
                 f"color: {health_color}; font-size: 12px; font-weight: 800; background: transparent;"
             )
+            interval = summary.interval
+            if interval is not None and interval.interval_seconds > 0:
+                top = interval.waits[0].wait_type if interval.waits else "none"
+                health_text += (
+                    f"  |  Now: {self._format_ms_compact(int(interval.wait_ms_per_sec))}/s wait "
+                    f"over {interval.interval_seconds:.0f}s, top {top}"
+                )
+                if interval.counter_reset:
+                    health_text += " (counters reset)"
             self._summary_health_label.setText(health_text)
 
-        category_stats = summary.category_stats or {}
+        self._render_sampled_waits(summary)
+        self._render_xe_telemetry(summary)
+        self._render_category_panel(summary)
+
+    def _render_category_panel(self, summary: WaitSummary) -> None:
+        delta = self._scope_interval(summary)
+        if self._category_title_label is not None:
+            self._category_title_label.setText(f"Wait Categories{self._scope_title_suffix(summary)}")
+        category_stats = (delta.category_wait_ms if delta is not None else summary.category_stats) or {}
         total_category_wait = max(1, sum(int(v or 0) for v in category_stats.values()))
         for category in self.CATEGORY_ORDER:
             wait_time = int(category_stats.get(category, 0) or 0)
             label = self._category_value_labels.get(category)
             if label is not None:
-                label.setText(self._format_ms_compact(wait_time))
+                if delta is not None:
+                    label.setText(f"{self._format_ms_compact(int(wait_time / delta.interval_seconds))}/s")
+                else:
+                    label.setText(self._format_ms_compact(wait_time))
             pct = (float(wait_time) * 100.0) / float(total_category_wait)
             pct_label = self._category_percent_labels.get(category)
             if pct_label is not None:
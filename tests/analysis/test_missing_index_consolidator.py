@@ -0,0 +1,100 @@
+"""MissingIndexConsolidator birleştirme kuralları"""
+
+from app.analysis.missing_index_consolidator import (
+    MissingIndexConsolidator,
+    MissingIndexSuggestion,
+)
+
+
+def _suggestion(eq, ineq=(), include=(), impact=50.0, executions=10.0, table="Orders"):
+    return MissingIndexSuggestion(
+        database="Sales",
+        schema_name="dbo",
+        table_name=table,
+        equality_columns=list(eq),
+        inequality_columns=list(ineq),
+        include_columns=list(include),
+        impact=impact,
+        executions=executions,
+    )
+
+
+def test_identical_keys_merge_includes():
+    consolidator = MissingIndexConsolidator()
+    consolidator.add(_suggestion(["a"], include=["x"]))
+    consolidator.add(_suggestion(["a"], include=["y"]))
+
+    results = consolidator.consolidate()
+
+    assert len(results) == 1
+    assert results[0].key_columns == ["a"]
+    assert sorted(results[0].include_columns) == ["x", "y"]
+    assert results[0].suggestion_count == 2
+
+
+def test_inequality_on_candidate_equality_keeps_own_equalities_first():
+    # S1: b = ? AND a = ? AND c > ?   S2: a = ? AND b > ?
+    # Tek index ikisine de seek verebilmek için (a, b, c) olmalı.
+    consolidator = MissingIndexConsolidator()
+    consolidator.add(_suggestion(["b", "a"], ["c"], impact=80.0))
+    consolidator.add(_suggestion(["a"], ["b"], impact=40.0))
+
+    results = consolidator.consolidate()
+
+    assert len(results) == 1
+    assert results[0].key_columns == ["a", "b", "c"]
+    assert results[0].suggestion_count == 2
+
+
+def test_incompatible_seek_prefixes_stay_separate():
+    # (a, ...) ve (b, ...) önekleri tek anahtar sırasıyla karşılanamaz
+    consolidator = MissingIndexConsolidator()
+    consolidator.add(_suggestion(["a", "b"], ["c"]))
+    consolidator.add(_suggestion(["a"], ["b"]))
+    consolidator.add(_suggestion(["b"], ["a"]))
+
+    results = consolidator.consolidate()
+
+    assert len(results) == 2
+    assert sum(item.suggestion_count for item in results) == 3
+    for item in results:
+        if item.suggestion_count == 2:
+            assert item.key_columns[:2] == ["a", "b"]
+
+
+def test_include_width_cap_blocks_merge():
+    consolidator = MissingIndexConsolidator(max_include_columns=1)
+    consolidator.add(_suggestion(["a", "b"], include=["x"]))
+    consolidator.add(_suggestion(["a"], include=["y", "z"]))
+
+    assert len(consolidator.consolidate()) == 2
+
+
+def test_dmv_rows_are_scored_by_impact_and_usage():
+    consolidator = MissingIndexConsolidator()
+    consolidator.add_dmv_rows([
+        {
+            "statement": "[Sales].[dbo].[Orders]",
+            "equality_columns": "[CustomerId]",
+            "inequality_columns": "[OrderDate]",
+            "included_columns": "[Total]",
+            "avg_user_impact": 90,
+            "user_seeks": 100,
+            "user_scans": 0,
+        },
+        {
+            "statement": "[Sales].[dbo].[Items]",
+            "equality_columns": "[Sku]",
+            "inequality_columns": None,
+            "included_columns": None,
+            "avg_user_impact": 10,
+            "user_seeks": 5,
+            "user_scans": 5,
+        },
+    ])
+
+    results = consolidator.consolidate(top_n=1)
+
+    assert [item.table_name for item in results] == ["Orders"]
+    assert results[0].score == 90.0
+    assert "ON [dbo].[Orders] ([CustomerId], [OrderDate])" in results[0].create_statement
@@ -0,0 +1,106 @@
+"""PlanCacheScanner - sahte plan XML getiricisiyle tarama ve toplama"""
+
+import threading
+
+from app.analysis.plan_cache_scanner import (
+    CATEGORY_IMPLICIT_CONVERSION,
+    CATEGORY_KEY_LOOKUP,
+    CATEGORY_MEMORY_GRANT,
+    CATEGORY_MISSING_INDEX,
+    PlanCacheScanner,
+    iter_plan_cache_entries,
+)
+
+_PLAN_XML = (
+    '<ShowPlanXML xmlns="http://schemas.microsoft.com/sqlserver/2004/07/showplan" Version="1.564">'
+    "<BatchSequence><Batch><Statements>"
+    '<StmtSimple StatementText="SELECT ..." StatementId="1" StatementType="SELECT">'
+    '<QueryPlan DegreeOfParallelism="1">'
+    "<Warnings>"
+    '<PlanAffectingConvert ConvertIssue="Seek Plan" '
+    'Expression="CONVERT_IMPLICIT(nvarchar(20),[Sales].[dbo].[Orders].[Code],0)"/>'
+    "</Warnings>"
+    '<MissingIndexes><MissingIndexGroup Impact="85">'
+    '<MissingIndex Database="[Sales]" Schema="[dbo]" Table="[Orders]">'
+    '<ColumnGroup Usage="EQUALITY"><Column Name="[CustomerId]"/></ColumnGroup>'
+    '<ColumnGroup Usage="INCLUDE"><Column Name="[Total]"/></ColumnGroup>'
+    "</MissingIndex></MissingIndexGroup></MissingIndexes>"
+    '<RelOp NodeId="0" PhysicalOp="Nested Loops" LogicalOp="Inner Join" EstimateRows="2000">'
+    "<NestedLoops>"
+    '<RelOp NodeId="1" PhysicalOp="Index Seek" LogicalOp="Index Seek" EstimateRows="2000">'
+    '<IndexScan><Object Database="[Sales]" Schema="[dbo]" Table="[Orders]" Index="[IX_Code]"/></IndexScan>'
+    "</RelOp>"
+    '<RelOp NodeId="2" PhysicalOp="Key Lookup" LogicalOp="Key Lookup" EstimateRows="1" EstimateRebinds="1999">'
+    '<IndexScan Lookup="1"><Object Database="[Sales]" Schema="[dbo]" Table="[Orders]" Index="[PK_Orders]"/></IndexScan>'
+    "</RelOp>"
+    "</NestedLoops></RelOp>"
+    "</QueryPlan></StmtSimple></Statements></Batch></BatchSequence></ShowPlanXML>"
+)
+
+
+def _entries():
+    return list(iter_plan_cache_entries([
+        {"plan_handle": b"\x01", "execution_count": 10, "total_cpu_ms": 500.0},
+        {"plan_handle": b"\x02", "execution_count": 30, "total_cpu_ms": 900.0,
+         "max_grant_kb": 50000, "max_used_grant_kb": 100},
+        {"plan_handle": b"\x03", "execution_count": 1, "total_cpu_ms": 10.0},
+        {"plan_handle": b"\x04", "execution_count": 1, "total_cpu_ms": 5.0},
+        {"plan_handle": None},
+    ]))
+
+
+class _FakeFetcher:
+    """Plan handle -> XML; worker thread'lerinden çağrıldığı için sayaç kilitli."""
+
+    def __init__(self, plans):
+        self._plans = plans
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def __call__(self, entry):
+        with self._lock:
+            self.calls += 1
+        entry.database_name = "Sales"
+        return self._plans.get(entry.handle_hex)
+
+
+def test_scan_aggregates_findings_by_object():
+    fetcher = _FakeFetcher({"0x01": _PLAN_XML, "0x02": _PLAN_XML, "0x03": None, "0x04": "<not-xml"})
+    progress = []
+
+    result = PlanCacheScanner(fetcher, max_workers=2).scan(
+        _entries(), progress_callback=lambda done, total: progress.append((done, total))
+    )
+
+    assert fetcher.calls == 4
+    assert (result.plans_requested, result.plans_scanned) == (4, 2)
+    assert (result.plans_without_xml, result.plans_failed, result.plans_with_findings) == (1, 1, 2)
+    assert progress[-1] == (4, 4)
+    assert result.category_counts[CATEGORY_KEY_LOOKUP] == 2
+    assert result.category_counts[CATEGORY_IMPLICIT_CONVERSION] == 2
+    assert result.category_counts[CATEGORY_MISSING_INDEX] == 2
+    # Yalnızca ikinci planın DMV grant'i kullanılmamış
+    assert result.category_counts[CATEGORY_MEMORY_GRANT] == 1
+
+    lookup = result.by_object[("sales.dbo.orders", "pk_orders")]
+    assert lookup.plan_count == 2
+    assert lookup.total_cpu_ms == 1400.0
+    assert lookup.samples[0].severity == "High"
+    convert = result.by_object[("sales.dbo.orders", "code")]
+    assert convert.category_counts[CATEGORY_IMPLICIT_CONVERSION] == 2
+
+    assert len(result.missing_indexes) == 1
+    index = result.missing_indexes[0]
+    assert (index.key_columns, index.include_columns) == (["CustomerId"], ["Total"])
+    assert index.suggestion_count == 2
+
+
+def test_cancel_stops_before_fetching():
+    fetcher = _FakeFetcher({"0x01": _PLAN_XML})
+
+    result = PlanCacheScanner(fetcher).scan(_entries(), cancel_check=lambda: True)
+
+    assert result.cancelled
+    assert fetcher.calls == 0
+    assert result.plans_scanned == 0
+    assert "cancelled" in result.get_summary()
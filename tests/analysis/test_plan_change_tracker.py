@@ -0,0 +1,78 @@
+"""PlanChangeTracker - artımlı store, plan flip ve forcing adayı tespiti"""
+
+from datetime import date, datetime, timedelta
+
+from app.analysis.plan_change_tracker import PlanChangeTracker
+
+TODAY = date(2026, 10, 18)
+
+
+def _row(query_id, plan_id, day_offset, executions, avg_ms, interval_id, last_seen_hour=0, forced=False):
+    day = TODAY - timedelta(days=day_offset)
+    return {
+        "query_id": query_id,
+        "plan_id": plan_id,
+        "bucket_date": day,
+        "query_plan_hash": bytes([plan_id]),
+        "is_forced_plan": forced,
+        "force_failure_count": 0,
+        "first_seen": datetime.combine(day, datetime.min.time()),
+        "last_seen": datetime.combine(day, datetime.min.time()) + timedelta(hours=last_seen_hour),
+        "executions": executions,
+        "sum_duration_us": executions * avg_ms * 1000.0,
+        "sum_cpu_us": executions * avg_ms * 500.0,
+        "sum_logical_reads": executions * 100,
+        "max_interval_id": interval_id,
+    }
+
+
+def test_flip_is_detected_and_survives_round_trip():
+    tracker = PlanChangeTracker(window_days=7)
+    tracker.merge_rows([
+        _row(1, 10, day_offset=3, executions=50, avg_ms=5.0, interval_id=100),
+        _row(1, 11, day_offset=1, executions=40, avg_ms=25.0, interval_id=120),
+        _row(2, 20, day_offset=1, executions=40, avg_ms=5.0, interval_id=121),
+    ])
+    # Sonraki artımlı tarama aynı bucket'a eklenir
+    tracker.merge_rows([_row(1, 11, day_offset=1, executions=10, avg_ms=25.0, interval_id=130, last_seen_hour=5)])
+
+    restored = PlanChangeTracker.from_dict(tracker.to_dict())
+    impacts = restored.evaluate(flip_ratio=2.0, min_executions=5)
+
+    assert restored.last_interval_id == 130
+    assert restored.known_query_ids() == [1, 2]
+    assert [i.query_id for i in impacts] == [1]
+    flip = impacts[0]
+    assert (flip.current_plan_id, flip.best_plan_id) == (11, 10)
+    assert flip.get_plan(11).executions == 50
+    assert round(flip.worse_ratio, 1) == 5.0
+    assert flip.impact_ms == (25.0 - 5.0) * 50
+    assert flip.is_plan_flip and flip.is_forcing_candidate
+
+
+def test_forced_plan_regression_blocks_forcing_candidate():
+    tracker = PlanChangeTracker()
+    tracker.merge_rows([
+        _row(1, 10, day_offset=4, executions=50, avg_ms=5.0, interval_id=1),
+        _row(1, 11, day_offset=1, executions=50, avg_ms=20.0, interval_id=2, forced=True),
+    ])
+
+    impact = tracker.evaluate(flip_ratio=2.0)[0]
+
+    assert impact.forced_plan_id == 11
+    assert impact.forced_plan_regressed
+    assert not impact.is_forcing_candidate
+
+
+def test_prune_drops_buckets_outside_window():
+    tracker = PlanChangeTracker()
+    tracker.merge_rows([
+        _row(1, 10, day_offset=10, executions=50, avg_ms=5.0, interval_id=1),
+        _row(1, 11, day_offset=1, executions=50, avg_ms=20.0, interval_id=2),
+    ])
+
+    removed = tracker.prune(window_days=7, today=TODAY)
+
+    assert removed == 1
+    assert tracker.plan_count() == 1
+    assert tracker.evaluate() == []
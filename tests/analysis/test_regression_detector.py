@@ -0,0 +1,58 @@
+"""WorkloadRegressionDetector - baseline / recent pencere karşılaştırması"""
+
+from app.analysis.regression_detector import WorkloadRegressionDetector
+
+
+def _row(query_id, avg_ms, sd_ms=1.0, executions=100, plan_id=1, plan_count=1, cpu=None, reads=None):
+    return {
+        "query_id": query_id,
+        "query_text": f"SELECT {query_id}",
+        "total_executions": executions,
+        "avg_duration_ms": avg_ms,
+        "stdev_duration_ms": sd_ms,
+        "avg_cpu_ms": avg_ms if cpu is None else cpu,
+        "stdev_cpu_ms": sd_ms,
+        "avg_logical_reads": 1000.0 if reads is None else reads,
+        "stdev_logical_reads": 10.0,
+        "dominant_plan_id": plan_id,
+        "plan_count": plan_count,
+    }
+
+
+def test_significant_slowdown_is_reported_with_impact():
+    baseline = [_row(1, 10.0), _row(2, 10.0)]
+    recent = [_row(1, 40.0, executions=200), _row(2, 10.5)]
+
+    results = WorkloadRegressionDetector().compare(baseline, recent)
+
+    assert [r.query_id for r in results] == [1]
+    regression = results[0]
+    assert regression.is_regression
+    assert regression.significant_metrics == ["duration", "cpu"]
+    assert round(regression.duration.change_percent) == 300
+    assert regression.impact_ms == 30.0 * 200
+
+
+def test_noise_low_volume_and_new_queries_are_ignored():
+    baseline = [
+        _row(1, 10.0, sd_ms=50.0),       # büyük varyans: z eşiği altında
+        _row(2, 10.0, executions=3),     # az execution
+    ]
+    recent = [
+        _row(1, 14.0, sd_ms=50.0),
+        _row(2, 100.0, executions=3),
+        _row(3, 500.0),                  # baseline'da yok
+    ]
+
+    assert WorkloadRegressionDetector(min_executions=10).compare(baseline, recent) == []
+
+
+def test_plan_change_without_regression_is_optional_and_ranked_last():
+    baseline = [_row(1, 10.0), _row(2, 10.0, plan_id=5)]
+    recent = [_row(1, 30.0), _row(2, 10.0, plan_id=6, plan_count=2)]
+    detector = WorkloadRegressionDetector()
+
+    ranked = detector.compare(baseline, recent)
+    assert [(r.query_id, r.is_regression, r.plan_changed) for r in ranked] == [(1, True, False), (2, False, True)]
+
+    assert [r.query_id for r in detector.compare(baseline, recent, include_plan_changes=False)] == [1]
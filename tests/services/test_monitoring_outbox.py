@@ -0,0 +1,150 @@
+"""MonitoringOutbox teslimatı - yerel HTTP sunucusuna karşı batch, backoff ve dead-letter"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.services import monitoring_outbox
+from app.services.monitoring_outbox import MonitoringOutbox
+
+
+class _Receiver:
+    """Gelen istekleri kaydeden ve sıradaki durum kodunu dönen sahte hedef."""
+
+    def __init__(self):
+        self.requests = []
+        self.status_codes = []
+        self._lock = threading.Lock()
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0) or 0)
+                body = self.rfile.read(length).decode("utf-8")
+                with receiver._lock:
+                    receiver.requests.append(json.loads(body))
+                    code = receiver.status_codes.pop(0) if receiver.status_codes else 200
+                self.send_response(code)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/push"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def receiver():
+    server = _Receiver()
+    yield server
+    server.close()
+
+
+def _outbox(tmp_path, receiver, **kwargs):
+    target = SimpleNamespace(name="ops", url=receiver.url, payload_format="json", enabled=True, headers={})
+    return MonitoringOutbox(
+        store_path=tmp_path / "outbox.jsonl",
+        dead_letter_path=tmp_path / "dead.jsonl",
+        resolve_targets=lambda: [target],
+        client_factory=lambda: httpx.AsyncClient(timeout=5.0, trust_env=False),
+        **kwargs,
+    )
+
+
+def test_due_entries_are_batched_per_target(tmp_path, receiver):
+    outbox = _outbox(tmp_path, receiver, batch_size=2)
+    for index in range(3):
+        outbox.enqueue("ops", "json", {"seq": index})
+
+    first = outbox.flush()
+    second = outbox.flush()
+
+    assert (first.requests, first.delivered, first.pending) == (1, 2, 1)
+    assert receiver.requests[0]["count"] == 2
+    assert [item["seq"] for item in receiver.requests[0]["snapshots"]] == [0, 1]
+    # Tek kalan snapshot olduğu gibi gönderilir
+    assert receiver.requests[1] == {"seq": 2}
+    assert (second.delivered, second.pending) == (1, 0)
+
+
+def test_transient_failure_backs_off_then_retries(tmp_path, receiver):
+    outbox = _outbox(tmp_path, receiver, base_backoff_seconds=0.5)
+    receiver.status_codes = [503]
+    outbox.enqueue("ops", "json", {"seq": 1})
+
+    failed = outbox.flush()
+    early = outbox.flush()
+
+    assert (failed.retried, failed.pending) == (1, 1)
+    assert early.requests == 0
+
+    # Deneme durumu journal'dan geri yüklenir
+    reloaded = _outbox(tmp_path, receiver, base_backoff_seconds=0.5)
+    assert reloaded.pending_count() == 1
+    assert reloaded._entries[0].attempts == 1
+    assert reloaded._entries[0].next_attempt_at > time.time()
+
+    time.sleep(0.7)
+    delivered = outbox.flush()
+
+    assert (delivered.delivered, delivered.pending) == (1, 0)
+    assert len(receiver.requests) == 2
+    assert _outbox(tmp_path, receiver).pending_count() == 0
+
+
+def test_permanent_and_exhausted_failures_are_dead_lettered(tmp_path, receiver):
+    outbox = _outbox(tmp_path, receiver, max_attempts=2, base_backoff_seconds=0.0)
+    receiver.status_codes = [400, 503, 503]
+    outbox.enqueue("ops", "json", {"seq": "bad"})
+
+    rejected = outbox.flush()
+    assert (rejected.dead_lettered, rejected.pending) == (1, 0)
+
+    outbox.enqueue("ops", "json", {"seq": "flaky"})
+    assert outbox.flush().retried == 1
+    time.sleep(0.01)
+    exhausted = outbox.flush()
+
+    assert (exhausted.dead_lettered, exhausted.pending) == (1, 0)
+    assert outbox.dead_letter_count() == 2
+    reasons = [json.loads(line)["reason"] for line in (tmp_path / "dead.jsonl").read_text().splitlines()]
+    assert reasons[0].startswith("HTTP 400") and reasons[1].startswith("HTTP 503")
+    assert _outbox(tmp_path, receiver).pending_count() == 0
+
+
+def test_journal_appends_and_compacts(tmp_path, receiver, monkeypatch):
+    monkeypatch.setattr(monitoring_outbox, "COMPACT_MIN_JOURNAL_LINES", 10)
+    outbox = _outbox(tmp_path, receiver, batch_size=50)
+    store = tmp_path / "outbox.jsonl"
+
+    for index in range(6):
+        outbox.enqueue("ops", "json", {"seq": index})
+    assert len(store.read_text().splitlines()) == 6
+
+    outbox.flush()
+    # Teslim edilenler tek bir ack satırıyla işaretlenir
+    assert json.loads(store.read_text().splitlines()[-1]) == {
+        "op": "ack",
+        "ids": [entry["entry_id"] for entry in map(json.loads, store.read_text().splitlines()[:6])],
+    }
+
+    for index in range(4):
+        outbox.enqueue("ops", "json", {"seq": 10 + index})
+    # 7 + 4 satır eşiği aştı; yalnızca canlı kayıtlar kalır
+    lines = [json.loads(line) for line in store.read_text().splitlines()]
+    assert len(lines) == 4
+    assert [line["payload"]["seq"] for line in lines] == [10, 11, 12, 13]
+    assert _outbox(tmp_path, receiver).pending_count() == 4
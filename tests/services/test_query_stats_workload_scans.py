@@ -0,0 +1,123 @@
+"""QueryStatsService workload taramaları - sahte executor ile uçtan uca"""
+
+from datetime import date, datetime, timedelta
+
+from app.database.queries.query_store_queries import QueryStoreQueries
+from app.services.query_stats_service import QueryStatsService
+
+
+class _FakeService(QueryStatsService):
+    """Sorgu metnine göre hazır satır dönen, bağlı ve Query Store'u açık servis."""
+
+    is_connected = True
+
+    def __init__(self, responses):
+        self._responses = responses
+        self.calls = []
+        self._runtime_warnings = []
+
+    def use_query_store(self, force_refresh=False):
+        return True
+
+    def _get_connection_cache_key(self):
+        return "srv|Sales"
+
+    def _log_structured(self, *args, **kwargs):
+        pass
+
+    def _execute_query_with_retry(self, sql, params=None, operation_name="", **kwargs):
+        self.calls.append((operation_name, dict(params or {})))
+        return list(self._responses.get(sql, []))
+
+
+def _window_row(query_id, avg_ms, executions=100):
+    return {
+        "query_id": query_id,
+        "query_text": "SELECT * FROM dbo.Orders WHERE Id = 42",
+        "total_executions": executions,
+        "avg_duration_ms": avg_ms,
+        "stdev_duration_ms": 1.0,
+        "avg_cpu_ms": avg_ms,
+        "stdev_cpu_ms": 1.0,
+        "avg_logical_reads": 10.0,
+        "stdev_logical_reads": 1.0,
+        "dominant_plan_id": 1,
+        "plan_count": 1,
+    }
+
+
+def test_detect_workload_regressions_compares_adjacent_windows():
+    # Aynı SQL iki pencere için çağrılır; sahte executor sırayla baseline / recent döner
+    windows = iter([[_window_row(7, 10.0)], [_window_row(7, 50.0)]])
+    service = _FakeService({})
+
+    def execute(sql, params=None, operation_name="", **kwargs):
+        service.calls.append((operation_name, dict(params or {})))
+        return next(windows)
+
+    service._execute_query_with_retry = execute
+    recent_end = datetime.now()
+
+    results = service.detect_workload_regressions(
+        recent_start=recent_end - timedelta(days=7),
+        recent_end=recent_end,
+    )
+
+    assert [name for name, _ in service.calls] == [
+        "detect_workload_regressions.baseline",
+        "detect_workload_regressions.recent",
+    ]
+    baseline_params, recent_params = service.calls[0][1], service.calls[1][1]
+    assert baseline_params["end_minutes_ago"] == recent_params["start_minutes_ago"]
+    assert baseline_params["start_minutes_ago"] - baseline_params["end_minutes_ago"] == 7 * 24 * 60
+    assert [r.query_id for r in results] == [7]
+    assert results[0].is_regression
+
+
+def test_scan_plan_changes_is_incremental(tmp_path, monkeypatch):
+    monkeypatch.setattr(QueryStatsService, "_plan_change_store_path", staticmethod(lambda: tmp_path / "pc.json"))
+    today = datetime.combine(date.today(), datetime.min.time())
+
+    def delta_row(plan_id, days_ago, avg_ms, interval_id):
+        return {
+            "query_id": 3,
+            "plan_id": plan_id,
+            "bucket_date": today - timedelta(days=days_ago),
+            "query_plan_hash": f"0x{plan_id:02X}",
+            "last_seen": today - timedelta(days=days_ago),
+            "executions": 20,
+            "sum_duration_us": 20 * avg_ms * 1000.0,
+            "sum_cpu_us": 0,
+            "sum_logical_reads": 0,
+            "max_interval_id": interval_id,
+        }
+
+    service = _FakeService({
+        QueryStoreQueries.PLAN_PERFORMANCE_DELTA: [delta_row(1, 3, 5.0, 10), delta_row(2, 1, 30.0, 11)],
+        QueryStoreQueries.QUERY_TEXT_BATCH: [{"query_id": 3, "query_text": "SELECT 1", "object_name": "usp_Orders"}],
+    })
+
+    first = service.scan_plan_changes(days=7)
+    service._responses[QueryStoreQueries.PLAN_PERFORMANCE_DELTA] = []
+    second = service.scan_plan_changes(days=7)
+
+    assert [(i.query_id, i.current_plan_id, i.best_plan_id) for i in first] == [(3, 2, 1)]
+    assert first[0].is_plan_flip and first[0].display_name == "usp_Orders"
+    # İkinci tarama watermark'tan devam eder ve store'daki planları yeniden değerlendirir
+    delta_calls = [params for name, params in service.calls if name == "scan_plan_changes"]
+    assert delta_calls[0]["last_interval_id"] == 0
+    assert delta_calls[1]["last_interval_id"] == 11
+    assert delta_calls[1]["known_query_ids_json"] == "[3]"
+    assert [i.query_id for i in second] == [3]
+
+
+def test_workload_scans_return_nothing_when_disconnected():
+    service = _FakeService({})
+    type(service).is_connected = False
+    try:
+        assert service.detect_workload_regressions() == []
+        assert service.scan_plan_changes() == []
+        assert service.scan_plan_cache() is None
+        assert service.calls == []
+    finally:
+        type(service).is_connected = True
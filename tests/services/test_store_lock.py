@@ -0,0 +1,44 @@
+"""StoreLock - süreçler arası dışlama ve aynı thread içinde yeniden girilebilirlik"""
+
+import multiprocessing
+import time
+
+import pytest
+
+from app.services.store_lock import StoreLock
+
+
+def _hold_and_report(path, queue):
+    started = time.monotonic()
+    with StoreLock(lambda: path):
+        queue.put(time.monotonic() - started)
+
+
+def test_lock_is_reentrant_and_releases_file_lock(tmp_path):
+    lock = StoreLock(lambda: tmp_path / "store.lock")
+
+    with lock:
+        with lock:
+            assert lock._handle is not None
+        assert lock._handle is not None
+
+    assert lock._handle is None
+    assert (tmp_path / "store.lock").exists()
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_second_process_waits_for_holder(tmp_path):
+    path = tmp_path / "store.lock"
+    ctx = multiprocessing.get_context("fork")
+    queue = ctx.Queue()
+
+    with StoreLock(lambda: path):
+        child = ctx.Process(target=_hold_and_report, args=(path, queue))
+        child.start()
+        time.sleep(0.5)
+        assert queue.empty()
+
+    waited = queue.get(timeout=10)
+    child.join(timeout=10)
+    assert child.exitcode == 0
+    assert waited >= 0.4
@@ -0,0 +1,97 @@
+"""WaitSampler - bağlantı sahipliği ve histogram özeti"""
+
+import threading
+import time
+
+from app.services.wait_sampler import WaitSampler
+
+
+class _FakeCursor:
+    def __init__(self, conn):
+        self._conn = conn
+        self._rows = []
+
+    def execute(self, sql):
+        if self._conn.closed:
+            raise RuntimeError("execute on closed connection")
+        if sql.startswith("SET"):
+            self._conn.session_sql.append(sql)
+            return
+        self._conn.polls += 1
+        self._conn.release.wait(5.0)
+        if self._conn.closed:
+            raise RuntimeError("connection closed under execute")
+        self._rows = list(self._conn.rows)
+
+    def fetchall(self):
+        return self._rows
+
+    def close(self):
+        pass
+
+
+class _FakeConnection:
+    def __init__(self, rows=(), blocking=False):
+        self.rows = list(rows)
+        self.release = threading.Event()
+        if not blocking:
+            self.release.set()
+        self.polls = 0
+        self.closed = False
+        self.session_sql = []
+
+    def cursor(self):
+        return _FakeCursor(self)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def _wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_stop_leaves_in_flight_connection_to_poll_thread():
+    conn = _FakeConnection(rows=[(51, "LCK_M_X", 40, 52, "KEY: 5:1")], blocking=True)
+    sampler = WaitSampler(lambda: conn, interval_ms=250)
+    sampler.start()
+    assert _wait_until(lambda: conn.polls == 1)
+
+    sampler.stop(timeout=0.05)
+    # Poll thread hâlâ execute içinde; bağlantı altından kapatılmamalı
+    assert not conn.closed
+
+    conn.release.set()
+    assert _wait_until(lambda: conn.closed)
+    assert "READ COMMITTED" in conn.session_sql[-1]
+    assert sampler.last_error == ""
+
+
+def test_summary_builds_histograms_from_polls():
+    conn = _FakeConnection(rows=[
+        (51, "PAGELATCH_EX", 3, 0, "2:1:1"),
+        (52, "PAGELATCH_EX", 700, 51, "2:1:1"),
+        (53, "LCK_M_S", 20, 51, "KEY"),
+    ])
+    sampler = WaitSampler(lambda: conn)
+
+    sampler.poll_once(conn)
+    sampler.poll_once(conn)
+    summary = sampler.summarize()
+
+    assert (summary.polls, summary.observations) == (2, 6)
+    latch = summary.wait_types[0]
+    assert latch.wait_type == "PAGELATCH_EX"
+    assert (latch.observations, latch.polls_seen, latch.sessions) == (4, 2, 2)
+    assert latch.blocked_observations == 2
+    assert latch.max_duration_ms == 700
+    assert summary.top_resources[0] == ("2:1:1", 4)
+    assert sampler.summarize().observations == 0